@@ -0,0 +1,473 @@
+"""
+host-agent 統合プロセス
+
+デスクトップモニター・ファイルシステムウォッチャー・入力モニターを1プロセス・1イベントループで実行する。
+コレクターを個別のプロセスで起動する場合と比べて、以下を共有する。
+
+- ローカルSQLiteの接続（LocalDatabases: データベースごとに1接続）
+- データ同期（DataSyncManager: 3テーブルを1つの同期ループで同期）
+- PostgreSQL接続プール（データ同期と監視ディレクトリ設定の同期で共有）
+- 設定・メトリクス公開・保持期間処理
+
+各コレクターは監視タスクとして実行し、例外や予期しない終了で停止した場合は
+待機時間を倍増させながら同じプロセス内で再起動する。
+
+コレクターはPostgreSQLへの接続を待たずにローカルへの記録を開始する。
+コレクター・同期のモジュールは使用時に読み込み、PostgreSQLへの接続はコレクターの起動後に
+バックグラウンドで行う（ファイルシステムウォッチャーは接続までYAML設定で監視する）。
+
+使い方:
+    python agent.py                              # 全コレクター
+    python agent.py --collectors desktop input   # 指定したコレクターのみ
+"""
+
+import argparse
+import asyncio
+import logging
+import signal
+import sys
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, List, Optional
+
+# host-agent/ をパスに追加（common・collectors モジュールをインポートするため）
+sys.path.insert(0, str(Path(__file__).parent))
+
+from common.config import ConfigManager
+from common.database import LocalDatabases
+from common.metrics import COLLECTOR_RESTARTS, start_metrics_exporter, stop_metrics_exporters
+from common.retention import LocalRetentionManager, default_targets
+
+if TYPE_CHECKING:
+    import asyncpg
+    from collectors.filesystem_watcher_v2 import FileSystemWatcherV2
+    from collectors.input_monitor import InputMonitor
+    from common.config_sync import ConfigSyncManager
+    from common.data_sync import DataSyncManager
+
+logger = logging.getLogger(__name__)
+
+# コレクター名（起動順）
+COLLECTORS = ('desktop', 'files', 'input')
+
+
+async def run_in_thread(
+    start: Callable[[], None],
+    stop: Callable[[], None],
+    stop_event: asyncio.Event,
+):
+    """
+    ブロッキングする監視ループを別スレッドで実行
+
+    停止イベントが設定されるか監視ループが終了するまで待機し、いずれの場合も stop() で後処理する。
+
+    Args:
+        start: 監視ループ（停止されるまで戻らない）
+        stop: 監視ループを停止する関数
+        stop_event: プロセス全体の停止イベント
+
+    Raises:
+        Exception: 監視ループで発生した例外
+    """
+    thread_task = asyncio.ensure_future(asyncio.to_thread(start))
+    stop_wait = asyncio.ensure_future(stop_event.wait())
+    try:
+        await asyncio.wait({thread_task, stop_wait}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        stop_wait.cancel()
+        await asyncio.to_thread(stop)
+        await asyncio.wait({thread_task})
+    thread_task.result()
+
+
+class SupervisedTask:
+    """
+    停止時に再起動されるタスク
+
+    run() が例外で終了した場合、または停止イベントが設定される前に終了した場合は、
+    待機時間（初回 backoff_initial 秒、以降倍増して最大 backoff_max 秒）の後に再起動する。
+    backoff_max 秒以上動作してから停止した場合は待機時間を初期値に戻す。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        run: Callable[[asyncio.Event], Awaitable[None]],
+        backoff_initial: float = 5.0,
+        backoff_max: float = 300.0,
+    ):
+        """
+        Args:
+            name: タスク名（ログ・メトリクスのラベル）
+            run: 停止イベントを受け取り、停止されるまで実行するコルーチン関数
+            backoff_initial: 再起動までの初回待機時間（秒）
+            backoff_max: 再起動までの最大待機時間（秒）
+        """
+        self.name = name
+        self.run = run
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.restarts = 0
+        self.restart_counter = COLLECTOR_RESTARTS.labels(name)
+
+    async def supervise(self, stop_event: asyncio.Event):
+        """停止イベントが設定されるまでタスクを実行し、停止した場合は再起動する"""
+        delay = self.backoff_initial
+        while not stop_event.is_set():
+            started = time.monotonic()
+            try:
+                await self.run(stop_event)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"{self.name} がエラーで停止しました: {e}", exc_info=True)
+            else:
+                if stop_event.is_set():
+                    break
+                logger.warning(f"{self.name} が予期せず終了しました")
+
+            if time.monotonic() - started >= self.backoff_max:
+                delay = self.backoff_initial
+            logger.info(f"{self.name} を{delay:.0f}秒後に再起動します")
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=delay)
+                break
+            except asyncio.TimeoutError:
+                pass
+            delay = min(delay * 2, self.backoff_max)
+            self.restarts += 1
+            self.restart_counter.inc()
+
+        logger.info(f"{self.name} を停止しました")
+
+
+class HostAgent:
+    """
+    コレクターを1プロセスで実行する統合エージェント
+
+    データベース接続・同期マネージャー・接続プールは start() で1回だけ作成し、
+    コレクターの再起動時も使い続ける。
+    """
+
+    def __init__(self, config_manager: ConfigManager, collectors: List[str]):
+        """
+        Args:
+            config_manager: 設定マネージャー
+            collectors: 実行するコレクター名（COLLECTORSの部分集合）
+        """
+        self.config_manager = config_manager
+        self.collectors = [name for name in COLLECTORS if name in collectors]
+        self.agent_config = config_manager.get_agent_config()
+
+        self.databases = LocalDatabases(
+            config_manager.get_sqlite_desktop_path(),
+            config_manager.get_sqlite_file_events_path(),
+            config_manager.get_sqlite_input_path(),
+        )
+        self.pool: Optional['asyncpg.Pool'] = None
+        self.sync_manager: Optional['DataSyncManager'] = None
+        self.config_sync_manager: Optional['ConfigSyncManager'] = None
+        self.retention_manager: Optional[LocalRetentionManager] = None
+
+        # 実行中の入力モニター・ファイルシステムウォッチャー（再起動で入れ替わる）
+        # 入力モニターは保持期間処理のアイドル判定、ウォッチャーは接続後の設定の切り替えに使用
+        self.input_monitor: Optional['InputMonitor'] = None
+        self.watcher: Optional['FileSystemWatcherV2'] = None
+
+        self.stop_event = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._connect_task: Optional[asyncio.Task] = None
+        self._metrics_exporters: List[object] = []
+
+    # ================================
+    # 共有リソース
+    # ================================
+
+    async def _create_pool(self) -> Optional['asyncpg.Pool']:
+        """共有のPostgreSQL接続プールを作成（接続できない場合はNone）"""
+        import asyncpg
+        from common.data_sync import TRANSPORT_POSTGRES
+
+        sync_config = self.config_manager.get_data_sync_config()
+        uses_postgres_sync = sync_config.get('enabled', True) and sync_config.get('transport') == TRANSPORT_POSTGRES
+        if not uses_postgres_sync and 'files' not in self.collectors:
+            return None
+
+        try:
+            pool = await asyncpg.create_pool(
+                self.config_manager.get_postgres_url(),
+                min_size=1,
+                max_size=5,
+                command_timeout=60
+            )
+            logger.info("共有のPostgreSQL接続プールを初期化しました")
+            return pool
+        except Exception as e:
+            # 各コンポーネントが個別の動作（スプール・再接続・YAMLフォールバック）で続行する
+            logger.warning(f"共有のPostgreSQL接続プールを作成できません: {e}")
+            return None
+
+    def _create_sync_manager(self) -> Optional['DataSyncManager']:
+        """3テーブルを同期するデータ同期マネージャーを作成（無効な場合はNone）"""
+        from common.data_sync import DataSyncManager
+
+        sync_config = self.config_manager.get_data_sync_config()
+        if not sync_config.get('enabled', True):
+            logger.info("データ同期は無効化されています（config.yaml: data_sync.enabled=false）")
+            return None
+
+        return DataSyncManager(
+            postgres_url=self.config_manager.get_postgres_url(),
+            sqlite_desktop_db_path=self.databases.desktop_path,
+            sqlite_file_events_db_path=self.databases.file_events_path,
+            sqlite_input_db_path=self.databases.input_path,
+            batch_size=sync_config.get('batch_size', 100),
+            sync_interval=sync_config.get('sync_interval_seconds', 300),
+            max_retries=sync_config.get('max_retries', 5),
+            transport=sync_config.get('transport', 'postgres'),
+            ingest_url=self.config_manager.get_ingest_url(),
+            compaction_mode=sync_config.get('compaction_mode', 'none'),
+            compaction_merge_gap_seconds=sync_config.get('compaction_merge_gap_seconds', 5),
+            raw_retention_hours=sync_config.get('raw_retention_hours', 168),
+            spool_dir=sync_config['spool_dir'] if sync_config.get('spool_enabled') else None,
+            spool_max_bytes=sync_config.get('spool_max_bytes', 256 * 1024 * 1024),
+            max_records_per_cycle=sync_config.get('max_records_per_cycle', 5000),
+            min_interval=sync_config.get('min_interval_seconds', 1),
+            max_idle_interval=sync_config.get('max_idle_interval_seconds', 1200),
+            backlog_threshold=sync_config.get('backlog_threshold', 1000),
+            backoff_initial=sync_config.get('retry_backoff_seconds', 30),
+            backoff_max=sync_config.get('max_backoff_seconds', 1800),
+            rate_limit_rows_per_second=sync_config.get('rate_limit_rows_per_second', 2000),
+            pool=self.pool
+        )
+
+    def _create_retention_manager(self) -> Optional[LocalRetentionManager]:
+        """ローカルSQLite保持期間処理を作成（無効な場合はNone）"""
+        retention_config = self.config_manager.get_local_retention_config()
+        if not retention_config.get('enabled', True):
+            return None
+
+        # データベースの縮小は入力モニターがアイドルを検出している間のみ行う
+        is_idle = None
+        if 'input' in self.collectors:
+            is_idle = lambda: self.input_monitor is not None and self.input_monitor.is_idle()
+
+        return LocalRetentionManager(
+            targets=default_targets(
+                self.databases.desktop_path,
+                self.databases.file_events_path,
+                self.databases.input_path,
+            ),
+            retention_days=retention_config.get('retention_days', 30),
+            delete_batch_size=retention_config.get('delete_batch_size', 500),
+            check_interval=retention_config.get('check_interval_seconds', 3600),
+            vacuum_step_pages=retention_config.get('vacuum_step_pages', 1024),
+            is_idle=is_idle,
+        )
+
+    # ================================
+    # コレクター
+    # ================================
+
+    async def _connect_postgres(self):
+        """
+        PostgreSQLに接続し、データ同期と監視ディレクトリ設定の同期を開始
+
+        コレクターの起動後にバックグラウンドで実行する。共有の接続プールを作成できない場合も
+        データ同期は開始し、同期ループが同期のたびに再接続を試みる。
+        """
+        self.pool = await self._create_pool()
+
+        try:
+            self.sync_manager = self._create_sync_manager()
+            if self.sync_manager:
+                self.sync_manager.run_sync_loop_in_background(asyncio.get_running_loop())
+        except Exception as e:
+            logger.error(f"データ同期マネージャー初期化エラー: {e}")
+            logger.info("同期機能なしで続行します")
+
+        if 'files' in self.collectors:
+            from common.config_sync import create_config_sync_manager
+
+            fs_config = self.config_manager.get_filesystem_watcher_config()
+            self.config_sync_manager, _ = await create_config_sync_manager(
+                database_url=self.config_manager.get_postgres_url(),
+                yaml_directories=fs_config.get('monitored_directories', []),
+                sync_interval=fs_config.get('sync_interval', 60),
+                pool=self.pool,
+            )
+            if self.config_sync_manager and self.watcher is not None:
+                await self.watcher.use_config_sync_manager(self.config_sync_manager)
+
+    async def _run_desktop(self, stop_event: asyncio.Event):
+        """デスクトップモニターを実行"""
+        from collectors.linux_x11_monitor import LinuxX11Monitor
+
+        monitor = LinuxX11Monitor(self.config_manager.get_desktop_monitor_config(), self.databases.desktop())
+        await run_in_thread(monitor.start_monitoring, monitor.stop_monitoring, stop_event)
+
+    async def _run_files(self, stop_event: asyncio.Event):
+        """
+        ファイルシステムウォッチャーを実行（監視スレッドが停止した場合は例外で終了）
+
+        PostgreSQLに接続済みであればその設定で、未接続であればYAML設定で監視を開始する。
+        """
+        from collectors.filesystem_watcher_v2 import FileSystemWatcherV2
+        from common.config_sync import FallbackConfigManager
+
+        fs_config = self.config_manager.get_filesystem_watcher_config()
+        fallback_manager = None
+        if self.config_sync_manager is None:
+            fallback_manager = FallbackConfigManager(fs_config.get('monitored_directories', []))
+        watcher = FileSystemWatcherV2(
+            fs_config,
+            self.databases.file_events(),
+            config_sync_manager=self.config_sync_manager,
+            fallback_manager=fallback_manager,
+        )
+        await watcher.start_async()
+        self.watcher = watcher
+        try:
+            interval = self.agent_config['health_check_interval_seconds']
+            while not stop_event.is_set():
+                stopped = [path for path, observer in watcher.observers.items() if not observer.is_alive()]
+                if stopped:
+                    raise RuntimeError(f"監視スレッドが停止しました: {', '.join(stopped)}")
+                try:
+                    await asyncio.wait_for(stop_event.wait(), timeout=interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.watcher = None
+            watcher.stop()
+
+    async def _run_input(self, stop_event: asyncio.Event):
+        """入力モニターを実行"""
+        from collectors.input_monitor import InputMonitor
+
+        monitor = InputMonitor(self.config_manager.get_input_monitor_config(), self.databases.input())
+        self.input_monitor = monitor
+        try:
+            await run_in_thread(monitor.start_monitoring, monitor.stop_monitoring, stop_event)
+        finally:
+            self.input_monitor = None
+
+    def _collector_runners(self) -> Dict[str, Callable[[asyncio.Event], Awaitable[None]]]:
+        """コレクター名 → 実行するコルーチン関数"""
+        return {
+            'desktop': self._run_desktop,
+            'files': self._run_files,
+            'input': self._run_input,
+        }
+
+    # ================================
+    # 起動・停止
+    # ================================
+
+    async def start(self):
+        """コレクターを開始し、PostgreSQLへの接続・同期ループ・保持期間処理をバックグラウンドで開始"""
+        self._metrics_exporters = start_metrics_exporter(self.config_manager.get_metrics_config(), 'agent')
+
+        if 'input' in self.collectors:
+            deleted_count = self.databases.input().delete_incomplete_sessions()
+            if deleted_count > 0:
+                logger.info(f"前回の未終了セッション {deleted_count} 件を削除しました")
+
+        runners = self._collector_runners()
+        for name in self.collectors:
+            task = SupervisedTask(
+                name,
+                runners[name],
+                backoff_initial=self.agent_config['restart_backoff_seconds'],
+                backoff_max=self.agent_config['max_restart_backoff_seconds'],
+            )
+            self._tasks.append(asyncio.create_task(task.supervise(self.stop_event)))
+
+        self._connect_task = asyncio.create_task(self._connect_postgres())
+
+        self.retention_manager = self._create_retention_manager()
+        if self.retention_manager:
+            self._tasks.append(asyncio.create_task(self.retention_manager.start_retention_loop()))
+
+        logger.info(f"host-agentを起動しました（コレクター: {', '.join(self.collectors)}）")
+
+    async def stop(self):
+        """全タスクを停止して共有リソースを解放"""
+        logger.info("host-agentを停止します")
+        self.stop_event.set()
+        if self.retention_manager:
+            self.retention_manager.stop()
+        if self._connect_task:
+            self._connect_task.cancel()
+            await asyncio.gather(self._connect_task, return_exceptions=True)
+
+        # コレクターは停止イベントで後処理（現在のセッションの終了）を行って終了する
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        if self.sync_manager:
+            await self.sync_manager.close()
+        if self.config_sync_manager:
+            await self.config_sync_manager.close()
+        if self.pool:
+            await self.pool.close()
+            logger.info("共有のPostgreSQL接続プールをクローズしました")
+        self.databases.close()
+        stop_metrics_exporters(self._metrics_exporters)
+        logger.info("host-agentを停止しました")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """コマンドライン引数を解析"""
+    parser = argparse.ArgumentParser(description='host-agent（全コレクターを1プロセスで実行）')
+    parser.add_argument(
+        '--collectors',
+        nargs='+',
+        choices=COLLECTORS,
+        default=list(COLLECTORS),
+        help='実行するコレクター（デフォルト: すべて）',
+    )
+    return parser.parse_args(argv)
+
+
+async def main_async(argv: Optional[List[str]] = None):
+    """統合プロセスのメイン処理（非同期）"""
+    args = parse_args(argv)
+
+    # ログ設定
+    logging.basicConfig(
+        level=logging.INFO,
+        format='[%(asctime)s] [%(levelname)s] [%(name)s] %(message)s'
+    )
+
+    config_manager = ConfigManager()
+    collectors = list(args.collectors)
+    if 'input' in collectors and not config_manager.get_input_monitor_config().get('enabled', True):
+        logger.info("InputMonitorは無効化されています（config.yaml: input_monitor.enabled=false）")
+        collectors.remove('input')
+    if not collectors:
+        logger.info("実行するコレクターがありません")
+        return
+
+    agent = HostAgent(config_manager, collectors)
+
+    # シグナルハンドラ登録（イベントループ上で停止イベントを設定）
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, agent.stop_event.set)
+
+    try:
+        await agent.start()
+        await agent.stop_event.wait()
+        logger.info("終了シグナルを受信しました")
+    finally:
+        await agent.stop()
+
+
+def main():
+    """エントリーポイント"""
+    asyncio.run(main_async())
+
+
+if __name__ == '__main__':
+    main()
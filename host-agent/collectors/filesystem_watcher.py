@@ -21,6 +21,7 @@ import sys
 sys.path.append(str(Path(__file__).parent.parent))
 
 from common.database import FileChangeDatabase
+from common.models import FileChangeEvent
 
 
 class FileChangeEventHandler(FileSystemEventHandler):
@@ -94,7 +95,7 @@ class FileChangeEventHandler(FileSystemEventHandler):
         except Exception:
             return None
 
-    def _create_event_data(self, event: FileSystemEvent, event_type: str) -> dict:
+    def _create_event_data(self, event: FileSystemEvent, event_type: str) -> FileChangeEvent:
         """
         イベントデータを作成
 
@@ -103,7 +104,7 @@ class FileChangeEventHandler(FileSystemEventHandler):
             event_type: イベントタイプ (created/modified/deleted/moved)
 
         Returns:
-            dict: イベントデータ
+            FileChangeEvent: イベント
         """
         file_path = event.src_path
         file_name = os.path.basename(file_path)
@@ -133,21 +134,21 @@ class FileChangeEventHandler(FileSystemEventHandler):
         event_time = int(time.time())
         event_time_iso = datetime.fromtimestamp(event_time).isoformat()
 
-        return {
-            'event_time': event_time,
-            'event_time_iso': event_time_iso,
-            'event_type': event_type,
-            'file_path': file_path,
-            'file_path_relative': file_path_relative,
-            'file_name': file_name,
-            'file_extension': file_extension,
-            'file_size': file_size,
-            'is_symlink': is_symlink,
-            'monitored_root': self.monitored_root,
-            'project_name': project_name
-        }
-
-    def _add_to_buffer(self, event_data: dict):
+        return FileChangeEvent(
+            event_time=event_time,
+            event_time_iso=event_time_iso,
+            event_type=event_type,
+            file_path=file_path,
+            file_name=file_name,
+            monitored_root=self.monitored_root,
+            file_extension=file_extension,
+            project_name=project_name,
+            file_path_relative=file_path_relative,
+            file_size=file_size,
+            is_symlink=is_symlink,
+        )
+
+    def _add_to_buffer(self, event_data: FileChangeEvent):
         """
         イベントをバッファに追加
 
@@ -253,7 +254,7 @@ class FileSystemWatcher:
         self.flush_timer = None
         self.is_running = False
 
-    def _save_events_batch(self, events: List[dict]):
+    def _save_events_batch(self, events: List[FileChangeEvent]):
         """
         イベントをバッチ保存
 
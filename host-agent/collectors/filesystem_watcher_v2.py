@@ -12,17 +12,33 @@ import signal
 import logging
 import threading
 import asyncio
+from collections import OrderedDict
 from pathlib import Path
 from datetime import datetime
-from typing import List, Optional, Dict, Set
+from typing import Callable, List, Optional, Dict, Sequence, Set
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler, FileSystemEvent
 
 import sys
 sys.path.append(str(Path(__file__).parent.parent))
 
+from common.content_hash import ContentVerifier
 from common.database import FileChangeDatabase
+from common.interning import DIMENSION_CACHE_MAX_AGE_SECONDS
+from common.line_stats import LineStatsAnalyzer
+from common.models import FileChangeEvent
+from common.project_resolver import ProjectResolver
 from common.config import ConfigManager
+from common.metrics import (
+    BUFFER_DEPTH,
+    EVENTS_DROPPED,
+    EVENTS_RECEIVED,
+    FLUSH_DURATION,
+    SQLITE_WRITE_DURATION,
+    WATCHES,
+    start_metrics_exporter,
+    stop_metrics_exporters,
+)
 from common.config_sync import (
     ConfigSyncManager,
     FallbackConfigManager,
@@ -43,7 +59,13 @@ class FileChangeEventHandler(FileSystemEventHandler):
         monitored_root: str,
         exclude_patterns: List[str],
         buffer_max_events: int,
-        flush_callback
+        flush_callback,
+        directory_resolver: Optional[Callable[[str], int]] = None,
+        directory_cache_size: int = 1024,
+        content_verifier: Optional[ContentVerifier] = None,
+        line_stats: Optional[LineStatsAnalyzer] = None,
+        project_markers: Optional[Sequence[str]] = None,
+        project_cache_size: int = 4096
     ):
         """
         イベントハンドラを初期化
@@ -53,6 +75,12 @@ class FileChangeEventHandler(FileSystemEventHandler):
             exclude_patterns: 除外パターンのリスト（正規表現）
             buffer_max_events: バッファ最大イベント数
             flush_callback: フラッシュ時に呼び出すコールバック関数
+            directory_resolver: ディレクトリパスから辞書IDを返す関数（省略時は保存時に解決）
+            directory_cache_size: ディレクトリIDのキャッシュ件数の上限
+            content_verifier: 内容の変わっていないmodifiedイベントを保存前に除外する（省略時は除外しない）
+            line_stats: 保存前のイベントに追加・削除行数を付与する（省略時は付与しない）
+            project_markers: プロジェクトルートを示すファイル名・ディレクトリ名（省略時は既定のマーカー）
+            project_cache_size: プロジェクトの判定結果をキャッシュするディレクトリ数の上限
         """
         super().__init__()
         self.monitored_root = monitored_root
@@ -61,8 +89,31 @@ class FileChangeEventHandler(FileSystemEventHandler):
         self.flush_callback = flush_callback
         self.buffer = []
         self.buffer_lock = threading.Lock()
+        self.directory_resolver = directory_resolver
+        self.directory_cache_size = directory_cache_size
+        # 同じディレクトリ内の変更は連続しやすいため、最近のディレクトリIDを保持する
+        self.directory_ids: "OrderedDict[str, int]" = OrderedDict()
+        self.directory_ids_cleared_at = time.monotonic()
+        self.content_verifier = content_verifier
+        self.line_stats = line_stats
+        self.project_resolver = ProjectResolver(monitored_root, project_markers, project_cache_size)
         self.logger = logging.getLogger(__name__)
 
+        # メトリクス（イベントごとに系列を引かないよう保持）
+        self.events_received = EVENTS_RECEIVED.labels('filesystem')
+        self.events_excluded = EVENTS_DROPPED.labels('filesystem', 'excluded')
+        self.flush_duration = FLUSH_DURATION.labels('filesystem')
+
+    def _accept(self, event: FileSystemEvent) -> bool:
+        """記録対象のイベントか判定（ディレクトリのイベントは数えない）"""
+        if event.is_directory:
+            return False
+        self.events_received.inc()
+        if self._should_exclude(event.src_path):
+            self.events_excluded.inc()
+            return False
+        return True
+
     def _should_exclude(self, path: str) -> bool:
         """ファイルパスが除外パターンにマッチするか判定"""
         for pattern in self.exclude_patterns:
@@ -70,49 +121,69 @@ class FileChangeEventHandler(FileSystemEventHandler):
                 return True
         return False
 
-    def _estimate_project_name(self, path: str) -> Optional[str]:
-        """ファイルパスからプロジェクト名を推定"""
-        try:
-            rel_path = os.path.relpath(path, self.monitored_root)
-            parts = rel_path.split(os.sep)
-
-            if len(parts) > 1 and parts[0] != '.':
-                return parts[0]
-
-            return None
-        except Exception:
-            return None
-
-    def _create_event_data(self, event: FileSystemEvent, event_type: str) -> dict:
+    def _notice_project_change(self, event: FileSystemEvent):
+        """マーカーの作成・削除・移動、ディレクトリの削除・移動に応じてプロジェクトの判定結果を破棄"""
+        # 除外パターン・ディレクトリのイベントも対象（.gitディレクトリの作成など）
+        self.project_resolver.notice_path(event.src_path)
+        dest_path = getattr(event, 'dest_path', None)
+        if dest_path:
+            self.project_resolver.notice_path(dest_path)
+        if event.is_directory and event.event_type != 'created':
+            self.project_resolver.forget_directory(event.src_path)
+
+    def _create_event_data(self, event: FileSystemEvent, event_type: str) -> FileChangeEvent:
         """イベントデータを作成"""
         file_path = event.src_path
-        file_name = os.path.basename(file_path)
+        directory_path, _, file_name = file_path.rpartition('/')
         _, file_extension = os.path.splitext(file_name)
-        project_name = self._estimate_project_name(file_path)
+        project_name = self.project_resolver.project_name(directory_path)
 
         # タイムスタンプ（UNIXタイムスタンプ整数とISO文字列）
         event_time = int(time.time())
         event_time_iso = datetime.fromtimestamp(event_time).isoformat()
 
-        return {
-            'event_time': event_time,
-            'event_time_iso': event_time_iso,
-            'event_type': event_type,
-            'file_path': file_path,
-            'file_name': file_name,
-            'file_extension': file_extension,
-            'project_name': project_name,
-            'monitored_root': self.monitored_root,
-        }
-
-    def _add_to_buffer(self, event_data: dict):
+        return FileChangeEvent(
+            event_time=event_time,
+            event_time_iso=event_time_iso,
+            event_type=event_type,
+            file_path=file_path,
+            file_name=file_name,
+            monitored_root=self.monitored_root,
+            file_extension=file_extension,
+            project_name=project_name,
+            directory_path=directory_path,
+        )
+
+    def _directory_id(self, directory_path: str) -> Optional[int]:
+        """ディレクトリの辞書IDを返す（キャッシュにない場合はdirectory_resolverで解決）"""
+        directory_id = self.directory_ids.get(directory_path)
+        if directory_id is not None:
+            self.directory_ids.move_to_end(directory_path)
+            return directory_id
+
+        if self.directory_resolver is None:
+            return None
+
+        try:
+            directory_id = self.directory_resolver(directory_path)
+        except Exception as e:
+            self.logger.warning(f"ディレクトリIDの解決に失敗しました（保存時に解決します）: {directory_path}: {e}")
+            return None
+
+        self.directory_ids[directory_path] = directory_id
+        if len(self.directory_ids) > self.directory_cache_size:
+            self.directory_ids.popitem(last=False)
+        return directory_id
+
+    def _add_to_buffer(self, event_data: FileChangeEvent):
         """イベントをバッファに追加"""
         with self.buffer_lock:
             self.buffer.append(event_data)
+            should_flush = len(self.buffer) >= self.buffer_max_events
 
-            # バッファが閾値を超えたら即座にフラッシュ
-            if len(self.buffer) >= self.buffer_max_events:
-                self.flush()
+        # バッファが閾値を超えたら即座にフラッシュ（flushもbuffer_lockを取得するためロックの外で呼ぶ）
+        if should_flush:
+            self.flush()
 
     def flush(self):
         """バッファをフラッシュ"""
@@ -120,16 +191,41 @@ class FileChangeEventHandler(FileSystemEventHandler):
             if not self.buffer:
                 return
 
-            events_to_save = self.buffer.copy()
+            events_to_save = list(self.buffer)
             self.buffer.clear()
 
-        # コールバックを呼び出し
+        # コールバックを呼び出し（ファイル内容の確認・行数の差分はイベント受信を止めないようロックの外で行う）
         if self.flush_callback:
-            self.flush_callback(events_to_save)
+            with self.flush_duration.time():
+                if self.content_verifier is not None:
+                    events_to_save = self.content_verifier.filter_events(events_to_save)
+                if self.line_stats is not None and events_to_save:
+                    events_to_save = self.line_stats.annotate_events(events_to_save)
+                if events_to_save:
+                    self.flush_callback(self._resolve_directory_ids(events_to_save))
+
+    def _resolve_directory_ids(self, events: List[FileChangeEvent]) -> List[FileChangeEvent]:
+        """
+        保存直前にディレクトリIDを付与（イベント受信時はデータベースにアクセスしない）
+
+        保持期間処理は参照されなくなった辞書の行を削除するため、保存しないイベントのIDは解決せず、
+        キャッシュしたIDもDIMENSION_CACHE_MAX_AGE_SECONDSごとに破棄する。
+        """
+        with self.buffer_lock:
+            now = time.monotonic()
+            if now - self.directory_ids_cleared_at > DIMENSION_CACHE_MAX_AGE_SECONDS:
+                self.directory_ids.clear()
+                self.directory_ids_cleared_at = now
+
+            return [
+                event_data._replace(directory_id=self._directory_id(event_data.directory_path))
+                for event_data in events
+            ]
 
     def on_created(self, event):
         """ファイル作成イベント"""
-        if event.is_directory or self._should_exclude(event.src_path):
+        self._notice_project_change(event)
+        if not self._accept(event):
             return
 
         event_data = self._create_event_data(event, 'created')
@@ -137,7 +233,7 @@ class FileChangeEventHandler(FileSystemEventHandler):
 
     def on_modified(self, event):
         """ファイル変更イベント"""
-        if event.is_directory or self._should_exclude(event.src_path):
+        if not self._accept(event):
             return
 
         event_data = self._create_event_data(event, 'modified')
@@ -145,7 +241,8 @@ class FileChangeEventHandler(FileSystemEventHandler):
 
     def on_deleted(self, event):
         """ファイル削除イベント"""
-        if event.is_directory or self._should_exclude(event.src_path):
+        self._notice_project_change(event)
+        if not self._accept(event):
             return
 
         event_data = self._create_event_data(event, 'deleted')
@@ -153,7 +250,8 @@ class FileChangeEventHandler(FileSystemEventHandler):
 
     def on_moved(self, event):
         """ファイル移動イベント"""
-        if event.is_directory or self._should_exclude(event.src_path):
+        self._notice_project_change(event)
+        if not self._accept(event):
             return
 
         # 移動元を削除、移動先を作成として記録
@@ -208,6 +306,36 @@ class FileSystemWatcherV2:
         self.flush_interval = buffer_config.get('flush_interval', 10)
         self.sync_interval = config.get('sync_interval', 60)
 
+        project_config = config.get('project_detection', {})
+        self.project_markers = project_config.get('markers')
+        self.project_cache_size = project_config.get('cache_size', 4096)
+
+        # 内容の変わっていないmodifiedイベントの除外（任意）
+        self.content_verifier: Optional[ContentVerifier] = None
+        verification_config = config.get('content_verification', {})
+        if verification_config.get('enabled', False):
+            self.content_verifier = ContentVerifier(
+                cache_path=verification_config.get('cache_path')
+                or str(Path(database.db_path).with_name('file_content_hashes.db')),
+                workers=verification_config.get('workers', 2),
+                max_inflight_bytes=int(verification_config.get('max_inflight_mb', 64) * 1024 * 1024),
+                max_file_bytes=int(verification_config.get('max_file_mb', 32) * 1024 * 1024),
+                max_entries=verification_config.get('cache_max_entries', 200000),
+            )
+
+        # 追加・削除行数の記録（任意）
+        self.line_stats: Optional[LineStatsAnalyzer] = None
+        line_stats_config = config.get('line_stats', {})
+        if line_stats_config.get('enabled', False):
+            self.line_stats = LineStatsAnalyzer(
+                snapshot_path=line_stats_config.get('snapshot_path')
+                or str(Path(database.db_path).with_name('file_snapshots.db')),
+                max_file_bytes=int(line_stats_config.get('max_file_kb', 256) * 1024),
+                max_snapshot_bytes=int(line_stats_config.get('snapshot_max_mb', 64) * 1024 * 1024),
+                max_read_bytes_per_flush=int(line_stats_config.get('max_read_mb_per_flush', 16) * 1024 * 1024),
+                max_cpu_seconds_per_flush=line_stats_config.get('max_cpu_ms_per_flush', 500) / 1000,
+            )
+
         # 監視状態
         self.observers: Dict[str, Observer] = {}  # {directory_path: Observer}
         self.event_handlers: Dict[str, FileChangeEventHandler] = {}  # {directory_path: Handler}
@@ -217,12 +345,22 @@ class FileSystemWatcherV2:
         self.is_running = False
         self.loop = None
 
-    def _save_events_batch(self, events: List[dict]):
+        # メトリクス（バッファ深度・監視数は公開時に計算）
+        self.sqlite_write_duration = SQLITE_WRITE_DURATION.labels('file_change_events')
+        self.events_save_failed = EVENTS_DROPPED.labels('filesystem', 'save_error')
+        BUFFER_DEPTH.labels('filesystem').set_function(
+            lambda: sum(len(handler.buffer) for handler in list(self.event_handlers.values()))
+        )
+        WATCHES.labels('observer').set_function(lambda: len(self.observers))
+
+    def _save_events_batch(self, events: List[FileChangeEvent]):
         """イベントをバッチ保存"""
         try:
-            self.database.save_file_events_batch(events)
+            with self.sqlite_write_duration.time():
+                self.database.save_file_events_batch(events)
             self.logger.info(f"{len(events)}件のファイルイベントを保存しました")
         except Exception as e:
+            self.events_save_failed.inc(len(events))
             self.logger.error(f"イベント保存エラー: {e}")
 
     def _schedule_flush(self):
@@ -254,7 +392,12 @@ class FileSystemWatcherV2:
             monitored_root=directory,
             exclude_patterns=self.exclude_patterns,
             buffer_max_events=self.buffer_max_events,
-            flush_callback=self._save_events_batch
+            flush_callback=self._save_events_batch,
+            directory_resolver=self.database.directory_id,
+            content_verifier=self.content_verifier,
+            line_stats=self.line_stats,
+            project_markers=self.project_markers,
+            project_cache_size=self.project_cache_size
         )
         self.event_handlers[directory] = handler
 
@@ -371,6 +514,28 @@ class FileSystemWatcherV2:
 
         self.logger.info(f"ファイルシステム監視を開始しました（{len(self.observers)}ディレクトリ）")
 
+    async def use_config_sync_manager(self, config_sync_manager: ConfigSyncManager):
+        """
+        起動後に接続できた設定同期マネージャーに切り替え
+
+        YAML設定（フォールバック）で監視を開始し、PostgreSQLに接続できた時点で
+        監視対象をPostgreSQLの設定に合わせて定期同期を開始する。
+
+        Args:
+            config_sync_manager: 接続済みの設定同期マネージャー
+        """
+        self.config_sync_manager = config_sync_manager
+        self.fallback_manager = None
+        if not self.is_running:
+            return
+
+        await self._sync_directories()
+        if self.sync_task is None or self.sync_task.done():
+            self.sync_task = asyncio.create_task(self._sync_loop())
+        if self.flush_timer is None:
+            self._schedule_flush()
+        self.logger.info(f"PostgreSQLの設定に切り替えました（{len(self.observers)}ディレクトリ）")
+
     def stop(self):
         """監視を停止"""
         if not self.is_running:
@@ -391,6 +556,11 @@ class FileSystemWatcherV2:
         for directory in list(self.observers.keys()):
             self._stop_observer(directory)
 
+        if self.content_verifier is not None:
+            self.content_verifier.close()
+        if self.line_stats is not None:
+            self.line_stats.close()
+
         self.logger.info("ファイルシステム監視を停止しました")
 
 
@@ -408,6 +578,9 @@ async def main_async():
     # 設定マネージャー初期化
     config_manager = ConfigManager()
 
+    # メトリクス公開（有効な場合）
+    metrics_exporters = start_metrics_exporter(config_manager.get_metrics_config(), 'filesystem_watcher')
+
     # FileSystemWatcher設定取得
     fs_config = config_manager.get_filesystem_watcher_config()
 
@@ -415,58 +588,58 @@ async def main_async():
     db_path = config_manager.get_sqlite_file_events_path()
     database = FileChangeDatabase(db_path)
 
-    # PostgreSQL設定同期マネージャーを作成
+    # YAML設定で監視を開始し、PostgreSQLへの接続は監視開始後にバックグラウンドで行う
+    # （接続待ち・タイムアウトの間もファイル変更を記録する）
     postgres_url = config_manager.get_postgres_url()
     yaml_directories = fs_config.get('monitored_directories', [])
 
-    config_sync_mgr, fallback_mgr = await create_config_sync_manager(
-        database_url=postgres_url,
-        yaml_directories=yaml_directories,
-        sync_interval=fs_config.get('sync_interval', 60)
-    )
-
-    # FileSystemWatcherV2を作成
     watcher = FileSystemWatcherV2(
         fs_config,
         database,
-        config_sync_manager=config_sync_mgr,
-        fallback_manager=fallback_mgr,
+        fallback_manager=FallbackConfigManager(yaml_directories),
     )
+    await watcher.start_async()
 
-    # シグナルハンドラ設定
-    def signal_handler(sig, frame):
-        logger.info("終了シグナルを受信しました")
+    async def connect_config_sync() -> Optional[ConfigSyncManager]:
+        config_sync_mgr, _ = await create_config_sync_manager(
+            database_url=postgres_url,
+            yaml_directories=yaml_directories,
+            sync_interval=fs_config.get('sync_interval', 60)
+        )
+        if config_sync_mgr:
+            await watcher.use_config_sync_manager(config_sync_mgr)
+        return config_sync_mgr
+
+    connect_task = asyncio.create_task(connect_config_sync())
+
+    async def shutdown():
         watcher.stop()
         database.close()
+        stop_metrics_exporters(metrics_exporters)
+        if not connect_task.done():
+            connect_task.cancel()
+        try:
+            config_sync_mgr = await connect_task
+        except (asyncio.CancelledError, Exception):
+            config_sync_mgr = None
         if config_sync_mgr:
-            # 非同期でクローズ
-            asyncio.create_task(config_sync_mgr.close())
-        sys.exit(0)
+            await config_sync_mgr.close()
 
-    signal.signal(signal.SIGINT, signal_handler)
-    signal.signal(signal.SIGTERM, signal_handler)
-
-    # 監視開始（非同期）
-    await watcher.start_async()
+    # シグナルハンドラ設定（イベントループ上で停止イベントを設定）
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
 
     logger.info("FileSystemWatcherV2 が実行中です。Ctrl+C で終了します。")
 
-    # メインループは非同期待機
     try:
-        while True:
-            await asyncio.sleep(1)
-    except KeyboardInterrupt:
-        logger.info("キーボード割り込みを検出しました")
-        watcher.stop()
-        database.close()
-        if config_sync_mgr:
-            await config_sync_mgr.close()
+        await stop_event.wait()
+        logger.info("終了シグナルを受信しました")
     except asyncio.CancelledError:
         logger.info("タスクがキャンセルされました")
-        watcher.stop()
-        database.close()
-        if config_sync_mgr:
-            await config_sync_mgr.close()
+    finally:
+        await shutdown()
 
     return 0
 
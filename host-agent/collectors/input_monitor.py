@@ -12,7 +12,6 @@ import time
 import logging
 import threading
 import asyncio
-import yaml
 from pathlib import Path
 from typing import Optional
 
@@ -21,8 +20,15 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from common.models import InputActivitySession
 from common.database import InputActivityDatabase
-from common.data_sync import DataSyncManager
 from common.config import ConfigManager
+from common.metrics import (
+    EVENTS_COALESCED,
+    EVENTS_RECEIVED,
+    SQLITE_WRITE_DURATION,
+    WATCHES,
+    start_metrics_exporter,
+    stop_metrics_exporters,
+)
 
 
 class InputMonitor:
@@ -67,6 +73,17 @@ class InputMonitor:
         self.mouse_listener = None
         self.keyboard_listener = None
 
+        # メトリクス（入力イベントは高頻度のため系列を保持して加算のみ行う）
+        self.events_received = EVENTS_RECEIVED.labels('input')
+        self.events_coalesced = EVENTS_COALESCED.labels('input')
+        self.sqlite_write_duration = SQLITE_WRITE_DURATION.labels('input_activity_sessions')
+        WATCHES.labels('input_listener').set_function(
+            lambda: sum(
+                1 for listener in (self.mouse_listener, self.keyboard_listener)
+                if listener is not None and listener.is_alive()
+            )
+        )
+
         self.logger.info(
             f"InputMonitor初期化完了（idle_timeout: {self.idle_timeout}秒, "
             f"check_interval: {self.timeout_check_interval}秒）"
@@ -185,14 +202,27 @@ class InputMonitor:
 
         スレッドセーフ: session_lockで保護
         """
+        self.events_received.inc()
         with self.session_lock:
             current_time = time.time()
 
             if self.current_session is None:
                 self._start_session()
+            else:
+                # 継続中のセッションに集約
+                self.events_coalesced.inc()
 
             self.last_input_time = current_time
 
+    def is_idle(self) -> bool:
+        """
+        ユーザーがアイドル中か（idle_timeout秒以上入力がなくセッションが終了している）
+
+        スレッドセーフ: session_lockで保護
+        """
+        with self.session_lock:
+            return self.is_running and self.current_session is None
+
     def _check_session_timeout(self) -> None:
         """
         セッションタイムアウトチェック（別スレッドで定期実行）
@@ -223,7 +253,8 @@ class InputMonitor:
         self.last_input_time = time.time()
 
         # データベースに保存
-        self.current_session_id = self.database.create_session(self.current_session)
+        with self.sqlite_write_duration.time():
+            self.current_session_id = self.database.create_session(self.current_session)
         self.current_session.id = self.current_session_id
 
         self.logger.info(
@@ -243,7 +274,8 @@ class InputMonitor:
         end_time = int(time.time())
 
         # データベースに終了時刻を更新
-        self.database.update_session_end_time(self.current_session_id, end_time)
+        with self.sqlite_write_duration.time():
+            self.database.update_session_end_time(self.current_session_id, end_time)
 
         # セッション情報を取得して表示
         session = self.database.get_session_by_id(self.current_session_id)
@@ -277,6 +309,9 @@ async def main_async():
         logger.info("InputMonitorは無効化されています（config.yaml: input_monitor.enabled=false）")
         return
 
+    # メトリクス公開（有効な場合）
+    metrics_exporters = start_metrics_exporter(config_manager.get_metrics_config(), 'input_monitor')
+
     # データベース初期化
     db_path = config_manager.get_sqlite_input_path()
     database = InputActivityDatabase(db_path)
@@ -286,25 +321,7 @@ async def main_async():
     if deleted_count > 0:
         logger.info(f"前回の未終了セッション {deleted_count} 件を削除しました")
 
-    # DataSyncManager初期化（input_activity_sessionsのみ同期）
-    postgres_url = config_manager.get_postgres_url()
-    sync_config = config_manager.get_data_sync_config()
-
-    sync_manager = DataSyncManager(
-        postgres_url=postgres_url,
-        sqlite_desktop_db_path=config_manager.get_sqlite_desktop_path(),
-        sqlite_file_events_db_path=config_manager.get_sqlite_file_events_path(),
-        sqlite_input_db_path=db_path,
-        batch_size=sync_config.get('batch_size', 100),
-        sync_interval=sync_config.get('sync_interval_seconds', 300),
-        max_retries=sync_config.get('max_retries', 5)
-    )
-    await sync_manager.initialize()
-
-    # バックグラウンド同期ループ開始
-    sync_task = asyncio.create_task(sync_manager.start_sync_loop())
-
-    # InputMonitor開始（別スレッドで実行）
+    # InputMonitor作成
     monitor = InputMonitor(input_config, database)
 
     # シグナルハンドラ登録
@@ -318,12 +335,64 @@ async def main_async():
     signal.signal(signal.SIGTERM, signal_handler)
     signal.signal(signal.SIGINT, signal_handler)
 
-    # InputMonitorを別スレッドで起動
-    import threading
+    # InputMonitorを別スレッドで起動（PostgreSQLへの接続を待たずにローカルへの記録を開始する）
     monitor_thread = threading.Thread(target=monitor.start_monitoring, daemon=True)
     monitor_thread.start()
     logger.info("InputMonitorをバックグラウンドスレッドで起動しました")
 
+    # 同期・保持期間処理のモジュールはモニターの起動後に読み込む
+    from common.data_sync import DataSyncManager
+    from common.retention import LocalRetentionManager, default_targets
+
+    # DataSyncManager初期化（PostgreSQLへの接続は同期ループ内で行う）
+    postgres_url = config_manager.get_postgres_url()
+    sync_config = config_manager.get_data_sync_config()
+
+    sync_manager = DataSyncManager(
+        postgres_url=postgres_url,
+        sqlite_desktop_db_path=config_manager.get_sqlite_desktop_path(),
+        sqlite_file_events_db_path=config_manager.get_sqlite_file_events_path(),
+        sqlite_input_db_path=db_path,
+        batch_size=sync_config.get('batch_size', 100),
+        sync_interval=sync_config.get('sync_interval_seconds', 300),
+        max_retries=sync_config.get('max_retries', 5),
+        transport=sync_config.get('transport', 'postgres'),
+        ingest_url=config_manager.get_ingest_url(),
+        compaction_mode=sync_config.get('compaction_mode', 'none'),
+        compaction_merge_gap_seconds=sync_config.get('compaction_merge_gap_seconds', 5),
+        raw_retention_hours=sync_config.get('raw_retention_hours', 168),
+        spool_dir=sync_config['spool_dir'] if sync_config.get('spool_enabled') else None,
+        spool_max_bytes=sync_config.get('spool_max_bytes', 256 * 1024 * 1024),
+        max_records_per_cycle=sync_config.get('max_records_per_cycle', 5000),
+        min_interval=sync_config.get('min_interval_seconds', 1),
+        max_idle_interval=sync_config.get('max_idle_interval_seconds', 1200),
+        backlog_threshold=sync_config.get('backlog_threshold', 1000),
+        backoff_initial=sync_config.get('retry_backoff_seconds', 30),
+        backoff_max=sync_config.get('max_backoff_seconds', 1800),
+        rate_limit_rows_per_second=sync_config.get('rate_limit_rows_per_second', 2000)
+    )
+
+    # バックグラウンド同期ループ開始
+    sync_manager.run_sync_loop_in_background(asyncio.get_running_loop())
+
+    # ローカルSQLite保持期間処理（アイドル中のみデータベースを縮小）
+    retention_task = None
+    retention_config = config_manager.get_local_retention_config()
+    if retention_config.get('enabled', True):
+        retention_manager = LocalRetentionManager(
+            targets=default_targets(
+                config_manager.get_sqlite_desktop_path(),
+                config_manager.get_sqlite_file_events_path(),
+                db_path,
+            ),
+            retention_days=retention_config.get('retention_days', 30),
+            delete_batch_size=retention_config.get('delete_batch_size', 500),
+            check_interval=retention_config.get('check_interval_seconds', 3600),
+            vacuum_step_pages=retention_config.get('vacuum_step_pages', 1024),
+            is_idle=monitor.is_idle,
+        )
+        retention_task = asyncio.create_task(retention_manager.start_retention_loop())
+
     # asyncioイベントループを維持（同期タスクが動作するように）
     try:
         await stop_event.wait()
@@ -332,13 +401,15 @@ async def main_async():
     finally:
         # クリーンアップ
         logger.info("クリーンアップを開始します")
-        sync_task.cancel()
-        try:
-            await sync_task
-        except asyncio.CancelledError:
-            pass
+        if retention_task:
+            retention_task.cancel()
+            try:
+                await retention_task
+            except asyncio.CancelledError:
+                pass
         await sync_manager.close()
         database.close()
+        stop_metrics_exporters(metrics_exporters)
         logger.info("クリーンアップ完了")
 
 
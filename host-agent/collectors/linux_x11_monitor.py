@@ -18,8 +18,16 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from common.models import ActivitySession
 from common.database import DesktopActivityDatabase
-from common.data_sync import DataSyncManager
 from common.config import ConfigManager
+from common.metrics import (
+    EVENTS_COALESCED,
+    EVENTS_DROPPED,
+    EVENTS_RECEIVED,
+    SQLITE_WRITE_DURATION,
+    WATCHES,
+    start_metrics_exporter,
+    stop_metrics_exporters,
+)
 
 
 class LinuxX11Monitor:
@@ -52,6 +60,13 @@ class LinuxX11Monitor:
         # 監視実行フラグ
         self.is_running = False
 
+        # メトリクス（ウィンドウ情報の取得1回を1イベントとして数える）
+        self.events_received = EVENTS_RECEIVED.labels('desktop')
+        self.events_unavailable = EVENTS_DROPPED.labels('desktop', 'window_unavailable')
+        self.events_coalesced = EVENTS_COALESCED.labels('desktop')
+        self.sqlite_write_duration = SQLITE_WRITE_DURATION.labels('desktop_activity_sessions')
+        WATCHES.labels('window_poller').set_function(lambda: 1 if self.is_running else 0)
+
         self.logger.info(f"LinuxX11Monitor初期化完了（監視間隔: {self.monitor_interval}秒）")
 
     def get_active_window_info(self) -> Optional[Tuple[str, str]]:
@@ -125,10 +140,13 @@ class LinuxX11Monitor:
             while self.is_running:
                 # アクティブウィンドウ情報を取得
                 window_info = self.get_active_window_info()
+                self.events_received.inc()
 
                 if window_info:
                     window_title, application_name = window_info
                     self._process_window_change(application_name, window_title)
+                else:
+                    self.events_unavailable.inc()
 
                 # 監視間隔待機
                 time.sleep(self.monitor_interval)
@@ -165,6 +183,7 @@ class LinuxX11Monitor:
         # 現在のセッションと同じかチェック
         if self.current_session and self.current_session.is_same_session(application_name, window_title):
             # 同じセッションなので何もしない
+            self.events_coalesced.inc()
             self.logger.debug(f"セッション継続中: {application_name} - {window_title[:30]}")
             return
 
@@ -193,7 +212,8 @@ class LinuxX11Monitor:
         )
 
         # データベースに保存
-        self.current_session_id = self.database.save_session(self.current_session)
+        with self.sqlite_write_duration.time():
+            self.current_session_id = self.database.save_session(self.current_session)
         self.current_session.id = self.current_session_id
 
         self.logger.info(
@@ -209,7 +229,8 @@ class LinuxX11Monitor:
         end_time = int(time.time())
 
         # データベースの終了時刻を更新
-        self.database.update_session_end_time(self.current_session_id, end_time)
+        with self.sqlite_write_duration.time():
+            self.database.update_session_end_time(self.current_session_id, end_time)
 
         # セッション情報を取得して継続時間をログ出力
         session = self.database.get_session_by_id(self.current_session_id)
@@ -242,6 +263,9 @@ async def main_async():
     # 設定マネージャー初期化
     config_manager = ConfigManager()
 
+    # メトリクス公開（有効な場合）
+    metrics_exporters = start_metrics_exporter(config_manager.get_metrics_config(), 'desktop_monitor')
+
     # データベースパスを取得
     desktop_db_path = config_manager.get_sqlite_desktop_path()
     file_db_path = config_manager.get_sqlite_file_events_path()
@@ -252,11 +276,20 @@ async def main_async():
     # デスクトップモニター設定を取得
     monitor_config = config_manager.get_desktop_monitor_config()
 
+    # モニター起動（別スレッドで実行してasyncioループをブロックしないようにする）
+    # PostgreSQLへの接続を待たずにローカルへの記録を開始する
+    monitor = LinuxX11Monitor(monitor_config, database)
+    monitor_thread = threading.Thread(target=monitor.start_monitoring, daemon=True)
+    monitor_thread.start()
+
     # データ同期マネージャー初期化（有効な場合）
+    # 同期モジュールの読み込みとPostgreSQLへの接続はモニターの起動後に行う（接続は同期ループ内）
     sync_manager = None
     sync_config = config_manager.get_data_sync_config()
     if sync_config.get('enabled', False):
         try:
+            from common.data_sync import DataSyncManager
+
             postgres_url = config_manager.get_postgres_url()
 
             sync_manager = DataSyncManager(
@@ -265,12 +298,23 @@ async def main_async():
                 sqlite_file_events_db_path=file_db_path,
                 batch_size=sync_config.get('batch_size', 100),
                 sync_interval=sync_config.get('sync_interval_seconds', 300),
-                max_retries=sync_config.get('max_retries', 5)
+                max_retries=sync_config.get('max_retries', 5),
+                transport=sync_config.get('transport', 'postgres'),
+                ingest_url=config_manager.get_ingest_url(),
+                compaction_mode=sync_config.get('compaction_mode', 'none'),
+                compaction_merge_gap_seconds=sync_config.get('compaction_merge_gap_seconds', 5),
+                raw_retention_hours=sync_config.get('raw_retention_hours', 168),
+                spool_dir=sync_config['spool_dir'] if sync_config.get('spool_enabled') else None,
+                spool_max_bytes=sync_config.get('spool_max_bytes', 256 * 1024 * 1024),
+                max_records_per_cycle=sync_config.get('max_records_per_cycle', 5000),
+                min_interval=sync_config.get('min_interval_seconds', 1),
+                max_idle_interval=sync_config.get('max_idle_interval_seconds', 1200),
+                backlog_threshold=sync_config.get('backlog_threshold', 1000),
+                backoff_initial=sync_config.get('retry_backoff_seconds', 30),
+                backoff_max=sync_config.get('max_backoff_seconds', 1800),
+                rate_limit_rows_per_second=sync_config.get('rate_limit_rows_per_second', 2000)
             )
 
-            await sync_manager.initialize()
-            logger.info("データ同期マネージャーを初期化しました")
-
             # 同期ループをバックグラウンドで開始
             loop = asyncio.get_event_loop()
             sync_manager.run_sync_loop_in_background(loop)
@@ -280,11 +324,6 @@ async def main_async():
             logger.error(f"データ同期マネージャー初期化エラー: {e}")
             logger.info("同期機能なしで続行します")
 
-    # モニター起動（別スレッドで実行してasyncioループをブロックしないようにする）
-    monitor = LinuxX11Monitor(monitor_config, database)
-    monitor_thread = threading.Thread(target=monitor.start_monitoring, daemon=True)
-    monitor_thread.start()
-
     try:
         # asyncioイベントループを継続実行（同期タスクが動作するように）
         # モニタースレッドが終了するまで待機
@@ -303,6 +342,8 @@ async def main_async():
         if sync_manager:
             await sync_manager.close()
 
+        stop_metrics_exporters(metrics_exporters)
+
 
 def main():
     """
@@ -0,0 +1,96 @@
+"""
+列指向バッチモジュール
+
+同期で扱う行のバッチを、行ごとの辞書ではなくカラムごとのリスト（並列配列）として保持する。
+
+- SQLiteから取得した行は、取得した単位で各カラムのリストに振り分ける（行ごとの辞書を作らない）
+- 変換・辞書IDへの置き換えはカラム単位で行い、変換しないカラムのリストはバッチ間で共有する
+- 行のタプルに戻すのは書き込み時（asyncpgのCOPY・スプールのCSV）のみで、zipで1行ずつ生成する
+
+値にNoneを含むカラム（終了時刻など）があるため、array.arrayではなくリストを使用する。
+"""
+
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+
+class ColumnBatch:
+    """
+    カラムごとのリストで保持する行のバッチ
+
+    全カラムのリストは同じ長さで、i番目の要素が同じ行の値となる。
+    select / with_column / slice / take は新しいバッチを返し、元のバッチは変更しない。
+    """
+
+    __slots__ = ('columns', 'arrays', '_positions')
+
+    def __init__(self, columns: Sequence[str], arrays: Sequence[List[Any]]):
+        """
+        Args:
+            columns: カラム名
+            arrays: カラムごとの値のリスト（columnsと同じ順）
+        """
+        self.columns: Tuple[str, ...] = tuple(columns)
+        self.arrays: List[List[Any]] = list(arrays)
+        self._positions: Dict[str, int] = {name: i for i, name in enumerate(self.columns)}
+
+    @classmethod
+    def empty(cls, columns: Sequence[str]) -> 'ColumnBatch':
+        """行のないバッチ"""
+        return cls(columns, [[] for _ in columns])
+
+    @classmethod
+    def from_cursor(cls, cursor: Any, chunk_size: int = 1000) -> 'ColumnBatch':
+        """
+        実行済みのカーソルの結果からバッチを生成
+
+        行はchunk_size件ずつ取得してカラムのリストに振り分けるため、全行のタプルを同時には保持しない。
+
+        Args:
+            cursor: SELECTを実行済みのsqlite3カーソル
+            chunk_size: 1回に取得する行数
+        """
+        columns = [description[0] for description in cursor.description or ()]
+        arrays: List[List[Any]] = [[] for _ in columns]
+        while True:
+            chunk = cursor.fetchmany(chunk_size)
+            if not chunk:
+                break
+            for array, values in zip(arrays, zip(*chunk)):
+                array.extend(values)
+        return cls(columns, arrays)
+
+    def __len__(self) -> int:
+        return len(self.arrays[0]) if self.arrays else 0
+
+    def column(self, name: str) -> List[Any]:
+        """カラムの値のリスト（コピーしない）"""
+        return self.arrays[self._positions[name]]
+
+    def select(self, columns: Sequence[str]) -> 'ColumnBatch':
+        """指定したカラムのみを指定した順に並べたバッチ（リストは共有）"""
+        return ColumnBatch(columns, [self.column(name) for name in columns])
+
+    def with_column(self, name: str, values: List[Any]) -> 'ColumnBatch':
+        """カラムを置き換え（存在しない場合は末尾に追加）たバッチ（他のカラムのリストは共有）"""
+        arrays = list(self.arrays)
+        if name in self._positions:
+            arrays[self._positions[name]] = values
+            return ColumnBatch(self.columns, arrays)
+        return ColumnBatch(self.columns + (name,), arrays + [values])
+
+    def slice(self, start: int, stop: int) -> 'ColumnBatch':
+        """start行目からstop行目の手前までのバッチ"""
+        return ColumnBatch(self.columns, [array[start:stop] for array in self.arrays])
+
+    def take(self, indices: Sequence[int]) -> 'ColumnBatch':
+        """指定した行番号の行のみのバッチ"""
+        return ColumnBatch(self.columns, [[array[i] for i in indices] for array in self.arrays])
+
+    def record(self, index: int) -> Dict[str, Any]:
+        """1行を辞書として返す（隔離・ログ出力用）"""
+        return {name: array[index] for name, array in zip(self.columns, self.arrays)}
+
+    def records(self) -> Iterator[Dict[str, Any]]:
+        """行を辞書として順に返す（JSON出力用）"""
+        for index in range(len(self)):
+            yield self.record(index)
@@ -75,15 +75,47 @@ class ConfigManager:
                 'enabled': config.get('enabled', True),
                 'sync_interval_seconds': config.get('interval_seconds', 300),
                 'batch_size': config.get('batch_size', 100),
-                'max_retries': config.get('max_retries', 5)
+                'max_retries': config.get('max_retries', 5),
+                'transport': os.getenv('SYNC_TRANSPORT', config.get('transport', 'postgres')),
+                'compaction_mode': config.get('compaction', {}).get('mode', 'none'),
+                'compaction_merge_gap_seconds': config.get('compaction', {}).get('merge_gap_seconds', 5),
+                'raw_retention_hours': config.get('compaction', {}).get('raw_retention_hours', 168),
+                'spool_enabled': config.get('spool', {}).get('enabled', False),
+                'spool_dir': self._resolve_path(config.get('spool', {}).get('dir', 'data/sync_spool')),
+                'spool_max_bytes': int(config.get('spool', {}).get('max_mb', 256) * 1024 * 1024),
+                'max_records_per_cycle': config.get('max_records_per_cycle', 5000),
+                'min_interval_seconds': config.get('min_interval_seconds', 1),
+                'max_idle_interval_seconds': config.get('max_idle_interval_seconds', 1200),
+                'backlog_threshold': config.get('backlog_threshold', 1000),
+                'retry_backoff_seconds': config.get('retry_backoff_seconds', 30),
+                'max_backoff_seconds': config.get('max_backoff_seconds', 1800),
+                'rate_limit_rows_per_second': config.get('rate_limit_rows_per_second', 2000)
             }
         return {
             'enabled': True,
             'sync_interval_seconds': 300,
             'batch_size': 100,
-            'max_retries': 5
+            'max_retries': 5,
+            'transport': os.getenv('SYNC_TRANSPORT', 'postgres'),
+            'compaction_mode': 'none',
+            'compaction_merge_gap_seconds': 5,
+            'raw_retention_hours': 168,
+            'spool_enabled': False,
+            'spool_dir': self._resolve_path('data/sync_spool'),
+            'spool_max_bytes': 256 * 1024 * 1024,
+            'max_records_per_cycle': 5000,
+            'min_interval_seconds': 1,
+            'max_idle_interval_seconds': 1200,
+            'backlog_threshold': 1000,
+            'retry_backoff_seconds': 30,
+            'max_backoff_seconds': 1800,
+            'rate_limit_rows_per_second': 2000
         }
 
+    def get_ingest_url(self) -> str:
+        """API Gatewayの取り込みAPIのベースURLを取得（transport=http時に使用）"""
+        return os.getenv('INGEST_URL', 'http://localhost:8800/api/v1/ingest')
+
     def get_desktop_monitor_config(self) -> Dict[str, Any]:
         """デスクトップモニター設定を取得（YAML > デフォルト）"""
         if 'desktop_monitor' in self.yaml_config:
@@ -124,6 +156,44 @@ class ConfigManager:
             'timeout_check_interval': 10
         }
 
+    def get_local_retention_config(self) -> Dict[str, Any]:
+        """ローカルSQLite保持期間設定を取得（YAML > デフォルト）"""
+        config = self.yaml_config.get('local_retention', {})
+        return {
+            'enabled': config.get('enabled', True),
+            'retention_days': config.get('retention_days', 30),
+            'delete_batch_size': config.get('delete_batch_size', 500),
+            'check_interval_seconds': config.get('check_interval_seconds', 3600),
+            'vacuum_step_pages': config.get('vacuum_step_pages', 1024)
+        }
+
+    def get_agent_config(self) -> Dict[str, Any]:
+        """統合プロセス（agent.py）設定を取得（YAML > デフォルト）"""
+        config = self.yaml_config.get('agent', {})
+        return {
+            'restart_backoff_seconds': config.get('restart_backoff_seconds', 5),
+            'max_restart_backoff_seconds': config.get('max_restart_backoff_seconds', 300),
+            'health_check_interval_seconds': config.get('health_check_interval_seconds', 5)
+        }
+
+    def get_metrics_config(self) -> Dict[str, Any]:
+        """メトリクス公開設定を取得（YAML > デフォルト）"""
+        config = self.yaml_config.get('metrics', {})
+        textfile_dir = config.get('textfile_dir')
+        return {
+            'enabled': config.get('enabled', False),
+            'host': config.get('host', '127.0.0.1'),
+            'ports': {
+                'desktop_monitor': 9464,
+                'filesystem_watcher': 9465,
+                'input_monitor': 9466,
+                'agent': 9467,
+                **config.get('ports', {}),
+            },
+            'textfile_dir': self._resolve_path(textfile_dir) if textfile_dir else None,
+            'textfile_interval_seconds': config.get('textfile_interval_seconds', 15)
+        }
+
     def _resolve_path(self, path: str) -> str:
         """相対パスをhost-agent/からの絶対パスに解決"""
         if Path(path).is_absolute():
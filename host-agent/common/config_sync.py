@@ -7,12 +7,14 @@ PostgreSQLから監視対象ディレクトリ設定を同期するモジュー
 - フォールバック機能（DB接続失敗時はYAML使用）
 """
 import asyncio
-import asyncpg
 import logging
-from typing import List, Optional, Dict, Any
+from typing import TYPE_CHECKING, List, Optional, Dict, Any
 from dataclasses import dataclass
 from pathlib import Path
 
+if TYPE_CHECKING:
+    import asyncpg
+
 logger = logging.getLogger(__name__)
 
 
@@ -35,15 +37,18 @@ class ConfigSyncManager:
         self,
         database_url: str,
         sync_interval: int = 60,
+        pool: Optional['asyncpg.Pool'] = None,
     ):
         """
         Args:
             database_url: PostgreSQL接続URL
             sync_interval: 同期間隔（秒）
+            pool: 他のコンポーネントと共有する接続プール（省略時は自前で作成し、close()でクローズする）
         """
         self.database_url = database_url
         self.sync_interval = sync_interval
-        self._pool: Optional[asyncpg.Pool] = None
+        self._pool: Optional['asyncpg.Pool'] = pool
+        self._owns_pool = pool is None
         self._is_connected = False
 
     async def initialize(self) -> bool:
@@ -53,7 +58,16 @@ class ConfigSyncManager:
         Returns:
             接続成功: True, 失敗: False
         """
+        if self._pool:
+            # 共有の接続プールは作成元で接続済み
+            self._is_connected = True
+            logger.info("共有のPostgreSQL接続プールを使用します")
+            return True
+
         try:
+            # asyncpgは接続時に読み込む（コレクターの起動を遅らせないため）
+            import asyncpg
+
             self._pool = await asyncpg.create_pool(
                 self.database_url,
                 min_size=1,
@@ -72,7 +86,8 @@ class ConfigSyncManager:
 
     async def close(self):
         """接続プールをクローズ"""
-        if self._pool:
+        # 共有の接続プールは作成元がクローズする
+        if self._pool and self._owns_pool:
             await self._pool.close()
             logger.info("PostgreSQL接続プールをクローズしました")
 
@@ -251,6 +266,7 @@ async def create_config_sync_manager(
     database_url: str,
     yaml_directories: List[str],
     sync_interval: int = 60,
+    pool: Optional['asyncpg.Pool'] = None,
 ) -> tuple[Optional[ConfigSyncManager], Optional[FallbackConfigManager]]:
     """
     設定同期マネージャーまたはフォールバックマネージャーを作成
@@ -259,6 +275,7 @@ async def create_config_sync_manager(
         database_url: PostgreSQL接続URL
         yaml_directories: YAMLから読み込んだディレクトリパスのリスト
         sync_interval: 同期間隔（秒）
+        pool: 共有の接続プール（省略時はConfigSyncManagerが自前で作成）
 
     Returns:
         (ConfigSyncManager or None, FallbackConfigManager or None)
@@ -266,7 +283,7 @@ async def create_config_sync_manager(
         - PostgreSQL接続失敗: (None, FallbackConfigManager)
     """
     # PostgreSQL接続を試行
-    manager = ConfigSyncManager(database_url, sync_interval)
+    manager = ConfigSyncManager(database_url, sync_interval, pool=pool)
     connected = await manager.initialize()
 
     if connected:
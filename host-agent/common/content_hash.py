@@ -0,0 +1,336 @@
+"""
+ファイル内容の確認モジュール
+
+フォーマッター・IDEの自動保存・git checkoutのように、同じ内容のままファイルを書き直す操作でも
+modifiedイベントが発生する。ContentVerifierは保存前のイベントについてファイル内容のハッシュを
+前回の値と比較し、内容が変わっていないmodifiedイベントを除外する。
+
+- (パス → サイズ, mtime_ns, ハッシュ) をSQLiteに保存し、再起動後も前回の内容と比較する
+- サイズとmtime_nsが前回と同じファイルは読み込まない（ハッシュの計算はどちらかが変わった場合のみ）
+- ハッシュはスレッドプールで並列に計算し、同時に読み込むバイト数を上限（バイト予算）で制限する
+- xxhashがインストールされていない場合はhashlibのBLAKE2bで計算する
+
+除外するのはmodifiedイベントのみで、created・deletedイベントはハッシュの記録・削除にのみ使用する。
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .metrics import CONTENT_CHECKS, CONTENT_HASH_BYTES, EVENTS_DROPPED
+from .models import FileChangeEvent
+
+try:
+    import xxhash
+except ImportError:  # xxhashは任意（hashlibのBLAKE2bで代替）
+    xxhash = None
+
+# ハッシュの種類（保存するハッシュの接頭辞。種類が変わった場合は別の内容として扱う）
+HASH_ALGORITHM = 'xxh3_64' if xxhash is not None else 'blake2b'
+
+# 読み込みの単位（バイト）
+READ_CHUNK_BYTES = 1024 * 1024
+
+# mtime_nsがハッシュ計算時刻からこの範囲内のエントリは、サイズ・mtime_nsが同じでも読み直す
+# （ハッシュ計算と同じタイムスタンプの粒度内に書き込まれた変更を見逃さないように）
+RACY_WINDOW_NS = 2_000_000_000
+
+# キャッシュの件数上限を確認する間隔（書き込んだエントリ数）
+PRUNE_INTERVAL = 1000
+
+CONTENT_HASHES_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS file_content_hashes (
+        path TEXT PRIMARY KEY,
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        digest TEXT NOT NULL,
+        checked_at_ns INTEGER NOT NULL
+    ) WITHOUT ROWID
+"""
+
+# (サイズ, mtime_ns, ハッシュ, ハッシュ計算時刻)
+CacheEntry = Tuple[int, int, str, int]
+
+
+def hash_file(path: str) -> str:
+    """
+    ファイル内容のハッシュを計算
+
+    Returns:
+        "<HASH_ALGORITHM>:<16進数>" 形式の文字列
+    """
+    hasher = xxhash.xxh3_64() if xxhash is not None else hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(READ_CHUNK_BYTES)
+            if not chunk:
+                break
+            hasher.update(chunk)
+    return f"{HASH_ALGORITHM}:{hasher.hexdigest()}"
+
+
+class ByteBudget:
+    """
+    同時に読み込むバイト数の上限
+
+    上限を超えるファイルも、他に読み込み中のファイルがなければ読み込める。
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_use = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, size: int) -> int:
+        """sizeバイト分の予算を確保（空くまで待機）し、確保した量を返す"""
+        size = min(size, self.limit)
+        with self._condition:
+            while self.in_use and self.in_use + size > self.limit:
+                self._condition.wait()
+            self.in_use += size
+        return size
+
+    def release(self, size: int):
+        """確保した予算を返却"""
+        with self._condition:
+            self.in_use -= size
+            self._condition.notify_all()
+
+
+class ContentVerifier:
+    """
+    内容の変わっていないmodifiedイベントの除外
+
+    複数のイベントハンドラ（監視ディレクトリ）から共有し、フラッシュ時にfilter_eventsを呼び出す。
+    """
+
+    def __init__(
+        self,
+        cache_path: str,
+        workers: int = 2,
+        max_inflight_bytes: int = 64 * 1024 * 1024,
+        max_file_bytes: int = 32 * 1024 * 1024,
+        max_entries: int = 200000,
+    ):
+        """
+        Args:
+            cache_path: ハッシュを保存するSQLiteファイル
+            workers: ハッシュを計算するスレッド数
+            max_inflight_bytes: 同時に読み込むバイト数の上限
+            max_file_bytes: ハッシュを計算するファイルサイズの上限（超える場合は確認せず記録）
+            max_entries: 保存するエントリ数の上限（超えた場合は確認の古いものから削除）
+        """
+        self.cache_path = cache_path
+        self.max_file_bytes = max_file_bytes
+        self.max_entries = max_entries
+        self.logger = logging.getLogger(__name__)
+
+        Path(cache_path).parent.mkdir(parents=True, exist_ok=True)
+        # check_same_thread=False: 各ハンドラのフラッシュ（タイマー・watchdogのスレッド）から呼び出されるため
+        self.connection = sqlite3.connect(cache_path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(CONTENT_HASHES_SCHEMA)
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_content_hashes_checked_at ON file_content_hashes(checked_at_ns)"
+        )
+        self.connection.commit()
+
+        self.budget = ByteBudget(max_inflight_bytes)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='content-hash')
+        # 同じパスの確認が並行しないよう、filter_events全体を直列化する（ハッシュ計算はプール内で並列）
+        self._lock = threading.Lock()
+        self._writes_since_prune = 0
+
+        # メトリクス
+        self.events_unchanged = EVENTS_DROPPED.labels('filesystem', 'unchanged_content')
+        self.checks_stat_match = CONTENT_CHECKS.labels('stat_match')
+        self.checks_hashed = CONTENT_CHECKS.labels('hashed')
+        self.checks_skipped = CONTENT_CHECKS.labels('skipped')
+        self.hashed_bytes = CONTENT_HASH_BYTES.labels()
+
+        self.logger.info(
+            f"ファイル内容の確認を有効化しました（{HASH_ALGORITHM}, スレッド数: {workers}, "
+            f"キャッシュ: {cache_path}）"
+        )
+
+    def filter_events(self, events: List[FileChangeEvent]) -> List[FileChangeEvent]:
+        """
+        内容の変わっていないmodifiedイベントを除外
+
+        バッチ内の同じパスは現在の内容を1回だけ確認し、イベント順に「直前の内容」と比較する。
+
+        Args:
+            events: 保存前のイベント（発生順）
+
+        Returns:
+            除外後のイベント（順序は維持）
+        """
+        with self._lock:
+            paths = {event.file_path for event in events if event.event_type != 'deleted'}
+            cached = self._load({event.file_path for event in events})
+            current = self._current_digests(paths, cached)
+
+            # イベント順に直前の内容を更新しながら比較
+            known: Dict[str, Optional[str]] = {path: entry[2] for path, entry in cached.items()}
+            kept: List[FileChangeEvent] = []
+            for event in events:
+                path = event.file_path
+                if event.event_type == 'deleted':
+                    known[path] = None
+                    kept.append(event)
+                    continue
+
+                digest, _ = current.get(path, (None, None))
+                if event.event_type == 'modified' and digest is not None and known.get(path) == digest:
+                    self.events_unchanged.inc()
+                    continue
+                known[path] = digest
+                kept.append(event)
+
+            self._store(known, current, cached)
+
+        dropped = len(events) - len(kept)
+        if dropped:
+            self.logger.debug(f"内容の変わっていない変更イベントを{dropped}件除外しました")
+        return kept
+
+    def close(self):
+        """スレッドプールとキャッシュを閉じる"""
+        self.executor.shutdown(wait=True)
+        with self._lock:
+            self.connection.close()
+
+    def _load(self, paths: set) -> Dict[str, CacheEntry]:
+        """保存済みのエントリを取得"""
+        entries: Dict[str, CacheEntry] = {}
+        path_list = list(paths)
+        # SQLiteの変数の上限を超えないよう分割
+        for i in range(0, len(path_list), 500):
+            chunk = path_list[i:i + 500]
+            rows = self.connection.execute(
+                f"""
+                SELECT path, size, mtime_ns, digest, checked_at_ns FROM file_content_hashes
+                WHERE path IN ({", ".join("?" * len(chunk))})
+                """,
+                chunk,
+            )
+            for path, size, mtime_ns, digest, checked_at_ns in rows:
+                entries[path] = (size, mtime_ns, digest, checked_at_ns)
+        return entries
+
+    def _current_digests(
+        self, paths: set, cached: Dict[str, CacheEntry]
+    ) -> Dict[str, Tuple[Optional[str], Optional[os.stat_result]]]:
+        """
+        各パスの現在の内容のハッシュを求める
+
+        サイズ・mtime_nsが保存済みのエントリと同じ場合は保存済みのハッシュを使用し、
+        それ以外はスレッドプールで計算する。
+
+        Returns:
+            パス → (ハッシュ, stat結果) の辞書（確認できない場合のハッシュはNone）
+        """
+        results: Dict[str, Tuple[Optional[str], Optional[os.stat_result]]] = {}
+        pending = {}
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                results[path] = (None, None)  # イベント後に削除・移動された
+                self.checks_skipped.inc()
+                continue
+
+            entry = cached.get(path)
+            if (
+                entry is not None
+                and entry[0] == stat.st_size
+                and entry[1] == stat.st_mtime_ns
+                and stat.st_mtime_ns < entry[3] - RACY_WINDOW_NS
+            ):
+                results[path] = (entry[2], None)
+                self.checks_stat_match.inc()
+                continue
+
+            if stat.st_size > self.max_file_bytes:
+                results[path] = (None, None)
+                self.checks_skipped.inc()
+                continue
+
+            pending[path] = (stat, self.executor.submit(self._hash_within_budget, path, stat.st_size))
+
+        for path, (stat, future) in pending.items():
+            try:
+                results[path] = (future.result(), stat)
+                self.checks_hashed.inc()
+            except OSError as e:
+                self.logger.debug(f"ファイル内容を読み込めません: {path}: {e}")
+                results[path] = (None, None)
+                self.checks_skipped.inc()
+        return results
+
+    def _hash_within_budget(self, path: str, size: int) -> str:
+        """バイト予算を確保してハッシュを計算（スレッドプールで実行）"""
+        reserved = self.budget.acquire(size)
+        try:
+            digest = hash_file(path)
+            self.hashed_bytes.inc(size)
+            return digest
+        finally:
+            self.budget.release(reserved)
+
+    def _store(
+        self,
+        known: Dict[str, Optional[str]],
+        current: Dict[str, Tuple[Optional[str], Optional[os.stat_result]]],
+        cached: Dict[str, CacheEntry],
+    ):
+        """新しく計算したハッシュを保存し、削除・確認できなかったパスのエントリを削除"""
+        checked_at_ns = time.time_ns()
+        upserts = []
+        for path, (digest, stat) in current.items():
+            if digest is not None and stat is not None and known.get(path) == digest:
+                upserts.append((path, stat.st_size, stat.st_mtime_ns, digest, checked_at_ns))
+        deletes = [(path,) for path, digest in known.items() if digest is None and path in cached]
+
+        try:
+            with self.connection:
+                if upserts:
+                    self.connection.executemany("""
+                        INSERT INTO file_content_hashes (path, size, mtime_ns, digest, checked_at_ns)
+                        VALUES (?, ?, ?, ?, ?)
+                        ON CONFLICT(path) DO UPDATE SET
+                            size = excluded.size,
+                            mtime_ns = excluded.mtime_ns,
+                            digest = excluded.digest,
+                            checked_at_ns = excluded.checked_at_ns
+                    """, upserts)
+                if deletes:
+                    self.connection.executemany("DELETE FROM file_content_hashes WHERE path = ?", deletes)
+
+            self._writes_since_prune += len(upserts)
+            if self._writes_since_prune >= PRUNE_INTERVAL:
+                self._writes_since_prune = 0
+                self._prune()
+        except sqlite3.Error as e:
+            # 保存できなくても次回は内容を読み直すだけのため、イベントの記録は続ける
+            self.logger.warning(f"ファイル内容のハッシュを保存できません: {e}")
+
+    def _prune(self):
+        """エントリ数が上限を超えた場合、確認の古いものから削除"""
+        count = self.connection.execute("SELECT COUNT(*) FROM file_content_hashes").fetchone()[0]
+        excess = count - self.max_entries
+        if excess <= 0:
+            return
+        with self.connection:
+            self.connection.execute("""
+                DELETE FROM file_content_hashes WHERE path IN (
+                    SELECT path FROM file_content_hashes ORDER BY checked_at_ns ASC LIMIT ?
+                )
+            """, (excess,))
+        self.logger.info(f"ファイル内容のハッシュを{excess}件削除しました（上限 {self.max_entries}件）")
@@ -5,15 +5,171 @@ SQLiteローカルデータベースからPostgreSQLへのバッチ同期を管
 """
 
 import asyncio
-import asyncpg
 import sqlite3
 import logging
 import socket
 import getpass
-from datetime import datetime
-from typing import Optional, List, Dict, Any
+import gzip
+import io
+import itertools
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Optional, List, Dict, Any, Callable, Iterable, Tuple
 from pathlib import Path
 
+from .columnar import ColumnBatch
+from .session_compaction import (
+    COMPACTION_NONE,
+    COMPACTED_TABLE,
+    DesktopSessionCompactor,
+)
+from .interning import (
+    DESKTOP_SESSIONS_VIEW,
+    FILE_EVENTS_VIEW,
+    PG_STORAGE_TABLES,
+    TABLE_DIMENSIONS,
+    DimensionResolver,
+    staging_insert_sql,
+)
+from .metrics import SYNC_BACKLOG, SYNC_BATCH_DURATION, SYNC_CYCLE_DURATION, SYNC_RECORDS
+from .sync_spool import SPOOLED_SYNCED_AT, SyncSpool
+from .sync_scheduler import AdaptiveSyncScheduler, RowRateLimiter, SyncCycleResult
+
+if TYPE_CHECKING:
+    import asyncpg
+
+
+# 同期先テーブルごとのPostgreSQLカラム（synced_atは挿入時に付与）
+PG_COLUMNS = {
+    'desktop_activity_sessions': (
+        'start_time', 'end_time', 'start_time_iso', 'end_time_iso',
+        'application_name', 'window_title', 'duration_seconds',
+    ),
+    'file_change_events': (
+        'event_time', 'event_time_iso', 'event_type', 'directory_path',
+        'file_path_relative', 'file_name', 'file_extension', 'file_size',
+        'is_symlink', 'monitored_root', 'project_name', 'lines_added', 'lines_removed',
+    ),
+    'input_activity_sessions': (
+        'start_time', 'end_time', 'start_time_iso', 'end_time_iso',
+        'duration_seconds', 'created_at', 'updated_at',
+        'host_identifier', 'synced_from_local_id',
+    ),
+}
+
+# 同期元SQLiteから取得するカラム（レコードID + 同期用の行の元になるカラム）
+SOURCE_COLUMNS = {
+    'desktop_activity_sessions': ('id',) + PG_COLUMNS['desktop_activity_sessions'],
+    'file_change_events': ('id',) + PG_COLUMNS['file_change_events'],
+    'input_activity_sessions': (
+        'id', 'start_time', 'end_time', 'start_time_iso', 'end_time_iso',
+        'duration_seconds', 'created_at', 'updated_at',
+    ),
+}
+
+# ISO文字列からdatetimeに変換するカラム
+PG_TIMESTAMP_COLUMNS = {
+    'start_time_iso', 'end_time_iso', 'event_time_iso',
+}
+
+# synced_atカラムを持つテーブル
+PG_TABLES_WITH_SYNCED_AT = {'desktop_activity_sessions', 'file_change_events'}
+
+# 同期用のカラムの値の型（NULLは型を問わない。ISO文字列のカラムは時刻として解釈できるかを確認する）
+PG_COLUMN_TYPES: Dict[str, type] = {
+    'start_time': int, 'end_time': int, 'event_time': int, 'duration_seconds': int,
+    'file_size': int, 'lines_added': int, 'lines_removed': int,
+    'created_at': int, 'updated_at': int, 'synced_from_local_id': int,
+    'application_name': str, 'window_title': str, 'event_type': str, 'directory_path': str,
+    'file_path_relative': str, 'file_name': str, 'file_extension': str,
+    'monitored_root': str, 'project_name': str, 'host_identifier': str,
+    'is_symlink': bool,
+}
+
+class IngestUnavailableError(ConnectionError):
+    """取り込みAPIが一時的に利用できない（429 / 5xx）"""
+
+
+class IngestRejectedError(ValueError):
+    """取り込みAPIが行の内容を拒否した（400 / 422）"""
+
+
+def connection_errors() -> Tuple[type, ...]:
+    """
+    PostgreSQLに到達できないことを示す例外（スプール有効時はスプールに切り替える）
+
+    asyncpgは接続時まで読み込まないため、asyncpgの例外は読み込み済みの場合のみ含める
+    （読み込み前にasyncpgの例外が発生することはない）。
+    """
+    asyncpg = sys.modules.get('asyncpg')
+    if asyncpg is None:
+        return (OSError, asyncio.TimeoutError)
+    return (
+        OSError,
+        asyncio.TimeoutError,
+        asyncpg.PostgresConnectionError,
+        asyncpg.CannotConnectNowError,
+        asyncpg.InterfaceError,
+    )
+
+
+def data_errors() -> Tuple[type, ...]:
+    """
+    行の内容が原因の書き込みエラー（二分して原因の行を隔離する）
+
+    これ以外の例外（テーブル未作成・権限・クエリのキャンセル・コードの不具合など）は行に原因がないため、
+    隔離せずにバッチを失敗させ、次回の同期で再送する。
+    COPYは型の合わない値をTypeError、時刻の変換はValueErrorで失敗するため、これらは書き込み前に
+    check_sync_values()で検出して隔離する（書き込み時のTypeError・ValueErrorはコードの不具合として扱う）。
+    クライアント側のasyncpgのDataError（辞書IDを解決するクエリの引数のエンコード失敗）は
+    InterfaceErrorのサブクラスのため、connection_errors()より先に判定すること。
+    """
+    asyncpg = sys.modules.get('asyncpg')
+    if asyncpg is None:
+        return (IngestRejectedError,)
+    return (
+        IngestRejectedError,
+        asyncpg.DataError,                          # 型・値の不正（InvalidTextRepresentationなど）
+        asyncpg.IntegrityConstraintViolationError,  # 制約違反
+        asyncpg.exceptions._base.DataError,         # クライアント側でのクエリ引数のエンコード失敗
+    )
+
+def check_sync_values(rows: ColumnBatch):
+    """
+    同期用のバッチの値の型と時刻の形式を確認
+
+    SQLiteはカラムの型を強制しないため、型の異なる値・解釈できないISO文字列が保存されている場合がある。
+    書き込み時（COPYのエンコード・時刻の変換）ではなく変換時に検出し、_convert_batchで1行ずつ隔離する。
+
+    Raises:
+        TypeError: 値の型がカラムの型と異なる場合
+        ValueError: ISO文字列を時刻として解釈できない場合
+    """
+    for column, array in zip(rows.columns, rows.arrays):
+        if column in PG_TIMESTAMP_COLUMNS:
+            for value in array:
+                if value is not None and not isinstance(value, str):
+                    raise TypeError(f"{column}: ISO文字列ではありません: {value!r}")
+                DataSyncManager._parse_iso(value)
+            continue
+
+        expected = PG_COLUMN_TYPES.get(column)
+        if expected is None:
+            continue
+        for value in array:
+            if value is None:
+                continue
+            # boolはintのサブクラスのため、整数カラムのboolも型の不一致とする
+            if not isinstance(value, expected) or (expected is int and isinstance(value, bool)):
+                raise TypeError(f"{column}: {expected.__name__}型ではありません: {value!r}")
+
+
+# 同期転送方式
+TRANSPORT_POSTGRES = "postgres"  # PostgreSQLへ直接接続
+TRANSPORT_HTTP = "http"          # API Gatewayの /api/v1/ingest 経由
+
 
 class DataSyncManager:
     """
@@ -27,6 +183,10 @@ class DataSyncManager:
     - 増分同期（synced_at IS NULL のみ）
     - エラーリカバリ（自動リトライ）
     - 同期統計記録
+    - 未同期件数・接続状態に応じた同期間隔の調整とレート制限
+    - 転送方式の選択（PostgreSQL直接 / API Gateway経由HTTP）
+    - デスクトップセッションの同期前圧縮（オプション）
+    - オフライン時の圧縮スプール（オプション、transport=postgresのみ）
     """
 
     def __init__(
@@ -37,7 +197,23 @@ class DataSyncManager:
         sqlite_input_db_path: Optional[str] = None,
         batch_size: int = 100,
         sync_interval: int = 300,
-        max_retries: int = 5
+        max_retries: int = 5,
+        transport: str = TRANSPORT_POSTGRES,
+        ingest_url: Optional[str] = None,
+        ingest_timeout: float = 30.0,
+        compaction_mode: str = COMPACTION_NONE,
+        compaction_merge_gap_seconds: int = 5,
+        raw_retention_hours: float = 168,
+        spool_dir: Optional[str] = None,
+        spool_max_bytes: int = 256 * 1024 * 1024,
+        max_records_per_cycle: int = 5000,
+        min_interval: float = 1.0,
+        max_idle_interval: Optional[float] = None,
+        backlog_threshold: int = 1000,
+        backoff_initial: float = 30.0,
+        backoff_max: float = 1800.0,
+        rate_limit_rows_per_second: float = 0,
+        pool: Optional['asyncpg.Pool'] = None
     ):
         """
         データ同期マネージャーを初期化
@@ -50,7 +226,29 @@ class DataSyncManager:
             batch_size: 1回の同期バッチサイズ
             sync_interval: 同期間隔（秒）
             max_retries: 最大リトライ回数
+            transport: 転送方式（"postgres" または "http"）
+            ingest_url: transport="http" 時の取り込みAPIのベースURL
+                        （例: http://localhost:8800/api/v1/ingest）
+            ingest_timeout: HTTPリクエストのタイムアウト（秒）
+            compaction_mode: デスクトップセッションの圧縮モード（"none" / "merge" / "minute"）
+            compaction_merge_gap_seconds: mergeモードで統合するセッション間の最大間隔（秒）
+            raw_retention_hours: 圧縮済みの生セッションをローカルに保持する時間
+            spool_dir: オフライン時にバッチを保存するスプールディレクトリ（省略時はスプールしない）
+            spool_max_bytes: スプールの最大サイズ（バイト）
+            max_records_per_cycle: 1サイクルでテーブルごとに取得する最大行数
+            min_interval: 未同期件数がbacklog_threshold以上の場合の同期間隔（秒）
+            max_idle_interval: 未同期件数が0の場合に延長する同期間隔の上限（秒、省略時はsync_intervalの4倍）
+            backlog_threshold: 最短間隔で同期し続ける未同期件数のしきい値
+            backoff_initial: 接続失敗時の初回待機時間（秒）
+            backoff_max: 接続失敗時の最大待機時間（秒）
+            rate_limit_rows_per_second: 送信レートの上限（行/秒、0で無制限）
+            pool: 他のコンポーネントと共有する接続プール（省略時は自前で作成し、close()でクローズする）
         """
+        if transport not in (TRANSPORT_POSTGRES, TRANSPORT_HTTP):
+            raise ValueError(f"不明な転送方式です: {transport}")
+        if transport == TRANSPORT_HTTP and not ingest_url:
+            raise ValueError("transport=http には ingest_url の指定が必要です")
+
         self.postgres_url = postgres_url
         self.sqlite_desktop_db_path = sqlite_desktop_db_path
         self.sqlite_file_events_db_path = sqlite_file_events_db_path
@@ -58,9 +256,51 @@ class DataSyncManager:
         self.batch_size = batch_size
         self.sync_interval = sync_interval
         self.max_retries = max_retries
+        self.transport = transport
+        self.ingest_url = ingest_url.rstrip('/') if ingest_url else None
+        self.ingest_timeout = ingest_timeout
+
+        # 圧縮有効時は生セッションの代わりに圧縮済みテーブルを同期する
+        # （生セッションは辞書テーブルを結合したビューから読み出す）
+        self.compactor: Optional[DesktopSessionCompactor] = None
+        self.desktop_source_table = 'desktop_activity_sessions'
+        self.desktop_read_table = DESKTOP_SESSIONS_VIEW
+        if compaction_mode != COMPACTION_NONE:
+            self.compactor = DesktopSessionCompactor(
+                sqlite_desktop_db_path,
+                mode=compaction_mode,
+                merge_gap_seconds=compaction_merge_gap_seconds,
+                raw_retention_hours=raw_retention_hours,
+            )
+            self.desktop_source_table = COMPACTED_TABLE
+            self.desktop_read_table = COMPACTED_TABLE
+
+        # PostgreSQLに接続できない間はバッチを圧縮してディスクに保存する
+        self.spool: Optional[SyncSpool] = None
+        if spool_dir and transport == TRANSPORT_POSTGRES:
+            self.spool = SyncSpool(spool_dir, max_bytes=spool_max_bytes)
+        self._offline = False
+
+        # 同期間隔の調整とレート制限
+        self.max_records_per_cycle = max_records_per_cycle
+        self.scheduler = AdaptiveSyncScheduler(
+            base_interval=sync_interval,
+            min_interval=min_interval,
+            max_idle_interval=max_idle_interval,
+            backlog_threshold=backlog_threshold,
+            backoff_initial=backoff_initial,
+            backoff_max=backoff_max,
+        )
+        self.rate_limiter = RowRateLimiter(rate_limit_rows_per_second, burst=max(batch_size, int(rate_limit_rows_per_second)))
+        self._cycle = SyncCycleResult()
 
         self.logger = logging.getLogger(__name__)
-        self.pool: Optional[asyncpg.Pool] = None
+        self.pool: Optional['asyncpg.Pool'] = pool
+        self._owns_pool = pool is None
+        # 辞書化カラムの文字列 → PostgreSQLのID
+        self.dimensions = DimensionResolver()
+        # テーブルごとの直近の同期所要時間（ミリ秒、ステップ別）
+        self.last_sync_timings: Dict[str, Dict[str, float]] = {}
         self._sync_task: Optional[asyncio.Task] = None
         self._stop_event = asyncio.Event()
 
@@ -68,26 +308,63 @@ class DataSyncManager:
         self.host_identifier = self._get_host_identifier()
 
     async def initialize(self):
-        """PostgreSQL接続プールを初期化"""
+        """
+        PostgreSQL接続プールを初期化（HTTP転送時は接続しない）
+
+        呼び出さずに同期ループを開始した場合は、同期ループが最初の同期時に接続する。
+        """
+        if self.transport == TRANSPORT_HTTP:
+            self.logger.info(f"HTTP転送モードで同期します: {self.ingest_url}")
+            return
+        if self.pool:
+            self.logger.info("共有のPostgreSQL接続プールを使用します")
+            return
+
         try:
-            self.pool = await asyncpg.create_pool(
-                self.postgres_url,
-                min_size=1,
-                max_size=5,
-                command_timeout=60
-            )
+            self.pool = await self._create_pool()
             self.logger.info("PostgreSQL接続プールを初期化しました")
         except Exception as e:
+            # スプール有効時はオフラインで開始し、同期のたびに再接続を試みる
+            if self.spool:
+                self.logger.warning(f"PostgreSQLに接続できないためオフラインで開始します: {e}")
+                return
             self.logger.error(f"PostgreSQL接続プール初期化エラー: {e}")
             raise
 
+    async def _create_pool(self) -> 'asyncpg.Pool':
+        """接続プールを作成（asyncpgは初回の接続時に読み込む）"""
+        import asyncpg
+
+        return await asyncpg.create_pool(
+            self.postgres_url,
+            min_size=1,
+            max_size=5,
+            command_timeout=60
+        )
+
+    async def _ensure_pool(self) -> bool:
+        """接続プールがなければ作成を試みる（作成できたかを返す）"""
+        if self.pool:
+            return True
+        try:
+            self.pool = await self._create_pool()
+            self.logger.info("PostgreSQL接続プールを初期化しました")
+            return True
+        except Exception as e:
+            if self.spool:
+                self.logger.warning(f"PostgreSQLに接続できません（スプールに保存します）: {e}")
+            else:
+                self.logger.warning(f"PostgreSQLに接続できません（次回の同期で再試行します）: {e}")
+            return False
+
     async def close(self):
         """接続プールをクローズ"""
         if self._sync_task and not self._sync_task.done():
             self._stop_event.set()
             await self._sync_task
 
-        if self.pool:
+        # 共有の接続プールは作成元がクローズする
+        if self.pool and self._owns_pool:
             await self.pool.close()
             self.logger.info("PostgreSQL接続プールをクローズしました")
 
@@ -97,9 +374,24 @@ class DataSyncManager:
         username = getpass.getuser()
         return f"{hostname}_{username}"
 
-    async def sync_all(self):
-        """全テーブルを同期（desktop_activity_sessions + file_change_events + input_activity_sessions）"""
+    async def sync_all(self) -> SyncCycleResult:
+        """
+        全テーブルを同期（desktop_activity_sessions + file_change_events + input_activity_sessions）
+
+        Returns:
+            SyncCycleResult: 同期件数・失敗件数・残りの未同期件数・接続失敗の有無
+        """
         self.logger.info("データ同期を開始します...")
+        self._cycle = SyncCycleResult()
+        cycle_started = time.perf_counter()
+
+        # スプール有効時は接続を確認し、オンラインならスプールを先に再送する
+        if self.spool:
+            self._offline = not await self._ensure_pool()
+            if not self._offline:
+                await self._replay_spool()
+            # オフライン中はスプールへの保存を続けつつ、再接続はバックオフする
+            self._cycle.connection_failed = self._offline
 
         # デスクトップアクティビティを同期
         await self._sync_desktop_activity()
@@ -110,139 +402,159 @@ class DataSyncManager:
         # 入力活動セッションを同期
         await self._sync_input_activity()
 
-        self.logger.info("データ同期が完了しました")
+        self._cycle.connection_failed = self._cycle.connection_failed or self._offline
+        self._cycle.backlog = self._count_unsynced()
+        SYNC_CYCLE_DURATION.labels().observe(time.perf_counter() - cycle_started)
+        self.logger.info(
+            f"データ同期が完了しました（同期={self._cycle.records_synced}件, "
+            f"失敗={self._cycle.records_failed}件, 残り={self._cycle.backlog}件）"
+        )
+        return self._cycle
+
+    def _count_unsynced(self) -> int:
+        """全テーブルの未同期行数を返す（部分インデックスにより未同期件数にのみ比例）"""
+        total = 0
+        for table_name in ('desktop_activity_sessions', 'file_change_events', 'input_activity_sessions'):
+            db_path, table = self._local_source(table_name)
+            if not db_path or not Path(db_path).exists():
+                continue
+            try:
+                conn = sqlite3.connect(db_path)
+                try:
+                    backlog = conn.execute(
+                        f"SELECT COUNT(*) FROM {table} WHERE synced_at IS NULL"
+                    ).fetchone()[0]
+                finally:
+                    conn.close()
+            except sqlite3.Error as e:
+                self.logger.debug(f"未同期件数の取得エラー ({table}): {e}")
+                continue
+            SYNC_BACKLOG.labels(table_name).set(backlog)
+            total += backlog
+        return total
 
     async def _sync_desktop_activity(self):
         """デスクトップアクティビティセッションを同期"""
-        table_name = "desktop_activity_sessions"
-        sync_started_at = datetime.now()
-        records_synced = 0
-        records_failed = 0
-        error_message = None
+        if self.compactor and Path(self.sqlite_desktop_db_path).exists():
+            try:
+                self.compactor.compact()
+            except Exception as e:
+                self.logger.error(f"デスクトップセッション圧縮エラー: {e}")
 
-        try:
-            # SQLiteから未同期レコードを取得
-            unsynced_records = self._get_unsynced_desktop_records()
+        await self._sync_table(
+            "desktop_activity_sessions",
+            self._get_unsynced_desktop_records,
+            self._update_desktop_synced_flags,
+            self._to_desktop_columns,
+        )
 
-            if not unsynced_records:
-                self.logger.debug(f"{table_name}: 未同期レコードがありません")
-                return
-
-            self.logger.info(f"{table_name}: {len(unsynced_records)}件の未同期レコードを検出")
+        if self.compactor and Path(self.sqlite_desktop_db_path).exists():
+            try:
+                self.compactor.purge_raw_sessions()
+            except Exception as e:
+                self.logger.error(f"生セッション削除エラー: {e}")
 
-            # バッチ単位でPostgreSQLに挿入
-            for i in range(0, len(unsynced_records), self.batch_size):
-                batch = unsynced_records[i:i + self.batch_size]
-                synced_ids = []
+    async def _sync_file_events(self):
+        """ファイル変更イベントを同期"""
+        await self._sync_table(
+            "file_change_events",
+            self._get_unsynced_file_records,
+            self._update_file_synced_flags,
+            self._to_file_event_columns,
+        )
 
-                try:
-                    async with self.pool.acquire() as conn:
-                        async with conn.transaction():
-                            for record in batch:
-                                # ISO文字列をPostgreSQLのTIMESTAMPに変換
-                                start_time_iso = None
-                                end_time_iso = None
-
-                                if record['start_time_iso']:
-                                    start_time_iso = datetime.fromisoformat(record['start_time_iso'].replace('Z', '+00:00'))
-                                if record['end_time_iso']:
-                                    end_time_iso = datetime.fromisoformat(record['end_time_iso'].replace('Z', '+00:00'))
-
-                                await conn.execute("""
-                                    INSERT INTO desktop_activity_sessions
-                                    (start_time, end_time, start_time_iso, end_time_iso,
-                                     application_name, window_title, duration_seconds, synced_at)
-                                    VALUES ($1, $2, $3, $4, $5, $6, $7, CURRENT_TIMESTAMP)
-                                """, record['start_time'], record['end_time'],
-                                    start_time_iso, end_time_iso,
-                                    record['application_name'], record['window_title'],
-                                    record['duration_seconds'])
-
-                                synced_ids.append(record['id'])
-
-                    # SQLiteのsynced_atフラグを更新
-                    self._update_desktop_synced_flags(synced_ids)
-                    records_synced += len(synced_ids)
-
-                    self.logger.debug(f"{table_name}: {len(synced_ids)}件を同期しました")
+    async def _sync_input_activity(self):
+        """入力活動セッションを同期"""
+        # 入力アクティビティDBが設定されていない場合はスキップ
+        if not self.sqlite_input_db_path:
+            self.logger.debug("入力アクティビティDB未設定のため同期をスキップ")
+            return
 
-                except Exception as e:
-                    self.logger.error(f"{table_name}: バッチ同期エラー: {e}")
-                    records_failed += len(batch)
-                    error_message = str(e)
+        await self._sync_table(
+            "input_activity_sessions",
+            self._get_unsynced_input_records,
+            self._update_input_synced_flags,
+            self._to_input_columns,
+        )
 
-            # 同期結果をログに記録
-            status = "success" if records_failed == 0 else "partial_success" if records_synced > 0 else "failed"
-            await self._log_sync_result(
-                sync_started_at, table_name, records_synced, records_failed, status, error_message
-            )
+    async def _sync_table(
+        self,
+        table_name: str,
+        get_records: Callable[[], ColumnBatch],
+        update_flags: Callable[[List[int]], None],
+        to_columns: Callable[[ColumnBatch], ColumnBatch],
+    ):
+        """
+        1テーブル分の未同期レコードをバッチ単位で同期
 
-        except Exception as e:
-            self.logger.error(f"{table_name}: 同期処理エラー: {e}")
-            await self._log_sync_result(
-                sync_started_at, table_name, 0, 0, "failed", str(e)
-            )
+        レコードは取得から書き込みまでカラムごとのリスト（ColumnBatch）のまま扱う。
 
-    async def _sync_file_events(self):
-        """ファイル変更イベントを同期"""
-        table_name = "file_change_events"
+        Args:
+            table_name: 同期先テーブル名
+            get_records: SQLiteから未同期レコードを取得する関数
+            update_flags: SQLiteのsynced_atフラグを更新する関数
+            to_columns: SQLiteレコードを同期用のカラム（PG_COLUMNSの順）に変換する関数
+        """
         sync_started_at = datetime.now()
         records_synced = 0
         records_failed = 0
+        records_quarantined = 0
+        batch_duration = SYNC_BATCH_DURATION.labels(table_name)
         error_message = None
+        # ステップ別の所要時間（ミリ秒）
+        timings = {'fetch': 0.0, 'convert': 0.0, 'throttle': 0.0, 'write': 0.0, 'ack': 0.0}
 
         try:
             # SQLiteから未同期レコードを取得
-            unsynced_records = self._get_unsynced_file_records()
+            step_started = time.perf_counter()
+            unsynced_records = get_records()
+            timings['fetch'] = (time.perf_counter() - step_started) * 1000
 
-            if not unsynced_records:
+            if not len(unsynced_records):
                 self.logger.debug(f"{table_name}: 未同期レコードがありません")
                 return
 
             self.logger.info(f"{table_name}: {len(unsynced_records)}件の未同期レコードを検出")
 
-            # バッチ単位でPostgreSQLに挿入
+            # バッチ単位で送信
             for i in range(0, len(unsynced_records), self.batch_size):
-                batch = unsynced_records[i:i + self.batch_size]
-                synced_ids = []
+                batch = unsynced_records.slice(i, i + self.batch_size)
 
                 try:
-                    async with self.pool.acquire() as conn:
-                        async with conn.transaction():
-                            for record in batch:
-                                # ISO文字列をPostgreSQLのTIMESTAMPに変換
-                                event_time_iso = None
-                                if record['event_time_iso']:
-                                    event_time_iso = datetime.fromisoformat(record['event_time_iso'].replace('Z', '+00:00'))
-
-                                # is_symlinkをboolean型に変換（SQLiteでは整数で保存されている）
-                                is_symlink = bool(record['is_symlink']) if record.get('is_symlink') is not None else False
-
-                                await conn.execute("""
-                                    INSERT INTO file_change_events
-                                    (event_time, event_time_iso, event_type, file_path,
-                                     file_path_relative, file_name, file_extension, file_size,
-                                     is_symlink, monitored_root, project_name, synced_at)
-                                    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, CURRENT_TIMESTAMP)
-                                """, record['event_time'], event_time_iso,
-                                    record['event_type'], record['file_path'],
-                                    record['file_path_relative'], record['file_name'],
-                                    record['file_extension'], record['file_size'],
-                                    is_symlink, record['monitored_root'],
-                                    record['project_name'])
-
-                                synced_ids.append(record['id'])
-
-                    # SQLiteのsynced_atフラグを更新
-                    self._update_file_synced_flags(synced_ids)
-                    records_synced += len(synced_ids)
-
-                    self.logger.debug(f"{table_name}: {len(synced_ids)}件を同期しました")
+                    with batch_duration.time():
+                        synced, quarantined = await self._deliver_batch(
+                            table_name, batch, to_columns, update_flags, timings
+                        )
+                    records_synced += synced
+                    records_failed += quarantined
+                    records_quarantined += quarantined
+                    if quarantined:
+                        error_message = f"{quarantined}件を隔離しました"
+
+                    self.logger.debug(f"{table_name}: {synced}件を同期しました")
 
                 except Exception as e:
                     self.logger.error(f"{table_name}: バッチ同期エラー: {e}")
                     records_failed += len(batch)
                     error_message = str(e)
+                    # 接続できない・テーブルがないなど行に原因のないエラーは残りのバッチも失敗するため送らない
+                    records_failed += len(unsynced_records) - i - len(batch)
+                    if isinstance(e, connection_errors()):
+                        # 接続できない間はバックオフに任せる
+                        self._cycle.connection_failed = True
+                    break
+
+            self._cycle.records_synced += records_synced
+            self._cycle.records_failed += records_failed
+            SYNC_RECORDS.labels(table_name, 'synced').inc(records_synced)
+            SYNC_RECORDS.labels(table_name, 'quarantined').inc(records_quarantined)
+            SYNC_RECORDS.labels(table_name, 'failed').inc(records_failed - records_quarantined)
+
+            self.last_sync_timings[table_name] = timings
+            self.logger.info(
+                f"{table_name}: 同期所要時間 "
+                + ", ".join(f"{step}={ms:.1f}ms" for step, ms in timings.items())
+            )
 
             # 同期結果をログに記録
             status = "success" if records_failed == 0 else "partial_success" if records_synced > 0 else "failed"
@@ -256,235 +568,593 @@ class DataSyncManager:
                 sync_started_at, table_name, 0, 0, "failed", str(e)
             )
 
-    def _get_unsynced_desktop_records(self) -> List[Dict[str, Any]]:
-        """SQLiteから未同期のデスクトップレコードを取得"""
-        if not Path(self.sqlite_desktop_db_path).exists():
-            self.logger.debug(f"デスクトップDBが存在しません: {self.sqlite_desktop_db_path}")
-            return []
+    async def _deliver_batch(
+        self,
+        table_name: str,
+        batch: ColumnBatch,
+        to_columns: Callable[[ColumnBatch], ColumnBatch],
+        update_flags: Callable[[List[int]], None],
+        timings: Dict[str, float],
+    ) -> Tuple[int, int]:
+        """
+        1バッチを変換・送信し、synced_atを更新
 
+        変換・書き込みに失敗する行は二分探索で特定して隔離テーブルに移し、
+        残りの行はそのままコミットする。隔離した行も同期済みとして扱い、
+        以降のサイクルで同じ行がバッチ全体を妨げないようにする。
+
+        Returns:
+            (同期した行数, 隔離した行数) のタプル
+
+        Raises:
+            connection_errors(): 同期先に接続できない場合（スプール無効時）
+        """
+        # カラム単位で変換し、変換できない行は隔離
+        step_started = time.perf_counter()
+        records, rows, rejected = self._convert_batch(batch, to_columns)
+        record_ids = records.column('id')
+        timings['convert'] += (time.perf_counter() - step_started) * 1000
+
+        # 送信レートを制限（オフライン中のスプール保存は対象外）
+        if not self._offline:
+            timings['throttle'] += await self.rate_limiter.acquire(len(rows)) * 1000
+
+        written_ids: List[int] = []
+        spooled_ids: List[int] = []
+        step_started = time.perf_counter()
         try:
-            conn = sqlite3.connect(self.sqlite_desktop_db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+            if self._offline:
+                self._spool_rows(table_name, rows, record_ids)
+                spooled_ids = list(record_ids)
+            else:
+                try:
+                    await self._write_isolating(table_name, records, rows, written_ids, rejected)
+                except connection_errors() as e:
+                    if not self.spool:
+                        raise
+                    self.logger.warning(
+                        f"{table_name}: PostgreSQLに接続できないためスプールに切り替えます: {e}"
+                    )
+                    self._offline = True
+
+                    # 書き込み済み・隔離済みの行を除いてスプールに保存
+                    done = set(written_ids) | {r['id'] for r, _ in rejected}
+                    remaining = [i for i, record_id in enumerate(record_ids) if record_id not in done]
+                    remaining_ids = [record_ids[i] for i in remaining]
+                    self._spool_rows(table_name, rows.take(remaining), remaining_ids)
+                    spooled_ids = remaining_ids
+        finally:
+            timings['write'] += (time.perf_counter() - step_started) * 1000
+
+            # 接続エラーで中断した場合も、書き込み済み・隔離済みの行は確定させる
+            if rejected:
+                self._quarantine(table_name, rejected)
+
+            # SQLiteのsynced_atフラグを更新（隔離済みの行も同期済みとして扱う。スプール済みの行は_spool_rowsで設定済み）
+            step_started = time.perf_counter()
+            update_flags(written_ids + [r['id'] for r, _ in rejected])
+            timings['ack'] += (time.perf_counter() - step_started) * 1000
+
+        return len(written_ids) + len(spooled_ids), len(rejected)
+
+    @staticmethod
+    def _convert_batch(
+        batch: ColumnBatch,
+        to_columns: Callable[[ColumnBatch], ColumnBatch],
+    ) -> Tuple[ColumnBatch, ColumnBatch, List[Tuple[Dict[str, Any], str]]]:
+        """
+        バッチを同期用のカラムに変換
 
-            cursor.execute("""
-                SELECT * FROM desktop_activity_sessions
-                WHERE synced_at IS NULL
-                ORDER BY start_time ASC
-            """)
+        通常はバッチ全体を1回で変換し、失敗した場合のみ1行ずつ変換して変換できない行を特定する。
+        値の型・時刻の形式が不正な行（check_sync_values）も変換できない行として扱う。
 
-            records = [dict(row) for row in cursor.fetchall()]
-            conn.close()
+        Returns:
+            (変換できたレコード, 同期用のバッチ, (レコード, エラー) のリスト) のタプル
+        """
+        try:
+            rows = to_columns(batch)
+            check_sync_values(rows)
+            return batch, rows, []
+        except Exception:
+            pass
+
+        accepted: List[int] = []
+        rejected: List[Tuple[Dict[str, Any], str]] = []
+        for index in range(len(batch)):
+            try:
+                check_sync_values(to_columns(batch.take([index])))
+                accepted.append(index)
+            except Exception as e:
+                rejected.append((batch.record(index), f"変換エラー: {e}"))
 
-            return records
+        records = batch.take(accepted)
+        return records, to_columns(records), rejected
 
-        except Exception as e:
-            self.logger.error(f"デスクトップレコード取得エラー: {e}")
-            return []
+    async def _write_isolating(
+        self,
+        table_name: str,
+        records: ColumnBatch,
+        rows: ColumnBatch,
+        written_ids: List[int],
+        rejected: List[Tuple[Dict[str, Any], str]],
+    ):
+        """
+        行を書き込み、データエラーで失敗した場合は二分して再試行
 
-    def _get_unsynced_file_records(self) -> List[Dict[str, Any]]:
-        """SQLiteから未同期のファイルレコードを取得"""
-        if not Path(self.sqlite_file_events_db_path).exists():
-            self.logger.debug(f"ファイルDBが存在しません: {self.sqlite_file_events_db_path}")
-            return []
+        1行まで絞り込んでも失敗する行をrejectedに追加する。
+        不正な行がk件の場合、書き込み回数は概ね 2k·log2(バッチサイズ) 回で済む。
+        データエラー以外の例外は二分せずにそのまま送出する（行は未同期のまま次回再送される）。
+
+        Args:
+            table_name: 同期先テーブル名
+            records: SQLiteレコード（rowsと同じ順）
+            rows: 同期用のバッチ
+            written_ids: 書き込みに成功したレコードIDを追加するリスト
+            rejected: (レコード, エラー) を追加するリスト
+
+        Raises:
+            connection_errors(): 同期先に接続できない場合
+            Exception: データエラー以外の書き込みエラー
+        """
+        if not len(rows):
+            return
 
         try:
-            conn = sqlite3.connect(self.sqlite_file_events_db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+            await self._write_rows(table_name, rows)
+            written_ids.extend(records.column('id'))
+            return
+        except data_errors() as e:
+            if len(rows) == 1:
+                record = records.record(0)
+                self.logger.warning(f"{table_name}: レコード id={record['id']} を隔離します: {e}")
+                rejected.append((record, str(e)))
+                return
 
-            cursor.execute("""
-                SELECT * FROM file_change_events
-                WHERE synced_at IS NULL
-                ORDER BY event_time ASC
-            """)
+        size = len(rows)
+        mid = size // 2
+        await self._write_isolating(
+            table_name, records.slice(0, mid), rows.slice(0, mid), written_ids, rejected
+        )
+        await self._write_isolating(
+            table_name, records.slice(mid, size), rows.slice(mid, size), written_ids, rejected
+        )
 
-            records = [dict(row) for row in cursor.fetchall()]
-            conn.close()
+    def _quarantine(self, table_name: str, rejected: List[Tuple[Dict[str, Any], str]]):
+        """
+        同期できない行を同期元SQLiteのsync_quarantineテーブルに保存
 
-            return records
+        Args:
+            table_name: 同期先テーブル名
+            rejected: (レコード, エラー) のリスト
+        """
+        db_path, source_table = self._local_source(table_name)
+        try:
+            conn = sqlite3.connect(db_path, timeout=30)
+            try:
+                with conn:
+                    conn.execute("""
+                        CREATE TABLE IF NOT EXISTS sync_quarantine (
+                            id INTEGER PRIMARY KEY AUTOINCREMENT,
+                            source_table TEXT NOT NULL,
+                            record_id INTEGER NOT NULL,
+                            record_json TEXT NOT NULL,
+                            error_message TEXT,
+                            quarantined_at INTEGER NOT NULL
+                        )
+                    """)
+                    current_time = int(datetime.now().timestamp())
+                    conn.executemany("""
+                        INSERT INTO sync_quarantine
+                        (source_table, record_id, record_json, error_message, quarantined_at)
+                        VALUES (?, ?, ?, ?, ?)
+                    """, [
+                        (source_table, record['id'], json.dumps(record, ensure_ascii=False, default=str),
+                         error, current_time)
+                        for record, error in rejected
+                    ])
+            finally:
+                conn.close()
+
+            self.logger.warning(f"{table_name}: {len(rejected)}件を sync_quarantine に隔離しました")
 
         except Exception as e:
-            self.logger.error(f"ファイルレコード取得エラー: {e}")
-            return []
+            self.logger.error(f"隔離テーブル書き込みエラー: {e}")
+
+    def _to_desktop_columns(self, batch: ColumnBatch) -> ColumnBatch:
+        """デスクトップレコードを同期用のカラムに変換"""
+        return batch.select(PG_COLUMNS['desktop_activity_sessions'])
+
+    def _to_file_event_columns(self, batch: ColumnBatch) -> ColumnBatch:
+        """ファイルレコードを同期用のカラムに変換"""
+        # is_symlinkをboolean型に変換（SQLiteでは整数で保存されている、NULLはFalse）
+        is_symlink = [bool(value) for value in batch.column('is_symlink')]
+        return batch.with_column('is_symlink', is_symlink).select(PG_COLUMNS['file_change_events'])
+
+    def _to_input_columns(self, batch: ColumnBatch) -> ColumnBatch:
+        """入力活動レコードを同期用のカラムに変換"""
+        return (
+            batch
+            .with_column('host_identifier', [self.host_identifier] * len(batch))
+            .with_column('synced_from_local_id', batch.column('id'))
+            .select(PG_COLUMNS['input_activity_sessions'])
+        )
+
+    async def _write_rows(self, table_name: str, rows: ColumnBatch):
+        """
+        行のバッチを転送方式に応じて書き込む
 
-    def _update_desktop_synced_flags(self, record_ids: List[int]):
-        """デスクトップレコードのsynced_atフラグを更新"""
-        if not record_ids:
-            return
+        いずれの方式でもバッチ全体が1トランザクションで挿入される。
 
-        try:
-            conn = sqlite3.connect(self.sqlite_desktop_db_path)
-            cursor = conn.cursor()
-            current_time = int(datetime.now().timestamp())
+        Args:
+            table_name: 同期先テーブル名
+            rows: 同期用のバッチ（PG_COLUMNSのカラム、時刻はISO文字列）
 
-            placeholders = ','.join('?' * len(record_ids))
-            cursor.execute(f"""
-                UPDATE desktop_activity_sessions
-                SET synced_at = ?
-                WHERE id IN ({placeholders})
-            """, [current_time] + record_ids)
+        Raises:
+            Exception: 書き込みに失敗した場合
+        """
+        if self.transport == TRANSPORT_HTTP:
+            await self._post_rows(table_name, rows.records())
+        else:
+            await self._insert_rows(table_name, rows)
+
+    async def _insert_rows(self, table_name: str, rows: ColumnBatch):
+        """PostgreSQLにCOPYで挿入（辞書化カラムはバッチ単位でIDに変換）"""
+        # ISO文字列をPostgreSQLのTIMESTAMPに変換（変換しないカラムのリストはそのまま渡す）
+        arrays = [
+            [self._parse_iso(value) for value in array] if column in PG_TIMESTAMP_COLUMNS else array
+            for column, array in zip(rows.columns, rows.arrays)
+        ]
+
+        async with self.pool.acquire() as conn:
+            # 辞書への登録は行の挿入とは別に確定させる（キャッシュしたIDがロールバックで無効にならないように）
+            columns, arrays = await self.dimensions.resolve_columns(conn, table_name, rows.columns, arrays)
+
+            if table_name in PG_TABLES_WITH_SYNCED_AT:
+                columns += ('synced_at',)
+                arrays.append(itertools.repeat(datetime.now(timezone.utc), len(rows)))
+
+            async with conn.transaction():
+                await conn.copy_records_to_table(
+                    PG_STORAGE_TABLES.get(table_name, table_name),
+                    records=zip(*arrays),
+                    columns=columns,
+                )
 
-            conn.commit()
-            conn.close()
+    async def _post_rows(self, table_name: str, rows: Iterable[Dict[str, Any]]):
+        """API Gatewayの取り込みAPIにgzip圧縮NDJSONで送信"""
+        lines = [json.dumps(row, ensure_ascii=False) for row in rows]
+        payload = "\n".join(lines).encode('utf-8')
+        body = gzip.compress(payload)
+        url = f"{self.ingest_url}/{table_name}"
+
+        def send():
+            # urllib.requestはHTTP転送時のみ必要なため、送信時に読み込む
+            import urllib.error
+            import urllib.request
+
+            request = urllib.request.Request(
+                url,
+                data=body,
+                method="POST",
+                headers={
+                    'Content-Type': 'application/x-ndjson',
+                    'Content-Encoding': 'gzip',
+                    'X-Host-Identifier': self.host_identifier,
+                },
+            )
+            try:
+                with urllib.request.urlopen(request, timeout=self.ingest_timeout) as response:
+                    return json.loads(response.read() or b'{}')
+            except urllib.error.HTTPError as e:
+                detail = e.read().decode('utf-8', errors='replace')
+                if e.code == 429 or e.code >= 500:
+                    raise IngestUnavailableError(f"取り込みAPIが利用できません: HTTP {e.code}: {detail}") from e
+                if e.code in (400, 422):
+                    raise IngestRejectedError(f"取り込みAPIが行を拒否しました: HTTP {e.code}: {detail}") from e
+                raise RuntimeError(f"取り込みAPIエラー: HTTP {e.code}: {detail}") from e
+
+        # urllibはブロッキングのため、イベントループを止めないよう別スレッドで実行
+        result = await asyncio.to_thread(send)
+        self.logger.debug(
+            f"{table_name}: 取り込みAPIに送信しました "
+            f"(rows={result.get('rows', len(lines))}, {len(payload)}→{len(body)}バイト)"
+        )
+
+    def _local_source(self, table_name: str) -> Tuple[str, str]:
+        """同期先テーブルに対応する (SQLiteファイル, 同期元テーブル) を返す"""
+        return {
+            'desktop_activity_sessions': (self.sqlite_desktop_db_path, self.desktop_source_table),
+            'file_change_events': (self.sqlite_file_events_db_path, 'file_change_events'),
+            'input_activity_sessions': (self.sqlite_input_db_path, 'input_activity_sessions'),
+        }[table_name]
+
+    @staticmethod
+    def _timestamp_literal(value: Optional[str]) -> Optional[str]:
+        """
+        ISO文字列をCOPY用のタイムスタンプ文字列に変換
 
-        except Exception as e:
-            self.logger.error(f"synced_atフラグ更新エラー: {e}")
+        タイムゾーンなしの値は、直接挿入時（asyncpgがUTCとして扱う）と同じ結果になるようUTCを付与する。
+        """
+        if not value:
+            return None
+        tail = value[19:]
+        if 'Z' in tail or '+' in tail or '-' in tail:
+            return value
+        return value + '+00:00'
+
+    def _spool_rows(self, table_name: str, rows: ColumnBatch, record_ids: List[int]):
+        """
+        バッチをスプールに保存
 
-    def _update_file_synced_flags(self, record_ids: List[int]):
-        """ファイルレコードのsynced_atフラグを更新"""
-        if not record_ids:
+        保存した行のsynced_atはSPOOLED_SYNCED_ATとし、通常同期の対象から外したまま
+        保持期間処理で削除されないようにする（再送に成功した時点で同期時刻を設定する）。
+        上限を超えて退避されたセグメントは、同期元のsynced_atを戻して通常同期に戻す。
+        """
+        columns = rows.columns
+        arrays = [
+            [self._timestamp_literal(value) for value in array] if column in PG_TIMESTAMP_COLUMNS else array
+            for column, array in zip(columns, rows.arrays)
+        ]
+        if table_name in PG_TABLES_WITH_SYNCED_AT:
+            columns += ('synced_at',)
+            arrays.append([datetime.now().astimezone().isoformat()] * len(rows))
+
+        db_path, source_table = self._local_source(table_name)
+        self.spool.write(
+            table_name,
+            columns,
+            list(zip(*arrays)),
+            db_path,
+            source_table,
+            self._id_ranges(record_ids),
+        )
+        self.logger.info(f"{table_name}: {len(rows)}件をスプールに保存しました")
+
+        # 退避でsynced_atを戻す前に印を付ける（保存直後に退避されたセグメントの行も未同期に戻るように）
+        self._ack_records(db_path, source_table, record_ids, synced_at=SPOOLED_SYNCED_AT)
+
+        for segment in self.spool.evict():
+            self._unack_ranges(segment.source_db, segment.source_table, segment.id_ranges)
+
+    async def _replay_spool(self):
+        """
+        スプール済みセグメントを古い順にCOPYで再送
+
+        接続エラーが発生した場合は中断してオフラインに戻る。
+        データエラーのセグメントは破棄し、同期元のsynced_atを戻して通常同期で再送させる。
+        """
+        segments = self.spool.segments()
+        if not segments:
             return
 
-        try:
-            conn = sqlite3.connect(self.sqlite_file_events_db_path)
-            cursor = conn.cursor()
-            current_time = int(datetime.now().timestamp())
+        self.logger.info(f"スプール済みの{len(segments)}セグメントを再送します")
+        replayed_rows = 0
+        started = time.perf_counter()
 
-            placeholders = ','.join('?' * len(record_ids))
-            cursor.execute(f"""
-                UPDATE file_change_events
-                SET synced_at = ?
-                WHERE id IN ({placeholders})
-            """, [current_time] + record_ids)
+        for path in segments:
+            claimed = self.spool.claim(path)
+            if claimed is None:
+                continue  # 他プロセスが再送中
 
-            conn.commit()
-            conn.close()
+            try:
+                segment = self.spool.read(claimed)
+                async with self.pool.acquire() as conn:
+                    async with conn.transaction():
+                        await self._copy_segment(conn, segment)
+            except connection_errors() as e:
+                self.spool.release(claimed)
+                self._offline = True
+                self.logger.warning(f"スプール再送中に接続が切断されました: {e}")
+                break
+            except Exception as e:
+                self.logger.error(f"スプールセグメントの再送に失敗しました（通常同期に戻します）: {claimed.name}: {e}")
+                try:
+                    header = self.spool.read_header(claimed)
+                    self._unack_ranges(header.source_db, header.source_table, header.id_ranges)
+                except Exception as header_error:
+                    self.logger.error(f"スプールセグメントのヘッダーを読めません: {header_error}")
+                self.spool.remove(claimed)
+                continue
+
+            self.spool.remove(claimed)
+            self._ack_ranges(segment.source_db, segment.source_table, segment.id_ranges)
+            replayed_rows += segment.row_count
+
+        if replayed_rows:
+            self.logger.info(
+                f"スプールから{replayed_rows}件を再送しました "
+                f"({(time.perf_counter() - started) * 1000:.1f}ms)"
+            )
 
-        except Exception as e:
-            self.logger.error(f"synced_atフラグ更新エラー: {e}")
+    async def _copy_segment(self, conn: 'asyncpg.Connection', segment):
+        """
+        セグメントのCSVをCOPYで挿入（トランザクション内で呼び出す）
 
-    async def _sync_input_activity(self):
-        """入力活動セッションを同期"""
-        # 入力アクティビティDBが設定されていない場合はスキップ
-        if not self.sqlite_input_db_path:
-            self.logger.debug("入力アクティビティDB未設定のため同期をスキップ")
+        辞書化カラムを持つテーブルは、文字列のまま一時テーブルにCOPYした後、
+        辞書を結合してIDに置き換えながら実データテーブルに挿入する。
+        """
+        if segment.table not in TABLE_DIMENSIONS:
+            await conn.copy_to_table(
+                segment.table,
+                source=io.BytesIO(segment.payload),
+                columns=list(segment.columns),
+                format='csv'
+            )
             return
 
-        table_name = "input_activity_sessions"
-        sync_started_at = datetime.now()
-        records_synced = 0
-        records_failed = 0
-        error_message = None
-
-        try:
-            # SQLiteから未同期レコードを取得
-            unsynced_records = self._get_unsynced_input_records()
+        staging_table = "sync_spool_staging"
+        await conn.execute(
+            f"CREATE TEMP TABLE {staging_table} (LIKE {segment.table}) ON COMMIT DROP"
+        )
+        await conn.copy_to_table(
+            staging_table,
+            source=io.BytesIO(segment.payload),
+            columns=list(segment.columns),
+            format='csv'
+        )
+        for statement in staging_insert_sql(segment.table, segment.columns, staging_table):
+            await conn.execute(statement)
+
+    @staticmethod
+    def _parse_iso(value: Optional[str]) -> Optional[datetime]:
+        """ISO文字列をdatetimeに変換（空の場合はNone）"""
+        if not value:
+            return None
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+    def _fetch_unsynced(
+        self, label: str, db_path: str, table: str, columns: Tuple[str, ...], order_column: str
+    ) -> ColumnBatch:
+        """
+        SQLiteから未同期レコードをカラムごとのリストとして取得
 
-            if not unsynced_records:
-                self.logger.debug(f"{table_name}: 未同期レコードがありません")
-                return
+        Args:
+            label: ログに表示するデータの種類
+            db_path: SQLiteファイル
+            table: 読み出すテーブル・ビュー
+            columns: 取得するカラム
+            order_column: 同期順のカラム
+
+        Returns:
+            ColumnBatch: 未同期レコード（取得できない場合は空）
+        """
+        if not Path(db_path).exists():
+            self.logger.debug(f"{label}DBが存在しません: {db_path}")
+            return ColumnBatch.empty(columns)
 
-            self.logger.info(f"{table_name}: {len(unsynced_records)}件の未同期レコードを検出")
+        try:
+            conn = sqlite3.connect(db_path)
+            try:
+                cursor = conn.execute(f"""
+                    SELECT {", ".join(columns)} FROM {table}
+                    WHERE synced_at IS NULL
+                    ORDER BY {order_column} ASC
+                    LIMIT ?
+                """, (self.max_records_per_cycle,))
+                return ColumnBatch.from_cursor(cursor)
+            finally:
+                conn.close()
 
-            # バッチ単位でPostgreSQLに挿入
-            for i in range(0, len(unsynced_records), self.batch_size):
-                batch = unsynced_records[i:i + self.batch_size]
-                synced_ids = []
+        except Exception as e:
+            self.logger.error(f"{label}レコード取得エラー: {e}")
+            return ColumnBatch.empty(columns)
 
-                try:
-                    async with self.pool.acquire() as conn:
-                        async with conn.transaction():
-                            for record in batch:
-                                # ISO文字列をPostgreSQLのTIMESTAMPに変換
-                                start_time_iso = None
-                                if record['start_time_iso']:
-                                    start_time_iso = datetime.fromisoformat(record['start_time_iso'].replace('Z', '+00:00'))
-
-                                end_time_iso = None
-                                if record['end_time_iso']:
-                                    end_time_iso = datetime.fromisoformat(record['end_time_iso'].replace('Z', '+00:00'))
-
-                                await conn.execute("""
-                                    INSERT INTO input_activity_sessions
-                                    (start_time, end_time, start_time_iso, end_time_iso,
-                                     duration_seconds, created_at, updated_at,
-                                     host_identifier, synced_from_local_id)
-                                    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
-                                """, record['start_time'], record['end_time'],
-                                    start_time_iso, end_time_iso,
-                                    record['duration_seconds'], record['created_at'],
-                                    record['updated_at'], self.host_identifier, record['id'])
-
-                                synced_ids.append(record['id'])
-
-                    # SQLiteのsynced_atフラグを更新
-                    self._update_input_synced_flags(synced_ids)
-                    records_synced += len(synced_ids)
-
-                    self.logger.debug(f"{table_name}: {len(synced_ids)}件を同期しました")
+    def _get_unsynced_desktop_records(self) -> ColumnBatch:
+        """SQLiteから未同期のデスクトップレコードを取得"""
+        return self._fetch_unsynced(
+            "デスクトップ", self.sqlite_desktop_db_path, self.desktop_read_table,
+            SOURCE_COLUMNS['desktop_activity_sessions'], "start_time",
+        )
 
-                except Exception as e:
-                    self.logger.error(f"{table_name}: バッチ同期エラー: {e}")
-                    records_failed += len(batch)
-                    error_message = str(e)
+    def _get_unsynced_file_records(self) -> ColumnBatch:
+        """SQLiteから未同期のファイルレコードを取得"""
+        return self._fetch_unsynced(
+            "ファイル", self.sqlite_file_events_db_path, FILE_EVENTS_VIEW,
+            SOURCE_COLUMNS['file_change_events'], "event_time",
+        )
 
-            # 同期結果をログに記録
-            status = "success" if records_failed == 0 else "partial_success" if records_synced > 0 else "failed"
-            await self._log_sync_result(
-                sync_started_at, table_name, records_synced, records_failed, status, error_message
-            )
+    def _update_desktop_synced_flags(self, record_ids: List[int]):
+        """デスクトップレコードのsynced_atフラグを更新"""
+        self._ack_records(self.sqlite_desktop_db_path, self.desktop_source_table, record_ids)
 
-        except Exception as e:
-            self.logger.error(f"{table_name}: 同期処理エラー: {e}")
-            await self._log_sync_result(
-                sync_started_at, table_name, 0, 0, "failed", str(e)
-            )
+    def _update_file_synced_flags(self, record_ids: List[int]):
+        """ファイルレコードのsynced_atフラグを更新"""
+        self._ack_records(self.sqlite_file_events_db_path, 'file_change_events', record_ids)
 
-    def _get_unsynced_input_records(self) -> List[Dict[str, Any]]:
+    def _get_unsynced_input_records(self) -> ColumnBatch:
         """SQLiteから未同期の入力活動レコードを取得"""
         if not self.sqlite_input_db_path:
-            return []
+            return ColumnBatch.empty(SOURCE_COLUMNS['input_activity_sessions'])
 
-        if not Path(self.sqlite_input_db_path).exists():
-            self.logger.debug(f"入力活動DBが存在しません: {self.sqlite_input_db_path}")
-            return []
+        return self._fetch_unsynced(
+            "入力活動", self.sqlite_input_db_path, "input_activity_sessions",
+            SOURCE_COLUMNS['input_activity_sessions'], "start_time",
+        )
 
-        try:
-            conn = sqlite3.connect(self.sqlite_input_db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+    def _update_input_synced_flags(self, record_ids: List[int]):
+        """入力活動レコードのsynced_atフラグを更新"""
+        if not self.sqlite_input_db_path:
+            return
 
-            cursor.execute("""
-                SELECT * FROM input_activity_sessions
-                WHERE synced_at IS NULL
-                ORDER BY start_time ASC
-            """)
+        self._ack_records(self.sqlite_input_db_path, 'input_activity_sessions', record_ids)
 
-            records = [dict(row) for row in cursor.fetchall()]
-            conn.close()
+    @staticmethod
+    def _id_ranges(record_ids: List[int]) -> List[Tuple[int, int]]:
+        """
+        IDのリストを連続区間に変換
 
-            return records
+        例: [5, 1, 2, 3, 7, 8] → [(1, 3), (5, 5), (7, 8)]
+        """
+        ranges: List[Tuple[int, int]] = []
+        for record_id in sorted(set(record_ids)):
+            if ranges and record_id == ranges[-1][1] + 1:
+                ranges[-1] = (ranges[-1][0], record_id)
+            else:
+                ranges.append((record_id, record_id))
+        return ranges
+
+    def _ack_records(
+        self, db_path: str, table_name: str, record_ids: List[int], synced_at: Optional[int] = None
+    ):
+        """
+        同期済みレコードのsynced_atを設定
 
-        except Exception as e:
-            self.logger.error(f"入力活動レコード取得エラー: {e}")
-            return []
+        IDを連続区間にまとめて WHERE id BETWEEN ? AND ? で更新する。
+        SQL文は1種類のみで、プレースホルダ数がバッチサイズに依存しないため
+        SQLITE_MAX_VARIABLE_NUMBER の制限を受けない。全区間を1トランザクションで更新する。
 
-    def _update_input_synced_flags(self, record_ids: List[int]):
-        """入力活動レコードのsynced_atフラグを更新"""
+        Args:
+            db_path: SQLiteファイルパス
+            table_name: 対象テーブル名
+            record_ids: 同期済みレコードのID
+            synced_at: 設定する値（省略時は現在時刻、スプール済みの行はSPOOLED_SYNCED_AT）
+        """
         if not record_ids:
             return
 
-        if not self.sqlite_input_db_path:
+        self._ack_ranges(db_path, table_name, self._id_ranges(record_ids), synced_at)
+
+    def _ack_ranges(
+        self, db_path: str, table_name: str, id_ranges: List[Tuple[int, int]], synced_at: Optional[int] = None
+    ):
+        """IDの連続区間のsynced_atを設定（省略時は現在時刻）"""
+        if not id_ranges:
             return
 
         try:
-            conn = sqlite3.connect(self.sqlite_input_db_path)
-            cursor = conn.cursor()
-            current_time = int(datetime.now().timestamp())
+            conn = sqlite3.connect(db_path, timeout=30)
+            try:
+                if synced_at is None:
+                    synced_at = int(datetime.now().timestamp())
+                with conn:
+                    conn.executemany(
+                        f"UPDATE {table_name} SET synced_at = ? WHERE id BETWEEN ? AND ?",
+                        [(synced_at, first, last) for first, last in id_ranges]
+                    )
+            finally:
+                conn.close()
 
-            placeholders = ','.join('?' * len(record_ids))
-            cursor.execute(f"""
-                UPDATE input_activity_sessions
-                SET synced_at = ?
-                WHERE id IN ({placeholders})
-            """, [current_time] + record_ids)
+        except Exception as e:
+            self.logger.error(f"synced_atフラグ更新エラー: {e}")
 
-            conn.commit()
-            conn.close()
+    def _unack_ranges(self, db_path: str, table_name: str, id_ranges: List[Tuple[int, int]]):
+        """synced_atをNULLに戻し、レコードを未同期に戻す"""
+        if not id_ranges:
+            return
+
+        try:
+            conn = sqlite3.connect(db_path, timeout=30)
+            try:
+                with conn:
+                    conn.executemany(
+                        f"UPDATE {table_name} SET synced_at = NULL WHERE id BETWEEN ? AND ?",
+                        id_ranges
+                    )
+            finally:
+                conn.close()
 
         except Exception as e:
-            self.logger.error(f"synced_atフラグ更新エラー: {e}")
+            self.logger.error(f"synced_atフラグ復元エラー: {e}")
 
     async def _log_sync_result(
         self,
@@ -496,18 +1166,37 @@ class DataSyncManager:
         error_message: Optional[str] = None
     ):
         """同期結果をPostgreSQLのsync_logsに記録"""
+        if self._offline:
+            self.logger.info(
+                f"オフラインのため同期ログはローカルのみ: table={table_name}, "
+                f"synced={records_synced}, failed={records_failed}, status={status}"
+            )
+            return
+
         try:
             host_identifier = self._get_host_identifier()
             sync_completed_at = datetime.now()
 
-            async with self.pool.acquire() as conn:
-                await conn.execute("""
-                    INSERT INTO sync_logs
-                    (sync_started_at, sync_completed_at, table_name, records_synced,
-                     records_failed, status, error_message, host_identifier)
-                    VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
-                """, sync_started_at, sync_completed_at, table_name, records_synced,
-                    records_failed, status, error_message, host_identifier)
+            if self.transport == TRANSPORT_HTTP:
+                await self._post_rows('sync_logs', [{
+                    'sync_started_at': sync_started_at.isoformat(),
+                    'sync_completed_at': sync_completed_at.isoformat(),
+                    'table_name': table_name,
+                    'records_synced': records_synced,
+                    'records_failed': records_failed,
+                    'status': status,
+                    'error_message': error_message,
+                    'host_identifier': host_identifier,
+                }])
+            else:
+                async with self.pool.acquire() as conn:
+                    await conn.execute("""
+                        INSERT INTO sync_logs
+                        (sync_started_at, sync_completed_at, table_name, records_synced,
+                         records_failed, status, error_message, host_identifier)
+                        VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+                    """, sync_started_at, sync_completed_at, table_name, records_synced,
+                        records_failed, status, error_message, host_identifier)
 
             self.logger.info(
                 f"同期ログを記録: table={table_name}, synced={records_synced}, "
@@ -518,25 +1207,38 @@ class DataSyncManager:
             self.logger.error(f"同期ログ記録エラー: {e}")
 
     async def start_sync_loop(self):
-        """定期同期ループを開始（asyncioタスク）"""
-        self.logger.info(f"定期同期ループを開始します（間隔: {self.sync_interval}秒）")
+        """
+        定期同期ループを開始（asyncioタスク）
 
-        while not self._stop_event.is_set():
-            try:
-                await self.sync_all()
-            except Exception as e:
-                self.logger.error(f"同期ループエラー: {e}")
+        同期間隔はAdaptiveSyncSchedulerが同期結果から決定する。
+        initialize() を呼ばずに開始した場合、PostgreSQLへの接続は最初の同期時に行う
+        （コレクターは接続を待たずにローカルへの記録を開始できる）。
+        """
+        self.logger.info(f"定期同期ループを開始します（基本間隔: {self.sync_interval}秒）")
+        delay = self.scheduler.initial_delay()
 
+        while not self._stop_event.is_set():
             # 次回同期まで待機（または停止イベント）
             try:
-                await asyncio.wait_for(
-                    self._stop_event.wait(),
-                    timeout=self.sync_interval
-                )
+                await asyncio.wait_for(self._stop_event.wait(), timeout=delay)
+                break
             except asyncio.TimeoutError:
                 # タイムアウトは正常（次回同期タイミング）
                 pass
 
+            try:
+                # 直接転送で未接続の場合は接続してから同期する（スプール有効時はsync_all内で接続を確認）
+                if self.transport == TRANSPORT_POSTGRES and not self.spool and not await self._ensure_pool():
+                    result = SyncCycleResult(connection_failed=True)
+                else:
+                    result = await self.sync_all()
+            except Exception as e:
+                self.logger.error(f"同期ループエラー: {e}")
+                result = SyncCycleResult(connection_failed=isinstance(e, connection_errors()))
+
+            delay = self.scheduler.next_delay(result)
+            self.logger.debug(f"次回同期まで{delay:.1f}秒待機します")
+
         self.logger.info("定期同期ループを停止しました")
 
     def run_sync_loop_in_background(self, loop: asyncio.AbstractEventLoop):
@@ -8,9 +8,188 @@
 import sqlite3
 import logging
 import time
+import threading
 from pathlib import Path
-from typing import Optional, List
-from .models import ActivitySession, InputActivitySession
+from typing import Dict, Optional, List, Sequence
+from .models import ActivitySession, FileChangeEvent, InputActivitySession
+from .interning import (
+    APPLICATIONS,
+    WINDOW_TITLES,
+    MONITORED_ROOTS,
+    PROJECTS,
+    FILE_EXTENSIONS,
+    DIRECTORIES,
+    DESKTOP_SESSIONS_VIEW,
+    FILE_EVENTS_VIEW,
+    Dimension,
+    StringInterner,
+    create_dimension_tables,
+    split_path,
+)
+
+# コレクターの書き込みがロックを待つ最長時間（秒）
+# 保持期間処理が既存のデータベースをauto_vacuum=INCREMENTALに変換するVACUUMの間も書き込みを失敗させない
+BUSY_TIMEOUT_SECONDS = 30
+
+
+def _connect_sqlite(db_path: str) -> sqlite3.Connection:
+    """
+    コレクター用のSQLite接続を作成
+
+    新規作成するデータベースはauto_vacuum=INCREMENTALとし、保持期間処理で完全なVACUUMを不要にする
+    （テーブル作成済みのデータベースには影響しない）。
+    """
+    # check_same_thread=False: 各コレクターのスレッド（watchdog・pynputなど）から呼び出されるため
+    conn = sqlite3.connect(db_path, check_same_thread=False, timeout=BUSY_TIMEOUT_SECONDS)
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    return conn
+
+
+# セッション取得時のカラム（モデルのフィールド順）
+DESKTOP_SESSION_COLUMNS = ", ".join(ActivitySession.COLUMNS)
+INPUT_SESSION_COLUMNS = ", ".join(InputActivitySession.COLUMNS)
+
+# 文字列カラムは辞書テーブルのIDとして保存し、参照用ビューで元の文字列に戻す
+DESKTOP_SESSIONS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS desktop_activity_sessions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        start_time INTEGER NOT NULL,
+        end_time INTEGER,
+        start_time_iso TEXT NOT NULL,
+        end_time_iso TEXT,
+        application_id INTEGER NOT NULL REFERENCES dim_applications(id),
+        window_title_id INTEGER NOT NULL REFERENCES dim_window_titles(id),
+        duration_seconds INTEGER,
+        synced_at INTEGER,
+        created_at INTEGER NOT NULL,
+        updated_at INTEGER NOT NULL
+    )
+"""
+
+DESKTOP_SESSIONS_VIEW_SCHEMA = f"""
+    CREATE VIEW IF NOT EXISTS {DESKTOP_SESSIONS_VIEW} AS
+    SELECT s.id, s.start_time, s.end_time, s.start_time_iso, s.end_time_iso,
+           a.name AS application_name, t.name AS window_title,
+           s.duration_seconds, s.synced_at, s.created_at, s.updated_at
+    FROM desktop_activity_sessions s
+    JOIN dim_applications a ON a.id = s.application_id
+    JOIN dim_window_titles t ON t.id = s.window_title_id
+"""
+
+FILE_EVENTS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS file_change_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        event_time INTEGER NOT NULL,
+        event_time_iso TEXT NOT NULL,
+        event_type TEXT NOT NULL,
+        directory_id INTEGER NOT NULL REFERENCES dim_directories(id),
+        file_path_relative TEXT,
+        file_name TEXT NOT NULL,
+        file_extension_id INTEGER REFERENCES dim_file_extensions(id),
+        file_size INTEGER,
+        is_symlink INTEGER DEFAULT 0,
+        monitored_root_id INTEGER NOT NULL REFERENCES dim_monitored_roots(id),
+        project_id INTEGER REFERENCES dim_projects(id),
+        synced_at INTEGER,
+        created_at INTEGER NOT NULL,
+        lines_added INTEGER,
+        lines_removed INTEGER
+    )
+"""
+
+FILE_EVENTS_VIEW_SCHEMA = f"""
+    CREATE VIEW IF NOT EXISTS {FILE_EVENTS_VIEW} AS
+    SELECT e.id, e.event_time, e.event_time_iso, e.event_type,
+           d.name || '/' || e.file_name AS file_path,
+           e.file_path_relative, e.file_name, x.name AS file_extension, e.file_size,
+           e.is_symlink, r.name AS monitored_root, p.name AS project_name,
+           e.synced_at, e.created_at, d.name AS directory_path, e.directory_id,
+           e.lines_added, e.lines_removed
+    FROM file_change_events e
+    JOIN dim_directories d ON d.id = e.directory_id
+    JOIN dim_monitored_roots r ON r.id = e.monitored_root_id
+    LEFT JOIN dim_projects p ON p.id = e.project_id
+    LEFT JOIN dim_file_extensions x ON x.id = e.file_extension_id
+"""
+
+
+def _rebuild_with_interned_columns(
+    conn: sqlite3.Connection,
+    table: str,
+    schema: str,
+    dimensions: Sequence[Dimension],
+    source_expressions: Optional[Dict[str, str]] = None,
+):
+    """
+    文字列カラムを辞書テーブルのIDに置き換えてテーブルを作り直す
+
+    SQLiteはカラムの削除・NOT NULL制約の変更ができないため、
+    旧テーブルを退避して新しいスキーマで作成し、辞書を結合してデータを移す。
+    旧テーブルに既に存在するカラム（移行済みのIDカラムを含む）はそのままコピーする。
+
+    Args:
+        conn: SQLite接続（トランザクションが開始されていないこと）
+        table: テーブル名
+        schema: 新しいテーブルのCREATE TABLE文
+        dimensions: 置き換える辞書
+        source_expressions: 旧テーブルに存在しない文字列カラムの算出式（カラム名 → 旧テーブルに対するSQL式）
+    """
+    old_table = f"{table}_before_interning"
+    source_expressions = source_expressions or {}
+
+    old_columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    pending = {
+        d.id_column: (d, source_expressions.get(d.column, d.column))
+        for d in dimensions
+        if d.id_column not in old_columns
+    }
+
+    conn.execute("BEGIN")
+    try:
+        for dimension, expression in pending.values():
+            conn.execute(f"""
+                INSERT OR IGNORE INTO {dimension.table} (name)
+                SELECT DISTINCT {expression} FROM {table}
+                WHERE {expression} IS NOT NULL
+            """)
+
+        conn.execute(f"ALTER TABLE {table} RENAME TO {old_table}")
+        conn.execute(schema)
+
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+        select_list = []
+        joins = []
+        for column in columns:
+            if column not in pending:
+                select_list.append(f"o.{column}")
+                continue
+            dimension, expression = pending[column]
+            select_list.append(f"{dimension.table}.id")
+            # 算出式は旧テーブルのカラムを修飾なしで参照する
+            joins.append(
+                f"LEFT JOIN {dimension.table} ON {dimension.table}.name = "
+                + (f"o.{expression}" if expression == dimension.column else expression)
+            )
+
+        conn.execute(f"""
+            INSERT INTO {table} ({", ".join(columns)})
+            SELECT {", ".join(select_list)}
+            FROM {old_table} o
+            {" ".join(joins)}
+        """)
+
+        # 削除済みの末尾IDを再利用しないようAUTOINCREMENTの値を引き継ぐ
+        conn.execute("""
+            UPDATE sqlite_sequence
+            SET seq = (SELECT seq FROM sqlite_sequence WHERE name = ?)
+            WHERE name = ?
+        """, (old_table, table))
+
+        conn.execute(f"DROP TABLE {old_table}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
 
 
 class DesktopActivityDatabase:
@@ -37,12 +216,12 @@ class DesktopActivityDatabase:
 
         self._connect()
         self._create_tables()
+        self.interner = StringInterner(self.connection)
 
     def _connect(self):
         """データベースに接続"""
         try:
-            # check_same_thread=False: 複数スレッドから呼び出されるため
-            self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+            self.connection = _connect_sqlite(self.db_path)
             self.connection.row_factory = sqlite3.Row  # 辞書形式で結果を取得
             self.logger.info(f"データベースに接続しました: {self.db_path}")
         except Exception as e:
@@ -54,22 +233,19 @@ class DesktopActivityDatabase:
         try:
             cursor = self.connection.cursor()
 
+            # 辞書テーブル（アプリケーション名・ウィンドウタイトル）
+            create_dimension_tables(self.connection, (APPLICATIONS, WINDOW_TITLES))
+
             # デスクトップアクティビティセッションテーブル
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS desktop_activity_sessions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    start_time INTEGER NOT NULL,
-                    end_time INTEGER,
-                    start_time_iso TEXT NOT NULL,
-                    end_time_iso TEXT,
-                    application_name TEXT NOT NULL,
-                    window_title TEXT NOT NULL,
-                    duration_seconds INTEGER,
-                    synced_at INTEGER,
-                    created_at INTEGER NOT NULL,
-                    updated_at INTEGER NOT NULL
-                )
-            """)
+            cursor.execute(DESKTOP_SESSIONS_SCHEMA)
+
+            self.connection.commit()
+            self.logger.info("データベーステーブルを作成しました")
+
+            # マイグレーション実行
+            self._migrate_add_synced_at_column()
+            self._migrate_interned_columns()
+            self._migrate_partial_unsynced_index()
 
             # インデックスを作成（検索高速化）
             cursor.execute("""
@@ -78,20 +254,14 @@ class DesktopActivityDatabase:
             """)
 
             cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_application_name
-                ON desktop_activity_sessions(application_name)
+                CREATE INDEX IF NOT EXISTS idx_application_id
+                ON desktop_activity_sessions(application_id)
             """)
 
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_synced_at
-                ON desktop_activity_sessions(synced_at)
-            """)
+            # 参照用ビュー（辞書化前と同じカラム）
+            cursor.execute(DESKTOP_SESSIONS_VIEW_SCHEMA)
 
             self.connection.commit()
-            self.logger.info("データベーステーブルを作成しました")
-
-            # マイグレーション実行
-            self._migrate_add_synced_at_column()
 
         except Exception as e:
             self.logger.error(f"テーブル作成エラー: {e}")
@@ -117,12 +287,6 @@ class DesktopActivityDatabase:
                     ADD COLUMN synced_at INTEGER
                 """)
 
-                # インデックスを作成
-                cursor.execute("""
-                    CREATE INDEX IF NOT EXISTS idx_synced_at
-                    ON desktop_activity_sessions(synced_at)
-                """)
-
                 self.connection.commit()
                 self.logger.info("synced_atカラムを追加しました")
             else:
@@ -132,6 +296,52 @@ class DesktopActivityDatabase:
             self.logger.error(f"マイグレーションエラー: {e}")
             # マイグレーションエラーは致命的ではないため、継続
 
+    def _migrate_interned_columns(self):
+        """
+        application_name / window_title を辞書テーブルのIDに置き換えるマイグレーション
+
+        既に移行済みの場合はスキップする
+        """
+        cursor = self.connection.cursor()
+        cursor.execute("PRAGMA table_info(desktop_activity_sessions)")
+        columns = [row[1] for row in cursor.fetchall()]
+
+        if 'application_name' not in columns:
+            return
+
+        self.logger.info("アプリケーション名・ウィンドウタイトルを辞書テーブルに移行しています...")
+        _rebuild_with_interned_columns(
+            self.connection,
+            'desktop_activity_sessions',
+            DESKTOP_SESSIONS_SCHEMA,
+            (APPLICATIONS, WINDOW_TITLES),
+        )
+        self.logger.info("辞書テーブルへの移行が完了しました")
+
+    def _migrate_partial_unsynced_index(self):
+        """
+        synced_atの全件インデックスを未同期行のみの部分インデックスに置き換えるマイグレーション
+
+        同期処理は synced_at IS NULL の行を start_time 順に読み出すため、
+        未同期行だけを同期順に索引する。同期済み行はインデックスから外れるため、
+        未同期行の検索コストは未同期件数にのみ比例する。
+        """
+        try:
+            cursor = self.connection.cursor()
+
+            cursor.execute("DROP INDEX IF EXISTS idx_synced_at")
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_unsynced_start_time
+                ON desktop_activity_sessions(start_time)
+                WHERE synced_at IS NULL
+            """)
+
+            self.connection.commit()
+
+        except Exception as e:
+            self.logger.error(f"マイグレーションエラー: {e}")
+            # マイグレーションエラーは致命的ではないため、継続
+
     def save_session(self, session: ActivitySession) -> int:
         """
         新しいセッションをデータベースに保存
@@ -149,7 +359,7 @@ class DesktopActivityDatabase:
             cursor.execute("""
                 INSERT INTO desktop_activity_sessions
                 (start_time, end_time, start_time_iso, end_time_iso,
-                 application_name, window_title, duration_seconds,
+                 application_id, window_title_id, duration_seconds,
                  created_at, updated_at)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (
@@ -157,8 +367,8 @@ class DesktopActivityDatabase:
                 session.end_time,
                 session.start_time_iso,
                 session.end_time_iso,
-                session.application_name,
-                session.window_title,
+                self.interner.intern(APPLICATIONS, session.application_name),
+                self.interner.intern(WINDOW_TITLES, session.window_title),
                 session.duration_seconds,
                 current_time,
                 current_time
@@ -176,6 +386,7 @@ class DesktopActivityDatabase:
 
         except Exception as e:
             self.logger.error(f"セッション保存エラー: {e}")
+            self.interner.clear()
             raise
 
     def update_session_end_time(self, session_id: int, end_time: int):
@@ -240,14 +451,14 @@ class DesktopActivityDatabase:
         """
         try:
             cursor = self.connection.cursor()
-            cursor.execute("""
-                SELECT * FROM desktop_activity_sessions
+            cursor.execute(f"""
+                SELECT {DESKTOP_SESSION_COLUMNS} FROM {DESKTOP_SESSIONS_VIEW}
                 WHERE id = ?
             """, (session_id,))
 
             row = cursor.fetchone()
             if row:
-                return ActivitySession.from_dict(dict(row))
+                return ActivitySession.from_row(row)
             return None
 
         except Exception as e:
@@ -266,17 +477,13 @@ class DesktopActivityDatabase:
         """
         try:
             cursor = self.connection.cursor()
-            cursor.execute("""
-                SELECT * FROM desktop_activity_sessions
+            cursor.execute(f"""
+                SELECT {DESKTOP_SESSION_COLUMNS} FROM {DESKTOP_SESSIONS_VIEW}
                 ORDER BY start_time DESC
                 LIMIT ?
             """, (limit,))
 
-            sessions = []
-            for row in cursor.fetchall():
-                sessions.append(ActivitySession.from_dict(dict(row)))
-
-            return sessions
+            return [ActivitySession.from_row(row) for row in cursor.fetchall()]
 
         except Exception as e:
             self.logger.error(f"セッション取得エラー: {e}")
@@ -301,17 +508,13 @@ class DesktopActivityDatabase:
             end_of_day = start_of_day + 86400  # 24時間後
 
             cursor = self.connection.cursor()
-            cursor.execute("""
-                SELECT * FROM desktop_activity_sessions
+            cursor.execute(f"""
+                SELECT {DESKTOP_SESSION_COLUMNS} FROM {DESKTOP_SESSIONS_VIEW}
                 WHERE start_time >= ? AND start_time < ?
                 ORDER BY start_time ASC
             """, (start_of_day, end_of_day))
 
-            sessions = []
-            for row in cursor.fetchall():
-                sessions.append(ActivitySession.from_dict(dict(row)))
-
-            return sessions
+            return [ActivitySession.from_row(row) for row in cursor.fetchall()]
 
         except Exception as e:
             self.logger.error(f"セッション取得エラー: {e}")
@@ -348,12 +551,12 @@ class FileChangeDatabase:
 
         self._connect()
         self._create_tables()
+        self.interner = StringInterner(self.connection)
 
     def _connect(self):
         """データベースに接続"""
         try:
-            # check_same_thread=False: watchdogのスレッドから呼び出されるため
-            self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+            self.connection = _connect_sqlite(self.db_path)
             self.connection.row_factory = sqlite3.Row  # 辞書形式で結果を取得
             self.logger.info(f"データベースに接続しました: {self.db_path}")
         except Exception as e:
@@ -365,25 +568,22 @@ class FileChangeDatabase:
         try:
             cursor = self.connection.cursor()
 
+            # 辞書テーブル（監視ルート・プロジェクト名・拡張子・ディレクトリ）
+            create_dimension_tables(
+                self.connection, (MONITORED_ROOTS, PROJECTS, FILE_EXTENSIONS, DIRECTORIES)
+            )
+
             # ファイル変更イベントテーブル
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS file_change_events (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    event_time INTEGER NOT NULL,
-                    event_time_iso TEXT NOT NULL,
-                    event_type TEXT NOT NULL,
-                    file_path TEXT NOT NULL,
-                    file_path_relative TEXT,
-                    file_name TEXT NOT NULL,
-                    file_extension TEXT,
-                    file_size INTEGER,
-                    is_symlink INTEGER DEFAULT 0,
-                    monitored_root TEXT NOT NULL,
-                    project_name TEXT,
-                    synced_at INTEGER,
-                    created_at INTEGER NOT NULL
-                )
-            """)
+            cursor.execute(FILE_EVENTS_SCHEMA)
+
+            self.connection.commit()
+            self.logger.info("データベーステーブルを作成しました")
+
+            # マイグレーション実行
+            self._migrate_add_synced_at_column()
+            self._migrate_add_line_stats_columns()
+            self._migrate_interned_columns()
+            self._migrate_partial_unsynced_index()
 
             # ファイル変更イベント用インデックス
             cursor.execute("""
@@ -392,25 +592,26 @@ class FileChangeDatabase:
             """)
 
             cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_file_project_name
-                ON file_change_events(project_name)
+                CREATE INDEX IF NOT EXISTS idx_file_project_id
+                ON file_change_events(project_id)
             """)
 
             cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_file_extension
-                ON file_change_events(file_extension)
+                CREATE INDEX IF NOT EXISTS idx_file_extension_id
+                ON file_change_events(file_extension_id)
             """)
 
+            # ディレクトリ単位の検索用
             cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_file_synced_at
-                ON file_change_events(synced_at)
+                CREATE INDEX IF NOT EXISTS idx_file_directory_event_time
+                ON file_change_events(directory_id, event_time)
             """)
 
-            self.connection.commit()
-            self.logger.info("データベーステーブルを作成しました")
+            # 参照用ビュー（辞書化前と同じカラム + directory_path）
+            cursor.execute(f"DROP VIEW IF EXISTS {FILE_EVENTS_VIEW}")
+            cursor.execute(FILE_EVENTS_VIEW_SCHEMA)
 
-            # マイグレーション実行
-            self._migrate_add_synced_at_column()
+            self.connection.commit()
 
         except Exception as e:
             self.logger.error(f"テーブル作成エラー: {e}")
@@ -436,12 +637,6 @@ class FileChangeDatabase:
                     ADD COLUMN synced_at INTEGER
                 """)
 
-                # インデックスを作成
-                cursor.execute("""
-                    CREATE INDEX IF NOT EXISTS idx_file_synced_at
-                    ON file_change_events(synced_at)
-                """)
-
                 self.connection.commit()
                 self.logger.info("synced_atカラムを追加しました")
             else:
@@ -451,16 +646,132 @@ class FileChangeDatabase:
             self.logger.error(f"マイグレーションエラー: {e}")
             # マイグレーションエラーは致命的ではないため、継続
 
-    def save_file_event(self, event_data: dict) -> int:
+    def _migrate_add_line_stats_columns(self):
+        """
+        既存テーブルにlines_added / lines_removedカラムを追加するマイグレーション
+
+        辞書テーブルへの移行（テーブルの作り直し）は旧テーブルのカラムをそのままコピーするため、その前に実行する。
+        既にカラムが存在する場合はスキップする
+        """
+        try:
+            cursor = self.connection.cursor()
+
+            cursor.execute("PRAGMA table_info(file_change_events)")
+            columns = [row[1] for row in cursor.fetchall()]
+
+            if 'lines_added' not in columns:
+                self.logger.info("lines_added / lines_removedカラムを追加しています...")
+                cursor.execute("ALTER TABLE file_change_events ADD COLUMN lines_added INTEGER")
+                cursor.execute("ALTER TABLE file_change_events ADD COLUMN lines_removed INTEGER")
+
+                self.connection.commit()
+                self.logger.info("lines_added / lines_removedカラムを追加しました")
+
+        except Exception as e:
+            self.logger.error(f"マイグレーションエラー: {e}")
+            # マイグレーションエラーは致命的ではないため、継続
+
+    def _migrate_interned_columns(self):
+        """
+        monitored_root / project_name / file_extension / file_path を辞書テーブルのIDに置き換えるマイグレーション
+
+        file_pathは (directory_id, file_name) に分割する。既に移行済みの場合はスキップする
+        """
+        cursor = self.connection.cursor()
+        cursor.execute("PRAGMA table_info(file_change_events)")
+        columns = [row[1] for row in cursor.fetchall()]
+
+        if 'monitored_root' not in columns and 'file_path' not in columns:
+            return
+
+        self.logger.info("監視ルート・プロジェクト名・拡張子・ディレクトリを辞書テーブルに移行しています...")
+        _rebuild_with_interned_columns(
+            self.connection,
+            'file_change_events',
+            FILE_EVENTS_SCHEMA,
+            (MONITORED_ROOTS, PROJECTS, FILE_EXTENSIONS, DIRECTORIES),
+            # file_nameはfile_pathのベース名のため、末尾の '/' + file_name を除いたものがディレクトリ
+            source_expressions={
+                'directory_path': "substr(file_path, 1, length(file_path) - length(file_name) - 1)",
+            },
+        )
+        self.logger.info("辞書テーブルへの移行が完了しました")
+
+    def _migrate_partial_unsynced_index(self):
+        """
+        synced_atの全件インデックスを未同期行のみの部分インデックスに置き換えるマイグレーション
+
+        同期処理は synced_at IS NULL の行を event_time 順に読み出すため、
+        未同期行だけを同期順に索引する。同期済み行はインデックスから外れるため、
+        未同期行の検索コストは未同期件数にのみ比例する。
+        """
+        try:
+            cursor = self.connection.cursor()
+
+            cursor.execute("DROP INDEX IF EXISTS idx_file_synced_at")
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_file_unsynced_event_time
+                ON file_change_events(event_time)
+                WHERE synced_at IS NULL
+            """)
+
+            self.connection.commit()
+
+        except Exception as e:
+            self.logger.error(f"マイグレーションエラー: {e}")
+            # マイグレーションエラーは致命的ではないため、継続
+
+    def directory_id(self, directory_path: str) -> int:
+        """
+        ディレクトリの辞書IDを返す（未登録の場合は登録）
+
+        保存の前に単独で呼ばれた場合は登録をその場で確定させる（イベントが保存されずに
+        トランザクションが開いたままになると、同期・保持期間の処理がロック待ちになるため）。
+
+        Args:
+            directory_path: ディレクトリの絶対パス（末尾の '/' なし）
+        """
+        in_transaction = self.connection.in_transaction
+        interned = self.interner.intern(DIRECTORIES, directory_path)
+        if not in_transaction and self.connection.in_transaction:
+            self.connection.commit()
+        return interned
+
+    def _to_event_tuple(self, event: FileChangeEvent, current_time: int) -> tuple:
+        """
+        イベントをINSERT用のタプルに変換（文字列カラムは辞書IDに変換）
+
+        directory_idが指定されていない場合はfile_pathから求める。
+        """
+        directory_id = event.directory_id
+        file_name = event.file_name
+        if directory_id is None:
+            directory, file_name = split_path(event.file_path)
+            directory_id = self.directory_id(directory)
+
+        return (
+            event.event_time,
+            event.event_time_iso,
+            event.event_type,
+            directory_id,
+            event.file_path_relative,
+            file_name,
+            self.interner.intern(FILE_EXTENSIONS, event.file_extension),
+            event.file_size,
+            event.is_symlink,
+            self.interner.intern(MONITORED_ROOTS, event.monitored_root),
+            self.interner.intern(PROJECTS, event.project_name),
+            current_time,
+            event.lines_added,
+            event.lines_removed
+        )
+
+    def save_file_event(self, event_data: FileChangeEvent) -> int:
         """
         ファイル変更イベントをデータベースに保存
 
         Args:
-            event_data: イベントデータ（辞書形式）
-                必須キー: event_time, event_time_iso, event_type, file_path,
-                         file_name, monitored_root
-                オプション: file_path_relative, file_extension, file_size,
-                           is_symlink, project_name
+            event_data: イベント
 
         Returns:
             int: 保存されたイベントのID
@@ -471,74 +782,48 @@ class FileChangeDatabase:
 
             cursor.execute("""
                 INSERT INTO file_change_events
-                (event_time, event_time_iso, event_type, file_path,
-                 file_path_relative, file_name, file_extension, file_size,
-                 is_symlink, monitored_root, project_name, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                event_data['event_time'],
-                event_data['event_time_iso'],
-                event_data['event_type'],
-                event_data['file_path'],
-                event_data.get('file_path_relative'),
-                event_data['file_name'],
-                event_data.get('file_extension'),
-                event_data.get('file_size'),
-                event_data.get('is_symlink', 0),
-                event_data['monitored_root'],
-                event_data.get('project_name'),
-                current_time
-            ))
+                (event_time, event_time_iso, event_type, directory_id,
+                 file_path_relative, file_name, file_extension_id, file_size,
+                 is_symlink, monitored_root_id, project_id, created_at,
+                 lines_added, lines_removed)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, self._to_event_tuple(event_data, current_time))
 
             self.connection.commit()
             event_id = cursor.lastrowid
 
             self.logger.debug(
                 f"ファイルイベントを保存しました: ID={event_id}, "
-                f"type={event_data['event_type']}, file={event_data['file_name']}"
+                f"type={event_data.event_type}, file={event_data.file_name}"
             )
 
             return event_id
 
         except Exception as e:
             self.logger.error(f"ファイルイベント保存エラー: {e}")
+            self.interner.clear()
             raise
 
-    def save_file_events_batch(self, events: List[dict]):
+    def save_file_events_batch(self, events: List[FileChangeEvent]):
         """
         複数のファイル変更イベントを一括保存
 
         Args:
-            events: イベントデータのリスト
+            events: イベントのリスト
         """
         try:
             cursor = self.connection.cursor()
             current_time = int(time.time())
 
-            event_tuples = [
-                (
-                    event['event_time'],
-                    event['event_time_iso'],
-                    event['event_type'],
-                    event['file_path'],
-                    event.get('file_path_relative'),
-                    event['file_name'],
-                    event.get('file_extension'),
-                    event.get('file_size'),
-                    event.get('is_symlink', 0),
-                    event['monitored_root'],
-                    event.get('project_name'),
-                    current_time
-                )
-                for event in events
-            ]
+            event_tuples = [self._to_event_tuple(event, current_time) for event in events]
 
             cursor.executemany("""
                 INSERT INTO file_change_events
-                (event_time, event_time_iso, event_type, file_path,
-                 file_path_relative, file_name, file_extension, file_size,
-                 is_symlink, monitored_root, project_name, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                (event_time, event_time_iso, event_type, directory_id,
+                 file_path_relative, file_name, file_extension_id, file_size,
+                 is_symlink, monitored_root_id, project_id, created_at,
+                 lines_added, lines_removed)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, event_tuples)
 
             self.connection.commit()
@@ -547,6 +832,7 @@ class FileChangeDatabase:
 
         except Exception as e:
             self.logger.error(f"ファイルイベント一括保存エラー: {e}")
+            self.interner.clear()
             raise
 
     def get_recent_file_events(self, limit: int = 100) -> List[dict]:
@@ -561,8 +847,8 @@ class FileChangeDatabase:
         """
         try:
             cursor = self.connection.cursor()
-            cursor.execute("""
-                SELECT * FROM file_change_events
+            cursor.execute(f"""
+                SELECT * FROM {FILE_EVENTS_VIEW}
                 ORDER BY event_time DESC
                 LIMIT ?
             """, (limit,))
@@ -612,8 +898,7 @@ class InputActivityDatabase:
     def _connect(self):
         """データベースに接続"""
         try:
-            # check_same_thread=False: pynputのスレッドから呼び出されるため
-            self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+            self.connection = _connect_sqlite(self.db_path)
             self.connection.row_factory = sqlite3.Row  # 辞書形式で結果を取得
             self.logger.info(f"データベースに接続しました: {self.db_path}")
         except Exception as e:
@@ -646,16 +931,12 @@ class InputActivityDatabase:
                 ON input_activity_sessions(start_time)
             """)
 
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_input_synced_at
-                ON input_activity_sessions(synced_at)
-            """)
-
             self.connection.commit()
             self.logger.info("データベーステーブルを作成しました")
 
             # マイグレーション実行
             self._migrate_add_synced_at_column()
+            self._migrate_partial_unsynced_index()
 
         except Exception as e:
             self.logger.error(f"テーブル作成エラー: {e}")
@@ -681,12 +962,6 @@ class InputActivityDatabase:
                     ADD COLUMN synced_at INTEGER
                 """)
 
-                # インデックスを作成
-                cursor.execute("""
-                    CREATE INDEX IF NOT EXISTS idx_input_synced_at
-                    ON input_activity_sessions(synced_at)
-                """)
-
                 self.connection.commit()
                 self.logger.info("synced_atカラムを追加しました")
             else:
@@ -696,6 +971,30 @@ class InputActivityDatabase:
             self.logger.error(f"マイグレーションエラー: {e}")
             # マイグレーションエラーは致命的ではないため、継続
 
+    def _migrate_partial_unsynced_index(self):
+        """
+        synced_atの全件インデックスを未同期行のみの部分インデックスに置き換えるマイグレーション
+
+        同期処理は synced_at IS NULL の行を start_time 順に読み出すため、
+        未同期行だけを同期順に索引する。同期済み行はインデックスから外れるため、
+        未同期行の検索コストは未同期件数にのみ比例する。
+        """
+        try:
+            cursor = self.connection.cursor()
+
+            cursor.execute("DROP INDEX IF EXISTS idx_input_synced_at")
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_input_unsynced_start_time
+                ON input_activity_sessions(start_time)
+                WHERE synced_at IS NULL
+            """)
+
+            self.connection.commit()
+
+        except Exception as e:
+            self.logger.error(f"マイグレーションエラー: {e}")
+            # マイグレーションエラーは致命的ではないため、継続
+
     def create_session(self, session: InputActivitySession) -> int:
         """
         新しいセッションをデータベースに保存
@@ -842,14 +1141,14 @@ class InputActivityDatabase:
         """
         try:
             cursor = self.connection.cursor()
-            cursor.execute("""
-                SELECT * FROM input_activity_sessions
+            cursor.execute(f"""
+                SELECT {INPUT_SESSION_COLUMNS} FROM input_activity_sessions
                 WHERE id = ?
             """, (session_id,))
 
             row = cursor.fetchone()
             if row:
-                return InputActivitySession.from_dict(dict(row))
+                return InputActivitySession.from_row(row)
             return None
 
         except Exception as e:
@@ -868,17 +1167,13 @@ class InputActivityDatabase:
         """
         try:
             cursor = self.connection.cursor()
-            cursor.execute("""
-                SELECT * FROM input_activity_sessions
+            cursor.execute(f"""
+                SELECT {INPUT_SESSION_COLUMNS} FROM input_activity_sessions
                 ORDER BY start_time DESC
                 LIMIT ?
             """, (limit,))
 
-            sessions = []
-            for row in cursor.fetchall():
-                sessions.append(InputActivitySession.from_dict(dict(row)))
-
-            return sessions
+            return [InputActivitySession.from_row(row) for row in cursor.fetchall()]
 
         except Exception as e:
             self.logger.error(f"セッション取得エラー: {e}")
@@ -903,17 +1198,13 @@ class InputActivityDatabase:
             end_of_day = start_of_day + 86400  # 24時間後
 
             cursor = self.connection.cursor()
-            cursor.execute("""
-                SELECT * FROM input_activity_sessions
+            cursor.execute(f"""
+                SELECT {INPUT_SESSION_COLUMNS} FROM input_activity_sessions
                 WHERE start_time >= ? AND start_time < ?
                 ORDER BY start_time ASC
             """, (start_of_day, end_of_day))
 
-            sessions = []
-            for row in cursor.fetchall():
-                sessions.append(InputActivitySession.from_dict(dict(row)))
-
-            return sessions
+            return [InputActivitySession.from_row(row) for row in cursor.fetchall()]
 
         except Exception as e:
             self.logger.error(f"セッション取得エラー: {e}")
@@ -926,6 +1217,60 @@ class InputActivityDatabase:
             self.logger.info("データベース接続をクローズしました")
 
 
+class LocalDatabases:
+    """
+    ローカルSQLiteデータベースの共有管理
+
+    1プロセスで複数のコレクターを実行する場合（agent.py）に、データベースごとの接続を
+    1つだけ開いて共有する。接続は最初に要求されたときに開き、コレクターを再起動しても
+    同じ接続を使い続ける。
+    """
+
+    def __init__(self, desktop_path: str, file_events_path: str, input_path: str):
+        """
+        Args:
+            desktop_path: デスクトップアクティビティSQLiteパス
+            file_events_path: ファイルイベントSQLiteパス
+            input_path: 入力アクティビティSQLiteパス
+        """
+        self.desktop_path = desktop_path
+        self.file_events_path = file_events_path
+        self.input_path = input_path
+        self._desktop: Optional[DesktopActivityDatabase] = None
+        self._file_events: Optional[FileChangeDatabase] = None
+        self._input: Optional[InputActivityDatabase] = None
+        self._lock = threading.Lock()
+
+    def desktop(self) -> DesktopActivityDatabase:
+        """デスクトップアクティビティデータベースを取得"""
+        with self._lock:
+            if self._desktop is None:
+                self._desktop = DesktopActivityDatabase(self.desktop_path)
+            return self._desktop
+
+    def file_events(self) -> FileChangeDatabase:
+        """ファイルイベントデータベースを取得"""
+        with self._lock:
+            if self._file_events is None:
+                self._file_events = FileChangeDatabase(self.file_events_path)
+            return self._file_events
+
+    def input(self) -> InputActivityDatabase:
+        """入力アクティビティデータベースを取得"""
+        with self._lock:
+            if self._input is None:
+                self._input = InputActivityDatabase(self.input_path)
+            return self._input
+
+    def close(self):
+        """開いている全データベース接続をクローズ"""
+        with self._lock:
+            for database in (self._desktop, self._file_events, self._input):
+                if database is not None:
+                    database.close()
+            self._desktop = self._file_events = self._input = None
+
+
 # 後方互換性のためのエイリアス（非推奨）
 # 既存コードとの互換性を保つため、Databaseクラスを残す
 Database = DesktopActivityDatabase
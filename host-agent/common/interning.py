@@ -0,0 +1,333 @@
+"""
+文字列インターン（辞書テーブル）モジュール
+
+アプリケーション名・ウィンドウタイトル・監視ルート・プロジェクト名・拡張子・ディレクトリのように
+多くの行で繰り返される文字列を辞書テーブルに1度だけ保存し、行には整数IDを保存する。
+ファイルパスは (ディレクトリID, ファイル名) として保存し、ディレクトリ + '/' + ファイル名 で復元する。
+
+- SQLite（ローカル）: StringInterner が辞書テーブルへの登録とIDの検索をメモリ上にキャッシュする
+- PostgreSQL（同期先）: DimensionResolver がバッチ内の文字列をまとめてIDに変換する
+  （辞書テーブルごとに1回のクエリで未登録の文字列の登録とIDの取得を行う）
+
+SQLiteとPostgreSQLのIDは独立しており、同期時は文字列を介して対応付ける。
+"""
+
+import logging
+import sqlite3
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+@dataclass(frozen=True)
+class Dimension:
+    """辞書化するカラムの定義"""
+
+    table: str      # 辞書テーブル名
+    column: str     # 文字列カラム名（同期用の行・参照用ビューでの名前）
+    id_column: str  # 行に保存するIDカラム名
+    # PostgreSQLの一意インデックスをmd5(name)に設ける（btreeの上限を超える長い文字列を含む辞書）
+    hash_key: bool = False
+
+    @property
+    def conflict_key(self) -> str:
+        """PostgreSQLの一意インデックスの式（ON CONFLICTの対象）"""
+        return 'md5(name)' if self.hash_key else 'name'
+
+    def match_sql(self, name: str, value: str) -> str:
+        """PostgreSQLで辞書の文字列と値を照合する条件（一意インデックスを使用する）"""
+        if self.hash_key:
+            return f"md5({name}) = md5({value}) AND {name} = {value}"
+        return f"{name} = {value}"
+
+
+APPLICATIONS = Dimension('dim_applications', 'application_name', 'application_id')
+WINDOW_TITLES = Dimension('dim_window_titles', 'window_title', 'window_title_id', hash_key=True)
+MONITORED_ROOTS = Dimension('dim_monitored_roots', 'monitored_root', 'monitored_root_id')
+PROJECTS = Dimension('dim_projects', 'project_name', 'project_id')
+FILE_EXTENSIONS = Dimension('dim_file_extensions', 'file_extension', 'file_extension_id')
+DIRECTORIES = Dimension('dim_directories', 'directory_path', 'directory_id')
+
+# コレクターがSQLiteの辞書IDをキャッシュする最長時間（秒）
+# 保持期間処理（retention.py）は参照されなくなった辞書の行を削除するため、古いIDを使い続けないようにする
+DIMENSION_CACHE_MAX_AGE_SECONDS = 3600
+
+# 同期先テーブルごとの辞書化カラム
+TABLE_DIMENSIONS: Dict[str, Tuple[Dimension, ...]] = {
+    'desktop_activity_sessions': (APPLICATIONS, WINDOW_TITLES),
+    'file_change_events': (MONITORED_ROOTS, PROJECTS, FILE_EXTENSIONS, DIRECTORIES),
+}
+
+# PostgreSQL上の実データテーブル（元のテーブル名は辞書を結合した参照用ビュー）
+PG_STORAGE_TABLES = {
+    'desktop_activity_sessions': 'desktop_activity_sessions_data',
+    'file_change_events': 'file_change_events_data',
+}
+
+# 旧形式のカラム（スプール済みのセグメントに残っている場合がある） → (辞書化カラム, 算出式)
+LEGACY_SOURCE_COLUMNS: Dict[str, Dict[str, Tuple[str, str]]] = {
+    'file_change_events': {
+        'file_path': ('directory_path', "left(s.file_path, length(s.file_path) - length(s.file_name) - 1)"),
+    },
+}
+
+# SQLite上の参照用ビュー（辞書を結合し、辞書化前と同じカラムを返す）
+DESKTOP_SESSIONS_VIEW = 'desktop_activity_sessions_view'
+FILE_EVENTS_VIEW = 'file_change_events_view'
+
+
+def split_path(file_path: str) -> Tuple[str, str]:
+    """
+    ファイルパスを (ディレクトリ, ファイル名) に分割
+
+    ディレクトリ + '/' + ファイル名 で元のパスに戻る（ルート直下のファイルのディレクトリは空文字列）。
+    """
+    directory, _, name = file_path.rpartition('/')
+    return directory, name
+
+
+def create_dimension_tables(conn: sqlite3.Connection, dimensions: Iterable[Dimension]):
+    """SQLiteに辞書テーブルを作成"""
+    for dimension in dimensions:
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {dimension.table} (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE
+            )
+        """)
+
+
+class StringInterner:
+    """
+    SQLite辞書テーブルへの文字列登録（LRUキャッシュ付き）
+
+    キャッシュにある文字列はSQLiteへアクセスせずにIDを返す。
+    ウィンドウタイトルのように種類が増え続ける辞書に備え、辞書ごとのキャッシュ件数には上限を設ける。
+    登録は呼び出し元のトランザクション内で行うため、ロールバックした場合はclear()を呼ぶこと。
+    キャッシュはmax_age_secondsごとに破棄する（保持期間処理で削除された辞書の行のIDを使わないように）。
+    """
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        max_entries: int = 4096,
+        max_age_seconds: float = DIMENSION_CACHE_MAX_AGE_SECONDS,
+    ):
+        """
+        Args:
+            conn: SQLite接続
+            max_entries: 辞書ごとのキャッシュ件数の上限
+            max_age_seconds: キャッシュを破棄する間隔（秒）
+        """
+        self.conn = conn
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self._ids: Dict[str, "OrderedDict[str, int]"] = {}
+        self._cleared_at = time.monotonic()
+
+    def intern(self, dimension: Dimension, value: Optional[str]) -> Optional[int]:
+        """
+        文字列のIDを返す（未登録の場合は登録）
+
+        Args:
+            dimension: 辞書
+            value: 文字列（Noneの場合はNoneを返す）
+
+        Returns:
+            辞書テーブルのID
+        """
+        if value is None:
+            return None
+
+        if time.monotonic() - self._cleared_at > self.max_age_seconds:
+            self.clear()
+
+        cache = self._ids.setdefault(dimension.table, OrderedDict())
+        interned = cache.get(value)
+        if interned is not None:
+            cache.move_to_end(value)
+            return interned
+
+        self.conn.execute(
+            f"INSERT OR IGNORE INTO {dimension.table} (name) VALUES (?)", (value,)
+        )
+        interned = self.conn.execute(
+            f"SELECT id FROM {dimension.table} WHERE name = ?", (value,)
+        ).fetchone()[0]
+
+        cache[value] = interned
+        if len(cache) > self.max_entries:
+            cache.popitem(last=False)
+        return interned
+
+    def clear(self):
+        """キャッシュを破棄"""
+        self._ids.clear()
+        self._cleared_at = time.monotonic()
+
+
+class DimensionResolver:
+    """
+    PostgreSQL辞書テーブルのIDをバッチ単位で解決
+
+    PostgreSQLの辞書テーブルは行を削除しないため、一度解決したIDはプロセス内でキャッシュし続ける
+    （件数の上限に達した場合は古いものから破棄）。
+    辞書への登録は行の挿入とは別のトランザクションで確定させるため、
+    行の挿入がロールバックされてもキャッシュ済みのIDは有効なままとなる。
+    """
+
+    # 入力文字列を登録し、既存・新規を問わずIDを返す（1往復）
+    RESOLVE_SQL = """
+        WITH input AS (
+            SELECT DISTINCT unnest($1::text[]) AS name
+        ), inserted AS (
+            INSERT INTO {table} (name)
+            SELECT name FROM input
+            ON CONFLICT ({conflict_key}) DO NOTHING
+            RETURNING id, name
+        )
+        SELECT id, name FROM inserted
+        UNION ALL
+        SELECT d.id, d.name FROM {table} d JOIN input i ON {match}
+    """
+
+    def __init__(self, max_entries: int = 65536):
+        """
+        Args:
+            max_entries: 辞書ごとのキャッシュ件数の上限
+        """
+        self.max_entries = max_entries
+        self.logger = logging.getLogger(__name__)
+        self._ids: Dict[str, "OrderedDict[str, int]"] = {}
+
+    async def resolve(self, conn: Any, dimension: Dimension, values: Iterable[str]) -> Dict[str, int]:
+        """
+        文字列をまとめてIDに変換
+
+        Args:
+            conn: asyncpg接続
+            dimension: 辞書
+            values: 文字列（重複・None可）
+
+        Returns:
+            文字列 → ID の辞書
+        """
+        cache = self._ids.setdefault(dimension.table, OrderedDict())
+        resolved: Dict[str, int] = {}
+        missing: List[str] = []
+        for value in set(values):
+            if value is None:
+                continue
+            interned = cache.get(value)
+            if interned is None:
+                missing.append(value)
+            else:
+                resolved[value] = interned
+
+        # 同時に登録された文字列はこのクエリのスナップショットから見えないため、もう一度だけ問い合わせる
+        for _ in range(2):
+            if not missing:
+                break
+            rows = await conn.fetch(self.RESOLVE_SQL.format(
+                table=dimension.table,
+                conflict_key=dimension.conflict_key,
+                match=dimension.match_sql('d.name', 'i.name'),
+            ), missing)
+            for row in rows:
+                resolved[row['name']] = row['id']
+                cache[row['name']] = row['id']
+            missing = [value for value in missing if value not in resolved]
+
+        if missing:
+            raise RuntimeError(f"{dimension.table}: IDを解決できない値があります: {missing[:5]}")
+
+        while len(cache) > self.max_entries:
+            cache.popitem(last=False)
+        return resolved
+
+    async def resolve_columns(
+        self, conn: Any, table_name: str, columns: Sequence[str], arrays: Sequence[List[Any]]
+    ) -> Tuple[Tuple[str, ...], List[List[Any]]]:
+        """
+        辞書化カラムの値を文字列からIDに置き換える
+
+        Args:
+            conn: asyncpg接続
+            table_name: 同期先テーブル名
+            columns: カラム名
+            arrays: カラムごとの値のリスト（columnsと同じ順）
+
+        Returns:
+            (置き換え後のカラム名, 置き換え後のカラムごとの値のリスト) のタプル
+            （辞書化カラム以外のリストは入力と同じオブジェクト）
+        """
+        columns = list(columns)
+        arrays = list(arrays)
+        for dimension in TABLE_DIMENSIONS.get(table_name, ()):
+            index = columns.index(dimension.column)
+            values = arrays[index]
+            ids = await self.resolve(conn, dimension, values)
+            arrays[index] = [None if value is None else ids[value] for value in values]
+            columns[index] = dimension.id_column
+
+        return tuple(columns), arrays
+
+
+def staging_insert_sql(table_name: str, columns: Tuple[str, ...], staging_table: str) -> List[str]:
+    """
+    文字列のままCOPYしたステージングテーブルから実データテーブルに挿入するSQLを返す
+
+    スプールの再送のように行をPython側で変換しない経路で使用する。
+    未登録の文字列を辞書に登録した後、辞書を結合してIDに置き換えて挿入する。
+
+    Args:
+        table_name: 同期先テーブル名
+        columns: ステージングテーブルのカラム順
+        staging_table: ステージングテーブル名
+
+    Returns:
+        順に実行するSQLのリスト
+    """
+    dimensions = {d.column: d for d in TABLE_DIMENSIONS.get(table_name, ())}
+    legacy = LEGACY_SOURCE_COLUMNS.get(table_name, {})
+
+    # (カラム名, ステージングテーブルからの算出式)
+    sources = []
+    for column in columns:
+        if column in legacy:
+            sources.append(legacy[column])
+        else:
+            sources.append((column, f"s.{column}"))
+
+    statements = [
+        f"""
+        INSERT INTO {dimensions[column].table} (name)
+        SELECT DISTINCT {expression} FROM {staging_table} s WHERE {expression} IS NOT NULL
+        ON CONFLICT ({dimensions[column].conflict_key}) DO NOTHING
+        """
+        for column, expression in sources
+        if column in dimensions
+    ]
+
+    target_columns = []
+    select_list = []
+    joins = []
+    for column, expression in sources:
+        dimension = dimensions.get(column)
+        if dimension is None:
+            target_columns.append(column)
+            select_list.append(expression)
+            continue
+        alias = dimension.table
+        target_columns.append(dimension.id_column)
+        select_list.append(f"{alias}.id")
+        joins.append(f"LEFT JOIN {alias} ON {dimension.match_sql(f'{alias}.name', expression)}")
+
+    statements.append(f"""
+        INSERT INTO {PG_STORAGE_TABLES.get(table_name, table_name)} ({", ".join(target_columns)})
+        SELECT {", ".join(select_list)}
+        FROM {staging_table} s
+        {" ".join(joins)}
+    """)
+    return statements
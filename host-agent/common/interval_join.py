@@ -0,0 +1,179 @@
+"""
+区間結合モジュール
+
+デスクトップセッションと入力セッションの時間的な重なり（実活動時間）を求める。
+
+入力セッションを開始時刻順に並べて和集合（重なりのない区間列）にまとめ、
+デスクトップセッションの開始・終了時刻を昇順に走査しながら
+「時刻tまでに入力セッションが覆っている秒数」を累積する。
+実活動時間は 覆われた秒数(終了) - 覆われた秒数(開始) となるため、
+全体の計算量はソートが支配的な O((n + m) log(n + m)) となる。
+
+入力セッションは和集合にしてから重なりを数えるため、複数ホストの入力セッションが
+重なっていても同じ秒を二重に数えない。
+
+numpyがインストールされている場合は active_seconds_array でベクトル化した計算を使用できる。
+PostgreSQL側の同等の処理は desktop_session_active_seconds()（10_add_interval_join.sql）を参照。
+"""
+
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from .models import ActivitySession, InputActivitySession
+
+try:
+    import numpy
+except ImportError:  # numpyは任意（純粋なPythonの走査で代替）
+    numpy = None
+
+# (開始時刻, 終了時刻) のUNIXエポック秒。終了時刻は含まない
+Interval = Tuple[int, int]
+
+
+def merge_intervals(intervals: Iterable[Optional[Interval]]) -> List[Interval]:
+    """
+    区間の和集合を求める
+
+    Args:
+        intervals: 区間（Noneや終了時刻がNone・開始時刻以前の区間は無視）
+
+    Returns:
+        開始時刻順の重なりのない区間のリスト（接している区間は結合する）
+    """
+    valid = sorted(
+        (start, end) for start, end in (i for i in intervals if i is not None)
+        if end is not None and end > start
+    )
+    merged: List[Interval] = []
+    for start, end in valid:
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def covered_until(times: Sequence[int], merged: Sequence[Interval]) -> List[int]:
+    """
+    各時刻までに和集合の区間が覆っている秒数を返す
+
+    Args:
+        times: 時刻のリスト（順不同）
+        merged: merge_intervals で求めた区間
+
+    Returns:
+        timesと同じ順序の秒数
+    """
+    result = [0] * len(times)
+    j = 0
+    covered = 0
+    for index in sorted(range(len(times)), key=times.__getitem__):
+        t = times[index]
+        # tまでに終わった区間を累積
+        while j < len(merged) and merged[j][1] <= t:
+            covered += merged[j][1] - merged[j][0]
+            j += 1
+        # tを含む区間は開始からtまで
+        partial = t - merged[j][0] if j < len(merged) and merged[j][0] < t else 0
+        result[index] = covered + partial
+    return result
+
+
+def active_seconds(sessions: Sequence[Interval], inputs: Iterable[Optional[Interval]]) -> List[int]:
+    """
+    各セッションのうち入力セッションと重なっている秒数を返す
+
+    Args:
+        sessions: デスクトップセッションの区間
+        inputs: 入力セッションの区間
+
+    Returns:
+        sessionsと同じ順序の実活動時間（秒）
+    """
+    merged = merge_intervals(inputs)
+    if not merged or not sessions:
+        return [0] * len(sessions)
+
+    points = [start for start, _ in sessions] + [max(start, end) for start, end in sessions]
+    covered = covered_until(points, merged)
+    n = len(sessions)
+    return [covered[n + i] - covered[i] for i in range(n)]
+
+
+def active_seconds_array(session_starts, session_ends, input_starts, input_ends):
+    """
+    active_seconds のベクトル化版（numpyが必要）
+
+    Args:
+        session_starts: デスクトップセッションの開始時刻の配列
+        session_ends: デスクトップセッションの終了時刻の配列
+        input_starts: 入力セッションの開始時刻の配列
+        input_ends: 入力セッションの終了時刻の配列
+
+    Returns:
+        numpy.ndarray: セッションごとの実活動時間（秒、int64）
+
+    Raises:
+        RuntimeError: numpyがインストールされていない場合
+    """
+    if numpy is None:
+        raise RuntimeError("active_seconds_array には numpy が必要です（pip install numpy）")
+
+    session_starts = numpy.asarray(session_starts, dtype=numpy.int64)
+    session_ends = numpy.maximum(numpy.asarray(session_ends, dtype=numpy.int64), session_starts)
+    input_starts = numpy.asarray(input_starts, dtype=numpy.int64)
+    input_ends = numpy.asarray(input_ends, dtype=numpy.int64)
+
+    valid = input_ends > input_starts
+    input_starts, input_ends = input_starts[valid], input_ends[valid]
+    if input_starts.size == 0:
+        return numpy.zeros(session_starts.shape, dtype=numpy.int64)
+
+    # 和集合: 開始時刻順に並べ、それまでの最大終了時刻より後に始まる区間で区切る
+    order = numpy.argsort(input_starts, kind='stable')
+    input_starts, input_ends = input_starts[order], input_ends[order]
+    running_end = numpy.maximum.accumulate(input_ends)
+    group_heads = numpy.flatnonzero(numpy.r_[True, input_starts[1:] > running_end[:-1]])
+    merged_starts = input_starts[group_heads]
+    merged_ends = numpy.maximum.reduceat(input_ends, group_heads)
+
+    prefix = numpy.concatenate(([0], numpy.cumsum(merged_ends - merged_starts)))
+
+    def covered(times):
+        # tまでに終わった区間の数と、tを含む区間の経過分
+        k = numpy.searchsorted(merged_ends, times, side='right')
+        head = numpy.append(merged_starts, numpy.iinfo(numpy.int64).max)[k]
+        return prefix[k] + numpy.clip(times - head, 0, None)
+
+    return covered(session_ends) - covered(session_starts)
+
+
+def filter_idle_periods(
+    desktop_sessions: Sequence[ActivitySession],
+    input_sessions: Sequence[InputActivitySession],
+    min_active_seconds: int = 10,
+) -> List[Tuple[ActivitySession, int]]:
+    """
+    デスクトップセッションから無活動期間を除外
+
+    入力セッションと重なっている秒数を実活動時間とし、min_active_seconds 未満のセッションは除外する。
+    継続中（終了時刻なし）のセッションは対象外。
+
+    Args:
+        desktop_sessions: デスクトップセッション
+        input_sessions: 入力セッション
+        min_active_seconds: 残すセッションの最小実活動時間（秒）
+
+    Returns:
+        (デスクトップセッション, 実活動時間) のリスト（元の順序）
+    """
+    finished = [s for s in desktop_sessions if s.end_time is not None]
+    seconds = active_seconds(
+        [(s.start_time, s.end_time) for s in finished],
+        ((s.start_time, s.end_time) for s in input_sessions if s.end_time is not None),
+    )
+    return [
+        (session, active)
+        for session, active in zip(finished, seconds)
+        if active >= min_active_seconds
+    ]
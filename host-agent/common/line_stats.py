@@ -0,0 +1,397 @@
+"""
+行数の差分モジュール
+
+file_change_eventsはファイルが変更されたことのみを記録し、どれだけ書いたかは分からない。
+LineStatsAnalyzerは保存前のイベントについて、小さなテキストファイルの現在の内容を前回の内容
+（スナップショット）と比較し、追加・削除した行数をイベントに付与する。
+
+- 前回の内容はzlibで圧縮してSQLiteに保存し（SnapshotStore）、合計サイズが上限を超えた場合は
+  更新の古いものから削除する（LRU）
+- max_file_bytesを超えるファイル・バイナリファイル（NULバイトを含む・UTF-8でない）は比較しない
+- 差分はMyers法で計算し、1ファイルで探索する手数に上限を設ける（超えた場合は行の出現回数の差で概算する）
+- 1回のフラッシュで読み込むバイト数と差分計算のCPU時間に予算を設け、超えた分のイベントは比較しない
+
+createdイベントは前回の内容がなければ全行を追加、deletedイベントは前回の内容の全行を削除として数える。
+前回の内容がないmodifiedイベントは行数を記録せず（NULL）、現在の内容を次回の比較用に保存する。
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .metrics import LINE_SNAPSHOT_BYTES, LINE_STATS
+from .models import FileChangeEvent
+
+# バイナリ判定で確認する先頭のバイト数
+BINARY_CHECK_BYTES = 8192
+
+# スナップショットの圧縮レベル
+COMPRESS_LEVEL = 6
+
+# 1ファイルの差分計算（Myers法）で探索する手数の上限。超えた場合は行の出現回数の差で概算する
+MAX_DIFF_STEPS = 200_000
+
+SNAPSHOTS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS file_snapshots (
+        path TEXT PRIMARY KEY,
+        content BLOB NOT NULL,
+        line_count INTEGER NOT NULL,
+        updated_at_ns INTEGER NOT NULL
+    )
+"""
+
+# (内容, 行数)。Noneは前回の内容なし（削除済み・比較対象外）
+Snapshot = Optional[Tuple[bytes, int]]
+
+
+def count_changed_lines(
+    old: Sequence[str], new: Sequence[str], max_steps: int = MAX_DIFF_STEPS
+) -> Tuple[int, int]:
+    """
+    追加・削除した行数を数える
+
+    共通の先頭・末尾を除いた範囲をMyers法で比較し、最小の編集数から行数を求める。
+    探索がmax_stepsを超えた場合（ファイル全体の書き換えなど）は、行の出現回数の差で概算する
+    （行の移動は数えない）。いずれもファイルの行数に対して計算量が上限を持つ。
+
+    Returns:
+        (追加行数, 削除行数)
+    """
+    limit = min(len(old), len(new))
+    start = 0
+    while start < limit and old[start] == new[start]:
+        start += 1
+    end = 0
+    while end < limit - start and old[-1 - end] == new[-1 - end]:
+        end += 1
+
+    old_middle = old[start:len(old) - end]
+    new_middle = new[start:len(new) - end]
+    if not old_middle or not new_middle:
+        return len(new_middle), len(old_middle)
+
+    # 行を整数IDに置き換え、比較を文字列の比較にしない
+    line_ids: Dict[str, int] = {}
+    a = [line_ids.setdefault(line, len(line_ids)) for line in old_middle]
+    b = [line_ids.setdefault(line, len(line_ids)) for line in new_middle]
+
+    distance = _edit_distance(a, b, max_steps)
+    if distance is None:
+        old_counts, new_counts = Counter(a), Counter(b)
+        return sum((new_counts - old_counts).values()), sum((old_counts - new_counts).values())
+
+    # 追加 + 削除 = 編集数、追加 - 削除 = 行数の増分
+    added = (distance + len(b) - len(a)) // 2
+    return added, distance - added
+
+
+def _edit_distance(a: Sequence[int], b: Sequence[int], max_steps: int) -> Optional[int]:
+    """
+    挿入・削除のみの最小編集数（Myers法）
+
+    Returns:
+        編集数（探索した手数がmax_stepsを超えた場合はNone）
+    """
+    n, m = len(a), len(b)
+    offset = n + m + 1
+    # v[k + offset]: 対角線kで到達した最も遠いx
+    v = [0] * (2 * offset + 1)
+    steps = 0
+    for d in range(n + m + 1):
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[k - 1 + offset] < v[k + 1 + offset]):
+                x = v[k + 1 + offset]
+            else:
+                x = v[k - 1 + offset] + 1
+            y = x - k
+            snake_start = x
+            while x < n and y < m and a[x] == b[y]:
+                x += 1
+                y += 1
+            v[k + offset] = x
+            if x >= n and y >= m:
+                return d
+            steps += 1 + x - snake_start
+        if steps > max_steps:
+            return None
+    return n + m
+
+
+def decode_text(data: bytes) -> Optional[List[str]]:
+    """テキストファイルの内容を行に分割（バイナリの場合はNone）"""
+    if b'\0' in data[:BINARY_CHECK_BYTES]:
+        return None
+    try:
+        return data.decode('utf-8').splitlines()
+    except UnicodeDecodeError:
+        return None
+
+
+class SnapshotStore:
+    """
+    ファイルごとの前回の内容（圧縮済み）
+
+    合計サイズ（圧縮後）がmax_bytesを超えた場合は、更新の古いものから削除する。
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        """
+        Args:
+            path: 保存先のSQLiteファイル
+            max_bytes: 圧縮後の合計サイズの上限
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.logger = logging.getLogger(__name__)
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # check_same_thread=False: 各ハンドラのフラッシュ（タイマー・watchdogのスレッド）から呼び出されるため
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(SNAPSHOTS_SCHEMA)
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_file_snapshots_updated_at ON file_snapshots(updated_at_ns)"
+        )
+        self.connection.commit()
+
+        self.total_bytes = self.connection.execute(
+            "SELECT COALESCE(SUM(length(content)), 0) FROM file_snapshots"
+        ).fetchone()[0]
+        LINE_SNAPSHOT_BYTES.labels().set_function(lambda: self.total_bytes)
+
+    def get(self, path: str) -> Snapshot:
+        """前回の内容（展開済み）と行数を返す"""
+        row = self.connection.execute(
+            "SELECT content, line_count FROM file_snapshots WHERE path = ?", (path,)
+        ).fetchone()
+        if row is None:
+            return None
+        try:
+            return zlib.decompress(row[0]), row[1]
+        except zlib.error as e:
+            self.logger.warning(f"スナップショットを展開できません（破棄します）: {path}: {e}")
+            return None
+
+    def write(self, snapshots: Dict[str, Snapshot]):
+        """
+        スナップショットをまとめて保存（Noneのパスは削除）し、上限を超えた分を削除
+
+        Args:
+            snapshots: パス → (内容, 行数) またはNone
+        """
+        updated_at_ns = time.time_ns()
+        upserts = []
+        deletes = []
+        for path, snapshot in snapshots.items():
+            if snapshot is None:
+                deletes.append((path,))
+            else:
+                content, line_count = snapshot
+                upserts.append((path, zlib.compress(content, COMPRESS_LEVEL), line_count, updated_at_ns))
+
+        # 合計サイズはコミット後に反映する（失敗時に実際の保存内容とずれないように）
+        total_bytes = self.total_bytes
+        with self.connection:
+            # 置き換え・削除するスナップショットの分を合計から除く
+            paths = list(snapshots)
+            for offset in range(0, len(paths), 500):
+                chunk = paths[offset:offset + 500]
+                placeholders = ", ".join("?" * len(chunk))
+                total_bytes -= self.connection.execute(
+                    f"SELECT COALESCE(SUM(length(content)), 0) FROM file_snapshots WHERE path IN ({placeholders})",
+                    chunk,
+                ).fetchone()[0]
+            if deletes:
+                self.connection.executemany("DELETE FROM file_snapshots WHERE path = ?", deletes)
+            if upserts:
+                self.connection.executemany("""
+                    INSERT INTO file_snapshots (path, content, line_count, updated_at_ns)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(path) DO UPDATE SET
+                        content = excluded.content,
+                        line_count = excluded.line_count,
+                        updated_at_ns = excluded.updated_at_ns
+                """, upserts)
+                total_bytes += sum(len(row[1]) for row in upserts)
+
+            if total_bytes > self.max_bytes:
+                total_bytes = self._evict(total_bytes)
+        self.total_bytes = total_bytes
+
+    def _evict(self, total_bytes: int) -> int:
+        """
+        合計サイズが上限の9割以下になるまで、更新の古いものから削除
+
+        Returns:
+            削除後の合計サイズ
+        """
+        target = self.max_bytes * 9 // 10
+        evicted = []
+        for path, size in self.connection.execute(
+            "SELECT path, length(content) FROM file_snapshots ORDER BY updated_at_ns ASC"
+        ):
+            if total_bytes <= target:
+                break
+            evicted.append((path,))
+            total_bytes -= size
+        self.connection.executemany("DELETE FROM file_snapshots WHERE path = ?", evicted)
+        self.logger.info(
+            f"スナップショットを{len(evicted)}件削除しました"
+            f"（{total_bytes / 1024 / 1024:.1f}MB / 上限 {self.max_bytes / 1024 / 1024:.0f}MB）"
+        )
+        return total_bytes
+
+    def close(self):
+        """接続を閉じる"""
+        self.connection.close()
+
+
+class LineStatsAnalyzer:
+    """
+    ファイル変更イベントへの追加・削除行数の付与
+
+    複数のイベントハンドラ（監視ディレクトリ）から共有し、フラッシュ時にannotate_eventsを呼び出す。
+    """
+
+    def __init__(
+        self,
+        snapshot_path: str,
+        max_file_bytes: int = 256 * 1024,
+        max_snapshot_bytes: int = 64 * 1024 * 1024,
+        max_read_bytes_per_flush: int = 16 * 1024 * 1024,
+        max_cpu_seconds_per_flush: float = 0.5,
+    ):
+        """
+        Args:
+            snapshot_path: 前回の内容を保存するSQLiteファイル
+            max_file_bytes: 比較するファイルサイズの上限
+            max_snapshot_bytes: 前回の内容の合計サイズ（圧縮後）の上限
+            max_read_bytes_per_flush: 1回のフラッシュで読み込むバイト数の上限
+            max_cpu_seconds_per_flush: 1回のフラッシュで差分計算に使うCPU時間の上限（秒）
+        """
+        self.max_file_bytes = max_file_bytes
+        self.max_read_bytes_per_flush = max_read_bytes_per_flush
+        self.max_cpu_seconds_per_flush = max_cpu_seconds_per_flush
+        self.store = SnapshotStore(snapshot_path, max_snapshot_bytes)
+        self.logger = logging.getLogger(__name__)
+        # 同じパスのスナップショットを並行して更新しないよう、annotate_events全体を直列化する
+        self._lock = threading.Lock()
+
+        # メトリクス
+        self.stats_diffed = LINE_STATS.labels('diffed')
+        self.stats_no_baseline = LINE_STATS.labels('no_baseline')
+        self.stats_too_large = LINE_STATS.labels('too_large')
+        self.stats_binary = LINE_STATS.labels('binary')
+        self.stats_over_budget = LINE_STATS.labels('over_budget')
+        self.stats_unreadable = LINE_STATS.labels('unreadable')
+
+        self.logger.info(
+            f"行数の差分の記録を有効化しました（ファイル上限: {max_file_bytes // 1024}KB, "
+            f"スナップショット: {snapshot_path}）"
+        )
+
+    def annotate_events(self, events: List[FileChangeEvent]) -> List[FileChangeEvent]:
+        """
+        created・modified・deletedイベントに追加・削除行数を付与
+
+        バッチ内の同じパスはイベント順に「直前の内容」と比較する。
+        予算を超えた後のイベントは行数を付与せず、そのパスのスナップショットを破棄する
+        （比較しなかった変更を次回の差分に含めないように）。
+
+        Args:
+            events: 保存前のイベント（発生順）
+
+        Returns:
+            行数を付与したイベント（順序は維持）
+        """
+        with self._lock:
+            # バッチ内で更新したスナップショット（パス → 内容。Noneは破棄）
+            pending: Dict[str, Snapshot] = {}
+            read_bytes = 0
+            cpu_started = time.thread_time()
+            annotated = []
+
+            for event in events:
+                path = event.file_path
+                previous = pending[path] if path in pending else self.store.get(path)
+
+                if event.event_type == 'deleted':
+                    pending[path] = None
+                    if previous is not None:
+                        event = event._replace(lines_added=0, lines_removed=previous[1])
+                    annotated.append(event)
+                    continue
+
+                over_budget = (
+                    read_bytes >= self.max_read_bytes_per_flush
+                    or time.thread_time() - cpu_started >= self.max_cpu_seconds_per_flush
+                )
+                if over_budget:
+                    self.stats_over_budget.inc()
+                    pending[path] = None
+                    annotated.append(event)
+                    continue
+
+                content = self._read(path)
+                if content is None:
+                    pending[path] = None
+                    annotated.append(event)
+                    continue
+                read_bytes += len(content)
+
+                lines = decode_text(content)
+                if lines is None:
+                    self.stats_binary.inc()
+                    pending[path] = None
+                    annotated.append(event)
+                    continue
+                pending[path] = (content, len(lines))
+
+                if previous is not None:
+                    old_lines = decode_text(previous[0]) or []
+                    added, removed = count_changed_lines(old_lines, lines)
+                    event = event._replace(lines_added=added, lines_removed=removed)
+                    self.stats_diffed.inc()
+                elif event.event_type == 'created':
+                    event = event._replace(lines_added=len(lines), lines_removed=0)
+                    self.stats_diffed.inc()
+                else:
+                    self.stats_no_baseline.inc()
+                annotated.append(event)
+
+            if time.thread_time() - cpu_started >= self.max_cpu_seconds_per_flush:
+                self.logger.debug(
+                    f"行数の差分の計算がCPU時間の予算（{self.max_cpu_seconds_per_flush}秒）に達しました"
+                )
+
+            try:
+                self.store.write(pending)
+            except sqlite3.Error as e:
+                # 保存できなくても次回の差分が記録されないだけのため、イベントの記録は続ける
+                self.logger.warning(f"スナップショットを保存できません: {e}")
+
+            return annotated
+
+    def _read(self, path: str) -> Optional[bytes]:
+        """比較対象のファイルを読み込む（上限を超える・読み込めない場合はNone）"""
+        try:
+            with open(path, 'rb') as f:
+                content = f.read(self.max_file_bytes + 1)
+        except OSError:
+            # 保存前に削除・移動された一時ファイルなど
+            self.stats_unreadable.inc()
+            return None
+        if len(content) > self.max_file_bytes:
+            self.stats_too_large.inc()
+            return None
+        return content
+
+    def close(self):
+        """スナップショットの接続を閉じる"""
+        with self._lock:
+            self.store.close()
@@ -0,0 +1,528 @@
+"""
+メトリクスモジュール
+
+コレクターの内部状態（受信・破棄・集約したイベント数、バッファ深度、フラッシュ・SQLite書き込み・
+同期バッチの所要時間、未同期件数、監視数）をPrometheusのテキスト形式で公開する。
+
+- 計測側は起動時にラベル付きの系列（labels()の戻り値）を取得して保持し、イベントごとには
+  ロック1回と加算のみを行う（バッファ深度や監視数のように都度計算できる値は公開時に関数で取得する）
+- 公開方法はlocalhostのHTTP（/metrics）またはnode_exporterのtextfileコレクター向けのファイル出力
+- 外部パッケージには依存しない
+
+メトリクスはプロセスごとのregistryに登録され、公開時にcollectorラベルが付与される。
+"""
+
+import bisect
+import logging
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# メトリクス名の接頭辞
+PREFIX = 'reprospective_agent_'
+
+# 所要時間のヒストグラムの既定の境界（秒）
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    """ラベル値をエスケープ"""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    """サンプル値を文字列に変換"""
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _label_text(names: Sequence[str], values: Sequence[str]) -> str:
+    """ラベルを {name="value",...} 形式に変換（ラベルがなければ空文字列）"""
+    if not names:
+        return ''
+    return '{' + ','.join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + '}'
+
+
+class _CounterChild:
+    """ラベル値ごとのカウンター"""
+
+    __slots__ = ('_lock', 'value')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1):
+        """加算"""
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeChild:
+    """ラベル値ごとのゲージ（関数を設定した場合は公開時に呼び出す）"""
+
+    __slots__ = ('_lock', '_value', '_function')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float):
+        """値を設定"""
+        self._value = value
+
+    def inc(self, amount: float = 1):
+        """加算"""
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1):
+        """減算"""
+        with self._lock:
+            self._value -= amount
+
+    def set_function(self, function: Callable[[], float]):
+        """公開時に値を計算する関数を設定"""
+        self._function = function
+
+    @property
+    def value(self) -> float:
+        """現在の値"""
+        if self._function is not None:
+            return self._function()
+        return self._value
+
+
+class _HistogramChild:
+    """ラベル値ごとのヒストグラム"""
+
+    __slots__ = ('_lock', '_upper_bounds', 'counts', 'sum')
+
+    def __init__(self, upper_bounds: Tuple[float, ...]):
+        self._lock = threading.Lock()
+        self._upper_bounds = upper_bounds
+        self.counts = [0] * (len(upper_bounds) + 1)  # 最後は+Inf
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        """値を記録"""
+        index = bisect.bisect_left(self._upper_bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self) -> '_Timer':
+        """withブロックの所要時間（秒）を記録するコンテキストマネージャーを返す"""
+        return _Timer(self)
+
+
+class _Timer:
+    """所要時間の計測"""
+
+    __slots__ = ('_histogram', '_started')
+
+    def __init__(self, histogram: _HistogramChild):
+        self._histogram = histogram
+        self._started = 0.0
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._histogram.observe(time.perf_counter() - self._started)
+        return False
+
+
+class _Metric:
+    """メトリクス（ラベル値ごとの系列の集合）"""
+
+    type_name = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """
+        ラベル値に対応する系列を返す（なければ作成）
+
+        呼び出しごとに辞書を引くため、頻繁に更新する系列は戻り値を保持して使うこと。
+        """
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name}: ラベルの数が一致しません（{self.labelnames}）")
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _samples(self) -> List[Tuple[str, Tuple[str, ...], Tuple[str, ...], float]]:
+        """(サンプル名, ラベル名, ラベル値, 値) のリスト"""
+        raise NotImplementedError
+
+    def render(self, const_names: Tuple[str, ...], const_values: Tuple[str, ...]) -> List[str]:
+        """テキスト形式の行を返す"""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        for sample_name, names, values, value in self._samples():
+            labels = _label_text(const_names + names, const_values + values)
+            lines.append(f"{sample_name}{labels} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """単調増加するカウンター"""
+
+    type_name = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def _samples(self):
+        return [
+            (self.name, self.labelnames, key, child.value)
+            for key, child in list(self._children.items())
+        ]
+
+
+class Gauge(_Metric):
+    """増減する値"""
+
+    type_name = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def _samples(self):
+        samples = []
+        for key, child in list(self._children.items()):
+            try:
+                value = child.value
+            except Exception:
+                # 公開時の関数が失敗しても他のメトリクスは返す
+                continue
+            samples.append((self.name, self.labelnames, key, value))
+        return samples
+
+
+class Histogram(_Metric):
+    """値の分布（累積バケット）"""
+
+    type_name = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.upper_bounds = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.upper_bounds)
+
+    def _samples(self):
+        samples = []
+        bucket_names = self.labelnames + ('le',)
+        for key, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(self.upper_bounds + (math.inf,), list(child.counts)):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", bucket_names, key + (_format_value(bound),), cumulative))
+            samples.append((f"{self.name}_sum", self.labelnames, key, child.sum))
+            samples.append((f"{self.name}_count", self.labelnames, key, cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    """メトリクスの登録と公開"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self._const_labels: Dict[str, str] = {}
+
+    def set_const_labels(self, **labels: str):
+        """全メトリクスに付与するラベルを設定（例: collector="filesystem_watcher"）"""
+        self._const_labels = dict(labels)
+
+    def _register(self, metric: _Metric) -> _Metric:
+        """同名のメトリクスが登録済みならそれを返す"""
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"メトリクス {metric.name} は異なる定義で登録済みです")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """カウンターを登録"""
+        return self._register(Counter(PREFIX + name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """ゲージを登録"""
+        return self._register(Gauge(PREFIX + name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """ヒストグラムを登録"""
+        return self._register(Histogram(PREFIX + name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """全メトリクスをPrometheusのテキスト形式で返す"""
+        const_names = tuple(self._const_labels)
+        const_values = tuple(self._const_labels.values())
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render(const_names, const_values))
+        return '\n'.join(lines) + '\n'
+
+
+# プロセス共有のレジストリ
+registry = MetricsRegistry()
+
+
+# ================================
+# コレクター共通のメトリクス
+# ================================
+
+EVENTS_RECEIVED = registry.counter(
+    'events_received_total', '受信したイベント数', ('source',)
+)
+EVENTS_DROPPED = registry.counter(
+    'events_dropped_total', '記録せずに破棄したイベント数', ('source', 'reason')
+)
+EVENTS_COALESCED = registry.counter(
+    'events_coalesced_total', '既存のセッション・イベントに集約したイベント数', ('source',)
+)
+BUFFER_DEPTH = registry.gauge(
+    'buffer_depth', '保存待ちのバッファ内イベント数', ('source',)
+)
+FLUSH_DURATION = registry.histogram(
+    'flush_duration_seconds', 'バッファのフラッシュ所要時間', ('source',)
+)
+SQLITE_WRITE_DURATION = registry.histogram(
+    'sqlite_write_duration_seconds', 'SQLiteへの書き込み所要時間', ('table',)
+)
+WATCHES = registry.gauge(
+    'watches', '監視中の対象数（Observer・監視ディレクトリ・入力リスナー）', ('kind',)
+)
+
+# ファイル内容の確認（content_hash.py）
+CONTENT_CHECKS = registry.counter(
+    'content_checks_total', 'modified・createdイベントのファイル内容の確認回数', ('result',)
+)
+CONTENT_HASH_BYTES = registry.counter(
+    'content_hash_bytes_total', 'ファイル内容のハッシュ計算で読み込んだバイト数'
+)
+
+# 行数の差分（line_stats.py）
+LINE_STATS = registry.counter(
+    'line_stats_total', 'created・modifiedイベントの行数の差分の計算結果', ('result',)
+)
+LINE_SNAPSHOT_BYTES = registry.gauge(
+    'line_snapshot_bytes', '差分計算用に保存している前回の内容（圧縮後）のバイト数'
+)
+
+# 同期
+SYNC_BACKLOG = registry.gauge(
+    'sync_backlog_rows', '未同期の行数（同期サイクル終了時点）', ('table',)
+)
+SYNC_BATCH_DURATION = registry.histogram(
+    'sync_batch_duration_seconds', '同期バッチの送信所要時間', ('table',)
+)
+SYNC_RECORDS = registry.counter(
+    'sync_records_total', '同期処理した行数', ('table', 'result')
+)
+SYNC_CYCLE_DURATION = registry.histogram(
+    'sync_cycle_duration_seconds', '同期サイクル全体の所要時間',
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0),
+)
+
+# 統合プロセス（agent.py）
+COLLECTOR_RESTARTS = registry.counter(
+    'collector_restarts_total', '停止したコレクターを再起動した回数', ('task',)
+)
+
+
+# ================================
+# 公開
+# ================================
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    """GET /metrics を処理"""
+
+    metrics_registry: MetricsRegistry = registry
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.metrics_registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsServer:
+    """/metrics を返すHTTPサーバー（デーモンスレッドで動作）"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 9464, metrics_registry: MetricsRegistry = registry):
+        """
+        Args:
+            host: 待ち受けアドレス（既定はlocalhostのみ）
+            port: 待ち受けポート
+            metrics_registry: 公開するレジストリ
+        """
+        handler = type('MetricsRequestHandler', (_MetricsRequestHandler,), {'metrics_registry': metrics_registry})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name='metrics-server', daemon=True)
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        """待ち受け中の (アドレス, ポート)"""
+        return self.server.server_address[:2]
+
+    def start(self):
+        """待ち受けを開始"""
+        self.thread.start()
+        host, port = self.address
+        self.logger.info(f"メトリクスを公開しています: http://{host}:{port}/metrics")
+
+    def stop(self):
+        """待ち受けを停止"""
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TextfileExporter:
+    """
+    node_exporterのtextfileコレクター向けにメトリクスを定期的にファイルへ書き出す
+
+    読み込み途中のファイルを見せないよう、一時ファイルに書いてから置き換える。
+    """
+
+    def __init__(self, path: str, interval: float = 15.0, metrics_registry: MetricsRegistry = registry):
+        """
+        Args:
+            path: 出力ファイル（拡張子は .prom）
+            interval: 書き出し間隔（秒）
+            metrics_registry: 公開するレジストリ
+        """
+        self.path = Path(path)
+        self.interval = interval
+        self.metrics_registry = metrics_registry
+        self._stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='metrics-textfile', daemon=True)
+        self.logger = logging.getLogger(__name__)
+
+    def write(self):
+        """現在の値を書き出す"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        temp_path.write_text(self.metrics_registry.render(), encoding='utf-8')
+        os.replace(temp_path, self.path)
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.write()
+            except OSError as e:
+                self.logger.warning(f"メトリクスファイルの書き出しに失敗しました: {self.path}: {e}")
+
+    def start(self):
+        """定期書き出しを開始"""
+        self.write()
+        self.thread.start()
+        self.logger.info(f"メトリクスを書き出しています: {self.path}（{self.interval}秒ごと）")
+
+    def stop(self):
+        """定期書き出しを停止（最後に1回書き出す）"""
+        self._stop_event.set()
+        self.thread.join(timeout=self.interval)
+        try:
+            self.write()
+        except OSError:
+            pass
+
+
+def start_metrics_exporter(config: dict, collector: str) -> List[object]:
+    """
+    設定に従ってメトリクスの公開を開始
+
+    Args:
+        config: ConfigManager.get_metrics_config() の戻り値
+        collector: コレクター名（collectorラベルの値・ポートとファイル名の選択に使用）
+
+    Returns:
+        開始した公開手段（終了時にstop()を呼ぶ）
+    """
+    registry.set_const_labels(collector=collector)
+    exporters: List[object] = []
+    if not config.get('enabled', False):
+        return exporters
+
+    logger = logging.getLogger(__name__)
+
+    port = config.get('ports', {}).get(collector)
+    if port:
+        try:
+            server = MetricsServer(host=config.get('host', '127.0.0.1'), port=int(port))
+            server.start()
+            exporters.append(server)
+        except OSError as e:
+            logger.warning(f"メトリクスのHTTPサーバーを起動できません（port={port}）: {e}")
+
+    textfile_dir = config.get('textfile_dir')
+    if textfile_dir:
+        exporter = TextfileExporter(
+            str(Path(textfile_dir) / f"reprospective_{collector}.prom"),
+            interval=config.get('textfile_interval_seconds', 15),
+        )
+        exporter.start()
+        exporters.append(exporter)
+
+    return exporters
+
+
+def stop_metrics_exporters(exporters: List[object]):
+    """start_metrics_exporterで開始した公開手段を停止"""
+    for exporter in exporters:
+        try:
+            exporter.stop()
+        except Exception:
+            pass
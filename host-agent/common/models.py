@@ -2,14 +2,16 @@
 データモデル定義
 
 アクティビティセッションやその他のデータ構造を定義する。
+行ごとに生成されるため、セッションは__slots__付きのデータクラス、
+ファイル変更イベントはNamedTupleとし、インスタンス辞書を持たないようにしている。
 """
 
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, ClassVar, NamedTuple, Optional, Sequence, Tuple
 from datetime import datetime
 
 
-@dataclass
+@dataclass(slots=True)
 class InputActivitySession:
     """
     入力活動セッションを表すデータクラス
@@ -24,6 +26,9 @@ class InputActivitySession:
     created_at: int = 0                # レコード作成時刻（UNIXエポック秒）
     updated_at: int = 0                # レコード更新時刻（UNIXエポック秒）
 
+    # from_rowが受け取る行のカラム順（フィールド順と同じ）
+    COLUMNS: ClassVar[Tuple[str, ...]] = ('id', 'start_time', 'end_time', 'created_at', 'updated_at')
+
     @property
     def start_time_iso(self) -> str:
         """開始時刻のISO 8601形式文字列"""
@@ -69,6 +74,11 @@ class InputActivitySession:
             updated_at=data.get('updated_at', 0)
         )
 
+    @staticmethod
+    def from_row(row: Sequence[Any]) -> 'InputActivitySession':
+        """COLUMNSの順に取得した行からInputActivitySessionオブジェクトを生成（辞書を経由しない）"""
+        return InputActivitySession(*row)
+
     def __repr__(self) -> str:
         """文字列表現"""
         duration = f"{self.duration_seconds}s" if self.duration_seconds else "継続中"
@@ -77,7 +87,7 @@ class InputActivitySession:
                 f"duration={duration})")
 
 
-@dataclass
+@dataclass(slots=True)
 class ActivitySession:
     """
     活動セッションを表すデータクラス
@@ -93,6 +103,11 @@ class ActivitySession:
     created_at: int = 0                # レコード作成時刻（UNIXエポック秒）
     updated_at: int = 0                # レコード更新時刻（UNIXエポック秒）
 
+    # from_rowが受け取る行のカラム順（フィールド順と同じ）
+    COLUMNS: ClassVar[Tuple[str, ...]] = (
+        'id', 'start_time', 'end_time', 'application_name', 'window_title', 'created_at', 'updated_at',
+    )
+
     @property
     def start_time_iso(self) -> str:
         """開始時刻のISO 8601形式文字列"""
@@ -156,6 +171,11 @@ class ActivitySession:
             updated_at=data.get('updated_at', 0)
         )
 
+    @staticmethod
+    def from_row(row: Sequence[Any]) -> 'ActivitySession':
+        """COLUMNSの順に取得した行からActivitySessionオブジェクトを生成（辞書を経由しない）"""
+        return ActivitySession(*row)
+
     def __repr__(self) -> str:
         """文字列表現"""
         duration = f"{self.duration_seconds}s" if self.duration_seconds else "継続中"
@@ -163,3 +183,27 @@ class ActivitySession:
                 f"app='{self.application_name}', "
                 f"title='{self.window_title[:30]}...', "
                 f"duration={duration})")
+
+
+class FileChangeEvent(NamedTuple):
+    """
+    ファイル変更イベント（ウォッチャーのバッファからSQLiteへの保存まで）
+
+    ウォッチャーはイベントごとに生成するため、辞書ではなくタプルとして保持する。
+    """
+
+    event_time: int                           # 発生時刻（UNIXエポック秒）
+    event_time_iso: str                       # 発生時刻のISO 8601形式文字列
+    event_type: str                           # created / modified / deleted
+    file_path: str                            # ファイルの絶対パス
+    file_name: str                            # ファイル名
+    monitored_root: str                       # 監視ルートディレクトリ
+    file_extension: Optional[str] = None      # 拡張子（例: ".py"）
+    project_name: Optional[str] = None        # 推定したプロジェクト名
+    file_path_relative: Optional[str] = None  # 監視ルートからの相対パス
+    file_size: Optional[int] = None           # ファイルサイズ（バイト）
+    is_symlink: int = 0                       # シンボリックリンクなら1
+    directory_path: Optional[str] = None      # ファイルのディレクトリ（末尾の '/' なし）
+    directory_id: Optional[int] = None        # ディレクトリの辞書ID（Noneの場合は保存時にfile_pathから解決）
+    lines_added: Optional[int] = None         # 追加した行数（line_stats有効時のみ、比較できない場合はNone）
+    lines_removed: Optional[int] = None       # 削除した行数（同上）
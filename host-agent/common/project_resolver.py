@@ -0,0 +1,148 @@
+"""
+プロジェクトルートの判定モジュール
+
+ファイルの属するプロジェクトを、ディレクトリを上にたどって最も近いマーカー
+（.git・pyproject.toml・package.jsonなど）を含むディレクトリとして判定する。
+入れ子のリポジトリやモノレポ内のパッケージは、監視ルート直下のディレクトリではなく
+最も内側のプロジェクトに帰属する。
+
+- 判定結果はディレクトリごとに上限付きのキャッシュ（LRU）に保持し、同じディレクトリのイベントは
+  ファイルシステムにアクセスせずに判定する
+- たどる途中のディレクトリの結果もキャッシュするため、兄弟ディレクトリは未確認の階層のみ確認する
+- マーカーの作成・削除・移動を検知した場合は、そのディレクトリ配下のキャッシュを破棄する
+
+マーカーが見つからない場合は、従来どおり監視ルート直下のディレクトリ名をプロジェクト名とする。
+"""
+
+import fnmatch
+import logging
+import os
+from collections import OrderedDict
+from typing import Optional, Sequence
+
+# 既定のマーカー（ファイル名・ディレクトリ名。* を含むものはパターンとして照合する）
+DEFAULT_PROJECT_MARKERS = (
+    '.git', '.hg', '.svn',
+    'pyproject.toml', 'setup.py', 'package.json', 'Cargo.toml', 'go.mod',
+    'pom.xml', 'build.gradle', 'Gemfile', 'composer.json',
+    '*.blend',
+)
+
+
+class ProjectResolver:
+    """
+    ディレクトリからプロジェクト名を判定
+
+    監視ルートごと（イベントハンドラごと）に生成する。イベントはObserverのスレッドからのみ
+    受け取るため、キャッシュはロックで保護しない。
+    """
+
+    def __init__(
+        self,
+        monitored_root: str,
+        markers: Optional[Sequence[str]] = None,
+        cache_size: int = 4096,
+    ):
+        """
+        Args:
+            monitored_root: 監視ルートディレクトリ（これより上はたどらない）
+            markers: プロジェクトルートを示すファイル名・ディレクトリ名（省略時はDEFAULT_PROJECT_MARKERS）
+            cache_size: 判定結果をキャッシュするディレクトリ数の上限
+        """
+        markers = DEFAULT_PROJECT_MARKERS if markers is None else markers
+        self.monitored_root = monitored_root.rstrip('/') or '/'
+        self.root_prefix = self.monitored_root.rstrip('/') + '/'
+        self.marker_names = frozenset(m for m in markers if not any(c in m for c in '*?['))
+        self.marker_patterns = tuple(m for m in markers if any(c in m for c in '*?['))
+        self.cache_size = cache_size
+        # ディレクトリ → 最も近いマーカーを含むディレクトリ（見つからない場合はNone）
+        self.marker_roots: "OrderedDict[str, Optional[str]]" = OrderedDict()
+        self.logger = logging.getLogger(__name__)
+
+    def project_name(self, directory_path: str) -> Optional[str]:
+        """
+        ディレクトリの属するプロジェクト名を返す
+
+        Args:
+            directory_path: ファイルのディレクトリ（末尾の '/' なし）
+
+        Returns:
+            Optional[str]: プロジェクト名（監視ルート外・判定できない場合はNone）
+        """
+        marker_root = self._marker_root(directory_path)
+        if marker_root is not None:
+            return os.path.basename(marker_root)
+
+        # マーカーがない場合は監視ルート直下のディレクトリ名
+        if directory_path.startswith(self.root_prefix):
+            return directory_path[len(self.root_prefix):].split('/', 1)[0]
+        return None
+
+    def notice_path(self, path: str):
+        """
+        作成・削除・移動されたパスがマーカーの場合、親ディレクトリ配下のキャッシュを破棄
+
+        Args:
+            path: 作成・削除・移動（移動元・移動先）されたファイル・ディレクトリのパス
+        """
+        parent, _, name = path.rpartition('/')
+        if self._is_marker(name):
+            self._invalidate(parent or '/')
+
+    def forget_directory(self, directory: str):
+        """削除・移動されたディレクトリ配下のキャッシュを破棄"""
+        self._invalidate(directory)
+
+    def _marker_root(self, directory_path: str) -> Optional[str]:
+        """最も近いマーカーを含むディレクトリ（監視ルートまでに見つからない場合はNone）"""
+        if directory_path in self.marker_roots:
+            self.marker_roots.move_to_end(directory_path)
+            return self.marker_roots[directory_path]
+
+        # キャッシュにある階層・マーカー・監視ルートのいずれかに着くまで上にたどる
+        unresolved = []
+        current = directory_path
+        while True:
+            if current in self.marker_roots:
+                marker_root = self.marker_roots[current]
+                break
+            unresolved.append(current)
+            if self._has_marker(current):
+                marker_root = current
+                break
+            if current == self.monitored_root or not current.startswith(self.root_prefix):
+                marker_root = None
+                break
+            current = current.rpartition('/')[0] or '/'
+
+        for directory in unresolved:
+            self.marker_roots[directory] = marker_root
+        while len(self.marker_roots) > self.cache_size:
+            self.marker_roots.popitem(last=False)
+        return marker_root
+
+    def _has_marker(self, directory: str) -> bool:
+        """ディレクトリがマーカーを含むか（読み込めない場合はFalse）"""
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            # 削除済みのディレクトリなど
+            return False
+        if not self.marker_names.isdisjoint(names):
+            return True
+        return any(fnmatch.filter(names, pattern) for pattern in self.marker_patterns)
+
+    def _is_marker(self, name: str) -> bool:
+        """名前がマーカーに一致するか"""
+        if name in self.marker_names:
+            return True
+        return any(fnmatch.fnmatchcase(name, pattern) for pattern in self.marker_patterns)
+
+    def _invalidate(self, directory: str):
+        """ディレクトリとその配下のキャッシュを破棄"""
+        prefix = directory.rstrip('/') + '/'
+        stale = [d for d in self.marker_roots if d == directory or d.startswith(prefix)]
+        for d in stale:
+            del self.marker_roots[d]
+        if stale:
+            self.logger.debug(f"プロジェクト判定のキャッシュを破棄しました: {directory} ({len(stale)}件)")
@@ -0,0 +1,315 @@
+"""
+ローカルデータ保持管理モジュール
+
+同期済み（synced_at設定済み）のSQLiteレコードを保持期間経過後に削除し、
+ユーザーが操作していない間にデータベースファイルを縮小する。
+
+- 削除は小さなバッチに分けて行い、コレクターの書き込みを長時間ブロックしない
+- レコードの削除後、どの行からも参照されなくなった辞書テーブル（dim_*）の行を削除する
+- 縮小はアイドル中のみ実行し、PRAGMA incremental_vacuumで空きページを少しずつ解放する
+  （排他ロックを長時間保持する完全なVACUUMは、auto_vacuum=INCREMENTALでない既存のデータベースを
+  変換する初回のみ実行する。コレクターが新規作成するデータベースは作成時からINCREMENTAL）
+- 実行ごとにデータベースサイズ（前後）を記録する
+"""
+
+import asyncio
+import sqlite3
+import logging
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from common.interning import DIMENSION_CACHE_MAX_AGE_SECONDS, TABLE_DIMENSIONS
+from common.sync_spool import SPOOLED_SYNCED_AT
+
+# PRAGMA auto_vacuum の値
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+@dataclass(frozen=True)
+class RetentionTarget:
+    """保持期間管理の対象テーブル"""
+
+    db_path: str      # SQLiteファイルパス
+    table: str        # テーブル名
+    time_column: str  # 保持期間の判定に使うカラム（UNIXエポック秒）
+
+
+@dataclass
+class RetentionResult:
+    """1データベース分の実行結果"""
+
+    db_path: str
+    deleted_rows: int     # 削除した行数
+    size_before: int      # 実行前のサイズ（バイト）
+    size_after: int       # 実行後のサイズ（バイト）
+    vacuum: Optional[str]  # 実行した縮小処理（"incremental" / "full" / None）
+    duration_seconds: float
+    pruned_dimension_rows: int = 0  # 削除した辞書テーブルの行数
+
+
+def default_targets(
+    desktop_db_path: str,
+    file_events_db_path: str,
+    input_db_path: Optional[str] = None,
+) -> List[RetentionTarget]:
+    """
+    コレクターのSQLiteデータベースに対する標準の対象テーブルを返す
+
+    Args:
+        desktop_db_path: デスクトップアクティビティSQLiteパス
+        file_events_db_path: ファイルイベントSQLiteパス
+        input_db_path: 入力アクティビティSQLiteパス（オプション）
+    """
+    targets = [
+        RetentionTarget(desktop_db_path, 'desktop_activity_sessions', 'start_time'),
+        RetentionTarget(desktop_db_path, 'desktop_activity_compacted', 'start_time'),
+        RetentionTarget(file_events_db_path, 'file_change_events', 'event_time'),
+    ]
+    if input_db_path:
+        targets.append(RetentionTarget(input_db_path, 'input_activity_sessions', 'start_time'))
+    return targets
+
+
+def database_size(db_path: str) -> int:
+    """データベースファイルのサイズ（WAL・ジャーナルを含む）を返す"""
+    total = 0
+    for suffix in ('', '-wal', '-journal'):
+        path = Path(db_path + suffix)
+        if path.exists():
+            total += path.stat().st_size
+    return total
+
+
+class LocalRetentionManager:
+    """
+    ローカルSQLite保持期間マネージャー
+
+    check_interval秒ごとに保持期間を過ぎた同期済みレコードを削除する。
+    is_idleがTrueを返す場合のみデータベースの縮小を行う。
+    """
+
+    def __init__(
+        self,
+        targets: List[RetentionTarget],
+        retention_days: float = 30,
+        delete_batch_size: int = 500,
+        check_interval: int = 3600,
+        vacuum_step_pages: int = 1024,
+        is_idle: Optional[Callable[[], bool]] = None,
+    ):
+        """
+        Args:
+            targets: 対象テーブルのリスト
+            retention_days: 同期済みレコードを保持する日数
+            delete_batch_size: 1回のDELETEで削除する最大行数
+            check_interval: 実行間隔（秒）
+            vacuum_step_pages: 1回のincremental_vacuumで解放する最大ページ数（ステップ間でロックを解放する）
+            is_idle: ユーザーがアイドル中かを返す関数（省略時は縮小を行わない）
+        """
+        self.targets = targets
+        self.retention_days = retention_days
+        self.delete_batch_size = delete_batch_size
+        self.check_interval = check_interval
+        self.vacuum_step_pages = vacuum_step_pages
+        self.is_idle = is_idle
+
+        self.logger = logging.getLogger(__name__)
+        self._stop_event = asyncio.Event()
+
+    def _connect(self, db_path: str) -> sqlite3.Connection:
+        """SQLiteに接続（他プロセスの書き込み中は待機）"""
+        return sqlite3.connect(db_path, timeout=30)
+
+    def _table_exists(self, conn: sqlite3.Connection, table: str) -> bool:
+        """テーブルが存在するか確認"""
+        row = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone()
+        return row is not None
+
+    def _delete_expired(self, conn: sqlite3.Connection, target: RetentionTarget, threshold: int) -> int:
+        """
+        保持期間を過ぎた同期済みレコードをバッチ単位で削除
+
+        スプールに保存しただけのレコード（synced_at = SPOOLED_SYNCED_AT）はPostgreSQLに未反映のため削除しない。
+
+        Args:
+            conn: SQLite接続
+            target: 対象テーブル
+            threshold: この時刻（UNIXエポック秒）より前のレコードを削除
+
+        Returns:
+            削除した行数
+        """
+        if not self._table_exists(conn, target.table):
+            return 0
+
+        deleted = 0
+        while True:
+            cursor = conn.execute(f"""
+                DELETE FROM {target.table}
+                WHERE rowid IN (
+                    SELECT rowid FROM {target.table}
+                    WHERE synced_at IS NOT NULL AND synced_at != ? AND {target.time_column} < ?
+                    LIMIT ?
+                )
+            """, (SPOOLED_SYNCED_AT, threshold, self.delete_batch_size))
+            conn.commit()
+            deleted += cursor.rowcount
+
+            if cursor.rowcount < self.delete_batch_size:
+                return deleted
+
+            # バッチ間でロックを解放し、コレクターの書き込みを先に通す
+            time.sleep(0.05)
+
+    def _prune_dimensions(self, conn: sqlite3.Connection) -> int:
+        """
+        どの行からも参照されなくなった辞書テーブル（dim_*）の行を削除
+
+        ウィンドウタイトル・ディレクトリの辞書は種類が増え続けるため、参照するレコードが
+        保持期間処理・セッション圧縮で削除された行を残さない。
+        コレクターは保存するイベントのIDのみを解決し、キャッシュしたIDはDIMENSION_CACHE_MAX_AGE_SECONDSで
+        破棄するため、保持期間がそれより長ければ削除した行のIDが保存されることはない。
+
+        Returns:
+            削除した行数
+        """
+        if self.retention_days * 86400 <= DIMENSION_CACHE_MAX_AGE_SECONDS:
+            return 0
+
+        # 辞書テーブル → 参照する (テーブル, IDカラム)
+        references: Dict[str, List[Tuple[str, str]]] = {}
+        for table, dimensions in TABLE_DIMENSIONS.items():
+            if not self._table_exists(conn, table):
+                continue
+            for dimension in dimensions:
+                references.setdefault(dimension.table, []).append((table, dimension.id_column))
+
+        pruned = 0
+        for dimension_table, referencing in references.items():
+            if not self._table_exists(conn, dimension_table):
+                continue
+            conditions = " AND ".join(
+                f"id NOT IN (SELECT {column} FROM {table} WHERE {column} IS NOT NULL)"
+                for table, column in referencing
+            )
+            cursor = conn.execute(f"DELETE FROM {dimension_table} WHERE {conditions}")
+            conn.commit()
+            pruned += cursor.rowcount
+        return pruned
+
+    def _vacuum(self, conn: sqlite3.Connection) -> Optional[str]:
+        """
+        データベースを縮小
+
+        Returns:
+            実行した縮小処理（"incremental" / "full" / None）
+        """
+        auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        # 未変換の既存データベースは一度だけ完全なVACUUMで変換する
+        # （コレクターはBUSY_TIMEOUT_SECONDSまでロックを待つため、変換中の書き込みは失敗しない）
+        if auto_vacuum != AUTO_VACUUM_INCREMENTAL:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+            return "full"
+
+        vacuumed = False
+        while conn.execute("PRAGMA freelist_count").fetchone()[0] > 0:
+            # execute()は結果を返さない文を1ステップしか実行せず1ページしか解放されないため、executescriptで実行する
+            conn.executescript(f"PRAGMA incremental_vacuum({self.vacuum_step_pages});")
+            vacuumed = True
+
+            # ユーザーが操作を再開した場合は次回に回す
+            if self.is_idle is not None and not self.is_idle():
+                break
+            # ステップ間でロックを解放し、コレクターの書き込みを先に通す
+            time.sleep(0.05)
+
+        return "incremental" if vacuumed else None
+
+    def run_once(self) -> List[RetentionResult]:
+        """
+        全対象データベースに対して削除・縮小を1回実行
+
+        Returns:
+            データベースごとの実行結果
+        """
+        threshold = int(time.time() - self.retention_days * 86400)
+
+        # データベースファイルごとに対象テーブルをまとめる
+        by_db: Dict[str, List[RetentionTarget]] = {}
+        for target in self.targets:
+            by_db.setdefault(target.db_path, []).append(target)
+
+        results = []
+        for db_path, targets in by_db.items():
+            if not Path(db_path).exists():
+                continue
+
+            started = time.monotonic()
+            size_before = database_size(db_path)
+            deleted = 0
+            pruned = 0
+            vacuum = None
+
+            try:
+                conn = self._connect(db_path)
+                try:
+                    for target in targets:
+                        deleted += self._delete_expired(conn, target, threshold)
+                    pruned = self._prune_dimensions(conn)
+
+                    if self.is_idle is not None and self.is_idle():
+                        vacuum = self._vacuum(conn)
+                finally:
+                    conn.close()
+            except Exception as e:
+                self.logger.error(f"保持期間処理エラー ({db_path}): {e}")
+
+            result = RetentionResult(
+                db_path=db_path,
+                deleted_rows=deleted,
+                size_before=size_before,
+                size_after=database_size(db_path),
+                vacuum=vacuum,
+                duration_seconds=time.monotonic() - started,
+                pruned_dimension_rows=pruned,
+            )
+            results.append(result)
+
+            self.logger.info(
+                f"保持期間処理: {Path(db_path).name} 削除={result.deleted_rows}件, "
+                f"辞書削除={result.pruned_dimension_rows}件, "
+                f"サイズ={result.size_before / 1024:.0f}KB → {result.size_after / 1024:.0f}KB, "
+                f"縮小={result.vacuum or 'なし'}, {result.duration_seconds:.2f}秒"
+            )
+
+        return results
+
+    async def start_retention_loop(self):
+        """定期実行ループを開始（asyncioタスク）"""
+        self.logger.info(
+            f"保持期間処理ループを開始します（保持: {self.retention_days}日, "
+            f"間隔: {self.check_interval}秒）"
+        )
+
+        while not self._stop_event.is_set():
+            try:
+                # SQLite操作はブロッキングのため別スレッドで実行
+                await asyncio.to_thread(self.run_once)
+            except Exception as e:
+                self.logger.error(f"保持期間処理ループエラー: {e}")
+
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), timeout=self.check_interval)
+            except asyncio.TimeoutError:
+                pass
+
+        self.logger.info("保持期間処理ループを停止しました")
+
+    def stop(self):
+        """定期実行ループを停止"""
+        self._stop_event.set()
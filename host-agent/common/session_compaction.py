@@ -0,0 +1,342 @@
+"""
+デスクトップセッション圧縮モジュール
+
+ウィンドウタイトルの変更ごとに作成される短いセッションを、同期前にローカルで集約する。
+集約結果はdesktop_activity_compactedテーブルに保存され、DataSyncManagerは
+生のセッションの代わりにこのテーブルを同期する。生のセッションは
+raw_retention_hoursの間ローカルに保持される。
+
+圧縮モード:
+- merge: 同一アプリケーションの連続するセッション（間隔がmerge_gap_seconds以下）を1行に統合
+- minute: 1分ごと・アプリケーションごとの使用秒数（分単位の使用量ベクトル）に集計
+
+どちらのモードでもアプリケーションごとの合計時間（duration_secondsの合計）は保存される。
+"""
+
+import sqlite3
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Tuple
+
+from .interning import DESKTOP_SESSIONS_VIEW
+from .sync_spool import SPOOLED_SYNCED_AT
+
+COMPACTION_NONE = "none"
+COMPACTION_MERGE = "merge"
+COMPACTION_MINUTE = "minute"
+
+COMPACTION_MODES = (COMPACTION_NONE, COMPACTION_MERGE, COMPACTION_MINUTE)
+
+# 圧縮済みセッションを保存するテーブル（同期元テーブル）
+COMPACTED_TABLE = "desktop_activity_compacted"
+
+
+def _dominant_title(title_seconds: Dict[str, int]) -> str:
+    """最も長く表示されていたウィンドウタイトルを返す"""
+    return max(title_seconds.items(), key=lambda item: (item[1], item[0]))[0]
+
+
+def merge_adjacent_sessions(
+    sessions: List[Dict[str, Any]],
+    merge_gap_seconds: int,
+) -> List[Dict[str, Any]]:
+    """
+    同一アプリケーションの連続するセッションを統合
+
+    Args:
+        sessions: 終了済みセッション（start_time昇順）
+        merge_gap_seconds: 統合する前後セッションの最大間隔（秒）
+
+    Returns:
+        統合後のセッションのリスト。各要素はsource_ids（統合元ID）と
+        session_count（統合元セッション数）を持つ。
+        duration_secondsは統合元の合計（間隔は含まない）。
+    """
+    merged: List[Dict[str, Any]] = []
+    current: Optional[Dict[str, Any]] = None
+    title_seconds: Dict[str, int] = {}
+
+    for session in sessions:
+        duration = session['duration_seconds'] or 0
+
+        if (
+            current is not None
+            and session['application_name'] == current['application_name']
+            and session['start_time'] - current['end_time'] <= merge_gap_seconds
+        ):
+            current['end_time'] = max(current['end_time'], session['end_time'])
+            if current['end_time'] == session['end_time']:
+                current['end_time_iso'] = session['end_time_iso']
+            current['duration_seconds'] += duration
+            current['source_ids'].append(session['id'])
+            current['session_count'] += 1
+        else:
+            if current is not None:
+                current['window_title'] = _dominant_title(title_seconds)
+                merged.append(current)
+            current = {
+                'start_time': session['start_time'],
+                'end_time': session['end_time'],
+                'start_time_iso': session['start_time_iso'],
+                'end_time_iso': session['end_time_iso'],
+                'application_name': session['application_name'],
+                'window_title': session['window_title'],
+                'duration_seconds': duration,
+                'source_ids': [session['id']],
+                'session_count': 1,
+            }
+            title_seconds = {}
+
+        title_seconds[session['window_title']] = (
+            title_seconds.get(session['window_title'], 0) + duration
+        )
+
+    if current is not None:
+        current['window_title'] = _dominant_title(title_seconds)
+        merged.append(current)
+
+    return merged
+
+
+def bucket_sessions_by_minute(sessions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    セッションを1分ごと・アプリケーションごとの使用秒数に集計
+
+    Args:
+        sessions: 終了済みセッション
+
+    Returns:
+        (分, アプリケーション) ごとの集計行（start_time昇順）。
+        start_time/end_timeは分の境界、duration_secondsはその分の使用秒数。
+        source_idsには1分でも寄与したセッションのIDが含まれる。
+    """
+    seconds: Dict[Tuple[int, str], int] = defaultdict(int)
+    titles: Dict[Tuple[int, str], Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    sources: Dict[Tuple[int, str], List[int]] = defaultdict(list)
+
+    for session in sessions:
+        start, end = session['start_time'], session['end_time']
+        app = session['application_name']
+        # 0秒のセッションも件数として残すため、開始分には必ず寄与させる
+        last = max(end - 1, start)
+        for minute in range(start - start % 60, last - last % 60 + 60, 60):
+            overlap = max(0, min(end, minute + 60) - max(start, minute))
+            key = (minute, app)
+            seconds[key] += overlap
+            titles[key][session['window_title']] += overlap
+            sources[key].append(session['id'])
+
+    buckets = []
+    for (minute, app) in sorted(seconds):
+        key = (minute, app)
+        buckets.append({
+            'start_time': minute,
+            'end_time': minute + 60,
+            'start_time_iso': datetime.fromtimestamp(minute).isoformat(),
+            'end_time_iso': datetime.fromtimestamp(minute + 60).isoformat(),
+            'application_name': app,
+            'window_title': _dominant_title(titles[key]),
+            'duration_seconds': seconds[key],
+            'source_ids': sources[key],
+            'session_count': len(sources[key]),
+        })
+    return buckets
+
+
+class DesktopSessionCompactor:
+    """
+    デスクトップセッション圧縮処理
+
+    未同期の生セッションを集約してdesktop_activity_compactedに書き込み、
+    生セッションのsynced_atを設定する（同一トランザクション）。
+    継続中のセッションと、それに続く可能性がある末尾のセッションは次回に持ち越す。
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        mode: str = COMPACTION_MERGE,
+        merge_gap_seconds: int = 5,
+        raw_retention_hours: float = 168,
+    ):
+        """
+        Args:
+            db_path: デスクトップアクティビティSQLiteパス
+            mode: 圧縮モード（"merge" または "minute"）
+            merge_gap_seconds: mergeモードで統合するセッション間の最大間隔（秒）
+            raw_retention_hours: 圧縮済みの生セッションを保持する時間（0以下で削除しない）
+        """
+        if mode not in (COMPACTION_MERGE, COMPACTION_MINUTE):
+            raise ValueError(f"不明な圧縮モードです: {mode}")
+
+        self.db_path = db_path
+        self.mode = mode
+        self.merge_gap_seconds = merge_gap_seconds
+        self.raw_retention_hours = raw_retention_hours
+        self.logger = logging.getLogger(__name__)
+
+    def _connect(self) -> sqlite3.Connection:
+        """SQLiteに接続し、圧縮済みテーブルを作成"""
+        # isolation_level=None: トランザクションをBEGIN IMMEDIATEで明示的に制御する
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {COMPACTED_TABLE} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                start_time INTEGER NOT NULL,
+                end_time INTEGER NOT NULL,
+                start_time_iso TEXT NOT NULL,
+                end_time_iso TEXT NOT NULL,
+                application_name TEXT NOT NULL,
+                window_title TEXT NOT NULL,
+                duration_seconds INTEGER NOT NULL,
+                session_count INTEGER NOT NULL,
+                compaction_mode TEXT NOT NULL,
+                synced_at INTEGER,
+                created_at INTEGER NOT NULL
+            )
+        """)
+        # 未同期行のみの部分インデックス（同期順）
+        conn.execute("DROP INDEX IF EXISTS idx_compacted_synced_at")
+        conn.execute(f"""
+            CREATE INDEX IF NOT EXISTS idx_compacted_unsynced_start_time
+            ON {COMPACTED_TABLE}(start_time)
+            WHERE synced_at IS NULL
+        """)
+        return conn
+
+    def _select_complete(
+        self, sessions: List[Dict[str, Any]], cutoff: int, next_session: Optional[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        今回圧縮するセッションを選択
+
+        Args:
+            sessions: 終了済みの未同期セッション（start_time昇順、cutoffより前に開始）
+            cutoff: 継続中セッションの開始時刻（なければ現在時刻）
+            next_session: 最初の継続中セッション（なければNone）
+        """
+        if not sessions:
+            return []
+
+        if self.mode == COMPACTION_MINUTE:
+            # cutoffを含む分にかかるセッションは、その分の集計が確定していないため持ち越す
+            current_minute = cutoff - cutoff % 60
+            return [s for s in sessions if s['end_time'] <= current_minute]
+
+        # mergeモード: 末尾の連続区間が後続セッションと統合され得る場合は持ち越す
+        tail_app = sessions[-1]['application_name']
+        tail_start = len(sessions) - 1
+        while tail_start > 0 and sessions[tail_start - 1]['application_name'] == tail_app:
+            tail_start -= 1
+        tail_end = max(s['end_time'] for s in sessions[tail_start:])
+
+        if next_session is not None:
+            can_continue = (
+                next_session['application_name'] == tail_app
+                and next_session['start_time'] - tail_end <= self.merge_gap_seconds
+            )
+        else:
+            can_continue = cutoff - tail_end <= self.merge_gap_seconds
+
+        return sessions[:tail_start] if can_continue else sessions
+
+    def compact(self) -> Tuple[int, int]:
+        """
+        未同期の生セッションを圧縮
+
+        Returns:
+            (圧縮した生セッション数, 作成した圧縮行数) のタプル
+        """
+        conn = self._connect()
+        try:
+            # 複数プロセス（デスクトップ・入力モニター）が同時に圧縮しても重複しないよう書き込みロックを取得
+            conn.execute("BEGIN IMMEDIATE")
+
+            rows = [dict(row) for row in conn.execute(f"""
+                SELECT id, start_time, end_time, start_time_iso, end_time_iso,
+                       application_name, window_title, duration_seconds
+                FROM {DESKTOP_SESSIONS_VIEW}
+                WHERE synced_at IS NULL
+                ORDER BY start_time ASC, id ASC
+            """)]
+
+            now = int(time.time())
+            next_session = next((r for r in rows if r['end_time'] is None), None)
+            cutoff = next_session['start_time'] if next_session else now
+            closed = [
+                r for r in rows
+                if r['end_time'] is not None and r['start_time'] < cutoff
+            ]
+
+            sessions = self._select_complete(closed, cutoff, next_session)
+            if not sessions:
+                conn.execute("COMMIT")
+                return 0, 0
+
+            if self.mode == COMPACTION_MINUTE:
+                compacted = bucket_sessions_by_minute(sessions)
+            else:
+                compacted = merge_adjacent_sessions(sessions, self.merge_gap_seconds)
+
+            conn.executemany(f"""
+                INSERT INTO {COMPACTED_TABLE}
+                (start_time, end_time, start_time_iso, end_time_iso,
+                 application_name, window_title, duration_seconds,
+                 session_count, compaction_mode, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, [
+                (
+                    c['start_time'], c['end_time'], c['start_time_iso'], c['end_time_iso'],
+                    c['application_name'], c['window_title'], c['duration_seconds'],
+                    c['session_count'], self.mode, now,
+                )
+                for c in compacted
+            ])
+
+            # 生セッションは圧縮済みとしてsynced_atを設定（同期対象から外す）
+            conn.executemany("""
+                UPDATE desktop_activity_sessions SET synced_at = ? WHERE id = ?
+            """, [(now, s['id']) for s in sessions])
+
+            conn.execute("COMMIT")
+
+            self.logger.info(
+                f"デスクトップセッションを圧縮しました: {len(sessions)}件 → {len(compacted)}件 "
+                f"(mode={self.mode})"
+            )
+            return len(sessions), len(compacted)
+
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def purge_raw_sessions(self) -> int:
+        """
+        保持期間を過ぎた圧縮済みの生セッションを削除
+
+        Returns:
+            削除した件数
+        """
+        if self.raw_retention_hours <= 0:
+            return 0
+
+        threshold = int(time.time() - self.raw_retention_hours * 3600)
+        conn = self._connect()
+        try:
+            # スプールに保存しただけの生セッション（PostgreSQLに未反映）は削除しない
+            cursor = conn.execute("""
+                DELETE FROM desktop_activity_sessions
+                WHERE synced_at IS NOT NULL AND synced_at != ? AND end_time < ?
+            """, (SPOOLED_SYNCED_AT, threshold))
+            deleted = cursor.rowcount
+            if deleted:
+                self.logger.info(f"保持期間を過ぎた生セッションを削除しました: {deleted}件")
+            return deleted
+        finally:
+            conn.close()
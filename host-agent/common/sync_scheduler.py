@@ -0,0 +1,146 @@
+"""
+同期スケジューラーモジュール
+
+同期の実行間隔を未同期件数と接続状態に応じて調整する。
+
+- 未同期件数がしきい値以上: 最短間隔で繰り返し同期
+- 未同期件数がしきい値未満: 基本間隔
+- 未同期件数が0: 連続回数に応じて間隔を延長（上限あり）
+- 接続失敗: ジッター付き指数バックオフ
+
+あわせて、行数ベースのトークンバケットで送信レートを制限する。
+全ホストが同時に復旧した場合でも、ジッターとレート制限によってデータベースへの負荷が分散される。
+"""
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class SyncCycleResult:
+    """1回の同期サイクルの結果"""
+
+    records_synced: int = 0          # 同期（またはスプール）した行数
+    records_failed: int = 0          # 失敗した行数
+    backlog: int = 0                 # サイクル終了時点の未同期行数
+    connection_failed: bool = False  # 同期先に接続できなかったか
+
+
+class AdaptiveSyncScheduler:
+    """未同期件数と接続状態に応じた同期間隔の決定"""
+
+    def __init__(
+        self,
+        base_interval: float,
+        min_interval: float = 1.0,
+        max_idle_interval: Optional[float] = None,
+        backlog_threshold: int = 1000,
+        backoff_initial: float = 30.0,
+        backoff_max: float = 1800.0,
+        jitter_ratio: float = 0.2,
+    ):
+        """
+        Args:
+            base_interval: 基本の同期間隔（秒）
+            min_interval: 未同期件数がしきい値以上の場合の間隔（秒）
+            max_idle_interval: 未同期件数が0の場合に延長する間隔の上限（秒、省略時は基本間隔の4倍）
+            backlog_threshold: 最短間隔で同期し続ける未同期件数のしきい値
+            backoff_initial: 接続失敗時の初回待機時間（秒）
+            backoff_max: 接続失敗時の最大待機時間（秒）
+            jitter_ratio: 間隔に加えるジッターの割合（0〜1）
+        """
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_idle_interval = max_idle_interval or base_interval * 4
+        self.backlog_threshold = backlog_threshold
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.jitter_ratio = jitter_ratio
+
+        self.consecutive_failures = 0
+        self.consecutive_idle = 0
+
+    def _jitter(self, delay: float) -> float:
+        """±jitter_ratioの範囲で間隔をずらす"""
+        spread = delay * self.jitter_ratio
+        return max(0.0, delay + random.uniform(-spread, spread))
+
+    def initial_delay(self) -> float:
+        """起動直後の待機時間（複数ホストの同時起動時に分散させる）"""
+        return random.uniform(0, min(self.base_interval, 10.0))
+
+    def next_delay(self, result: SyncCycleResult) -> float:
+        """
+        次回同期までの待機時間を決定
+
+        Args:
+            result: 直前の同期サイクルの結果
+
+        Returns:
+            待機時間（秒）
+        """
+        if result.connection_failed:
+            self.consecutive_failures += 1
+            self.consecutive_idle = 0
+            delay = min(self.backoff_max, self.backoff_initial * 2 ** (self.consecutive_failures - 1))
+            # 全ホストが同じ周期で再接続しないよう、待機時間の後半半分からランダムに選ぶ
+            return random.uniform(delay / 2, delay)
+
+        self.consecutive_failures = 0
+
+        if result.backlog >= self.backlog_threshold:
+            self.consecutive_idle = 0
+            return self.min_interval
+
+        if result.backlog == 0 and result.records_synced == 0:
+            self.consecutive_idle += 1
+            delay = min(self.max_idle_interval, self.base_interval * 2 ** (self.consecutive_idle - 1))
+            return self._jitter(delay)
+
+        self.consecutive_idle = 0
+        return self._jitter(self.base_interval)
+
+
+class RowRateLimiter:
+    """
+    行数ベースのトークンバケット
+
+    rate行/秒で補充され、最大burst行まで蓄積される。
+    """
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        """
+        Args:
+            rate: 1秒あたりの最大行数（0以下で無制限）
+            burst: 蓄積できる最大行数（省略時はrateと同じ）
+        """
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+
+    async def acquire(self, rows: int) -> float:
+        """
+        rows行分のトークンを取得（不足している場合は待機）
+
+        Returns:
+            待機した時間（秒）
+        """
+        if self.rate <= 0:
+            return 0.0
+
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+        # burstを超えるバッチは負債として扱い、次回以降の取得で待機させる
+        self._tokens -= rows
+        if self._tokens >= 0:
+            return 0.0
+
+        wait = -self._tokens / self.rate
+        await asyncio.sleep(wait)
+        return wait
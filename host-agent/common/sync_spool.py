@@ -0,0 +1,249 @@
+"""
+同期スプールモジュール
+
+PostgreSQLに接続できない間、未同期バッチをCOPY用CSVに変換して圧縮し、
+ディスク上のセグメントファイルとして保持する。接続が回復したら、セグメントを展開して
+そのままCOPYに流し込む（レコードごとのPython側の変換を行わない）。
+
+セグメントファイル形式:
+    マジック（4バイト） + ヘッダー長（4バイト、ビッグエンディアン） + ヘッダー（JSON） + 圧縮済みCSV
+
+ヘッダーは非圧縮のため、退避（エビクション）時にペイロードを展開せずに同期元を特定できる。
+zstandardがインストールされていない場合はgzipで圧縮する。
+"""
+
+import gzip
+import json
+import logging
+import os
+import struct
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import zstandard
+except ImportError:  # zstandardは任意（gzipで代替）
+    zstandard = None
+
+MAGIC_ZSTD = b"RSZ1"
+MAGIC_GZIP = b"RSG1"
+
+# スプールに保存し、PostgreSQLへの再送が済んでいないレコードのsynced_at
+# （再送に成功した時点で同期時刻に、退避・再送失敗時はNULLに戻す。保持期間処理はこの値の行を削除しない）
+SPOOLED_SYNCED_AT = 0
+
+SEGMENT_SUFFIX = ".seg"
+CLAIMED_SUFFIX = ".replaying"
+
+
+@dataclass
+class SpoolSegment:
+    """スプールセグメント"""
+
+    path: Path
+    table: str                        # 同期先テーブル
+    columns: Tuple[str, ...]          # CSVのカラム順
+    source_db: str                    # 同期元SQLiteファイル
+    source_table: str                 # 同期元テーブル
+    id_ranges: List[Tuple[int, int]]  # 同期元レコードIDの連続区間
+    row_count: int
+    created_at: float
+    payload: Optional[bytes] = None   # 展開済みCSV（read()時のみ）
+
+
+def _csv_field(value: Any) -> str:
+    """1フィールドをCSV表現に変換（Noneは引用符なしの空フィールド = NULL）"""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return str(value)
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def render_csv(rows: Iterable[Sequence[Any]]) -> bytes:
+    """
+    行をPostgreSQLのCOPY (FORMAT csv) 用にエンコード
+
+    文字列は常に引用符で囲み、NoneのみをNULL（引用符なしの空フィールド）として出力する。
+    空文字列は "" となるため、NULLと区別される。
+    """
+    return "".join(
+        ",".join(_csv_field(value) for value in row) + "\n" for row in rows
+    ).encode("utf-8")
+
+
+class SyncSpool:
+    """
+    サイズ上限付きのディスクスプール
+
+    上限を超えた場合は古いセグメントから退避する。退避したセグメントは
+    呼び出し元が同期元のsynced_atを戻し、SQLiteからの通常同期に戻す。
+    """
+
+    def __init__(self, spool_dir: str, max_bytes: int = 256 * 1024 * 1024, compression_level: int = 3):
+        """
+        Args:
+            spool_dir: セグメントを保存するディレクトリ
+            max_bytes: スプール全体の最大サイズ（バイト）
+            compression_level: 圧縮レベル
+        """
+        self.spool_dir = Path(spool_dir)
+        self.max_bytes = max_bytes
+        self.compression_level = compression_level
+        self.logger = logging.getLogger(__name__)
+
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+
+        # 前回異常終了時に再送中だったセグメントを戻す
+        for path in self.spool_dir.glob(f"*{CLAIMED_SUFFIX}"):
+            path.rename(path.with_suffix(SEGMENT_SUFFIX))
+
+    def _compress(self, data: bytes) -> Tuple[bytes, bytes]:
+        """(マジック, 圧縮データ) を返す"""
+        if zstandard is not None:
+            return MAGIC_ZSTD, zstandard.ZstdCompressor(level=self.compression_level).compress(data)
+        return MAGIC_GZIP, gzip.compress(data, compresslevel=min(self.compression_level, 9))
+
+    @staticmethod
+    def _decompress(magic: bytes, data: bytes) -> bytes:
+        if magic == MAGIC_ZSTD:
+            if zstandard is None:
+                raise RuntimeError("zstd圧縮のセグメントを展開するには zstandard が必要です")
+            return zstandard.ZstdDecompressor().decompress(data)
+        if magic == MAGIC_GZIP:
+            return gzip.decompress(data)
+        raise ValueError(f"不明なセグメント形式です: {magic!r}")
+
+    def segments(self) -> List[Path]:
+        """未送信セグメントを古い順に返す"""
+        return sorted(self.spool_dir.glob(f"*{SEGMENT_SUFFIX}"))
+
+    def size(self) -> int:
+        """スプール全体のサイズ（バイト）"""
+        return sum(p.stat().st_size for p in self.spool_dir.glob(f"*{SEGMENT_SUFFIX}"))
+
+    def write(
+        self,
+        table: str,
+        columns: Sequence[str],
+        rows: List[Sequence[Any]],
+        source_db: str,
+        source_table: str,
+        id_ranges: List[Tuple[int, int]],
+    ) -> Path:
+        """
+        バッチをセグメントとして書き込む
+
+        Args:
+            table: 同期先テーブル
+            columns: rowsのカラム順
+            rows: COPYする行（値はPostgreSQLがテキストから解釈できる形式）
+            source_db: 同期元SQLiteファイル
+            source_table: 同期元テーブル
+            id_ranges: 同期元レコードIDの連続区間
+
+        Returns:
+            書き込んだセグメントのパス
+        """
+        header = json.dumps({
+            "table": table,
+            "columns": list(columns),
+            "source_db": source_db,
+            "source_table": source_table,
+            "id_ranges": id_ranges,
+            "rows": len(rows),
+            "created_at": time.time(),
+        }).encode("utf-8")
+        magic, payload = self._compress(render_csv(rows))
+
+        # ファイル名のナノ秒タイムスタンプで古い順に並ぶ
+        path = self.spool_dir / f"{time.time_ns():020d}_{table}{SEGMENT_SUFFIX}"
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(magic)
+            f.write(struct.pack(">I", len(header)))
+            f.write(header)
+            f.write(payload)
+        os.replace(tmp_path, path)
+        return path
+
+    def read_header(self, path: Path) -> SpoolSegment:
+        """セグメントのヘッダーのみを読み込む"""
+        with open(path, "rb") as f:
+            f.read(4)
+            (header_len,) = struct.unpack(">I", f.read(4))
+            header = json.loads(f.read(header_len))
+        return SpoolSegment(
+            path=path,
+            table=header["table"],
+            columns=tuple(header["columns"]),
+            source_db=header["source_db"],
+            source_table=header["source_table"],
+            id_ranges=[tuple(r) for r in header["id_ranges"]],
+            row_count=header["rows"],
+            created_at=header["created_at"],
+        )
+
+    def read(self, path: Path) -> SpoolSegment:
+        """セグメントを読み込み、ペイロードを展開"""
+        segment = self.read_header(path)
+        with open(path, "rb") as f:
+            magic = f.read(4)
+            (header_len,) = struct.unpack(">I", f.read(4))
+            f.seek(header_len, os.SEEK_CUR)
+            segment.payload = self._decompress(magic, f.read())
+        return segment
+
+    def claim(self, path: Path) -> Optional[Path]:
+        """
+        再送のためにセグメントを確保（複数プロセスによる二重送信を防止）
+
+        Returns:
+            確保したセグメントのパス（他プロセスが確保済みの場合はNone）
+        """
+        claimed = path.with_suffix(CLAIMED_SUFFIX)
+        try:
+            path.rename(claimed)
+        except FileNotFoundError:
+            return None
+        return claimed
+
+    def release(self, claimed: Path) -> None:
+        """確保したセグメントを未送信に戻す"""
+        claimed.rename(claimed.with_suffix(SEGMENT_SUFFIX))
+
+    def remove(self, path: Path) -> None:
+        """セグメントを削除"""
+        path.unlink(missing_ok=True)
+
+    def evict(self) -> List[SpoolSegment]:
+        """
+        上限を超えている場合、古いセグメントから削除
+
+        最新のセグメントは削除しない。
+
+        Returns:
+            削除したセグメントのヘッダー（呼び出し元が同期元のsynced_atを戻す）
+        """
+        segments = self.segments()
+        sizes: Dict[Path, int] = {p: p.stat().st_size for p in segments}
+        total = sum(sizes.values())
+
+        evicted = []
+        for path in segments[:-1]:
+            if total <= self.max_bytes:
+                break
+            evicted.append(self.read_header(path))
+            self.remove(path)
+            total -= sizes[path]
+
+        if evicted:
+            self.logger.warning(
+                f"スプール上限（{self.max_bytes}バイト）を超えたため "
+                f"{len(evicted)}セグメントを退避しました"
+            )
+        return evicted
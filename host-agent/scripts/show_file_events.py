@@ -106,6 +106,8 @@ def show_events(database: FileChangeDatabase, limit: int = 50):
         print(f"     プロジェクト: {project_name}")
         print(f"     パス: {file_path}")
         print(f"     サイズ: {file_size} {is_symlink}")
+        if event.get('lines_added') is not None:
+            print(f"     行数: +{event['lines_added']} -{event['lines_removed']}")
         print()
 
     # 統計サマリー
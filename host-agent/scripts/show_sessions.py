@@ -71,7 +71,7 @@ def show_sessions(limit=10):
             duration_seconds,
             application_name,
             window_title
-        FROM desktop_activity_sessions
+        FROM desktop_activity_sessions_view
         ORDER BY start_time DESC
         LIMIT ?
     """, (limit,))
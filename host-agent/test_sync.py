@@ -9,13 +9,14 @@ import logging
 import sys
 from pathlib import Path
 from datetime import datetime
+import sqlite3
 import time
 
 # 親ディレクトリをパスに追加
 sys.path.insert(0, str(Path(__file__).parent))
 
 from common.database import DesktopActivityDatabase, FileChangeDatabase
-from common.models import ActivitySession
+from common.models import ActivitySession, FileChangeEvent
 from common.data_sync import DataSyncManager
 from common.config import ConfigManager
 
@@ -97,8 +98,15 @@ async def test_sync():
     await sync_manager.sync_all()
     logger.info("  同期が完了しました")
 
-    # ステップ4: 結果確認
-    logger.info("\nステップ4: 同期結果を確認")
+    # ステップ4: 不正な行の隔離
+    logger.info("\nステップ4: 不正な行（解釈できない時刻・型の異なる値）の隔離を確認")
+    logger.info("-" * 60)
+
+    poison_ok = await check_poison_rows(sync_manager, desktop_db_path, file_db_path, logger)
+    logger.info(f"  {'✅' if poison_ok else '❌'} 不正な行の隔離")
+
+    # ステップ5: 結果確認
+    logger.info("\nステップ5: 同期結果を確認")
     logger.info("-" * 60)
     logger.info("  PostgreSQLに同期されたデータを確認してください:")
     logger.info("  ./scripts/show-sync-stats.sh")
@@ -117,5 +125,72 @@ async def test_sync():
     logger.info("=" * 60)
 
 
+async def check_poison_rows(
+    sync_manager: DataSyncManager, desktop_db_path: str, file_db_path: str, logger: logging.Logger
+) -> bool:
+    """
+    不正な行が隔離され、他の行の同期を妨げないことを確認
+
+    SQLiteはカラムの型を強制しないため、直接書き換えて不正な行を作る。
+
+    Returns:
+        bool: 不正な行がsync_quarantineに隔離され、未同期の行が残っていない場合True
+    """
+    current_time = int(time.time())
+
+    desktop_db = DesktopActivityDatabase(desktop_db_path)
+    good_id = desktop_db.save_session(ActivitySession(
+        start_time=current_time - 60, application_name="Terminal", window_title="ok - Terminal"
+    ))
+    bad_time_id = desktop_db.save_session(ActivitySession(
+        start_time=current_time - 30, application_name="Terminal", window_title="poison - Terminal"
+    ))
+    desktop_db.connection.execute(
+        "UPDATE desktop_activity_sessions SET start_time_iso = 'not-a-time' WHERE id = ?", (bad_time_id,)
+    )
+    desktop_db.connection.commit()
+    desktop_db.close()
+
+    file_db = FileChangeDatabase(file_db_path)
+    file_db.save_file_events_batch([
+        FileChangeEvent(
+            current_time, datetime.now().isoformat(), 'modified', f'/tmp/poison/{name}', name,
+            '/tmp', '.txt', 'poison', directory_path='/tmp/poison'
+        )
+        for name in ('ok.txt', 'bad.txt')
+    ])
+    bad_size_id = file_db.connection.execute(
+        "SELECT MAX(id) FROM file_change_events"
+    ).fetchone()[0]
+    file_db.connection.execute(
+        "UPDATE file_change_events SET file_size = 'big' WHERE id = ?", (bad_size_id,)
+    )
+    file_db.connection.commit()
+    file_db.close()
+
+    result = await sync_manager.sync_all()
+    logger.info(f"  同期結果: {result}")
+
+    quarantined = set()
+    for db_path, table in ((desktop_db_path, 'desktop_activity_sessions'), (file_db_path, 'file_change_events')):
+        conn = sqlite3.connect(db_path)
+        try:
+            quarantined |= {
+                (table, row[0]) for row in conn.execute(
+                    "SELECT record_id FROM sync_quarantine WHERE source_table = ?", (table,)
+                )
+            }
+            unsynced = conn.execute(f"SELECT COUNT(*) FROM {table} WHERE synced_at IS NULL").fetchone()[0]
+        finally:
+            conn.close()
+        logger.info(f"  {table}: 未同期 {unsynced}件")
+        if unsynced:
+            return False
+
+    expected = {('desktop_activity_sessions', bad_time_id), ('file_change_events', bad_size_id)}
+    logger.info(f"  隔離された行: {sorted(quarantined & expected)}（正常な行 id={good_id} は同期済み）")
+    return expected <= quarantined and ('desktop_activity_sessions', good_id) not in quarantined
+
+
 if __name__ == "__main__":
     asyncio.run(test_sync())
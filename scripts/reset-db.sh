@@ -43,8 +43,13 @@ echo "🗑️  データベースをリセット中..."
 # 全テーブルを削除
 echo "  - 既存テーブルを削除..."
 docker compose exec -T database psql -U reprospective_user -d reprospective << 'EOF' > /dev/null 2>&1
+DROP VIEW IF EXISTS desktop_activity_sessions CASCADE;
+DROP VIEW IF EXISTS file_change_events CASCADE;
 DROP TABLE IF EXISTS desktop_activity_sessions CASCADE;
 DROP TABLE IF EXISTS file_change_events CASCADE;
+DROP TABLE IF EXISTS desktop_activity_sessions_data CASCADE;
+DROP TABLE IF EXISTS file_change_events_data CASCADE;
+DROP TABLE IF EXISTS dim_applications, dim_window_titles, dim_monitored_roots, dim_projects, dim_file_extensions, dim_directories CASCADE;
 DROP TABLE IF EXISTS monitored_directories CASCADE;
 DROP TABLE IF EXISTS sync_logs CASCADE;
 DROP TABLE IF EXISTS schema_version CASCADE;
@@ -26,6 +26,7 @@ usage() {
     echo "  --desktop          デスクトップモニターのみ起動"
     echo "  --files            ファイルシステムウォッチャーのみ起動"
     echo "  --input            入力モニターのみ起動"
+    echo "  --supervised       選択したコレクターを1プロセスで起動 (agent.py)"
     echo "  -h, --help         このヘルプを表示"
     echo ""
     echo "例:"
@@ -33,6 +34,8 @@ usage() {
     echo "  $0 --desktop       # デスクトップモニターのみ"
     echo "  $0 --files         # ファイルウォッチャーのみ"
     echo "  $0 --input         # 入力モニターのみ"
+    echo "  $0 --supervised    # デスクトップ・入力モニターを1プロセスで起動"
+    echo "  $0 --all --supervised  # すべてを1プロセスで起動"
     exit 1
 }
 
@@ -58,6 +61,7 @@ is_running() {
 start_agent() {
     local name=$1
     local script=$2
+    shift 2
     local pid_file="$PID_DIR/${name}.pid"
     local log_file="$LOG_DIR/${name}.log"
 
@@ -78,7 +82,7 @@ start_agent() {
 
     # バックグラウンドで起動
     cd "$HOST_AGENT_DIR"
-    nohup ./venv/bin/python "$script" > "$log_file" 2>&1 &
+    nohup ./venv/bin/python "$script" "$@" > "$log_file" 2>&1 &
     local pid=$!
     echo "$pid" > "$pid_file"
 
@@ -100,6 +104,7 @@ START_ALL=true
 START_DESKTOP=false
 START_FILES=false
 START_INPUT=false
+SUPERVISED=false
 
 if [ $# -eq 0 ]; then
     # ファイル監視を除くすべてのエージェントを起動
@@ -122,6 +127,9 @@ else
             --input)
                 START_INPUT=true
                 ;;
+            --supervised)
+                SUPERVISED=true
+                ;;
             -h|--help)
                 usage
                 ;;
@@ -134,6 +142,13 @@ else
     done
 fi
 
+# --supervised のみ指定された場合はデフォルトと同じコレクターを起動
+if [ "$SUPERVISED" = true ] && [ "$START_ALL" = false ] && [ "$START_DESKTOP" = false ] \
+    && [ "$START_FILES" = false ] && [ "$START_INPUT" = false ]; then
+    START_DESKTOP=true
+    START_INPUT=true
+fi
+
 # allオプションの場合はすべて有効化
 if [ "$START_ALL" = true ]; then
     START_DESKTOP=true
@@ -172,22 +187,46 @@ fi
 # エージェントを起動
 STARTED_COUNT=0
 
-if [ "$START_DESKTOP" = true ]; then
-    if start_agent "desktop-monitor" "collectors/linux_x11_monitor.py"; then
+if [ "$SUPERVISED" = true ]; then
+    # 統合プロセス: 個別プロセスと同時に起動すると同じデータを二重に記録するため確認する
+    for name in desktop-monitor filesystem-watcher input-monitor; do
+        if is_running "$name"; then
+            echo "  ❌ $name が個別プロセスで実行中です。先に ./scripts/stop-agent.sh で停止してください"
+            exit 1
+        fi
+    done
+
+    COLLECTORS=()
+    [ "$START_DESKTOP" = true ] && COLLECTORS+=("desktop")
+    [ "$START_FILES" = true ] && COLLECTORS+=("files")
+    [ "$START_INPUT" = true ] && COLLECTORS+=("input")
+
+    if start_agent "agent" "agent.py" --collectors "${COLLECTORS[@]}"; then
         STARTED_COUNT=$((STARTED_COUNT + 1))
     fi
-fi
+else
+    if is_running "agent"; then
+        echo "  ❌ 統合プロセス (agent) が実行中です。先に ./scripts/stop-agent.sh で停止してください"
+        exit 1
+    fi
 
-if [ "$START_FILES" = true ]; then
-    # v2（PostgreSQL連携版）を優先的に使用
-    if start_agent "filesystem-watcher" "collectors/filesystem_watcher_v2.py"; then
-        STARTED_COUNT=$((STARTED_COUNT + 1))
+    if [ "$START_DESKTOP" = true ]; then
+        if start_agent "desktop-monitor" "collectors/linux_x11_monitor.py"; then
+            STARTED_COUNT=$((STARTED_COUNT + 1))
+        fi
     fi
-fi
 
-if [ "$START_INPUT" = true ]; then
-    if start_agent "input-monitor" "collectors/input_monitor.py"; then
-        STARTED_COUNT=$((STARTED_COUNT + 1))
+    if [ "$START_FILES" = true ]; then
+        # v2（PostgreSQL連携版）を優先的に使用
+        if start_agent "filesystem-watcher" "collectors/filesystem_watcher_v2.py"; then
+            STARTED_COUNT=$((STARTED_COUNT + 1))
+        fi
+    fi
+
+    if [ "$START_INPUT" = true ]; then
+        if start_agent "input-monitor" "collectors/input_monitor.py"; then
+            STARTED_COUNT=$((STARTED_COUNT + 1))
+        fi
     fi
 fi
 
@@ -214,6 +253,7 @@ echo "   ./scripts/stop-agent.sh --desktop      # デスクトップモニター
 echo "   ./scripts/stop-agent.sh --input        # 入力モニターのみ停止"
 echo "   tail -f $LOG_DIR/desktop-monitor.log   # デスクトップログ確認"
 echo "   tail -f $LOG_DIR/input-monitor.log     # 入力モニターログ確認"
+echo "   tail -f $LOG_DIR/agent.log             # 統合プロセスログ確認 (--supervised)"
 echo "   cd host-agent && python scripts/show_sessions.py         # デスクトップデータ確認"
 echo "   cd host-agent && python scripts/show_input_sessions.py   # 入力データ確認"
 echo ""
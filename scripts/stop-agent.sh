@@ -21,6 +21,7 @@ usage() {
     echo "  --desktop          デスクトップモニターのみ停止"
     echo "  --files            ファイルシステムウォッチャーのみ停止"
     echo "  --input            入力モニターのみ停止"
+    echo "  --supervised       統合プロセス (agent.py) のみ停止"
     echo "  -h, --help         このヘルプを表示"
     echo ""
     echo "例:"
@@ -65,12 +66,12 @@ stop_agent() {
     # SIGTERMを送信
     kill "$pid" 2>/dev/null || true
 
-    # プロセスが終了するまで待機（最大10秒）
+    # プロセスが終了するまで待機（最大20秒、統合プロセスはコレクターの後処理を待つ）
     local count=0
     while ps -p "$pid" > /dev/null 2>&1; do
         sleep 0.5
         count=$((count + 1))
-        if [ $count -ge 20 ]; then
+        if [ $count -ge 40 ]; then
             # タイムアウト: 強制終了
             echo "     ⚠️  正常終了しなかったため強制終了します..."
             kill -9 "$pid" 2>/dev/null || true
@@ -95,6 +96,7 @@ STOP_ALL=true
 STOP_DESKTOP=false
 STOP_FILES=false
 STOP_INPUT=false
+STOP_SUPERVISED=false
 
 if [ $# -eq 0 ]; then
     STOP_ALL=true
@@ -114,6 +116,9 @@ else
             --input)
                 STOP_INPUT=true
                 ;;
+            --supervised)
+                STOP_SUPERVISED=true
+                ;;
             -h|--help)
                 usage
                 ;;
@@ -131,6 +136,7 @@ if [ "$STOP_ALL" = true ]; then
     STOP_DESKTOP=true
     STOP_FILES=true
     STOP_INPUT=true
+    STOP_SUPERVISED=true
 fi
 
 echo "================================"
@@ -165,6 +171,12 @@ if [ "$STOP_INPUT" = true ]; then
     fi
 fi
 
+if [ "$STOP_SUPERVISED" = true ]; then
+    if stop_agent "agent"; then
+        STOPPED_COUNT=$((STOPPED_COUNT + 1))
+    fi
+fi
+
 echo ""
 echo "================================"
 echo "✅ 停止完了 ($STOPPED_COUNT エージェント)"
@@ -0,0 +1,132 @@
+"""
+レスポンスキャッシュ管理
+
+監視対象ディレクトリ一覧のレスポンスをプロセス内にキャッシュする。
+キャッシュはmonitored_directoriesのバージョンに紐づき、
+作成・更新・削除・切り替えハンドラ、またはPostgreSQLのNOTIFYで無効化される。
+"""
+import asyncpg
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# monitored_directories変更通知チャネル（07_add_monitored_directories_notify.sql参照）
+DIRECTORIES_CHANNEL = "monitored_directories_changed"
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """キャッシュ済みレスポンス"""
+
+    body: bytes       # JSONシリアライズ済みのレスポンスボディ
+    etag: str         # 強いETag（ダブルクォート付き）
+    cached_at: float  # 格納時刻（time.monotonic()）
+
+
+class DirectoryListCache:
+    """
+    監視対象ディレクトリ一覧キャッシュ
+
+    バージョン番号はinvalidate()のたびに増加する。
+    クエリ実行中に無効化された場合は、古い結果をキャッシュしない。
+    NOTIFYを取りこぼした場合に備え、ttl秒を超えたエントリは再取得する。
+    """
+
+    def __init__(self, ttl: float):
+        """
+        Args:
+            ttl: キャッシュ有効期間（秒、0以下でキャッシュ無効）
+        """
+        self.ttl = ttl
+        self.version = 0
+        self._entries: Dict[str, CachedResponse] = {}
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """キャッシュを取得（存在しない・期限切れの場合はNone）"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry.cached_at > self.ttl:
+            del self._entries[key]
+            return None
+        return entry
+
+    def put(self, key: str, body: bytes, version: int) -> CachedResponse:
+        """
+        レスポンスをキャッシュに格納
+
+        Args:
+            key: キャッシュキー（クエリ条件）
+            body: レスポンスボディ
+            version: クエリ実行前に取得したバージョン
+
+        Returns:
+            CachedResponse: ETag付きレスポンス
+        """
+        # 内容のハッシュを使うため、再起動後や複数プロセス間でも同じ内容なら同じETagになる
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        entry = CachedResponse(body=body, etag=etag, cached_at=time.monotonic())
+
+        # クエリ中に無効化されていなければ格納
+        if version == self.version:
+            self._entries[key] = entry
+        return entry
+
+    def invalidate(self, reason: str = "") -> None:
+        """キャッシュを無効化"""
+        self.version += 1
+        self._entries.clear()
+        logger.debug(f"ディレクトリ一覧キャッシュを無効化: version={self.version} {reason}")
+
+
+# グローバルキャッシュインスタンス
+directory_cache = DirectoryListCache(ttl=settings.directory_cache_ttl)
+
+# NOTIFY受信用の専用接続（プール外で保持する）
+_listener_conn: Optional[asyncpg.Connection] = None
+
+
+def _on_directories_changed(conn, pid, channel, payload) -> None:
+    """NOTIFY受信時のコールバック"""
+    directory_cache.invalidate(f"(NOTIFY: {payload})")
+
+
+def _on_listener_terminated(conn) -> None:
+    """購読用接続が切断された場合のコールバック"""
+    global _listener_conn
+    _listener_conn = None
+    directory_cache.invalidate("(通知用接続切断)")
+    logger.warning("キャッシュ無効化通知の接続が切断されました（TTLによる再取得で継続）")
+
+
+async def start_cache_listener() -> None:
+    """
+    monitored_directoriesの変更通知の購読を開始
+
+    他のゲートウェイやエージェント（YAML移行など）による変更も検知する。
+    接続失敗時はハンドラからの無効化のみで動作する。
+    """
+    global _listener_conn
+    try:
+        _listener_conn = await asyncpg.connect(settings.database_url)
+        await _listener_conn.add_listener(DIRECTORIES_CHANNEL, _on_directories_changed)
+        _listener_conn.add_termination_listener(_on_listener_terminated)
+        logger.info(f"キャッシュ無効化通知の購読を開始: {DIRECTORIES_CHANNEL}")
+    except Exception as e:
+        _listener_conn = None
+        logger.warning(f"キャッシュ無効化通知の購読に失敗（ハンドラ経由の無効化のみ）: {e}")
+
+
+async def stop_cache_listener() -> None:
+    """変更通知の購読を停止"""
+    global _listener_conn
+    if _listener_conn:
+        await _listener_conn.close()
+        _listener_conn = None
+        logger.info("キャッシュ無効化通知の購読を停止しました")
@@ -29,6 +29,25 @@ class Settings(BaseSettings):
     # デバッグ設定
     debug_mode: bool = False  # デフォルトは無効（本番環境用）
 
+    # ディレクトリ一覧キャッシュ設定
+    directory_cache_ttl: float = 300.0  # キャッシュ有効期間（秒、0でキャッシュ無効）
+
+    # データ取り込みAPI設定
+    ingest_max_body_bytes: int = 32 * 1024 * 1024  # 1リクエストの最大ペイロード（展開後）
+
+    # アクティビティ参照API設定
+    activity_max_page_size: int = 1000  # 一覧取得の1ページ最大件数
+    activity_latency_target_ms: int = 200  # クエリのレイテンシ目標（超過時に警告ログ）
+    activity_query_timeout: float = 10.0  # クエリのタイムアウト（秒）
+    activity_export_prefetch: int = 1000  # エクスポート時にカーソルから一度に読み出す行数
+    timeline_prefetch: int = 200  # タイムラインでストリームごとにカーソルから一度に読み出す行数
+    timeline_max_buckets: int = 10000  # タイムラインの区間集計で1ページに返す最大区間数
+
+    # ライブフィード設定
+    live_feed_queue_size: int = 1000  # 購読者ごとの未送信イベントの上限（超えた購読者は切断）
+    live_feed_max_subscribers: int = 100  # 同時購読者数の上限
+    live_feed_keepalive_seconds: float = 15.0  # イベントがない間のキープアライブ送信間隔（秒）
+
     @field_validator("cors_origins", mode="before")
     @classmethod
     def parse_cors_origins(cls, v):
@@ -4,7 +4,7 @@ asyncpgを使用したPostgreSQL非同期接続
 """
 import asyncpg
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from typing import AsyncGenerator, AsyncIterator
 import logging
 
 from app.config import settings
@@ -59,3 +59,18 @@ async def get_db() -> AsyncGenerator[asyncpg.Connection, None]:
         yield conn
     finally:
         await release_db_connection(conn)
+
+
+@asynccontextmanager
+async def acquire_db_connection() -> AsyncIterator[asyncpg.Connection]:
+    """
+    データベース接続を取得するコンテキストマネージャー
+
+    StreamingResponseのジェネレーター内など、Dependsのライフサイクル外で
+    接続を保持する必要がある場合に使用する。
+    """
+    conn = await get_db_connection()
+    try:
+        yield conn
+    finally:
+        await release_db_connection(conn)
@@ -0,0 +1,280 @@
+"""
+ライブアクティビティフィード
+
+新しく同期されたデスクトップセッション・ファイル変更イベント・入力活動セッションを
+購読中のクライアントへ配信する（/api/v1/activity/live のServer-Sent Events）。
+
+- PostgreSQLの挿入トリガーが発行するNOTIFY（12_add_activity_notify.sql参照）を専用接続で受信する
+- 通知されたIDの行は購読者の数に関わらず1回だけ取得し、プロセス内の全購読者に配信する
+  （購読者がいない間は取得しない）
+- 購読者ごとのキューは上限付きで、あふれた購読者（読み出しの遅いクライアント）は切断する
+"""
+import asyncio
+import asyncpg
+import json
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, List, Optional, Set
+
+from app.config import settings
+from app.database import acquire_db_connection
+from app.utils import STREAMS, TIMELINE_STREAMS, encode_timeline_cursor, timeline_item
+
+logger = logging.getLogger(__name__)
+
+# 挿入通知チャネル（12_add_activity_notify.sql参照）
+ACTIVITY_CHANNEL = "activity_inserted"
+
+# 通知のテーブル名（実データテーブル） → ストリーム名
+NOTIFY_TABLE_STREAMS = {
+    "desktop_activity_sessions_data": "desktop_sessions",
+    "file_change_events_data": "file_events",
+    "input_activity_sessions": "input_sessions",
+}
+
+# 取得待ちの通知の上限（取得が追いつかない場合は通知を破棄する）
+MAX_PENDING_NOTIFICATIONS = 10000
+
+
+def format_sse(event: str, data: Dict[str, Any], event_id: Optional[str] = None) -> bytes:
+    """
+    Server-Sent Eventsの1イベントをエンコード
+
+    Args:
+        event: イベント名
+        data: JSONで送る内容
+        event_id: イベントID（クライアントのLast-Event-IDになる）
+    """
+    body = json.dumps(
+        data,
+        ensure_ascii=False,
+        default=lambda value: value.isoformat() if isinstance(value, datetime) else str(value),
+    )
+    lines = [f"id: {event_id}"] if event_id else []
+    lines += [f"event: {event}", f"data: {body}"]
+    return ("\n".join(lines) + "\n\n").encode("utf-8")
+
+
+@dataclass(eq=False)
+class Subscriber:
+    """ライブフィードの購読者"""
+
+    streams: FrozenSet[str]   # 配信対象のストリーム名
+    queue: asyncio.Queue      # 配信待ちのエンコード済みイベント（Noneは切断の合図）
+    dropped: bool = False     # キューがあふれて切断されたか
+
+
+@dataclass
+class ActivityBroadcaster:
+    """
+    購読者へのイベント配信
+
+    publish() は待機しないため、遅い購読者が他の購読者や通知の受信を止めることはない。
+    """
+
+    queue_size: int
+    max_subscribers: int
+    subscribers: Set[Subscriber] = field(default_factory=set)
+    dropped_total: int = 0
+
+    def subscribe(self, streams: FrozenSet[str]) -> Optional[Subscriber]:
+        """
+        購読を開始
+
+        Args:
+            streams: 配信対象のストリーム名
+
+        Returns:
+            Subscriber: 購読者（上限に達している場合はNone）
+        """
+        if self.is_full():
+            return None
+        subscriber = Subscriber(streams=streams, queue=asyncio.Queue(maxsize=self.queue_size))
+        self.subscribers.add(subscriber)
+        logger.debug(f"ライブフィード購読開始: subscribers={len(self.subscribers)}")
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        """購読を終了"""
+        self.subscribers.discard(subscriber)
+        logger.debug(f"ライブフィード購読終了: subscribers={len(self.subscribers)}")
+
+    def wanted_streams(self) -> Set[str]:
+        """いずれかの購読者が対象とするストリーム名"""
+        wanted: Set[str] = set()
+        for subscriber in self.subscribers:
+            wanted |= subscriber.streams
+        return wanted
+
+    def is_full(self) -> bool:
+        """購読者数が上限に達しているか"""
+        return len(self.subscribers) >= self.max_subscribers
+
+    def publish(self, stream: str, event: bytes) -> None:
+        """
+        エンコード済みのイベントを対象の購読者のキューに追加
+
+        キューがあふれた購読者は未配信のイベントを破棄して切断する。
+        """
+        for subscriber in list(self.subscribers):
+            if stream not in subscriber.streams:
+                continue
+            try:
+                subscriber.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self._drop(subscriber)
+
+    def close_all(self) -> None:
+        """全購読者を切断（シャットダウン時）"""
+        for subscriber in list(self.subscribers):
+            self._disconnect(subscriber)
+
+    def _drop(self, subscriber: Subscriber) -> None:
+        """読み出しの遅い購読者を切断"""
+        subscriber.dropped = True
+        self.dropped_total += 1
+        self._disconnect(subscriber)
+        logger.warning(
+            f"ライブフィードの購読者を切断しました（キュー上限 {self.queue_size} 件超過、"
+            f"累計 {self.dropped_total} 件）"
+        )
+
+    def _disconnect(self, subscriber: Subscriber) -> None:
+        """未配信のイベントを破棄し、切断の合図を送る"""
+        self.subscribers.discard(subscriber)
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(None)
+
+
+class ActivityFeed:
+    """
+    挿入通知の受信と行の取得
+
+    通知はコールバックで受け取ってキューに積み、取得用タスクが溜まった通知をまとめて
+    テーブルごとに1回のクエリで取得する（同期のバッチが行ごとに通知しても取得は1回）。
+    通知用接続が切断された場合は再接続する（切断中に挿入された行は配信されない）。
+    """
+
+    def __init__(self, broadcaster: ActivityBroadcaster):
+        self.broadcaster = broadcaster
+        self._notifications: asyncio.Queue = asyncio.Queue(maxsize=MAX_PENDING_NOTIFICATIONS)
+        self._tasks: List[asyncio.Task] = []
+        self._conn: Optional[asyncpg.Connection] = None
+
+    async def start(self) -> None:
+        """通知の受信と行の取得を開始"""
+        self._tasks = [
+            asyncio.create_task(self._listen()),
+            asyncio.create_task(self._dispatch()),
+        ]
+
+    async def stop(self) -> None:
+        """停止して全購読者を切断"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+        self.broadcaster.close_all()
+        logger.info("ライブフィードを停止しました")
+
+    def _on_notification(self, conn, pid, channel, payload) -> None:
+        """NOTIFY受信時のコールバック（購読者がいない間は破棄）"""
+        if not self.broadcaster.subscribers:
+            return
+        try:
+            self._notifications.put_nowait(payload)
+        except asyncio.QueueFull:
+            logger.warning("ライブフィードの取得待ち通知が上限に達したため、通知を破棄しました")
+
+    async def _listen(self) -> None:
+        """通知用接続を保持し、切断された場合は再接続する"""
+        delay = 1.0
+        while True:
+            terminated = asyncio.Event()
+            try:
+                self._conn = await asyncpg.connect(settings.database_url)
+                self._conn.add_termination_listener(lambda conn: terminated.set())
+                await self._conn.add_listener(ACTIVITY_CHANNEL, self._on_notification)
+                logger.info(f"ライブフィード通知の購読を開始: {ACTIVITY_CHANNEL}")
+                delay = 1.0
+                await terminated.wait()
+                logger.warning("ライブフィード通知の接続が切断されました（再接続します）")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"ライブフィード通知の購読に失敗（{delay:.0f}秒後に再試行）: {e}")
+            if self._conn is not None and not self._conn.is_closed():
+                self._conn.terminate()
+            self._conn = None
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 60.0)
+
+    async def _dispatch(self) -> None:
+        """溜まった通知のIDをテーブルごとにまとめて取得し、購読者に配信する"""
+        while True:
+            payloads = [await self._notifications.get()]
+            while not self._notifications.empty():
+                payloads.append(self._notifications.get_nowait())
+
+            ids_by_stream: Dict[str, List[int]] = {}
+            for payload in payloads:
+                try:
+                    message = json.loads(payload)
+                    stream = NOTIFY_TABLE_STREAMS[message["table"]]
+                except (ValueError, KeyError) as e:
+                    logger.warning(f"不正なライブフィード通知を無視しました: {payload[:200]} ({e})")
+                    continue
+                ids_by_stream.setdefault(stream, []).extend(message["ids"])
+
+            wanted = self.broadcaster.wanted_streams()
+            for stream in TIMELINE_STREAMS:
+                ids = ids_by_stream.get(stream)
+                if not ids or stream not in wanted:
+                    continue
+                try:
+                    await self._fetch_and_publish(stream, ids)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"ライブフィードの行取得エラー ({stream}, {len(ids)}件): {e}")
+
+    async def _fetch_and_publish(self, stream_name: str, ids: List[int]) -> None:
+        """通知されたIDの行を取得して配信"""
+        stream = STREAMS[stream_name]
+        query = f"""
+            SELECT {", ".join(stream.columns)}
+            FROM {stream.table}
+            WHERE id = ANY($1::bigint[])
+            ORDER BY {stream.time_column} ASC, id ASC
+        """
+        async with acquire_db_connection() as conn:
+            rows = await conn.fetch(query, ids, timeout=settings.activity_query_timeout)
+
+        # エンコードは購読者の数に関わらず1行1回
+        for row in rows:
+            key = (row[stream.time_column], stream_name, row["id"])
+            event = format_sse("activity", timeline_item(key, row), encode_timeline_cursor(key))
+            self.broadcaster.publish(stream_name, event)
+
+
+# グローバルインスタンス
+broadcaster = ActivityBroadcaster(
+    queue_size=settings.live_feed_queue_size,
+    max_subscribers=settings.live_feed_max_subscribers,
+)
+activity_feed = ActivityFeed(broadcaster)
+
+
+async def start_activity_feed() -> None:
+    """ライブフィードを開始（通知用接続の確立は待たない）"""
+    await activity_feed.start()
+
+
+async def stop_activity_feed() -> None:
+    """ライブフィードを停止"""
+    await activity_feed.stop()
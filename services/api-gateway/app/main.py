@@ -1,6 +1,6 @@
 """
 Reprospective API Gateway
-監視対象ディレクトリ管理API
+監視対象ディレクトリ管理API・アクティビティ参照API
 """
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
@@ -9,7 +9,9 @@ import logging
 
 from app.config import settings
 from app.database import init_db_pool, close_db_pool
-from app.routers import health, directories, debug
+from app.cache import start_cache_listener, stop_cache_listener
+from app.live_feed import start_activity_feed, stop_activity_feed
+from app.routers import health, directories, activity, ingest, debug
 
 # ロギング設定
 logging.basicConfig(
@@ -25,12 +27,16 @@ async def lifespan(app: FastAPI):
     # 起動時処理
     logger.info("API Gateway起動中...")
     await init_db_pool()
+    await start_cache_listener()
+    await start_activity_feed()
     logger.info("API Gateway起動完了")
 
     yield
 
     # 終了時処理
     logger.info("API Gatewayシャットダウン中...")
+    await stop_activity_feed()
+    await stop_cache_listener()
     await close_db_pool()
     logger.info("API Gatewayシャットダウン完了")
 
@@ -50,11 +56,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 # ルーター登録
 app.include_router(health.router)
 app.include_router(directories.router)
+app.include_router(activity.router)
+app.include_router(ingest.router)
 
 # デバッグモード有効時のみデバッグルーター登録
 if settings.debug_mode:
@@ -4,9 +4,35 @@ from app.models.monitored_directory import (
     MonitoredDirectoryCreate,
     MonitoredDirectoryUpdate,
 )
+from app.models.activity import (
+    DesktopSession,
+    FileEvent,
+    InputSession,
+    DesktopSessionPage,
+    FileEventPage,
+    InputSessionPage,
+    ActivitySummaryItem,
+    ActivitySummary,
+    TimelineItem,
+    TimelinePage,
+    TimelineBucket,
+    TimelineBucketPage,
+)
 
 __all__ = [
     "MonitoredDirectory",
     "MonitoredDirectoryCreate",
     "MonitoredDirectoryUpdate",
+    "DesktopSession",
+    "FileEvent",
+    "InputSession",
+    "DesktopSessionPage",
+    "FileEventPage",
+    "InputSessionPage",
+    "ActivitySummaryItem",
+    "ActivitySummary",
+    "TimelineItem",
+    "TimelinePage",
+    "TimelineBucket",
+    "TimelineBucketPage",
 ]
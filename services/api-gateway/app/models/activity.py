@@ -0,0 +1,120 @@
+"""
+アクティビティ参照APIのデータモデル
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field
+
+
+class DesktopSession(BaseModel):
+    """デスクトップアクティビティセッション"""
+
+    id: int = Field(..., description="ID")
+    start_time: int = Field(..., description="開始時刻（UNIXエポック秒）")
+    end_time: Optional[int] = Field(None, description="終了時刻（UNIXエポック秒）")
+    start_time_iso: datetime = Field(..., description="開始時刻")
+    end_time_iso: Optional[datetime] = Field(None, description="終了時刻")
+    application_name: str = Field(..., description="アプリケーション名")
+    window_title: str = Field(..., description="ウィンドウタイトル")
+    duration_seconds: Optional[int] = Field(None, description="継続時間（秒）")
+
+
+class FileEvent(BaseModel):
+    """ファイル変更イベント"""
+
+    id: int = Field(..., description="ID")
+    event_time: int = Field(..., description="イベント発生時刻（UNIXエポック秒）")
+    event_time_iso: datetime = Field(..., description="イベント発生時刻")
+    event_type: str = Field(..., description="イベントタイプ")
+    file_path: str = Field(..., description="ファイルの絶対パス")
+    file_name: str = Field(..., description="ファイル名")
+    file_extension: Optional[str] = Field(None, description="拡張子")
+    file_size: Optional[int] = Field(None, description="サイズ（バイト）")
+    monitored_root: str = Field(..., description="監視ルート")
+    project_name: Optional[str] = Field(None, description="プロジェクト名")
+    desktop_session_id: Optional[int] = Field(None, description="発生時刻を含むデスクトップセッションのID")
+    lines_added: Optional[int] = Field(None, description="追加した行数（記録していない場合はnull）")
+    lines_removed: Optional[int] = Field(None, description="削除した行数（記録していない場合はnull）")
+
+
+class InputSession(BaseModel):
+    """入力活動セッション"""
+
+    id: int = Field(..., description="ID")
+    start_time: int = Field(..., description="開始時刻（UNIXエポック秒）")
+    end_time: Optional[int] = Field(None, description="終了時刻（UNIXエポック秒）")
+    start_time_iso: datetime = Field(..., description="開始時刻")
+    end_time_iso: Optional[datetime] = Field(None, description="終了時刻")
+    duration_seconds: Optional[int] = Field(None, description="継続時間（秒）")
+    host_identifier: str = Field(..., description="同期元ホスト識別子")
+
+
+class DesktopSessionPage(BaseModel):
+    """デスクトップセッション一覧（ページ単位）"""
+
+    items: List[DesktopSession] = Field(..., description="セッションのリスト")
+    next_cursor: Optional[str] = Field(None, description="次ページのカーソル（最終ページはnull）")
+
+
+class FileEventPage(BaseModel):
+    """ファイル変更イベント一覧（ページ単位）"""
+
+    items: List[FileEvent] = Field(..., description="イベントのリスト")
+    next_cursor: Optional[str] = Field(None, description="次ページのカーソル（最終ページはnull）")
+
+
+class InputSessionPage(BaseModel):
+    """入力活動セッション一覧（ページ単位）"""
+
+    items: List[InputSession] = Field(..., description="セッションのリスト")
+    next_cursor: Optional[str] = Field(None, description="次ページのカーソル（最終ページはnull）")
+
+
+class ActivitySummaryItem(BaseModel):
+    """集計結果の1行"""
+
+    key: Optional[str] = Field(None, description="集計キー（アプリ名、プロジェクト名、時間帯など）")
+    count: int = Field(..., description="件数")
+    total_seconds: Optional[int] = Field(None, description="合計継続時間（秒、セッションのみ）")
+    first_time: int = Field(..., description="最初の時刻（UNIXエポック秒）")
+    last_time: int = Field(..., description="最後の時刻（UNIXエポック秒）")
+
+
+class ActivitySummary(BaseModel):
+    """集計結果"""
+
+    stream: str = Field(..., description="集計対象ストリーム")
+    group_by: str = Field(..., description="集計キー種別")
+    items: List[ActivitySummaryItem] = Field(..., description="集計行のリスト")
+
+
+class TimelineItem(BaseModel):
+    """タイムラインの1行"""
+
+    stream: str = Field(..., description="ストリーム名（desktop_sessions / file_events / input_sessions）")
+    time: int = Field(..., description="時刻（UNIXエポック秒、セッションは開始時刻）")
+    id: int = Field(..., description="ストリーム内のID")
+    data: Dict[str, Any] = Field(..., description="行の内容（各ストリームの一覧APIと同じ項目）")
+
+
+class TimelinePage(BaseModel):
+    """タイムライン（ページ単位）"""
+
+    items: List[TimelineItem] = Field(..., description="時刻順に統合した行のリスト")
+    next_cursor: Optional[str] = Field(None, description="次ページのカーソル（最終ページはnull）")
+
+
+class TimelineBucket(BaseModel):
+    """タイムラインの1区間の集計"""
+
+    start: int = Field(..., description="区間の開始時刻（UNIXエポック秒、この時刻を含む）")
+    end: int = Field(..., description="区間の終了時刻（UNIXエポック秒、この時刻を含まない）")
+    counts: Dict[str, int] = Field(..., description="ストリーム名 → 件数")
+    total_seconds: Dict[str, int] = Field(..., description="ストリーム名 → 合計継続時間（秒、セッションのみ）")
+
+
+class TimelineBucketPage(BaseModel):
+    """タイムラインの区間集計（ページ単位）"""
+
+    buckets: List[TimelineBucket] = Field(..., description="行のある区間のリスト（時刻順）")
+    next_cursor: Optional[str] = Field(None, description="次ページのカーソル（最終ページはnull）")
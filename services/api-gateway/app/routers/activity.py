@@ -0,0 +1,795 @@
+"""
+アクティビティ参照APIエンドポイント
+
+デスクトップセッション、ファイル変更イベント、入力活動セッションを
+時間範囲・属性で絞り込み、一覧（キーセットページネーション）または
+SQL側で集計した結果を返す。
+"""
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, status
+from fastapi.responses import StreamingResponse
+from datetime import datetime
+from typing import AsyncIterator, Dict, Optional, Tuple
+import asyncio
+import asyncpg
+import csv
+import io
+import json
+import logging
+import time
+import zlib
+
+from app.config import settings
+from app.database import get_db, acquire_db_connection
+from app.live_feed import broadcaster, format_sse
+from app.models import (
+    DesktopSessionPage,
+    FileEventPage,
+    InputSessionPage,
+    ActivitySummary,
+    TimelinePage,
+    TimelineBucketPage,
+)
+from app.utils import (
+    ActivityFilter,
+    ActivityStream,
+    InvalidCursorError,
+    STREAMS,
+    build_list_query,
+    build_summary_query,
+    build_export_query,
+    encode_cursor,
+    build_timeline_query,
+    bucket_timeline,
+    decode_timeline_cursor,
+    encode_timeline_cursor,
+    merge_timeline,
+    parse_timeline_streams,
+    timeline_item,
+)
+
+router = APIRouter(prefix="/api/v1/activity", tags=["activity"])
+logger = logging.getLogger(__name__)
+
+
+async def _fetch_with_timing(
+    conn: asyncpg.Connection, label: str, query: str, params: list
+) -> list:
+    """
+    クエリを実行し、レイテンシ目標を超えた場合は警告を記録
+
+    Args:
+        conn: データベース接続
+        label: ログ出力用のラベル
+        query: SQL
+        params: SQLパラメータ
+    """
+    started = time.perf_counter()
+    rows = await conn.fetch(query, *params, timeout=settings.activity_query_timeout)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    if elapsed_ms > settings.activity_latency_target_ms:
+        logger.warning(
+            f"アクティビティクエリがレイテンシ目標を超過: {label}, "
+            f"{elapsed_ms:.1f}ms > {settings.activity_latency_target_ms}ms, rows={len(rows)}"
+        )
+    else:
+        logger.debug(f"アクティビティクエリ: {label}, {elapsed_ms:.1f}ms, rows={len(rows)}")
+
+    return rows
+
+
+async def _list_stream(
+    conn: asyncpg.Connection,
+    stream: ActivityStream,
+    filters: ActivityFilter,
+    limit: int,
+    cursor: Optional[str],
+) -> dict:
+    """ストリームの一覧を1ページ分取得"""
+    try:
+        query, params = build_list_query(stream, filters, limit, cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    try:
+        rows = await _fetch_with_timing(conn, f"{stream.name}.list", query, params)
+    except Exception as e:
+        logger.error(f"{stream.name} 一覧取得エラー: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="アクティビティ一覧の取得に失敗しました",
+        )
+
+    items = [dict(row) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor(last[stream.time_column], last["id"])
+
+    return {"items": items, "next_cursor": next_cursor}
+
+
+async def _summarize_stream(
+    conn: asyncpg.Connection,
+    stream: ActivityStream,
+    filters: ActivityFilter,
+    group_by: str,
+    limit: int,
+) -> dict:
+    """ストリームをSQL側で集計"""
+    try:
+        query, params = build_summary_query(stream, filters, group_by, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    try:
+        rows = await _fetch_with_timing(conn, f"{stream.name}.summary.{group_by}", query, params)
+    except Exception as e:
+        logger.error(f"{stream.name} 集計エラー: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="アクティビティの集計に失敗しました",
+        )
+
+    return {
+        "stream": stream.name,
+        "group_by": group_by,
+        "items": [dict(row) for row in rows],
+    }
+
+
+@router.get("/desktop-sessions", response_model=DesktopSessionPage)
+async def list_desktop_sessions(
+    start: Optional[datetime] = Query(None, description="開始時刻（この時刻を含む）"),
+    end: Optional[datetime] = Query(None, description="終了時刻（この時刻を含まない）"),
+    application_name: Optional[str] = Query(None, description="アプリケーション名"),
+    limit: int = Query(100, ge=1, le=settings.activity_max_page_size, description="1ページの件数"),
+    cursor: Optional[str] = Query(None, description="前ページのnext_cursor"),
+    conn: asyncpg.Connection = Depends(get_db),
+):
+    """
+    デスクトップセッション一覧取得
+
+    Args:
+        start: 開始時刻
+        end: 終了時刻
+        application_name: アプリケーション名で絞り込み
+        limit: 1ページの件数
+        cursor: 前ページのnext_cursor
+    """
+    filters = ActivityFilter(start=start, end=end, values={"application_name": application_name})
+    return await _list_stream(conn, STREAMS["desktop_sessions"], filters, limit, cursor)
+
+
+@router.get("/desktop-sessions/summary", response_model=ActivitySummary)
+async def summarize_desktop_sessions(
+    group_by: str = Query("app", description="集計キー（app / hour / day）"),
+    start: Optional[datetime] = Query(None, description="開始時刻（この時刻を含む）"),
+    end: Optional[datetime] = Query(None, description="終了時刻（この時刻を含まない）"),
+    application_name: Optional[str] = Query(None, description="アプリケーション名"),
+    limit: int = Query(100, ge=1, le=10000, description="集計行の最大数"),
+    conn: asyncpg.Connection = Depends(get_db),
+):
+    """
+    デスクトップセッション集計（アプリ別・時間帯別）
+
+    Args:
+        group_by: 集計キー
+        start: 開始時刻
+        end: 終了時刻
+        application_name: アプリケーション名で絞り込み
+        limit: 集計行の最大数
+    """
+    filters = ActivityFilter(start=start, end=end, values={"application_name": application_name})
+    return await _summarize_stream(conn, STREAMS["desktop_sessions"], filters, group_by, limit)
+
+
+@router.get("/file-events", response_model=FileEventPage)
+async def list_file_events(
+    start: Optional[datetime] = Query(None, description="開始時刻（この時刻を含む）"),
+    end: Optional[datetime] = Query(None, description="終了時刻（この時刻を含まない）"),
+    project_name: Optional[str] = Query(None, description="プロジェクト名"),
+    file_extension: Optional[str] = Query(None, description="拡張子（例: .py）"),
+    event_type: Optional[str] = Query(None, description="イベントタイプ"),
+    monitored_root: Optional[str] = Query(None, description="監視ルート"),
+    directory: Optional[str] = Query(None, description="ディレクトリ（配下のファイルを含む）"),
+    desktop_session_id: Optional[int] = Query(None, description="デスクトップセッションID"),
+    limit: int = Query(100, ge=1, le=settings.activity_max_page_size, description="1ページの件数"),
+    cursor: Optional[str] = Query(None, description="前ページのnext_cursor"),
+    conn: asyncpg.Connection = Depends(get_db),
+):
+    """
+    ファイル変更イベント一覧取得
+
+    Args:
+        start: 開始時刻
+        end: 終了時刻
+        project_name: プロジェクト名で絞り込み
+        file_extension: 拡張子で絞り込み
+        event_type: イベントタイプで絞り込み
+        monitored_root: 監視ルートで絞り込み
+        directory: ディレクトリとその配下で絞り込み
+        desktop_session_id: 発生時刻を含むデスクトップセッションで絞り込み
+        limit: 1ページの件数
+        cursor: 前ページのnext_cursor
+    """
+    filters = ActivityFilter(
+        start=start,
+        end=end,
+        values={
+            "project_name": project_name,
+            "file_extension": file_extension,
+            "event_type": event_type,
+            "monitored_root": monitored_root,
+            "directory": directory,
+            "desktop_session_id": desktop_session_id,
+        },
+    )
+    return await _list_stream(conn, STREAMS["file_events"], filters, limit, cursor)
+
+
+@router.get("/file-events/summary", response_model=ActivitySummary)
+async def summarize_file_events(
+    group_by: str = Query("project", description="集計キー（project / extension / event_type / directory / desktop_session / hour / day）"),
+    start: Optional[datetime] = Query(None, description="開始時刻（この時刻を含む）"),
+    end: Optional[datetime] = Query(None, description="終了時刻（この時刻を含まない）"),
+    project_name: Optional[str] = Query(None, description="プロジェクト名"),
+    file_extension: Optional[str] = Query(None, description="拡張子（例: .py）"),
+    event_type: Optional[str] = Query(None, description="イベントタイプ"),
+    monitored_root: Optional[str] = Query(None, description="監視ルート"),
+    directory: Optional[str] = Query(None, description="ディレクトリ（配下のファイルを含む）"),
+    desktop_session_id: Optional[int] = Query(None, description="デスクトップセッションID"),
+    limit: int = Query(100, ge=1, le=10000, description="集計行の最大数"),
+    conn: asyncpg.Connection = Depends(get_db),
+):
+    """
+    ファイル変更イベント集計（プロジェクト別・拡張子別・時間帯別）
+
+    Args:
+        group_by: 集計キー
+        start: 開始時刻
+        end: 終了時刻
+        project_name: プロジェクト名で絞り込み
+        file_extension: 拡張子で絞り込み
+        event_type: イベントタイプで絞り込み
+        monitored_root: 監視ルートで絞り込み
+        directory: ディレクトリとその配下で絞り込み
+        desktop_session_id: 発生時刻を含むデスクトップセッションで絞り込み
+        limit: 集計行の最大数
+    """
+    filters = ActivityFilter(
+        start=start,
+        end=end,
+        values={
+            "project_name": project_name,
+            "file_extension": file_extension,
+            "event_type": event_type,
+            "monitored_root": monitored_root,
+            "directory": directory,
+            "desktop_session_id": desktop_session_id,
+        },
+    )
+    return await _summarize_stream(conn, STREAMS["file_events"], filters, group_by, limit)
+
+
+@router.get("/input-sessions", response_model=InputSessionPage)
+async def list_input_sessions(
+    start: Optional[datetime] = Query(None, description="開始時刻（この時刻を含む）"),
+    end: Optional[datetime] = Query(None, description="終了時刻（この時刻を含まない）"),
+    host_identifier: Optional[str] = Query(None, description="ホスト識別子"),
+    limit: int = Query(100, ge=1, le=settings.activity_max_page_size, description="1ページの件数"),
+    cursor: Optional[str] = Query(None, description="前ページのnext_cursor"),
+    conn: asyncpg.Connection = Depends(get_db),
+):
+    """
+    入力活動セッション一覧取得
+
+    Args:
+        start: 開始時刻
+        end: 終了時刻
+        host_identifier: ホスト識別子で絞り込み
+        limit: 1ページの件数
+        cursor: 前ページのnext_cursor
+    """
+    filters = ActivityFilter(start=start, end=end, values={"host_identifier": host_identifier})
+    return await _list_stream(conn, STREAMS["input_sessions"], filters, limit, cursor)
+
+
+@router.get("/input-sessions/summary", response_model=ActivitySummary)
+async def summarize_input_sessions(
+    group_by: str = Query("hour", description="集計キー（host / hour / day）"),
+    start: Optional[datetime] = Query(None, description="開始時刻（この時刻を含む）"),
+    end: Optional[datetime] = Query(None, description="終了時刻（この時刻を含まない）"),
+    host_identifier: Optional[str] = Query(None, description="ホスト識別子"),
+    limit: int = Query(100, ge=1, le=10000, description="集計行の最大数"),
+    conn: asyncpg.Connection = Depends(get_db),
+):
+    """
+    入力活動セッション集計（ホスト別・時間帯別）
+
+    Args:
+        group_by: 集計キー
+        start: 開始時刻
+        end: 終了時刻
+        host_identifier: ホスト識別子で絞り込み
+        limit: 集計行の最大数
+    """
+    filters = ActivityFilter(start=start, end=end, values={"host_identifier": host_identifier})
+    return await _summarize_stream(conn, STREAMS["input_sessions"], filters, group_by, limit)
+
+
+# エクスポート対象ストリーム（URLパス名 → ストリーム名）
+EXPORT_STREAMS = {
+    "desktop-sessions": "desktop_sessions",
+    "file-events": "file_events",
+    "input-sessions": "input_sessions",
+}
+
+# エクスポート形式 → Content-Type
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _serialize_value(value):
+    """CSV/NDJSON出力用に値を変換"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _encode_rows(rows: list, columns: tuple, export_format: str, include_header: bool) -> bytes:
+    """
+    行のチャンクをNDJSONまたはCSVのバイト列に変換
+
+    Args:
+        rows: asyncpg.Recordのリスト
+        columns: 出力カラム
+        export_format: "ndjson" または "csv"
+        include_header: CSVヘッダー行を出力するか
+    """
+    if export_format == "ndjson":
+        lines = [
+            json.dumps(
+                {col: _serialize_value(row[col]) for col in columns},
+                ensure_ascii=False,
+            )
+            for row in rows
+        ]
+        return ("\n".join(lines) + "\n").encode("utf-8") if lines else b""
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if include_header:
+        writer.writerow(columns)
+    writer.writerows([[_serialize_value(row[col]) for col in columns] for row in rows])
+    return buffer.getvalue().encode("utf-8")
+
+
+async def _stream_export(
+    query: str,
+    params: list,
+    columns: tuple,
+    export_format: str,
+    compress: bool,
+) -> AsyncIterator[bytes]:
+    """
+    サーバーサイドカーソルから行を読み出し、チャンク単位でエンコードして返す
+
+    一度に保持する行はprefetch分のみのため、結果件数に関わらずメモリ使用量は一定。
+    接続はDependsではなくジェネレーター内で取得し、ストリーミング完了まで保持する。
+    """
+    prefetch = settings.activity_export_prefetch
+    compressor = zlib.compressobj(wbits=31) if compress else None  # wbits=31: gzip形式
+    include_header = export_format == "csv"
+    rows_exported = 0
+    started = time.perf_counter()
+
+    async with acquire_db_connection() as conn:
+        # サーバーサイドカーソルはトランザクション内でのみ使用可能
+        async with conn.transaction(readonly=True):
+            chunk = []
+            async for row in conn.cursor(query, *params, prefetch=prefetch):
+                chunk.append(row)
+                if len(chunk) < prefetch:
+                    continue
+
+                data = _encode_rows(chunk, columns, export_format, include_header)
+                include_header = False
+                rows_exported += len(chunk)
+                chunk = []
+                if compressor:
+                    data = compressor.compress(data)
+                if data:
+                    yield data
+
+            if chunk or include_header:
+                data = _encode_rows(chunk, columns, export_format, include_header)
+                rows_exported += len(chunk)
+                if compressor:
+                    data = compressor.compress(data)
+                if data:
+                    yield data
+
+    if compressor:
+        yield compressor.flush()
+
+    logger.info(
+        f"エクスポート完了: rows={rows_exported}, format={export_format}, "
+        f"gzip={compress}, {time.perf_counter() - started:.1f}秒"
+    )
+
+
+@router.get("/export/{stream_name}")
+async def export_activity(
+    stream_name: str,
+    format: str = Query("ndjson", description="出力形式（ndjson / csv）"),
+    gzip: bool = Query(False, description="gzip圧縮して返す"),
+    start: Optional[datetime] = Query(None, description="開始時刻（この時刻を含む）"),
+    end: Optional[datetime] = Query(None, description="終了時刻（この時刻を含まない）"),
+    application_name: Optional[str] = Query(None, description="アプリケーション名（desktop-sessions）"),
+    project_name: Optional[str] = Query(None, description="プロジェクト名（file-events）"),
+    file_extension: Optional[str] = Query(None, description="拡張子（file-events）"),
+    event_type: Optional[str] = Query(None, description="イベントタイプ（file-events）"),
+    monitored_root: Optional[str] = Query(None, description="監視ルート（file-events）"),
+    directory: Optional[str] = Query(None, description="ディレクトリ（file-events、配下を含む）"),
+    desktop_session_id: Optional[int] = Query(None, description="デスクトップセッションID（file-events）"),
+    host_identifier: Optional[str] = Query(None, description="ホスト識別子（input-sessions）"),
+):
+    """
+    アクティビティのストリーミングエクスポート
+
+    一覧APIと同じフィルタを受け付け、全件を (時刻, id) 順にNDJSONまたはCSVで返す。
+    結果はサーバーサイドカーソルから逐次読み出されるため、期間の長さに関わらず
+    ゲートウェイのメモリ使用量は一定となる。
+
+    Args:
+        stream_name: desktop-sessions / file-events / input-sessions
+        format: 出力形式
+        gzip: gzip圧縮の有無
+        start: 開始時刻
+        end: 終了時刻
+        その他: 属性フィルタ（対象ストリームに存在しないものは無視）
+    """
+    if stream_name not in EXPORT_STREAMS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"ストリーム '{stream_name}' は存在しません（使用可能: {', '.join(EXPORT_STREAMS)}）",
+        )
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"出力形式 '{format}' には対応していません（使用可能: {', '.join(EXPORT_MEDIA_TYPES)}）",
+        )
+
+    stream = STREAMS[EXPORT_STREAMS[stream_name]]
+    filters = ActivityFilter(
+        start=start,
+        end=end,
+        values={
+            "application_name": application_name,
+            "project_name": project_name,
+            "file_extension": file_extension,
+            "event_type": event_type,
+            "monitored_root": monitored_root,
+            "directory": directory,
+            "desktop_session_id": desktop_session_id,
+            "host_identifier": host_identifier,
+        },
+    )
+    query, params = build_export_query(stream, filters)
+
+    filename = f"{stream.name}.{format}" + (".gz" if gzip else "")
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    media_type = "application/gzip" if gzip else EXPORT_MEDIA_TYPES[format]
+
+    logger.info(f"エクスポート開始: stream={stream.name}, format={format}, gzip={gzip}")
+    return StreamingResponse(
+        _stream_export(query, params, stream.columns, format, gzip),
+        media_type=media_type,
+        headers=headers,
+    )
+
+
+# ================================
+# タイムライン（全ストリームの統合）
+# ================================
+
+def _parse_timeline_params(streams: Optional[str], cursor: Optional[str]) -> Tuple[tuple, Optional[tuple]]:
+    """対象ストリームとカーソルを検証し、(ストリーム名のタプル, カーソルのキー) を返す"""
+    try:
+        names = parse_timeline_streams(streams)
+        after = decode_timeline_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return names, after
+
+
+def _timeline_sources(
+    conn: asyncpg.Connection,
+    names: tuple,
+    filters: ActivityFilter,
+    after: Optional[tuple],
+    limit: Optional[int] = None,
+) -> Dict[str, object]:
+    """
+    ストリームごとの (時刻, id) 順のサーバーサイドカーソルを作成（トランザクション内で呼び出す）
+
+    同じ接続上のカーソルを交互に読み出し、各カーソルからはprefetch行ずつ取得する。
+    """
+    prefetch = settings.timeline_prefetch if limit is None else min(settings.timeline_prefetch, limit)
+    sources = {}
+    for name in names:
+        query, params = build_timeline_query(STREAMS[name], filters, after, limit)
+        sources[name] = conn.cursor(query, *params, prefetch=prefetch)
+    return sources
+
+
+def _log_timeline_timing(label: str, started: float, rows: int):
+    """タイムラインの所要時間を記録（レイテンシ目標を超えた場合は警告）"""
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if elapsed_ms > settings.activity_latency_target_ms:
+        logger.warning(
+            f"アクティビティクエリがレイテンシ目標を超過: {label}, "
+            f"{elapsed_ms:.1f}ms > {settings.activity_latency_target_ms}ms, rows={rows}"
+        )
+    else:
+        logger.debug(f"アクティビティクエリ: {label}, {elapsed_ms:.1f}ms, rows={rows}")
+
+
+@router.get("/timeline", response_model=TimelinePage)
+async def get_timeline(
+    start: Optional[datetime] = Query(None, description="開始時刻（この時刻を含む）"),
+    end: Optional[datetime] = Query(None, description="終了時刻（この時刻を含まない）"),
+    streams: Optional[str] = Query(None, description="対象ストリーム（カンマ区切り、省略時は全て）"),
+    limit: int = Query(100, ge=1, le=settings.activity_max_page_size, description="1ページの件数"),
+    cursor: Optional[str] = Query(None, description="前ページのnext_cursor"),
+    conn: asyncpg.Connection = Depends(get_db),
+):
+    """
+    タイムライン取得（デスクトップセッション・ファイル変更イベント・入力活動セッションの時刻順の統合）
+
+    各ストリームを (時刻, id) 順に読み出し、k-way mergeで統合する。
+    同時刻の行は desktop_sessions → file_events → input_sessions の順に並ぶ。
+
+    Args:
+        start: 開始時刻
+        end: 終了時刻
+        streams: 対象ストリーム（desktop_sessions / file_events / input_sessions）
+        limit: 1ページの件数
+        cursor: 前ページのnext_cursor
+    """
+    names, after = _parse_timeline_params(streams, cursor)
+    filters = ActivityFilter(start=start, end=end)
+    items = []
+    next_cursor = None
+    started = time.perf_counter()
+
+    try:
+        async with conn.transaction(readonly=True):
+            # 統合結果の先頭limit + 1件は各ストリームの先頭limit + 1件に含まれる
+            sources = _timeline_sources(conn, names, filters, after, limit + 1)
+            last_key = None
+            async for key, row in merge_timeline(sources):
+                if len(items) == limit:
+                    next_cursor = encode_timeline_cursor(last_key)
+                    break
+                items.append(timeline_item(key, row))
+                last_key = key
+    except Exception as e:
+        logger.error(f"タイムライン取得エラー: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="タイムラインの取得に失敗しました",
+        )
+
+    _log_timeline_timing("timeline.list", started, len(items))
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@router.get("/timeline/buckets", response_model=TimelineBucketPage)
+async def get_timeline_buckets(
+    bucket_seconds: int = Query(3600, ge=60, le=31 * 86400, description="区間の幅（秒、UNIXエポックから区切る）"),
+    start: Optional[datetime] = Query(None, description="開始時刻（この時刻を含む）"),
+    end: Optional[datetime] = Query(None, description="終了時刻（この時刻を含まない）"),
+    streams: Optional[str] = Query(None, description="対象ストリーム（カンマ区切り、省略時は全て）"),
+    limit: int = Query(1000, ge=1, le=settings.timeline_max_buckets, description="1ページの区間数"),
+    cursor: Optional[str] = Query(None, description="前ページのnext_cursor"),
+    conn: asyncpg.Connection = Depends(get_db),
+):
+    """
+    タイムラインの区間集計（区間ごとのストリーム別件数・合計継続時間）
+
+    統合した時系列を順に読みながら区間を確定させるため、数週間分でも行を保持せずに集計できる。
+    行は時刻（セッションは開始時刻）の区間に数え、行のない区間は返さない。
+
+    Args:
+        bucket_seconds: 区間の幅（秒）
+        start: 開始時刻
+        end: 終了時刻
+        streams: 対象ストリーム
+        limit: 1ページの区間数
+        cursor: 前ページのnext_cursor（/timeline のカーソルも指定可能）
+    """
+    names, after = _parse_timeline_params(streams, cursor)
+    filters = ActivityFilter(start=start, end=end)
+    buckets = []
+    next_cursor = None
+    started = time.perf_counter()
+
+    try:
+        async with conn.transaction(readonly=True):
+            sources = _timeline_sources(conn, names, filters, after)
+            async for bucket, has_more in bucket_timeline(merge_timeline(sources), bucket_seconds):
+                buckets.append({
+                    "start": bucket.start,
+                    "end": bucket.end,
+                    "counts": bucket.counts,
+                    "total_seconds": bucket.total_seconds,
+                })
+                if len(buckets) == limit:
+                    if has_more:
+                        next_cursor = encode_timeline_cursor(bucket.last_key)
+                    break
+    except Exception as e:
+        logger.error(f"タイムライン集計エラー: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="タイムラインの集計に失敗しました",
+        )
+
+    _log_timeline_timing(f"timeline.buckets.{bucket_seconds}", started, len(buckets))
+    return {"buckets": buckets, "next_cursor": next_cursor}
+
+
+async def _stream_timeline(
+    names: tuple,
+    filters: ActivityFilter,
+    after: Optional[tuple],
+    compress: bool,
+) -> AsyncIterator[bytes]:
+    """
+    統合したタイムラインをNDJSONで逐次返す
+
+    各行には続きから再開するためのcursorを含める。
+    一度に保持する行はストリームごとのprefetch分のみ。
+    """
+    compressor = zlib.compressobj(wbits=31) if compress else None  # wbits=31: gzip形式
+    rows_exported = 0
+    started = time.perf_counter()
+
+    async with acquire_db_connection() as conn:
+        async with conn.transaction(readonly=True):
+            lines = []
+            async for key, row in merge_timeline(_timeline_sources(conn, names, filters, after)):
+                item = timeline_item(key, row)
+                item["data"] = {column: _serialize_value(value) for column, value in item["data"].items()}
+                item["cursor"] = encode_timeline_cursor(key)
+                lines.append(json.dumps(item, ensure_ascii=False))
+                if len(lines) < settings.activity_export_prefetch:
+                    continue
+
+                rows_exported += len(lines)
+                data = ("\n".join(lines) + "\n").encode("utf-8")
+                lines = []
+                yield compressor.compress(data) if compressor else data
+
+            if lines:
+                rows_exported += len(lines)
+                data = ("\n".join(lines) + "\n").encode("utf-8")
+                yield compressor.compress(data) if compressor else data
+
+    if compressor:
+        yield compressor.flush()
+
+    logger.info(
+        f"タイムラインのエクスポート完了: rows={rows_exported}, gzip={compress}, "
+        f"{time.perf_counter() - started:.1f}秒"
+    )
+
+
+@router.get("/timeline/export")
+async def export_timeline(
+    start: Optional[datetime] = Query(None, description="開始時刻（この時刻を含む）"),
+    end: Optional[datetime] = Query(None, description="終了時刻（この時刻を含まない）"),
+    streams: Optional[str] = Query(None, description="対象ストリーム（カンマ区切り、省略時は全て）"),
+    cursor: Optional[str] = Query(None, description="再開位置（出力済みの最後の行のcursor）"),
+    gzip: bool = Query(False, description="gzip圧縮して返す"),
+):
+    """
+    タイムラインのストリーミングエクスポート（NDJSON）
+
+    /timeline と同じ順序で全件を返す。各行のcursorを指定すると、その行の次から再開できる。
+
+    Args:
+        start: 開始時刻
+        end: 終了時刻
+        streams: 対象ストリーム
+        cursor: 再開位置
+        gzip: gzip圧縮の有無
+    """
+    names, after = _parse_timeline_params(streams, cursor)
+    filters = ActivityFilter(start=start, end=end)
+
+    filename = "timeline.ndjson" + (".gz" if gzip else "")
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    media_type = "application/gzip" if gzip else EXPORT_MEDIA_TYPES["ndjson"]
+
+    logger.info(f"タイムラインのエクスポート開始: streams={','.join(names)}, gzip={gzip}")
+    return StreamingResponse(
+        _stream_timeline(names, filters, after, gzip),
+        media_type=media_type,
+        headers=headers,
+    )
+
+
+# ================================
+# ライブフィード（Server-Sent Events）
+# ================================
+
+async def _stream_live(request: Request, streams: frozenset) -> AsyncIterator[bytes]:
+    """
+    購読者のキューからイベントを送信
+
+    イベントがない間はキープアライブのコメントを送り、クライアントの切断を検知する。
+    キューがあふれて切断された場合は dropped イベントを送って終了する。
+    """
+    subscriber = broadcaster.subscribe(streams)
+    if subscriber is None:
+        yield format_sse("error", {"detail": "ライブフィードの購読者数が上限に達しています"})
+        return
+
+    try:
+        yield b": connected\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(
+                    subscriber.queue.get(), timeout=settings.live_feed_keepalive_seconds
+                )
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield b": keepalive\n\n"
+                continue
+
+            if event is None:
+                if subscriber.dropped:
+                    yield format_sse("dropped", {"detail": "送信が追いつかないため切断しました"})
+                break
+            yield event
+    finally:
+        broadcaster.unsubscribe(subscriber)
+
+
+@router.get("/live")
+async def live_activity(
+    request: Request,
+    streams: Optional[str] = Query(None, description="対象ストリーム（カンマ区切り、省略時は全て）"),
+):
+    """
+    ライブアクティビティフィード（Server-Sent Events）
+
+    新しく同期された行を activity イベント（/timeline の項目と同じ形式）として配信する。
+    イベントIDは /timeline のカーソルだが、再接続時の /timeline?cursor=<最後のID> による補完はベストエフォート。
+    配信は挿入順・カーソルはイベント時刻順のため、同期の遅延やスプールの再送で後から挿入された
+    カーソルより古い時刻の行は含まれない（同期の遅延分さかのぼったstartで取得し、(stream, id)で重複を除く）。
+
+    Args:
+        streams: 対象ストリーム（desktop_sessions / file_events / input_sessions）
+    """
+    try:
+        names = parse_timeline_streams(streams)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if broadcaster.is_full():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="ライブフィードの購読者数が上限に達しています",
+        )
+
+    return StreamingResponse(
+        _stream_live(request, frozenset(names)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,12 +1,14 @@
 """
 監視対象ディレクトリ管理APIエンドポイント
 """
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Request, Response, status
+from pydantic import TypeAdapter
 from typing import List
 import asyncpg
 import logging
 
-from app.database import get_db
+from app.cache import directory_cache
+from app.database import get_db, acquire_db_connection
 from app.models import (
     MonitoredDirectory,
     MonitoredDirectoryCreate,
@@ -18,45 +20,82 @@ router = APIRouter(prefix="/api/v1/directories", tags=["directories"])
 logger = logging.getLogger(__name__)
 
 
+_directory_list_adapter = TypeAdapter(List[MonitoredDirectory])
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """If-None-MatchヘッダーがETagに一致するか判定"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
 @router.get("/", response_model=List[MonitoredDirectory])
-async def list_directories(
-    enabled_only: bool = False, conn: asyncpg.Connection = Depends(get_db)
-):
+async def list_directories(request: Request, enabled_only: bool = False):
     """
     監視対象ディレクトリの一覧取得
 
+    レスポンスはmonitored_directoriesのバージョンごとにキャッシュされ、
+    強いETagを付与する。If-None-Matchが一致する場合は304を返す。
+    キャッシュヒット時はデータベース接続を取得しない。
+
     Args:
         enabled_only: Trueの場合、有効なディレクトリのみ取得
     """
-    try:
-        if enabled_only:
-            query = """
-                SELECT id, directory_path, enabled, display_name, description,
-                       display_path, resolved_path,
-                       created_at, updated_at, created_by, updated_by
-                FROM monitored_directories
-                WHERE enabled = true
-                ORDER BY updated_at DESC
-            """
-        else:
-            query = """
-                SELECT id, directory_path, enabled, display_name, description,
-                       display_path, resolved_path,
-                       created_at, updated_at, created_by, updated_by
-                FROM monitored_directories
-                ORDER BY updated_at DESC
-            """
-
-        rows = await conn.fetch(query)
-        return [dict(row) for row in rows]
+    cache_key = "enabled" if enabled_only else "all"
+    if_none_match = request.headers.get("if-none-match")
+    cache_headers = {"Cache-Control": "no-cache"}  # 毎回ETagで再検証させる
+
+    cached = directory_cache.get(cache_key)
+    if cached is None:
+        version = directory_cache.version
+        try:
+            if enabled_only:
+                query = """
+                    SELECT id, directory_path, enabled, display_name, description,
+                           display_path, resolved_path,
+                           created_at, updated_at, created_by, updated_by
+                    FROM monitored_directories
+                    WHERE enabled = true
+                    ORDER BY updated_at DESC
+                """
+            else:
+                query = """
+                    SELECT id, directory_path, enabled, display_name, description,
+                           display_path, resolved_path,
+                           created_at, updated_at, created_by, updated_by
+                    FROM monitored_directories
+                    ORDER BY updated_at DESC
+                """
+
+            async with acquire_db_connection() as conn:
+                rows = await conn.fetch(query)
+
+            body = _directory_list_adapter.dump_json(
+                _directory_list_adapter.validate_python([dict(row) for row in rows])
+            )
+            cached = directory_cache.put(cache_key, body, version)
 
-    except Exception as e:
-        logger.error(f"ディレクトリ一覧取得エラー: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="ディレクトリ一覧の取得に失敗しました",
+        except Exception as e:
+            logger.error(f"ディレクトリ一覧取得エラー: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="ディレクトリ一覧の取得に失敗しました",
+            )
+
+    if _etag_matches(if_none_match, cached.etag):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={"ETag": cached.etag, **cache_headers},
         )
 
+    return Response(
+        content=cached.body,
+        media_type="application/json",
+        headers={"ETag": cached.etag, **cache_headers},
+    )
+
 
 @router.get("/{directory_id}", response_model=MonitoredDirectory)
 async def get_directory(
@@ -131,6 +170,7 @@ async def create_directory(
             directory.created_by,
         )
 
+        directory_cache.invalidate("(作成)")
         logger.info(
             f"ディレクトリ追加成功: {display_path}"
             + (f" -> {resolved_path}" if resolved_path and resolved_path != display_path else "")
@@ -230,6 +270,7 @@ async def update_directory(
 
         row = await conn.fetchrow(query, *params)
 
+        directory_cache.invalidate("(更新)")
         logger.info(f"ディレクトリ更新成功: ID {directory_id}")
         return dict(row)
 
@@ -268,6 +309,7 @@ async def delete_directory(
                 detail=f"ID {directory_id} のディレクトリが見つかりません",
             )
 
+        directory_cache.invalidate("(削除)")
         logger.info(f"ディレクトリ削除成功: ID {directory_id}")
         return None
 
@@ -308,6 +350,7 @@ async def toggle_directory(
                 detail=f"ID {directory_id} のディレクトリが見つかりません",
             )
 
+        directory_cache.invalidate("(切り替え)")
         logger.info(f"ディレクトリ切り替え成功: ID {directory_id}, enabled={row['enabled']}")
         return dict(row)
 
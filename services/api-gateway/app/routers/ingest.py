@@ -0,0 +1,303 @@
+"""
+データ取り込みAPIエンドポイント
+
+host-agentからバッチ送信されたセッション・ファイルイベント・同期ログを受け取り、
+ゲートウェイの共有接続プールを使ってCOPYで一括挿入する。
+エージェントがPostgreSQLへ直接接続しないため、ホスト数が増えても
+データベースの接続数は一定に保たれる。
+
+リクエスト形式:
+- Content-Type: application/x-ndjson（1行1レコードのJSON）または application/msgpack（レコードの配列）
+- Content-Encoding: gzip（任意）
+"""
+from fastapi import APIRouter, HTTPException, Depends, Request, status
+from pydantic import BaseModel, Field
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, FrozenSet, List, Tuple
+import asyncpg
+import json
+import logging
+import zlib
+
+from app.config import settings
+from app.database import get_db
+from app.utils.dimensions import STORAGE_TABLES, dimension_resolver
+
+try:
+    import msgpack
+except ImportError:  # msgpackは任意（NDJSONのみ受け付ける）
+    msgpack = None
+
+router = APIRouter(prefix="/api/v1/ingest", tags=["ingest"])
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class IngestTable:
+    """取り込み対象テーブルの定義"""
+
+    columns: Tuple[str, ...]                    # 受け付けるカラム（この順でCOPYする）
+    timestamp_columns: FrozenSet[str] = frozenset()  # ISO文字列をdatetimeに変換するカラム
+    bool_columns: FrozenSet[str] = frozenset()  # 整数をboolに変換するカラム
+    integer_columns: FrozenSet[str] = frozenset()  # 整数のカラム（それ以外は文字列のカラム）
+    stamp_synced_at: bool = False               # synced_atに受信時刻を設定するか
+
+
+INGEST_TABLES: Dict[str, IngestTable] = {
+    "desktop_activity_sessions": IngestTable(
+        columns=(
+            "start_time", "end_time", "start_time_iso", "end_time_iso",
+            "application_name", "window_title", "duration_seconds",
+        ),
+        timestamp_columns=frozenset({"start_time_iso", "end_time_iso"}),
+        integer_columns=frozenset({"start_time", "end_time", "duration_seconds"}),
+        stamp_synced_at=True,
+    ),
+    "file_change_events": IngestTable(
+        columns=(
+            "event_time", "event_time_iso", "event_type", "directory_path",
+            "file_path_relative", "file_name", "file_extension", "file_size",
+            "is_symlink", "monitored_root", "project_name", "lines_added", "lines_removed",
+        ),
+        timestamp_columns=frozenset({"event_time_iso"}),
+        bool_columns=frozenset({"is_symlink"}),
+        integer_columns=frozenset({"event_time", "file_size", "lines_added", "lines_removed"}),
+        stamp_synced_at=True,
+    ),
+    "input_activity_sessions": IngestTable(
+        columns=(
+            "start_time", "end_time", "start_time_iso", "end_time_iso",
+            "duration_seconds", "created_at", "updated_at",
+            "host_identifier", "synced_from_local_id",
+        ),
+        timestamp_columns=frozenset({"start_time_iso", "end_time_iso"}),
+        integer_columns=frozenset({
+            "start_time", "end_time", "duration_seconds", "created_at", "updated_at",
+            "synced_from_local_id",
+        }),
+    ),
+    "sync_logs": IngestTable(
+        columns=(
+            "sync_started_at", "sync_completed_at", "table_name", "records_synced",
+            "records_failed", "status", "error_message", "host_identifier",
+        ),
+        timestamp_columns=frozenset({"sync_started_at", "sync_completed_at"}),
+        integer_columns=frozenset({"records_synced", "records_failed"}),
+    ),
+}
+
+
+class IngestResponse(BaseModel):
+    """取り込み結果"""
+
+    table: str = Field(..., description="取り込み先テーブル")
+    rows: int = Field(..., description="挿入した行数")
+
+
+def _decompress(body: bytes, max_bytes: int) -> bytes:
+    """
+    gzipボディを展開（展開後サイズの上限付き）
+
+    Raises:
+        HTTPException: 展開失敗時は400、上限超過時は413
+    """
+    decompressor = zlib.decompressobj(wbits=47)  # 47: gzip/zlibヘッダーを自動判別
+    try:
+        data = decompressor.decompress(body, max_bytes + 1)
+    except zlib.error as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"gzipの展開に失敗しました: {e}",
+        )
+    if len(data) > max_bytes or decompressor.unconsumed_tail:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"展開後のペイロードが上限（{max_bytes}バイト）を超えています",
+        )
+    return data
+
+
+def _parse_payload(data: bytes, content_type: str) -> List[Dict[str, Any]]:
+    """
+    ペイロードをレコードのリストに変換
+
+    Raises:
+        HTTPException: 形式不正時は400、未対応のContent-Typeは415
+    """
+    media_type = content_type.split(";", 1)[0].strip().lower()
+
+    if media_type in ("application/x-ndjson", "application/ndjson", "application/jsonl"):
+        try:
+            return [json.loads(line) for line in data.splitlines() if line.strip()]
+        except json.JSONDecodeError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"NDJSONの解析に失敗しました: {e}",
+            )
+
+    if media_type in ("application/msgpack", "application/x-msgpack"):
+        if msgpack is None:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail="msgpackはこのゲートウェイでは無効です（pip install msgpack）",
+            )
+        try:
+            records = msgpack.unpackb(data, raw=False)
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"msgpackの解析に失敗しました: {e}",
+            )
+        if not isinstance(records, list):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="msgpackペイロードはレコードの配列である必要があります",
+            )
+        return records
+
+    raise HTTPException(
+        status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+        detail=f"未対応のContent-Typeです: {content_type}",
+    )
+
+
+def _to_copy_records(
+    spec: IngestTable, records: List[Dict[str, Any]], synced_at: datetime
+) -> List[tuple]:
+    """
+    レコードをCOPY用のタプルに変換
+
+    値の型もここで確認する（COPYは型の合わない値をTypeErrorで失敗し、行の不正と区別できないため）。
+
+    Raises:
+        HTTPException: 未知のカラムや型の不一致・型変換エラー時は400
+    """
+    allowed = set(spec.columns)
+    copy_records = []
+
+    for index, record in enumerate(records):
+        if not isinstance(record, dict):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"{index}件目: レコードはオブジェクトである必要があります",
+            )
+        unknown = set(record) - allowed
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"{index}件目: 未知のカラムがあります: {', '.join(sorted(unknown))}",
+            )
+
+        values = []
+        for column in spec.columns:
+            value = record.get(column)
+            if value is not None:
+                try:
+                    if column in spec.timestamp_columns:
+                        if not isinstance(value, (str, datetime)):
+                            raise TypeError(f"ISO文字列ではありません: {value!r}")
+                        if isinstance(value, str):
+                            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+                    elif column in spec.bool_columns:
+                        value = bool(value)
+                    elif column in spec.integer_columns:
+                        # boolはintのサブクラスのため除外する
+                        if not isinstance(value, int) or isinstance(value, bool):
+                            raise TypeError(f"整数ではありません: {value!r}")
+                    elif not isinstance(value, str):
+                        raise TypeError(f"文字列ではありません: {value!r}")
+                except (TypeError, ValueError) as e:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"{index}件目: {column} の変換に失敗しました: {e}",
+                    )
+            values.append(value)
+
+        if spec.stamp_synced_at:
+            values.append(synced_at)
+        copy_records.append(tuple(values))
+
+    return copy_records
+
+
+@router.post("/{table_name}", response_model=IngestResponse)
+async def ingest_records(
+    table_name: str,
+    request: Request,
+    conn: asyncpg.Connection = Depends(get_db),
+):
+    """
+    レコードのバッチ取り込み
+
+    ペイロード全体を1トランザクションのCOPYで挿入する。
+    1件でも制約違反・値のエンコード失敗があればバッチ全体をロールバックし422を返す
+    （エージェントは400 / 422のバッチを二分して原因の行を隔離する）。
+
+    Args:
+        table_name: desktop_activity_sessions / file_change_events /
+                    input_activity_sessions / sync_logs
+    """
+    spec = INGEST_TABLES.get(table_name)
+    if spec is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"テーブル '{table_name}' は取り込み対象ではありません",
+        )
+
+    body = await request.body()
+    if len(body) > settings.ingest_max_body_bytes:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"ペイロードが上限（{settings.ingest_max_body_bytes}バイト）を超えています",
+        )
+
+    if request.headers.get("content-encoding", "").lower() == "gzip":
+        body = _decompress(body, settings.ingest_max_body_bytes)
+
+    records = _parse_payload(body, request.headers.get("content-type", ""))
+    if not records:
+        return IngestResponse(table=table_name, rows=0)
+
+    copy_records = _to_copy_records(spec, records, datetime.now(timezone.utc))
+    columns = list(spec.columns) + (["synced_at"] if spec.stamp_synced_at else [])
+    host = request.headers.get("x-host-identifier", "unknown")
+
+    try:
+        # 辞書化カラムを文字列からIDに変換（辞書への登録は挿入トランザクションの外で確定させる）
+        columns, copy_records = await dimension_resolver.resolve_records(
+            conn, table_name, columns, copy_records
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+    try:
+        async with conn.transaction():
+            await conn.copy_records_to_table(
+                STORAGE_TABLES.get(table_name, table_name), records=copy_records, columns=columns
+            )
+    except (
+        asyncpg.IntegrityConstraintViolationError,
+        asyncpg.DataError,
+        # COPYの値のエンコード失敗（整数の範囲外など、型の確認で検出できないもの）はレコードが原因
+        TypeError,
+        ValueError,
+        OverflowError,
+    ) as e:
+        logger.warning(f"取り込み拒否: table={table_name}, host={host}, rows={len(records)}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"レコードが制約に違反しています: {e}",
+        )
+    except Exception as e:
+        logger.error(f"取り込みエラー: table={table_name}, host={host}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="レコードの取り込みに失敗しました",
+        )
+
+    logger.debug(f"取り込み完了: table={table_name}, host={host}, rows={len(copy_records)}")
+    return IngestResponse(table=table_name, rows=len(copy_records))
@@ -5,9 +5,59 @@ from .path_resolver import (
     validate_absolute_path,
     check_path_accessibility,
 )
+from .activity_query import (
+    ActivityFilter,
+    ActivityStream,
+    InvalidCursorError,
+    STREAMS,
+    build_list_query,
+    build_summary_query,
+    build_export_query,
+    encode_cursor,
+    decode_cursor,
+)
+from .timeline import (
+    TIMELINE_STREAMS,
+    build_timeline_query,
+    bucket_timeline,
+    decode_timeline_cursor,
+    encode_timeline_cursor,
+    merge_timeline,
+    parse_timeline_streams,
+    timeline_item,
+)
+from .dimensions import (
+    Dimension,
+    DimensionResolver,
+    TABLE_DIMENSIONS,
+    STORAGE_TABLES,
+    dimension_resolver,
+)
 
 __all__ = [
     "resolve_directory_path",
     "validate_absolute_path",
     "check_path_accessibility",
+    "ActivityFilter",
+    "ActivityStream",
+    "InvalidCursorError",
+    "STREAMS",
+    "build_list_query",
+    "build_summary_query",
+    "build_export_query",
+    "encode_cursor",
+    "decode_cursor",
+    "TIMELINE_STREAMS",
+    "build_timeline_query",
+    "bucket_timeline",
+    "decode_timeline_cursor",
+    "encode_timeline_cursor",
+    "merge_timeline",
+    "parse_timeline_streams",
+    "timeline_item",
+    "Dimension",
+    "DimensionResolver",
+    "TABLE_DIMENSIONS",
+    "STORAGE_TABLES",
+    "dimension_resolver",
 ]
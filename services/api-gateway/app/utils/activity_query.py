@@ -0,0 +1,344 @@
+"""
+アクティビティクエリ構築ユーティリティ
+
+desktop_activity_sessions / file_change_events / input_activity_sessions に対する
+時間範囲フィルタ、集計（GROUP BY）、キーセットページネーション用のSQLを構築する。
+
+集計はすべてSQL側で実行し、生の行をAPIサーバーへ転送しないことを前提とする。
+"""
+import base64
+import binascii
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class ActivityStream:
+    """クエリ対象ストリーム（テーブル）の定義"""
+
+    name: str                          # APIで使用するストリーム名
+    table: str                         # テーブル名
+    time_column: str                   # 時間範囲・ソートに使うBIGINTカラム（UNIXエポック秒）
+    time_iso_column: str               # 時間単位集計に使うTIMESTAMPカラム
+    columns: Tuple[str, ...]           # 一覧取得時のカラム
+    filters: Dict[str, str]            # クエリパラメータ名 → カラム名
+    group_by: Dict[str, str]           # group_by値 → SQL式
+    duration_column: Optional[str] = None  # 合計時間集計に使うカラム（なければ件数のみ）
+    # 配下検索フィルタ（クエリパラメータ名 → (IDカラム, 辞書テーブル)）
+    subtree_filters: Dict[str, Tuple[str, str]] = field(default_factory=dict)
+
+
+DESKTOP_SESSIONS = ActivityStream(
+    name="desktop_sessions",
+    table="desktop_activity_sessions",
+    time_column="start_time",
+    time_iso_column="start_time_iso",
+    columns=(
+        "id", "start_time", "end_time", "start_time_iso", "end_time_iso",
+        "application_name", "window_title", "duration_seconds",
+    ),
+    filters={"application_name": "application_name"},
+    group_by={
+        "app": "application_name",
+        "hour": "date_trunc('hour', start_time_iso)",
+        "day": "date_trunc('day', start_time_iso)",
+    },
+    duration_column="duration_seconds",
+)
+
+FILE_EVENTS = ActivityStream(
+    name="file_events",
+    table="file_change_events",
+    time_column="event_time",
+    time_iso_column="event_time_iso",
+    columns=(
+        "id", "event_time", "event_time_iso", "event_type", "file_path",
+        "file_name", "file_extension", "file_size", "monitored_root", "project_name",
+        "desktop_session_id", "lines_added", "lines_removed",
+    ),
+    filters={
+        "project_name": "project_name",
+        "file_extension": "file_extension",
+        "event_type": "event_type",
+        "monitored_root": "monitored_root",
+        "desktop_session_id": "desktop_session_id",
+    },
+    group_by={
+        "project": "project_name",
+        "extension": "file_extension",
+        "event_type": "event_type",
+        "directory": "directory_path",
+        "desktop_session": "desktop_session_id",
+        "hour": "date_trunc('hour', event_time_iso)",
+        "day": "date_trunc('day', event_time_iso)",
+    },
+    subtree_filters={"directory": ("directory_id", "dim_directories")},
+)
+
+INPUT_SESSIONS = ActivityStream(
+    name="input_sessions",
+    table="input_activity_sessions",
+    time_column="start_time",
+    time_iso_column="start_time_iso",
+    columns=(
+        "id", "start_time", "end_time", "start_time_iso", "end_time_iso",
+        "duration_seconds", "host_identifier",
+    ),
+    filters={"host_identifier": "host_identifier"},
+    group_by={
+        "host": "host_identifier",
+        "hour": "date_trunc('hour', start_time_iso)",
+        "day": "date_trunc('day', start_time_iso)",
+    },
+    duration_column="duration_seconds",
+)
+
+STREAMS: Dict[str, ActivityStream] = {
+    s.name: s for s in (DESKTOP_SESSIONS, FILE_EVENTS, INPUT_SESSIONS)
+}
+
+
+@dataclass
+class ActivityFilter:
+    """アクティビティ検索条件"""
+
+    start: Optional[datetime] = None   # 開始時刻（この時刻を含む）
+    end: Optional[datetime] = None     # 終了時刻（この時刻を含まない）
+    values: Dict[str, Any] = field(default_factory=dict)  # 等価フィルタ（パラメータ名 → 値）
+
+
+class InvalidCursorError(ValueError):
+    """ページネーションカーソルが不正な場合のエラー"""
+
+
+def encode_cursor(time_value: int, row_id: int) -> str:
+    """
+    キーセットページネーション用カーソルをエンコード
+
+    Args:
+        time_value: 最後の行の時間カラム値
+        row_id: 最後の行のID
+
+    Returns:
+        不透明なカーソル文字列（URLセーフBase64）
+    """
+    raw = f"{time_value}:{row_id}".encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[int, int]:
+    """
+    カーソル文字列をデコード
+
+    Args:
+        cursor: encode_cursorで生成したカーソル
+
+    Returns:
+        (time_value, row_id) のタプル
+
+    Raises:
+        InvalidCursorError: カーソル形式が不正な場合
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("ascii")
+        time_part, id_part = raw.split(":", 1)
+        return int(time_part), int(id_part)
+    except (binascii.Error, UnicodeError, ValueError) as e:
+        raise InvalidCursorError(f"不正なカーソルです: {cursor}") from e
+
+
+def build_where_clause(
+    stream: ActivityStream,
+    filters: ActivityFilter,
+    params: List[Any],
+) -> str:
+    """
+    WHERE句を構築
+
+    時間範囲はインデックス付きのBIGINTカラムで比較する。
+    配下検索フィルタは辞書テーブルの前方一致（範囲検索）でIDを求め、IDカラムで絞り込む。
+
+    Args:
+        stream: 対象ストリーム
+        filters: 検索条件
+        params: SQLパラメータのリスト（追記される）
+
+    Returns:
+        WHERE句（条件がない場合は空文字列）
+    """
+    conditions = []
+
+    if filters.start is not None:
+        params.append(int(filters.start.timestamp()))
+        conditions.append(f"{stream.time_column} >= ${len(params)}")
+
+    if filters.end is not None:
+        params.append(int(filters.end.timestamp()))
+        conditions.append(f"{stream.time_column} < ${len(params)}")
+
+    for param_name, value in filters.values.items():
+        if value is None:
+            continue
+        subtree = stream.subtree_filters.get(param_name)
+        if subtree is not None:
+            conditions.append(_subtree_condition(subtree, value, params))
+            continue
+        column = stream.filters.get(param_name)
+        if column is None:
+            continue
+        params.append(value)
+        conditions.append(f"{column} = ${len(params)}")
+
+    if not conditions:
+        return ""
+    return "WHERE " + " AND ".join(conditions)
+
+
+def _subtree_condition(subtree: Tuple[str, str], path: str, params: List[Any]) -> str:
+    """
+    指定パスとその配下に一致する条件を構築
+
+    辞書テーブルのnameは照合順序"C"のため、'/'の次の文字である'0'までの範囲検索で
+    配下のパスをインデックスから取得できる（LIKEのワイルドカードのエスケープも不要）。
+    """
+    id_column, dimension_table = subtree
+    params.append(path.rstrip("/"))
+    n = len(params)
+    return (
+        f"{id_column} IN (SELECT id FROM {dimension_table} "
+        f"WHERE name = ${n} OR (name >= ${n} || '/' AND name < ${n} || '0'))"
+    )
+
+
+def build_list_query(
+    stream: ActivityStream,
+    filters: ActivityFilter,
+    limit: int,
+    cursor: Optional[str] = None,
+) -> Tuple[str, List[Any]]:
+    """
+    一覧取得クエリ（キーセットページネーション）を構築
+
+    (time_column, id) の複合キーで昇順に並べ、limit + 1件を取得する。
+    1件多く取得できた場合は次ページが存在する。
+
+    Args:
+        stream: 対象ストリーム
+        filters: 検索条件
+        limit: 1ページの件数
+        cursor: 前ページの最後の行を示すカーソル
+
+    Returns:
+        (SQL, パラメータ) のタプル
+
+    Raises:
+        InvalidCursorError: カーソル形式が不正な場合
+    """
+    params: List[Any] = []
+    where = build_where_clause(stream, filters, params)
+
+    if cursor:
+        time_value, row_id = decode_cursor(cursor)
+        params.extend([time_value, row_id])
+        keyset = f"({stream.time_column}, id) > (${len(params) - 1}, ${len(params)})"
+        where = f"{where} AND {keyset}" if where else f"WHERE {keyset}"
+
+    params.append(limit + 1)
+    query = f"""
+        SELECT {", ".join(stream.columns)}
+        FROM {stream.table}
+        {where}
+        ORDER BY {stream.time_column} ASC, id ASC
+        LIMIT ${len(params)}
+    """
+    return query, params
+
+
+def build_summary_query(
+    stream: ActivityStream,
+    filters: ActivityFilter,
+    group_by: str,
+    limit: int,
+) -> Tuple[str, List[Any]]:
+    """
+    集計クエリを構築
+
+    Args:
+        stream: 対象ストリーム
+        filters: 検索条件
+        group_by: 集計キー（stream.group_byのキー）
+        limit: 返却する集計行の最大数
+
+    Returns:
+        (SQL, パラメータ) のタプル
+
+    Raises:
+        ValueError: group_byが対象ストリームで未対応の場合
+    """
+    expression = stream.group_by.get(group_by)
+    if expression is None:
+        raise ValueError(
+            f"group_by '{group_by}' は {stream.name} では使用できません"
+            f"（使用可能: {', '.join(stream.group_by)}）"
+        )
+
+    params: List[Any] = []
+    where = build_where_clause(stream, filters, params)
+
+    if stream.duration_column:
+        total = f"COALESCE(SUM({stream.duration_column}), 0)::BIGINT"
+    else:
+        total = "NULL::BIGINT"
+
+    # 時間単位の集計は時系列順、それ以外は件数・合計時間の多い順
+    if expression.startswith("date_trunc"):
+        order = "key ASC"
+    elif stream.duration_column:
+        order = "total_seconds DESC, key ASC"
+    else:
+        order = "count DESC, key ASC"
+
+    params.append(limit)
+    query = f"""
+        SELECT {expression}::TEXT AS key,
+               COUNT(*) AS count,
+               {total} AS total_seconds,
+               MIN({stream.time_column}) AS first_time,
+               MAX({stream.time_column}) AS last_time
+        FROM {stream.table}
+        {where}
+        GROUP BY 1
+        ORDER BY {order}
+        LIMIT ${len(params)}
+    """
+    return query, params
+
+
+def build_export_query(
+    stream: ActivityStream,
+    filters: ActivityFilter,
+) -> Tuple[str, List[Any]]:
+    """
+    エクスポート用クエリを構築
+
+    件数制限を設けず (time_column, id) 順に全件を返す。
+    サーバーサイドカーソルで少しずつ読み出すことを前提とする。
+
+    Args:
+        stream: 対象ストリーム
+        filters: 検索条件
+
+    Returns:
+        (SQL, パラメータ) のタプル
+    """
+    params: List[Any] = []
+    where = build_where_clause(stream, filters, params)
+    query = f"""
+        SELECT {", ".join(stream.columns)}
+        FROM {stream.table}
+        {where}
+        ORDER BY {stream.time_column} ASC, id ASC
+    """
+    return query, params
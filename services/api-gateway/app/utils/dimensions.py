@@ -0,0 +1,183 @@
+"""
+辞書テーブル（文字列インターン）ユーティリティ
+
+desktop_activity_sessions / file_change_events の繰り返し出現する文字列カラムは
+辞書テーブル（dim_*）の整数IDとして *_data テーブルに保存される（08_add_dimension_tables.sql参照）。
+ファイルパスは (ディレクトリID, ファイル名) として保存される（09_add_directory_dictionary.sql参照）。
+取り込み時はバッチ内の文字列をまとめてIDに変換する。
+"""
+import asyncpg
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Tuple
+
+
+@dataclass(frozen=True)
+class Dimension:
+    """辞書化するカラムの定義"""
+
+    table: str      # 辞書テーブル名
+    column: str     # 文字列カラム名（取り込みペイロード・参照用ビューでの名前）
+    id_column: str  # 実データテーブルのIDカラム名
+    # 一意インデックスをmd5(name)に設ける（btreeの上限を超える長い文字列を含む辞書）
+    hash_key: bool = False
+
+    @property
+    def conflict_key(self) -> str:
+        """一意インデックスの式（ON CONFLICTの対象）"""
+        return "md5(name)" if self.hash_key else "name"
+
+    def match_sql(self, name: str, value: str) -> str:
+        """辞書の文字列と値を照合する条件（一意インデックスを使用する）"""
+        if self.hash_key:
+            return f"md5({name}) = md5({value}) AND {name} = {value}"
+        return f"{name} = {value}"
+
+
+# 取り込み対象テーブルごとの辞書化カラム
+TABLE_DIMENSIONS: Dict[str, Tuple[Dimension, ...]] = {
+    "desktop_activity_sessions": (
+        Dimension("dim_applications", "application_name", "application_id"),
+        Dimension("dim_window_titles", "window_title", "window_title_id", hash_key=True),
+    ),
+    "file_change_events": (
+        Dimension("dim_monitored_roots", "monitored_root", "monitored_root_id"),
+        Dimension("dim_projects", "project_name", "project_id"),
+        Dimension("dim_file_extensions", "file_extension", "file_extension_id"),
+        Dimension("dim_directories", "directory_path", "directory_id"),
+    ),
+}
+
+# 参照用ビュー名 → 実データテーブル名
+STORAGE_TABLES: Dict[str, str] = {
+    "desktop_activity_sessions": "desktop_activity_sessions_data",
+    "file_change_events": "file_change_events_data",
+}
+
+# 入力文字列を登録し、既存・新規を問わずIDを返す（1往復）
+_RESOLVE_SQL = """
+    WITH input AS (
+        SELECT DISTINCT unnest($1::text[]) AS name
+    ), inserted AS (
+        INSERT INTO {table} (name)
+        SELECT name FROM input
+        ON CONFLICT ({conflict_key}) DO NOTHING
+        RETURNING id, name
+    )
+    SELECT id, name FROM inserted
+    UNION ALL
+    SELECT d.id, d.name FROM {table} d JOIN input i ON {match}
+"""
+
+
+class DimensionResolver:
+    """
+    辞書IDのバッチ解決（プロセス内キャッシュ付き）
+
+    辞書テーブルの行は削除しないため、解決済みのIDはキャッシュし続ける
+    （件数の上限に達した場合は古いものから破棄）。
+    辞書への登録は行の挿入とは別のトランザクションで確定させるため、
+    行の挿入がロールバックされてもキャッシュ済みのIDは有効なままとなる。
+    """
+
+    def __init__(self, max_entries: int = 65536):
+        """
+        Args:
+            max_entries: 辞書ごとのキャッシュ件数の上限
+        """
+        self.max_entries = max_entries
+        self._ids: Dict[str, "OrderedDict[str, int]"] = {}
+
+    async def resolve(
+        self, conn: asyncpg.Connection, dimension: Dimension, values: Iterable[Any]
+    ) -> Dict[str, int]:
+        """
+        文字列をまとめてIDに変換
+
+        Args:
+            conn: データベース接続（トランザクション外で呼び出す）
+            dimension: 辞書
+            values: 文字列（重複・None可）
+
+        Returns:
+            文字列 → ID の辞書
+
+        Raises:
+            RuntimeError: IDを解決できない値がある場合
+        """
+        cache = self._ids.setdefault(dimension.table, OrderedDict())
+        resolved: Dict[str, int] = {}
+        missing: List[str] = []
+        for value in set(values):
+            if value is None:
+                continue
+            interned = cache.get(value)
+            if interned is None:
+                missing.append(value)
+            else:
+                resolved[value] = interned
+
+        # 同時に登録された文字列はこのクエリのスナップショットから見えないため、もう一度だけ問い合わせる
+        for _ in range(2):
+            if not missing:
+                break
+            rows = await conn.fetch(
+                _RESOLVE_SQL.format(
+                    table=dimension.table,
+                    conflict_key=dimension.conflict_key,
+                    match=dimension.match_sql("d.name", "i.name"),
+                ),
+                missing,
+            )
+            for row in rows:
+                resolved[row["name"]] = row["id"]
+                cache[row["name"]] = row["id"]
+            missing = [value for value in missing if value not in resolved]
+
+        if missing:
+            raise RuntimeError(f"{dimension.table}: IDを解決できない値があります: {missing[:5]}")
+
+        while len(cache) > self.max_entries:
+            cache.popitem(last=False)
+        return resolved
+
+    async def resolve_records(
+        self,
+        conn: asyncpg.Connection,
+        table_name: str,
+        columns: List[str],
+        records: List[tuple],
+    ) -> Tuple[List[str], List[tuple]]:
+        """
+        COPY用レコードの辞書化カラムを文字列からIDに置き換える
+
+        Args:
+            conn: データベース接続（トランザクション外で呼び出す）
+            table_name: 取り込み対象テーブル名
+            columns: recordsのカラム順
+            records: 値のタプルのリスト
+
+        Returns:
+            (置き換え後のカラム順, 置き換え後のレコード) のタプル
+        """
+        dimensions = TABLE_DIMENSIONS.get(table_name, ())
+        if not dimensions:
+            return columns, records
+
+        columns = list(columns)
+        rows = [list(record) for record in records]
+        for dimension in dimensions:
+            index = columns.index(dimension.column)
+            if any(row[index] is not None and not isinstance(row[index], str) for row in rows):
+                raise ValueError(f"{dimension.column} は文字列である必要があります")
+            ids = await self.resolve(conn, dimension, (row[index] for row in rows))
+            for row in rows:
+                if row[index] is not None:
+                    row[index] = ids[row[index]]
+            columns[index] = dimension.id_column
+
+        return columns, [tuple(row) for row in rows]
+
+
+# プロセス共有のリゾルバー
+dimension_resolver = DimensionResolver()
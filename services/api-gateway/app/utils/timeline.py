@@ -0,0 +1,243 @@
+"""
+タイムラインクエリユーティリティ
+
+デスクトップセッション・ファイル変更イベント・入力活動セッションを1本の時系列に統合する。
+各ストリームは (時刻, id) のインデックス順に読み出し、(時刻, ストリーム順, id) をキーとする
+k-way mergeで統合するため、期間の長さに関わらず保持する行は各ストリームの先頭1行のみとなる。
+
+続きの取得には最後の行の (時刻, ストリーム, id) を不透明なカーソルとして渡す。
+バケットモードでは統合した時系列を一定の時間幅で区切り、ストリームごとの件数・合計時間を返す。
+"""
+import base64
+import binascii
+import heapq
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Mapping, Optional, Tuple
+
+from .activity_query import (
+    ActivityFilter,
+    ActivityStream,
+    InvalidCursorError,
+    STREAMS,
+    build_where_clause,
+)
+
+# 統合順（同時刻の行はこの順に並ぶ）
+TIMELINE_STREAMS: Tuple[str, ...] = ("desktop_sessions", "file_events", "input_sessions")
+
+# (時刻, ストリーム名, id)
+TimelineKey = Tuple[int, str, int]
+
+
+def encode_timeline_cursor(key: TimelineKey) -> str:
+    """
+    タイムラインのカーソルをエンコード
+
+    Args:
+        key: 最後の行の (時刻, ストリーム名, id)
+
+    Returns:
+        不透明なカーソル文字列（URLセーフBase64）
+    """
+    time_value, stream_name, row_id = key
+    raw = f"{time_value}:{TIMELINE_STREAMS.index(stream_name)}:{row_id}".encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_timeline_cursor(cursor: str) -> TimelineKey:
+    """
+    タイムラインのカーソルをデコード
+
+    Args:
+        cursor: encode_timeline_cursorで生成したカーソル
+
+    Returns:
+        (時刻, ストリーム名, id) のタプル
+
+    Raises:
+        InvalidCursorError: カーソル形式が不正な場合
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("ascii")
+        time_part, stream_part, id_part = raw.split(":")
+        return int(time_part), TIMELINE_STREAMS[int(stream_part)], int(id_part)
+    except (binascii.Error, UnicodeError, ValueError, IndexError) as e:
+        raise InvalidCursorError(f"不正なカーソルです: {cursor}") from e
+
+
+def parse_timeline_streams(value: Optional[str]) -> Tuple[str, ...]:
+    """
+    カンマ区切りのストリーム名を検証
+
+    Args:
+        value: "desktop_sessions,file_events" など（Noneの場合は全ストリーム）
+
+    Returns:
+        統合順に並べたストリーム名
+
+    Raises:
+        ValueError: 未知のストリーム名が含まれる場合
+    """
+    if not value:
+        return TIMELINE_STREAMS
+    names = {name.strip() for name in value.split(",") if name.strip()}
+    unknown = names - set(TIMELINE_STREAMS)
+    if unknown or not names:
+        raise ValueError(
+            f"ストリーム '{', '.join(sorted(unknown)) or value}' は使用できません"
+            f"（使用可能: {', '.join(TIMELINE_STREAMS)}）"
+        )
+    return tuple(name for name in TIMELINE_STREAMS if name in names)
+
+
+def build_timeline_query(
+    stream: ActivityStream,
+    filters: ActivityFilter,
+    after: Optional[TimelineKey] = None,
+    limit: Optional[int] = None,
+) -> Tuple[str, List[Any]]:
+    """
+    1ストリーム分のタイムラインクエリを構築
+
+    (時刻, ストリーム順, id) の辞書順でカーソルより後の行を (時刻, id) 順に返す。
+    カーソルより前のストリームは同時刻を含まず、後のストリームは同時刻を含む。
+
+    Args:
+        stream: 対象ストリーム
+        filters: 検索条件
+        after: カーソル（この行より後を返す）
+        limit: 最大件数（Noneの場合は制限なし）
+
+    Returns:
+        (SQL, パラメータ) のタプル
+    """
+    params: List[Any] = []
+    where = build_where_clause(stream, filters, params)
+
+    if after is not None:
+        time_value, stream_name, row_id = after
+        position = TIMELINE_STREAMS.index(stream.name) - TIMELINE_STREAMS.index(stream_name)
+        if position == 0:
+            params.extend([time_value, row_id])
+            keyset = f"({stream.time_column}, id) > (${len(params) - 1}, ${len(params)})"
+        else:
+            params.append(time_value)
+            operator = ">" if position < 0 else ">="
+            keyset = f"{stream.time_column} {operator} ${len(params)}"
+        where = f"{where} AND {keyset}" if where else f"WHERE {keyset}"
+
+    limit_clause = ""
+    if limit is not None:
+        params.append(limit)
+        limit_clause = f"LIMIT ${len(params)}"
+
+    query = f"""
+        SELECT {", ".join(stream.columns)}
+        FROM {stream.table}
+        {where}
+        ORDER BY {stream.time_column} ASC, id ASC
+        {limit_clause}
+    """
+    return query, params
+
+
+async def merge_timeline(
+    sources: Mapping[str, AsyncIterable[Mapping[str, Any]]],
+) -> AsyncIterator[Tuple[TimelineKey, Mapping[str, Any]]]:
+    """
+    (時刻, id) 順の行のイテレーターをk-way mergeで統合
+
+    Args:
+        sources: ストリーム名 → (時刻, id) 順に行を返す非同期イテラブル（asyncpgのカーソルなど）
+
+    Yields:
+        ((時刻, ストリーム名, id), 行) のタプル（(時刻, ストリーム順, id) 順）
+    """
+    heap = []
+
+    async def push(name: str, iterator: AsyncIterator[Mapping[str, Any]]):
+        try:
+            row = await iterator.__anext__()
+        except StopAsyncIteration:
+            return
+        time_column = STREAMS[name].time_column
+        heapq.heappush(
+            heap, (row[time_column], TIMELINE_STREAMS.index(name), row["id"], name, row, iterator)
+        )
+
+    for name, rows in sources.items():
+        await push(name, rows.__aiter__())
+
+    while heap:
+        time_value, _, row_id, name, row, iterator = heapq.heappop(heap)
+        yield (time_value, name, row_id), row
+        await push(name, iterator)
+
+
+@dataclass
+class TimelineBucket:
+    """バケットモードの1区間"""
+
+    start: int                                                   # 区間の開始時刻（この時刻を含む）
+    end: int                                                     # 区間の終了時刻（この時刻を含まない）
+    counts: Dict[str, int] = field(default_factory=dict)         # ストリーム名 → 件数
+    total_seconds: Dict[str, int] = field(default_factory=dict)  # ストリーム名 → 合計継続時間（セッションのみ）
+    last_key: Optional[TimelineKey] = None                       # 区間の最後の行（続きを取得するカーソル）
+
+    def add(self, key: TimelineKey, row: Mapping[str, Any]):
+        """行を集計に加える"""
+        name = key[1]
+        self.counts[name] = self.counts.get(name, 0) + 1
+        duration_column = STREAMS[name].duration_column
+        if duration_column:
+            self.total_seconds[name] = self.total_seconds.get(name, 0) + (row[duration_column] or 0)
+        self.last_key = key
+
+
+async def bucket_timeline(
+    merged: AsyncIterator[Tuple[TimelineKey, Mapping[str, Any]]],
+    bucket_seconds: int,
+) -> AsyncIterator[Tuple[TimelineBucket, bool]]:
+    """
+    統合した時系列を一定の時間幅で区切って集計
+
+    区間はUNIXエポックから bucket_seconds 単位で区切り、行は時刻（セッションは開始時刻）の区間に数える。
+    行のない区間は返さない。時系列順に入力されるため、保持するのは集計中の1区間のみとなる。
+
+    Args:
+        merged: merge_timelineの結果
+        bucket_seconds: 区間の幅（秒）
+
+    Yields:
+        (区間, 後続の行があるか) のタプル
+    """
+    current: Optional[TimelineBucket] = None
+    async for key, row in merged:
+        window = key[0] - key[0] % bucket_seconds
+        if current is not None and current.start != window:
+            yield current, True
+            current = None
+        if current is None:
+            current = TimelineBucket(start=window, end=window + bucket_seconds)
+        current.add(key, row)
+
+    if current is not None:
+        yield current, False
+
+
+def timeline_item(key: TimelineKey, row: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    統合した行をAPIのタイムライン項目に変換
+
+    Args:
+        key: (時刻, ストリーム名, id)
+        row: 行（dataにはストリームの一覧取得時のカラムを含める）
+    """
+    time_value, name, row_id = key
+    return {
+        "stream": name,
+        "time": time_value,
+        "id": row_id,
+        "data": {column: row[column] for column in STREAMS[name].columns},
+    }
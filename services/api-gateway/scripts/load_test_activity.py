@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+アクティビティ参照API 負荷テストスクリプト
+
+PostgreSQLに合成データを投入（--seed）し、/api/v1/activity の各エンドポイントに
+並列リクエストを送ってレイテンシ（p50/p95/p99）を計測する。
+p95がレイテンシ目標を超えたエンドポイントがあれば終了コード1を返す。
+
+使い方:
+    python scripts/load_test_activity.py --seed 200000 --requests 500 --concurrency 16
+"""
+
+import sys
+import time
+import random
+import asyncio
+import argparse
+import statistics
+import urllib.request
+import urllib.error
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+import asyncpg
+
+# エンドポイントごとのレイテンシ目標（p95、ミリ秒）
+LATENCY_TARGETS_MS = {
+    "desktop-sessions": 100,
+    "desktop-sessions/summary?group_by=app": 200,
+    "desktop-sessions/summary?group_by=hour": 200,
+    "file-events": 100,
+    "file-events/summary?group_by=project": 250,
+    "file-events/summary?group_by=extension": 250,
+    "input-sessions/summary?group_by=hour": 200,
+}
+
+APPLICATIONS = ["Code", "Brave-browser", "Gnome-terminal", "Slack", "Blender", "Firefox"]
+PROJECTS = ["reprospective", "blog", "dotfiles", "experiments", None]
+EXTENSIONS = [".py", ".ts", ".tsx", ".md", ".sql", ".yaml", ".blend"]
+EVENT_TYPES = ["created", "modified", "modified", "modified", "deleted"]
+
+
+async def intern_names(conn: asyncpg.Connection, table: str, names, key: str = "name") -> dict:
+    """
+    辞書テーブルに文字列を登録し、文字列 → ID の辞書を返す
+
+    Args:
+        conn: データベース接続
+        table: 辞書テーブル名（dim_*）
+        names: 登録する文字列（Noneは無視）
+        key: 辞書テーブルの一意インデックスの式（dim_window_titlesは md5(name)）
+    """
+    rows = await conn.fetch(
+        f"""
+        INSERT INTO {table} (name)
+        SELECT DISTINCT unnest($1::text[])
+        ON CONFLICT ({key}) DO UPDATE SET name = EXCLUDED.name
+        RETURNING id, name
+        """,
+        sorted({name for name in names if name is not None}),
+    )
+    ids = {row["name"]: row["id"] for row in rows}
+    ids[None] = None
+    return ids
+
+
+async def seed_database(database_url: str, rows: int, days: int):
+    """
+    合成データを投入
+
+    Args:
+        database_url: PostgreSQL接続URL
+        rows: テーブルごとの投入件数
+        days: データを分布させる日数
+    """
+    conn = await asyncpg.connect(database_url)
+    try:
+        now = int(time.time())
+        span = days * 86400
+
+        def timestamps():
+            start = now - random.randint(0, span)
+            duration = random.randint(1, 900)
+            return start, start + duration, duration
+
+        desktop = []
+        for _ in range(rows):
+            start, end, duration = timestamps()
+            app = random.choice(APPLICATIONS)
+            desktop.append((
+                start, end,
+                datetime.fromtimestamp(start, timezone.utc),
+                datetime.fromtimestamp(end, timezone.utc),
+                app, f"{app} window {random.randint(0, 500)}", duration,
+            ))
+
+        # 文字列カラムは辞書IDに変換して実データテーブルに投入（08_add_dimension_tables.sql参照）
+        app_ids = await intern_names(conn, "dim_applications", (r[4] for r in desktop))
+        title_ids = await intern_names(conn, "dim_window_titles", (r[5] for r in desktop), key="md5(name)")
+        await conn.copy_records_to_table(
+            "desktop_activity_sessions_data",
+            records=[r[:4] + (app_ids[r[4]], title_ids[r[5]], r[6]) for r in desktop],
+            columns=["start_time", "end_time", "start_time_iso", "end_time_iso",
+                     "application_id", "window_title_id", "duration_seconds"],
+        )
+        print(f"desktop_activity_sessions: {rows}件投入")
+
+        files = []
+        for _ in range(rows):
+            event_time = now - random.randint(0, span)
+            project = random.choice(PROJECTS)
+            ext = random.choice(EXTENSIONS)
+            name = f"file_{random.randint(0, 2000)}{ext}"
+            root = "/home/user/work"
+            directory = f"{root}/{project or 'misc'}/src"
+            files.append((
+                event_time, datetime.fromtimestamp(event_time, timezone.utc),
+                random.choice(EVENT_TYPES), directory, name, ext, root, project,
+            ))
+        directory_ids = await intern_names(conn, "dim_directories", (r[3] for r in files))
+        ext_ids = await intern_names(conn, "dim_file_extensions", (r[5] for r in files))
+        root_ids = await intern_names(conn, "dim_monitored_roots", (r[6] for r in files))
+        project_ids = await intern_names(conn, "dim_projects", (r[7] for r in files))
+        await conn.copy_records_to_table(
+            "file_change_events_data",
+            records=[
+                r[:3] + (directory_ids[r[3]], r[4], ext_ids[r[5]], root_ids[r[6]], project_ids[r[7]])
+                for r in files
+            ],
+            columns=["event_time", "event_time_iso", "event_type", "directory_id",
+                     "file_name", "file_extension_id", "monitored_root_id", "project_id"],
+        )
+        print(f"file_change_events: {rows}件投入")
+
+        inputs = []
+        for i in range(rows):
+            start, end, duration = timestamps()
+            inputs.append((
+                start, end,
+                datetime.fromtimestamp(start), datetime.fromtimestamp(end),
+                duration, start, end, f"loadtest_{i % 4}", i,
+            ))
+        await conn.copy_records_to_table(
+            "input_activity_sessions",
+            records=inputs,
+            columns=["start_time", "end_time", "start_time_iso", "end_time_iso",
+                     "duration_seconds", "created_at", "updated_at",
+                     "host_identifier", "synced_from_local_id"],
+        )
+        print(f"input_activity_sessions: {rows}件投入")
+
+        await conn.execute("ANALYZE desktop_activity_sessions_data")
+        await conn.execute("ANALYZE file_change_events_data")
+        await conn.execute("ANALYZE input_activity_sessions")
+    finally:
+        await conn.close()
+
+
+def timed_request(url: str) -> float:
+    """1リクエストを送信し、所要時間（ミリ秒）を返す"""
+    started = time.perf_counter()
+    with urllib.request.urlopen(url, timeout=30) as response:
+        response.read()
+    return (time.perf_counter() - started) * 1000
+
+
+def run_endpoint(base_url: str, endpoint: str, days: int, requests: int, concurrency: int) -> list:
+    """
+    エンドポイントに並列リクエストを送信
+
+    時間範囲はランダムな1日（一覧）または直近の指定日数（集計）とする。
+    """
+    now = datetime.now(timezone.utc)
+    urls = []
+    for _ in range(requests):
+        if "summary" in endpoint:
+            start = now - timedelta(days=days)
+            end = now
+        else:
+            start = now - timedelta(days=random.randint(1, days))
+            end = start + timedelta(days=1)
+        sep = "&" if "?" in endpoint else "?"
+        urls.append(
+            f"{base_url}/api/v1/activity/{endpoint}{sep}"
+            f"start={start.strftime('%Y-%m-%dT%H:%M:%SZ')}&end={end.strftime('%Y-%m-%dT%H:%M:%SZ')}"
+        )
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(timed_request, urls))
+
+
+def percentile(values: list, pct: float) -> float:
+    """パーセンタイル値を計算"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description='アクティビティ参照APIの負荷テスト')
+    parser.add_argument('--base-url', default='http://localhost:8800', help='API GatewayのURL')
+    parser.add_argument('--database-url', default=None, help='シード投入先のPostgreSQL接続URL')
+    parser.add_argument('--seed', type=int, default=0, help='テーブルごとのシード件数（0で投入しない）')
+    parser.add_argument('--days', type=int, default=90, help='データ・クエリの対象日数')
+    parser.add_argument('--requests', type=int, default=200, help='エンドポイントごとのリクエスト数')
+    parser.add_argument('--concurrency', type=int, default=8, help='並列数')
+    args = parser.parse_args()
+
+    if args.seed:
+        if not args.database_url:
+            print("エラー: --seed には --database-url の指定が必要です")
+            return 1
+        asyncio.run(seed_database(args.database_url, args.seed, args.days))
+
+    failed = []
+    print()
+    print(f"{'エンドポイント':<45} {'p50':>8} {'p95':>8} {'p99':>8} {'目標':>8}")
+    print("-" * 82)
+
+    for endpoint, target_ms in LATENCY_TARGETS_MS.items():
+        try:
+            latencies = run_endpoint(
+                args.base_url, endpoint, args.days, args.requests, args.concurrency
+            )
+        except urllib.error.URLError as e:
+            print(f"{endpoint:<45} リクエスト失敗: {e}")
+            failed.append(endpoint)
+            continue
+
+        p95 = percentile(latencies, 95)
+        mark = "OK" if p95 <= target_ms else "NG"
+        print(
+            f"{endpoint:<45} {statistics.median(latencies):>7.1f}ms {p95:>7.1f}ms "
+            f"{percentile(latencies, 99):>7.1f}ms {target_ms:>6}ms {mark}"
+        )
+        if p95 > target_ms:
+            failed.append(endpoint)
+
+    print()
+    if failed:
+        print(f"レイテンシ目標未達: {', '.join(failed)}")
+        return 1
+
+    print("すべてのエンドポイントがレイテンシ目標を満たしました")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,49 @@
+-- 06_add_activity_query_indexes.sql
+-- アクティビティ参照API（/api/v1/activity）用インデックス
+--
+-- 一覧取得は (時刻, id) のキーセットページネーション、
+-- 集計は属性 + 時間範囲の絞り込みを行うため、複合インデックスを追加する。
+
+-- ================================
+-- desktop_activity_sessions
+-- ================================
+
+-- キーセットページネーション用
+CREATE INDEX IF NOT EXISTS idx_desktop_start_time_id
+    ON desktop_activity_sessions(start_time, id);
+
+-- アプリ別集計用（duration_secondsを含めてIndex Only Scanを可能にする）
+CREATE INDEX IF NOT EXISTS idx_desktop_app_start_time
+    ON desktop_activity_sessions(application_name, start_time)
+    INCLUDE (duration_seconds);
+
+-- ================================
+-- file_change_events
+-- ================================
+
+-- キーセットページネーション用
+CREATE INDEX IF NOT EXISTS idx_file_event_time_id
+    ON file_change_events(event_time, id);
+
+-- プロジェクト別・拡張子別の時間範囲絞り込み用
+CREATE INDEX IF NOT EXISTS idx_file_project_event_time
+    ON file_change_events(project_name, event_time);
+CREATE INDEX IF NOT EXISTS idx_file_extension_event_time
+    ON file_change_events(file_extension, event_time);
+
+-- ================================
+-- input_activity_sessions
+-- ================================
+
+-- キーセットページネーション用
+CREATE INDEX IF NOT EXISTS idx_input_start_time_id
+    ON input_activity_sessions(start_time, id);
+
+-- ホスト別の時間範囲絞り込み用
+CREATE INDEX IF NOT EXISTS idx_input_host_start_time
+    ON input_activity_sessions(host_identifier, start_time);
+
+-- バージョン6を記録
+INSERT INTO schema_version (version, description)
+VALUES (6, 'Add composite indexes for activity query API')
+ON CONFLICT (version) DO NOTHING;
@@ -0,0 +1,27 @@
+-- 07_add_monitored_directories_notify.sql
+-- monitored_directories 変更通知
+--
+-- API Gatewayはディレクトリ一覧のレスポンスをプロセス内にキャッシュしている。
+-- 他のプロセス（別のゲートウェイ、エージェントのYAML移行など）による変更でも
+-- キャッシュを無効化できるよう、変更時に NOTIFY を発行する。
+
+CREATE OR REPLACE FUNCTION notify_monitored_directories_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('monitored_directories_changed', TG_OP);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_notify_monitored_directories_changed ON monitored_directories;
+
+-- 文単位トリガー（一括更新でも通知は1回）
+CREATE TRIGGER trigger_notify_monitored_directories_changed
+    AFTER INSERT OR UPDATE OR DELETE ON monitored_directories
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_monitored_directories_changed();
+
+-- バージョン7を記録
+INSERT INTO schema_version (version, description)
+VALUES (7, 'Add NOTIFY trigger on monitored_directories for API response cache invalidation')
+ON CONFLICT (version) DO NOTHING;
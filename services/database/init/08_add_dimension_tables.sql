@@ -0,0 +1,229 @@
+-- 08_add_dimension_tables.sql
+-- 繰り返し出現する文字列の辞書テーブル化
+--
+-- アプリケーション名・ウィンドウタイトル・監視ルート・プロジェクト名・拡張子を
+-- 行ごとのTEXTから辞書テーブルの整数IDに置き換え、行サイズとインデックスサイズを削減する。
+--
+-- 実データは *_data テーブルに移し、従来のテーブル名は辞書を結合したビューとして残す。
+-- 参照側（API・スクリプト・集計ビュー）は従来どおりのカラム名で参照できる。
+-- 書き込み（host-agentの同期・取り込みAPI）は辞書IDに変換して *_data テーブルに挿入する。
+
+-- ================================
+-- 辞書テーブル
+-- ================================
+
+CREATE TABLE IF NOT EXISTS dim_applications (
+    id SERIAL PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+
+-- ウィンドウタイトルは長いもの（btreeの上限約2700バイトを超えるもの）があるため、
+-- nameではなくmd5(name)に一意インデックスを設ける（登録・照合はmd5(name)とnameの両方で行う）
+CREATE TABLE IF NOT EXISTS dim_window_titles (
+    id SERIAL PRIMARY KEY,
+    name TEXT NOT NULL
+);
+
+-- nameに一意制約を設けていた以前のスキーマから移行
+ALTER TABLE dim_window_titles DROP CONSTRAINT IF EXISTS dim_window_titles_name_key;
+CREATE UNIQUE INDEX IF NOT EXISTS dim_window_titles_name_md5_key ON dim_window_titles (md5(name));
+
+CREATE TABLE IF NOT EXISTS dim_monitored_roots (
+    id SERIAL PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS dim_projects (
+    id SERIAL PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS dim_file_extensions (
+    id SERIAL PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+
+COMMENT ON TABLE dim_applications IS 'アプリケーション名辞書';
+COMMENT ON TABLE dim_window_titles IS 'ウィンドウタイトル辞書';
+COMMENT ON TABLE dim_monitored_roots IS '監視ルート辞書';
+COMMENT ON TABLE dim_projects IS 'プロジェクト名辞書';
+COMMENT ON TABLE dim_file_extensions IS '拡張子辞書';
+
+-- ================================
+-- 実データテーブルへの移行（未移行の場合のみ）
+-- ================================
+
+DO $$
+BEGIN
+    IF to_regclass('desktop_activity_sessions_data') IS NULL THEN
+        -- 文字列カラムに依存する集計ビューは移行後に作り直す
+        DROP VIEW IF EXISTS daily_activity_summary;
+
+        ALTER TABLE desktop_activity_sessions RENAME TO desktop_activity_sessions_data;
+
+        INSERT INTO dim_applications (name)
+        SELECT DISTINCT application_name FROM desktop_activity_sessions_data
+        ON CONFLICT (name) DO NOTHING;
+
+        INSERT INTO dim_window_titles (name)
+        SELECT DISTINCT window_title FROM desktop_activity_sessions_data
+        ON CONFLICT (md5(name)) DO NOTHING;
+
+        ALTER TABLE desktop_activity_sessions_data
+            ADD COLUMN application_id INTEGER REFERENCES dim_applications(id),
+            ADD COLUMN window_title_id INTEGER REFERENCES dim_window_titles(id);
+
+        UPDATE desktop_activity_sessions_data d
+        SET application_id = a.id,
+            window_title_id = t.id
+        FROM dim_applications a, dim_window_titles t
+        WHERE a.name = d.application_name
+          AND md5(t.name) = md5(d.window_title)
+          AND t.name = d.window_title;
+
+        -- 文字列カラムを削除（idx_desktop_application_name / idx_desktop_app_start_time も削除される）
+        ALTER TABLE desktop_activity_sessions_data
+            ALTER COLUMN application_id SET NOT NULL,
+            ALTER COLUMN window_title_id SET NOT NULL,
+            DROP COLUMN application_name,
+            DROP COLUMN window_title;
+    END IF;
+
+    IF to_regclass('file_change_events_data') IS NULL THEN
+        DROP VIEW IF EXISTS daily_file_changes_summary;
+
+        ALTER TABLE file_change_events RENAME TO file_change_events_data;
+
+        INSERT INTO dim_monitored_roots (name)
+        SELECT DISTINCT monitored_root FROM file_change_events_data
+        ON CONFLICT (name) DO NOTHING;
+
+        INSERT INTO dim_projects (name)
+        SELECT DISTINCT project_name FROM file_change_events_data
+        WHERE project_name IS NOT NULL
+        ON CONFLICT (name) DO NOTHING;
+
+        INSERT INTO dim_file_extensions (name)
+        SELECT DISTINCT file_extension FROM file_change_events_data
+        WHERE file_extension IS NOT NULL
+        ON CONFLICT (name) DO NOTHING;
+
+        ALTER TABLE file_change_events_data
+            ADD COLUMN monitored_root_id INTEGER REFERENCES dim_monitored_roots(id),
+            ADD COLUMN project_id INTEGER REFERENCES dim_projects(id),
+            ADD COLUMN file_extension_id INTEGER REFERENCES dim_file_extensions(id);
+
+        -- project_name / file_extension はNULLを含むため、スカラーサブクエリで引く
+        UPDATE file_change_events_data e
+        SET monitored_root_id = (SELECT id FROM dim_monitored_roots WHERE name = e.monitored_root),
+            project_id = (SELECT id FROM dim_projects WHERE name = e.project_name),
+            file_extension_id = (SELECT id FROM dim_file_extensions WHERE name = e.file_extension);
+
+        ALTER TABLE file_change_events_data
+            ALTER COLUMN monitored_root_id SET NOT NULL,
+            DROP COLUMN monitored_root,
+            DROP COLUMN project_name,
+            DROP COLUMN file_extension;
+    END IF;
+END $$;
+
+-- ================================
+-- 辞書IDのインデックス
+-- ================================
+
+-- アプリ別集計用（duration_secondsを含めてIndex Only Scanを可能にする）
+CREATE INDEX IF NOT EXISTS idx_desktop_app_id_start_time
+    ON desktop_activity_sessions_data(application_id, start_time)
+    INCLUDE (duration_seconds);
+
+-- プロジェクト別・拡張子別の時間範囲絞り込み用
+CREATE INDEX IF NOT EXISTS idx_file_project_id_event_time
+    ON file_change_events_data(project_id, event_time);
+CREATE INDEX IF NOT EXISTS idx_file_extension_id_event_time
+    ON file_change_events_data(file_extension_id, event_time);
+CREATE INDEX IF NOT EXISTS idx_file_root_id_event_time
+    ON file_change_events_data(monitored_root_id, event_time);
+
+-- ================================
+-- 参照用ビュー（辞書化前と同じカラム）
+-- ================================
+
+CREATE OR REPLACE VIEW desktop_activity_sessions AS
+SELECT
+    d.id,
+    d.start_time,
+    d.end_time,
+    d.start_time_iso,
+    d.end_time_iso,
+    a.name AS application_name,
+    t.name AS window_title,
+    d.duration_seconds,
+    d.synced_at,
+    d.created_at,
+    d.updated_at,
+    d.application_id,
+    d.window_title_id
+FROM desktop_activity_sessions_data d
+JOIN dim_applications a ON a.id = d.application_id
+JOIN dim_window_titles t ON t.id = d.window_title_id;
+
+COMMENT ON VIEW desktop_activity_sessions IS 'デスクトップアクティビティセッション（辞書結合済み、実データはdesktop_activity_sessions_data）';
+
+CREATE OR REPLACE VIEW file_change_events AS
+SELECT
+    e.id,
+    e.event_time,
+    e.event_time_iso,
+    e.event_type,
+    e.file_path,
+    e.file_path_relative,
+    e.file_name,
+    x.name AS file_extension,
+    e.file_size,
+    e.is_symlink,
+    r.name AS monitored_root,
+    p.name AS project_name,
+    e.synced_at,
+    e.created_at,
+    e.monitored_root_id,
+    e.project_id,
+    e.file_extension_id
+FROM file_change_events_data e
+JOIN dim_monitored_roots r ON r.id = e.monitored_root_id
+LEFT JOIN dim_projects p ON p.id = e.project_id
+LEFT JOIN dim_file_extensions x ON x.id = e.file_extension_id;
+
+COMMENT ON VIEW file_change_events IS 'ファイル変更イベント（辞書結合済み、実データはfile_change_events_data）';
+
+-- 集計ビューを作り直す
+CREATE OR REPLACE VIEW daily_activity_summary AS
+SELECT
+    DATE(start_time_iso) as activity_date,
+    application_name,
+    COUNT(*) as session_count,
+    SUM(duration_seconds) as total_duration_seconds,
+    AVG(duration_seconds) as avg_duration_seconds
+FROM desktop_activity_sessions
+WHERE end_time IS NOT NULL
+GROUP BY DATE(start_time_iso), application_name
+ORDER BY activity_date DESC, total_duration_seconds DESC;
+
+COMMENT ON VIEW daily_activity_summary IS '日別アクティビティ集計（アプリケーションごと）';
+
+CREATE OR REPLACE VIEW daily_file_changes_summary AS
+SELECT
+    DATE(event_time_iso) as event_date,
+    project_name,
+    event_type,
+    file_extension,
+    COUNT(*) as event_count
+FROM file_change_events
+GROUP BY DATE(event_time_iso), project_name, event_type, file_extension
+ORDER BY event_date DESC, event_count DESC;
+
+COMMENT ON VIEW daily_file_changes_summary IS '日別ファイル変更集計';
+
+-- バージョン8を記録
+INSERT INTO schema_version (version, description)
+VALUES (8, 'Intern repeated strings into dimension tables')
+ON CONFLICT (version) DO NOTHING;
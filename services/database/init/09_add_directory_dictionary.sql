@@ -0,0 +1,102 @@
+-- 09_add_directory_dictionary.sql
+-- ファイルパスのディレクトリ部分の辞書テーブル化
+--
+-- file_change_events のファイルパスは同じディレクトリ配下で先頭部分が繰り返されるため、
+-- (ディレクトリID, ファイル名) として保存し、参照用ビューで ディレクトリ || '/' || ファイル名 に復元する。
+-- ディレクトリ単位の絞り込みは辞書テーブルの範囲検索でディレクトリIDを求め、
+-- (directory_id, event_time) インデックスで引く。
+
+-- ================================
+-- 辞書テーブル
+-- ================================
+
+-- 前方一致の範囲検索でインデックスを使えるよう、照合順序はバイト順（"C"）とする
+CREATE TABLE IF NOT EXISTS dim_directories (
+    id SERIAL PRIMARY KEY,
+    name TEXT COLLATE "C" NOT NULL UNIQUE
+);
+
+COMMENT ON TABLE dim_directories IS 'ディレクトリ辞書（末尾の / なしの絶対パス）';
+
+-- ================================
+-- ディレクトリIDの追加（未移行の場合のみ）
+-- ================================
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'file_change_events_data' AND column_name = 'directory_id'
+    ) THEN
+        -- file_nameはfile_pathのベース名のため、末尾の '/' || file_name を除いたものがディレクトリ
+        INSERT INTO dim_directories (name)
+        SELECT DISTINCT left(file_path, length(file_path) - length(file_name) - 1)
+        FROM file_change_events_data
+        ON CONFLICT (name) DO NOTHING;
+
+        ALTER TABLE file_change_events_data
+            ADD COLUMN directory_id INTEGER REFERENCES dim_directories(id);
+
+        UPDATE file_change_events_data e
+        SET directory_id = d.id
+        FROM dim_directories d
+        WHERE d.name = left(e.file_path, length(e.file_path) - length(e.file_name) - 1);
+    END IF;
+END $$;
+
+-- ディレクトリ別の時間範囲絞り込み用
+CREATE INDEX IF NOT EXISTS idx_file_directory_id_event_time
+    ON file_change_events_data(directory_id, event_time);
+
+-- ================================
+-- 参照用ビュー（file_pathを復元し、directory_pathを追加）
+-- ================================
+-- file_pathはdim_directories.nameの照合順序（"C"）を引き継ぐため、既存のビューのカラムに合わせて"default"に戻す
+-- （CREATE OR REPLACE VIEWはカラムの照合順序を変更できない）
+
+CREATE OR REPLACE VIEW file_change_events AS
+SELECT
+    e.id,
+    e.event_time,
+    e.event_time_iso,
+    e.event_type,
+    (dir.name || '/' || e.file_name) COLLATE "default" AS file_path,
+    e.file_path_relative,
+    e.file_name,
+    x.name AS file_extension,
+    e.file_size,
+    e.is_symlink,
+    r.name AS monitored_root,
+    p.name AS project_name,
+    e.synced_at,
+    e.created_at,
+    e.monitored_root_id,
+    e.project_id,
+    e.file_extension_id,
+    dir.name AS directory_path,
+    e.directory_id
+FROM file_change_events_data e
+JOIN dim_directories dir ON dir.id = e.directory_id
+JOIN dim_monitored_roots r ON r.id = e.monitored_root_id
+LEFT JOIN dim_projects p ON p.id = e.project_id
+LEFT JOIN dim_file_extensions x ON x.id = e.file_extension_id;
+
+COMMENT ON VIEW file_change_events IS 'ファイル変更イベント（辞書結合済み、実データはfile_change_events_data）';
+
+-- ビューがfile_pathを参照しなくなったため、元のカラムを削除する
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'file_change_events_data' AND column_name = 'file_path'
+    ) THEN
+        ALTER TABLE file_change_events_data
+            ALTER COLUMN directory_id SET NOT NULL,
+            DROP COLUMN file_path;
+    END IF;
+END $$;
+
+-- バージョン9を記録
+INSERT INTO schema_version (version, description)
+VALUES (9, 'Store file paths as directory id and file name')
+ON CONFLICT (version) DO NOTHING;
@@ -0,0 +1,60 @@
+-- 10_add_interval_join.sql
+-- デスクトップセッションと入力セッションの区間結合
+--
+-- デスクトップセッションごとに、入力セッションと重なっている秒数（実活動時間）を求める。
+-- 区間の重なりは範囲型（int8range）の && 演算子とGiSTインデックスで検索し、
+-- セッション内の重なりは range_agg で和集合にしてから長さを合計する
+-- （複数ホストの入力セッションが重なっていても同じ秒を二重に数えない）。
+-- ホスト側の同等の処理は host-agent/common/interval_join.py を参照。
+
+-- ================================
+-- 区間のGiSTインデックス（終了済みのセッションのみ）
+-- ================================
+
+CREATE INDEX IF NOT EXISTS idx_input_time_range
+    ON input_activity_sessions USING gist (int8range(start_time, end_time))
+    WHERE end_time IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_desktop_time_range
+    ON desktop_activity_sessions_data USING gist (int8range(start_time, end_time))
+    WHERE end_time IS NOT NULL;
+
+-- ================================
+-- 実活動時間の算出
+-- ================================
+
+-- 指定期間 [p_start, p_end) と重なる終了済みデスクトップセッションの実活動時間
+-- （session_idはdesktop_activity_sessions_data.idと同じBIGINT。戻り値の型は置き換えできないため作り直す）
+DROP FUNCTION IF EXISTS desktop_session_active_seconds(BIGINT, BIGINT);
+CREATE FUNCTION desktop_session_active_seconds(p_start BIGINT, p_end BIGINT)
+RETURNS TABLE (session_id BIGINT, duration_seconds INTEGER, active_seconds BIGINT)
+LANGUAGE sql STABLE AS $$
+    WITH overlapping AS (
+        SELECT
+            d.id,
+            d.duration_seconds,
+            -- セッション範囲で切り取った入力セッションの和集合（重なりがなければNULL）
+            range_agg(int8range(i.start_time, i.end_time) * int8range(d.start_time, d.end_time))
+                FILTER (WHERE i.id IS NOT NULL) AS active
+        FROM desktop_activity_sessions_data d
+        LEFT JOIN input_activity_sessions i
+            ON i.end_time IS NOT NULL
+           AND int8range(i.start_time, i.end_time) && int8range(d.start_time, d.end_time)
+        WHERE d.end_time IS NOT NULL
+          AND int8range(d.start_time, d.end_time) && int8range(p_start, p_end)
+        GROUP BY d.id, d.duration_seconds
+    )
+    SELECT
+        o.id,
+        o.duration_seconds,
+        COALESCE((SELECT SUM(upper(r) - lower(r)) FROM unnest(o.active) AS r), 0)::BIGINT
+    FROM overlapping o
+$$;
+
+COMMENT ON FUNCTION desktop_session_active_seconds(BIGINT, BIGINT)
+    IS '指定期間のデスクトップセッションごとの実活動時間（入力セッションと重なる秒数）';
+
+-- バージョン10を記録
+INSERT INTO schema_version (version, description)
+VALUES (10, 'Add interval join between desktop and input sessions')
+ON CONFLICT (version) DO NOTHING;
@@ -0,0 +1,137 @@
+-- 11_add_file_event_session_attribution.sql
+-- ファイル変更イベントへのデスクトップセッションIDの付与
+--
+-- ファイル変更イベントの発生時刻を含むデスクトップセッション（その時点の前面アプリケーション）の
+-- IDを挿入時に desktop_session_id として保存し、セッションごとのファイル変更件数を
+-- 範囲結合ではなく desktop_session_id のGROUP BYで求められるようにする。
+--
+-- 挿入経路（host-agentの直接同期・取り込みAPI・スプールのCOPY）によらず付与されるよう、トリガーで処理する。
+-- - ファイル変更イベントの挿入時: 区間のGiSTインデックス（10_add_interval_join.sql）で含むセッションを検索
+-- - デスクトップセッションの挿入時: セッションより先に同期された未付与のイベントに付与
+--   （セッションは終了後に同期されるため、作業中のファイル変更が先に届くことが多い）
+
+-- ================================
+-- カラムとインデックス
+-- ================================
+
+ALTER TABLE file_change_events_data
+    ADD COLUMN IF NOT EXISTS desktop_session_id BIGINT
+        REFERENCES desktop_activity_sessions_data(id) ON DELETE SET NULL;
+
+COMMENT ON COLUMN file_change_events_data.desktop_session_id
+    IS 'イベント発生時刻を含むデスクトップセッションのID（該当なしはNULL）';
+
+-- ================================
+-- 含むセッションの検索
+-- ================================
+
+-- 指定時刻を含む終了済みデスクトップセッション（複数ホストで重なる場合は最も遅く始まったもの）
+-- （戻り値はdesktop_activity_sessions_data.idと同じBIGINT。戻り値の型は置き換えできないため作り直す）
+DROP FUNCTION IF EXISTS covering_desktop_session_id(BIGINT);
+CREATE FUNCTION covering_desktop_session_id(p_time BIGINT)
+RETURNS BIGINT
+LANGUAGE sql STABLE AS $$
+    SELECT id
+    FROM desktop_activity_sessions_data
+    WHERE end_time IS NOT NULL
+      AND int8range(start_time, end_time) @> p_time
+    ORDER BY start_time DESC, id DESC
+    LIMIT 1
+$$;
+
+-- ================================
+-- 既存データへの付与
+-- ================================
+
+UPDATE file_change_events_data
+SET desktop_session_id = covering_desktop_session_id(event_time)
+WHERE desktop_session_id IS NULL;
+
+-- セッション別集計用
+CREATE INDEX IF NOT EXISTS idx_file_desktop_session_id
+    ON file_change_events_data(desktop_session_id);
+
+-- 未付与のイベントの検索用（セッション挿入時の付与）
+CREATE INDEX IF NOT EXISTS idx_file_unattributed_event_time
+    ON file_change_events_data(event_time)
+    WHERE desktop_session_id IS NULL;
+
+-- ================================
+-- トリガー
+-- ================================
+
+CREATE OR REPLACE FUNCTION attribute_file_event_to_session()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.desktop_session_id := covering_desktop_session_id(NEW.event_time);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_attribute_file_event_to_session ON file_change_events_data;
+
+CREATE TRIGGER trigger_attribute_file_event_to_session
+    BEFORE INSERT ON file_change_events_data
+    FOR EACH ROW
+    WHEN (NEW.desktop_session_id IS NULL)
+    EXECUTE FUNCTION attribute_file_event_to_session();
+
+CREATE OR REPLACE FUNCTION attribute_file_events_to_new_sessions()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE file_change_events_data e
+    SET desktop_session_id = s.id
+    FROM new_sessions s
+    WHERE e.desktop_session_id IS NULL
+      AND s.end_time IS NOT NULL
+      AND e.event_time >= s.start_time
+      AND e.event_time < s.end_time;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_attribute_file_events_to_new_sessions ON desktop_activity_sessions_data;
+
+-- 文単位トリガー（同期のバッチ全体を1回のUPDATEで処理）
+CREATE TRIGGER trigger_attribute_file_events_to_new_sessions
+    AFTER INSERT ON desktop_activity_sessions_data
+    REFERENCING NEW TABLE AS new_sessions
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION attribute_file_events_to_new_sessions();
+
+-- ================================
+-- 参照用ビュー（desktop_session_idを追加）
+-- ================================
+
+CREATE OR REPLACE VIEW file_change_events AS
+SELECT
+    e.id,
+    e.event_time,
+    e.event_time_iso,
+    e.event_type,
+    (dir.name || '/' || e.file_name) COLLATE "default" AS file_path,
+    e.file_path_relative,
+    e.file_name,
+    x.name AS file_extension,
+    e.file_size,
+    e.is_symlink,
+    r.name AS monitored_root,
+    p.name AS project_name,
+    e.synced_at,
+    e.created_at,
+    e.monitored_root_id,
+    e.project_id,
+    e.file_extension_id,
+    dir.name AS directory_path,
+    e.directory_id,
+    e.desktop_session_id
+FROM file_change_events_data e
+JOIN dim_directories dir ON dir.id = e.directory_id
+JOIN dim_monitored_roots r ON r.id = e.monitored_root_id
+LEFT JOIN dim_projects p ON p.id = e.project_id
+LEFT JOIN dim_file_extensions x ON x.id = e.file_extension_id;
+
+-- バージョン11を記録
+INSERT INTO schema_version (version, description)
+VALUES (11, 'Attribute file events to the covering desktop session')
+ON CONFLICT (version) DO NOTHING;
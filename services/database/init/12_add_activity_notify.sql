@@ -0,0 +1,59 @@
+-- 12_add_activity_notify.sql
+-- アクティビティ挿入通知
+--
+-- API Gatewayのライブフィード（/api/v1/activity/live）が新しく同期された行を配信できるよう、
+-- デスクトップセッション・ファイル変更イベント・入力活動セッションの挿入時に NOTIFY を発行する。
+-- 挿入経路（host-agentの直接同期・取り込みAPI・スプールのCOPY）によらず通知される。
+--
+-- ペイロードは {"table": テーブル名, "ids": [ID, ...]}。
+-- NOTIFYのペイロード上限（8000バイト）を超えないよう、IDは500件ずつに分けて通知する。
+-- 通知はトランザクションのコミット時に配信されるため、受信側からは常に挿入済みの行が見える。
+
+CREATE OR REPLACE FUNCTION notify_activity_inserted()
+RETURNS TRIGGER AS $$
+DECLARE
+    chunk_ids BIGINT[];
+BEGIN
+    FOR chunk_ids IN
+        SELECT array_agg(id ORDER BY id)
+        FROM (
+            SELECT id, (row_number() OVER (ORDER BY id) - 1) / 500 AS chunk
+            FROM new_rows
+        ) numbered
+        GROUP BY chunk
+    LOOP
+        PERFORM pg_notify(
+            'activity_inserted',
+            json_build_object('table', TG_TABLE_NAME, 'ids', chunk_ids)::TEXT
+        );
+    END LOOP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 文単位トリガー（バッチ全体で通知はIDの件数 / 500 回）
+DROP TRIGGER IF EXISTS trigger_notify_desktop_sessions_inserted ON desktop_activity_sessions_data;
+CREATE TRIGGER trigger_notify_desktop_sessions_inserted
+    AFTER INSERT ON desktop_activity_sessions_data
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_activity_inserted();
+
+DROP TRIGGER IF EXISTS trigger_notify_file_events_inserted ON file_change_events_data;
+CREATE TRIGGER trigger_notify_file_events_inserted
+    AFTER INSERT ON file_change_events_data
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_activity_inserted();
+
+DROP TRIGGER IF EXISTS trigger_notify_input_sessions_inserted ON input_activity_sessions;
+CREATE TRIGGER trigger_notify_input_sessions_inserted
+    AFTER INSERT ON input_activity_sessions
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_activity_inserted();
+
+-- バージョン12を記録
+INSERT INTO schema_version (version, description)
+VALUES (12, 'Add NOTIFY triggers for the live activity feed')
+ON CONFLICT (version) DO NOTHING;
@@ -0,0 +1,54 @@
+-- 13_add_file_event_line_stats.sql
+-- ファイル変更イベントの追加・削除行数
+--
+-- host-agentの行数の差分（filesystem_watcher.line_stats）が有効な場合に、
+-- 小さなテキストファイルの変更で追加・削除した行数を記録する。
+-- 無効な場合・比較できなかったイベント（大きなファイル・バイナリ・前回の内容なし）はNULL。
+
+ALTER TABLE file_change_events_data
+    ADD COLUMN IF NOT EXISTS lines_added INTEGER,
+    ADD COLUMN IF NOT EXISTS lines_removed INTEGER;
+
+COMMENT ON COLUMN file_change_events_data.lines_added
+    IS '前回の内容と比較して追加した行数（比較していない場合はNULL）';
+COMMENT ON COLUMN file_change_events_data.lines_removed
+    IS '前回の内容と比較して削除した行数（比較していない場合はNULL）';
+
+-- ================================
+-- 参照用ビュー（lines_added / lines_removedを追加）
+-- ================================
+
+CREATE OR REPLACE VIEW file_change_events AS
+SELECT
+    e.id,
+    e.event_time,
+    e.event_time_iso,
+    e.event_type,
+    (dir.name || '/' || e.file_name) COLLATE "default" AS file_path,
+    e.file_path_relative,
+    e.file_name,
+    x.name AS file_extension,
+    e.file_size,
+    e.is_symlink,
+    r.name AS monitored_root,
+    p.name AS project_name,
+    e.synced_at,
+    e.created_at,
+    e.monitored_root_id,
+    e.project_id,
+    e.file_extension_id,
+    dir.name AS directory_path,
+    e.directory_id,
+    e.desktop_session_id,
+    e.lines_added,
+    e.lines_removed
+FROM file_change_events_data e
+JOIN dim_directories dir ON dir.id = e.directory_id
+JOIN dim_monitored_roots r ON r.id = e.monitored_root_id
+LEFT JOIN dim_projects p ON p.id = e.project_id
+LEFT JOIN dim_file_extensions x ON x.id = e.file_extension_id;
+
+-- バージョン13を記録
+INSERT INTO schema_version (version, description)
+VALUES (13, 'Add line-level change statistics to file events')
+ON CONFLICT (version) DO NOTHING;